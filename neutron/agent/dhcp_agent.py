@@ -400,7 +400,8 @@ class DhcpPluginApi(n_rpc.RpcProxy):
 
     def __init__(self, topic, context, use_namespaces):
         super(DhcpPluginApi, self).__init__(
-            topic=topic, default_version=self.BASE_RPC_API_VERSION)
+            topic=agent_rpc.get_plugin_topic(topic, topics.RPC_GROUP_SYNC),
+            default_version=self.BASE_RPC_API_VERSION)
         self.context = context
         self.host = cfg.CONF.host
         self.use_namespaces = use_namespaces
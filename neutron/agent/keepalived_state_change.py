@@ -0,0 +1,77 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Push a keepalived state transition of a HA router to the L3 agent.
+
+This is run by the keepalived notify scripts written by the L3 agent, the
+agent listens on a UNIX domain socket for these notifications.
+"""
+
+import httplib
+import socket
+import sys
+import time
+
+from oslo.config import cfg
+
+OPTS = [
+    cfg.StrOpt('router_id', help=_('ID of the router')),
+    cfg.StrOpt('state', help=_('New keepalived state of the router')),
+    cfg.StrOpt('socket_path',
+               help=_('Location of the L3 agent HA state change socket')),
+    cfg.IntOpt('timeout', default=5,
+               help=_('Timeout in seconds for the notification')),
+]
+
+
+class UnixDomainHTTPConnection(httplib.HTTPConnection):
+    """Connection class for HTTP over UNIX domain socket."""
+    def __init__(self, socket_path, timeout=None):
+        httplib.HTTPConnection.__init__(self, 'localhost')
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def notify(socket_path, router_id, state, timeout=None):
+    conn = UnixDomainHTTPConnection(socket_path, timeout=timeout)
+    try:
+        conn.request('PUT', '/', headers={
+            'X-Neutron-Router-Id': router_id,
+            'X-Neutron-State': state,
+            'X-Neutron-Timestamp': '%f' % time.time()})
+        return conn.getresponse().status
+    finally:
+        conn.close()
+
+
+def main():
+    conf = cfg.CONF
+    conf.register_cli_opts(OPTS)
+    conf(sys.argv[1:], project='neutron')
+
+    try:
+        status = notify(conf.socket_path, conf.router_id, conf.state,
+                        timeout=conf.timeout)
+    except (socket.error, httplib.HTTPException) as e:
+        # The agent still gets the state from the state file
+        sys.stderr.write(_('Unable to notify the L3 agent: %s\n') % e)
+        return 1
+    return 0 if status == httplib.OK else 1
@@ -15,6 +15,7 @@
 
 import sys
 
+import copy
 import datetime
 import eventlet
 eventlet.monkey_patch()
@@ -28,6 +29,7 @@ import Queue
 from neutron.agent.common import config
 from neutron.agent import l3_ha_agent
 from neutron.agent.linux import external_process
+from neutron.agent.linux import garp
 from neutron.agent.linux import interface
 from neutron.agent.linux import ip_lib
 from neutron.agent.linux import iptables_manager
@@ -72,8 +74,9 @@ FIP_PR_END = FIP_PR_START + 40000
 RPC_LOOP_INTERVAL = 1
 FLOATING_IP_CIDR_SUFFIX = '/32'
 # Lower value is higher priority
-PRIORITY_RPC = 0
-PRIORITY_SYNC_ROUTERS_TASK = 1
+PRIORITY_HA_STATE_CHANGE = 0
+PRIORITY_RPC = 1
+PRIORITY_SYNC_ROUTERS_TASK = 2
 DELETE_ROUTER = 1
 
 
@@ -88,6 +91,9 @@ class L3PluginApi(n_rpc.RpcProxy):
               - get_agent_gateway_port
               Needed by the agent when operating in DVR/DVR_SNAT mode
         1.3 - Get the list of activated services
+        1.4 - Report the HA state of a router
+        1.5 - Get the IDs and checksums of the routers hosted by the agent
+        1.6 - Report the HA state of several routers at once
 
     """
 
@@ -104,6 +110,29 @@ class L3PluginApi(n_rpc.RpcProxy):
                          self.make_msg('sync_routers', host=self.host,
                                        router_ids=router_ids))
 
+    def get_router_ids(self, context):
+        """Make a remote process call to retrieve the hosted router IDs."""
+        return self.call(context,
+                         self.make_msg('get_router_ids', host=self.host),
+                         version='1.5')
+
+    def get_router_checksums(self, context, router_ids):
+        """Make a remote process call to retrieve router checksums."""
+        return self.call(context,
+                         self.make_msg('get_router_checksums', host=self.host,
+                                       router_ids=router_ids),
+                         version='1.5')
+
+    def update_ha_routers_states(self, context, states):
+        """Report the HA state of the routers hosted by the agent.
+
+        :param states: dict of router_id to 'active' or 'standby'
+        """
+        return self.call(context,
+                         self.make_msg('update_ha_routers_states',
+                                       host=self.host, states=states),
+                         version='1.6')
+
     def get_external_network_id(self, context):
         """Make a remote process call to retrieve the external network id.
 
@@ -243,7 +272,7 @@ class LinkLocalAllocator(object):
 class RouterInfo(l3_ha_agent.RouterMixin):
 
     def __init__(self, router_id, root_helper, use_namespaces, router,
-                 use_ipv6=False):
+                 use_ipv6=False, iptables_apply_scheduler=None):
         self.router_id = router_id
         self.ex_gw_port = None
         self._snat_enabled = None
@@ -256,16 +285,22 @@ class RouterInfo(l3_ha_agent.RouterMixin):
         self.use_namespaces = use_namespaces
         # Invoke the setter for establishing initial SNAT action
         self.router = router
+        self.iptables_apply_scheduler = iptables_apply_scheduler
         self.iptables_manager = iptables_manager.IptablesManager(
             root_helper=root_helper,
             use_ipv6=use_ipv6,
-            namespace=self.ns_name)
+            namespace=self.ns_name,
+            apply_scheduler=iptables_apply_scheduler)
         self.snat_iptables_manager = None
         self.routes = []
         # DVR Data
         # Linklocal subnet for router and floating IP namespace link
         self.rtr_fip_subnet = None
         self.dist_fip_count = 0
+        # Copy of the router dict as it was when last successfully processed
+        self.last_applied_router = None
+        # Set to process every stage of the router at its next update
+        self.force_full_process = False
 
         super(RouterInfo, self).__init__()
 
@@ -300,6 +335,76 @@ class RouterInfo(l3_ha_agent.RouterMixin):
         self._snat_action = None
 
 
+class RouterChanges(object):
+    """Stages of process_router affected by a router update
+
+    Compares the router dict last applied by the agent to the current one and
+    tells which processing stages need to run. Everything is considered
+    changed when there is no previously applied router. DVR routers depend on
+    agent-wide state (FIP namespace, agent gateway port) which is not part of
+    the router dict, so they are always fully processed.
+
+    When only some floating IPs changed, fips_added and fips_removed are the
+    new and old dicts of the floating IPs added, updated or removed, so that
+    only those are processed. They are None when all the floating IPs must
+    be processed.
+    """
+    # Keys added to port dicts by the agent itself while processing a router
+    AGENT_PORT_KEYS = frozenset(['ip_cidr'])
+
+    def __init__(self, old_router, new_router):
+        self.full = old_router is None or new_router.get('distributed')
+        self.old = old_router or {}
+        self.new = new_router
+
+        self.interfaces = self._changed(l3_constants.INTERFACE_KEY, [])
+        self.gateway = (self._changed('gw_port') or
+                        self._changed('gw_port_host'))
+        self.snat = (self.gateway or self.interfaces or
+                     self._changed('enable_snat', True))
+        self.routes = self._changed('routes', [])
+        self.floating_ips = (self.gateway or
+                             self._changed(l3_constants.FLOATINGIP_KEY, []))
+        self.fips_added = None
+        self.fips_removed = None
+        if self.floating_ips and not (self.full or self.gateway):
+            self._diff_floating_ips()
+
+    def _diff_floating_ips(self):
+        old_fips = dict((fip['id'], fip) for fip in
+                        self.old.get(l3_constants.FLOATINGIP_KEY, []))
+        new_fips = dict((fip['id'], fip) for fip in
+                        self.new.get(l3_constants.FLOATINGIP_KEY, []))
+        self.fips_added = [fip for fip_id, fip in new_fips.iteritems()
+                           if old_fips.get(fip_id) != fip]
+        self.fips_removed = [fip for fip_id, fip in old_fips.iteritems()
+                             if new_fips.get(fip_id) != fip]
+
+    @classmethod
+    def _strip_port(cls, port):
+        if not isinstance(port, dict):
+            return port
+        return dict((k, v) for k, v in port.iteritems()
+                    if k not in cls.AGENT_PORT_KEYS)
+
+    @classmethod
+    def _strip(cls, value):
+        if isinstance(value, list):
+            return [cls._strip_port(item) for item in value]
+        return cls._strip_port(value)
+
+    def _changed(self, key, default=None):
+        if self.full:
+            return True
+        return (self._strip(self.old.get(key, default)) !=
+                self._strip(self.new.get(key, default)))
+
+    @property
+    def any(self):
+        return (self.interfaces or self.gateway or self.snat or
+                self.routes or self.floating_ips)
+
+
 class RouterUpdate(object):
     """Encapsulates a router update
 
@@ -454,8 +559,10 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
               - add_arp_entry
               - del_arp_entry
               Needed by the L3 service when dealing with DVR
+        1.3 - update_arp_entries: add or delete several ARP entries of a
+              DVR router at once
     """
-    RPC_API_VERSION = '1.2'
+    RPC_API_VERSION = '1.3'
 
     OPTS = [
         cfg.StrOpt('agent_mode', default='legacy',
@@ -482,6 +589,15 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
                    default=3,
                    help=_("Send this many gratuitous ARPs for HA setup, if "
                           "less than or equal to 0, the feature is disabled")),
+        cfg.IntOpt('send_arp_senders_per_namespace',
+                   default=4,
+                   help=_("Maximum number of gratuitous ARPs sent "
+                          "concurrently in a router namespace. Further "
+                          "requests are queued.")),
+        cfg.FloatOpt('send_arp_interface_interval',
+                     default=0.02,
+                     help=_("Minimum number of seconds between two "
+                            "gratuitous ARPs sent on the same interface.")),
         cfg.StrOpt('router_id', default='',
                    help=_("If namespaces is disabled, the l3 agent can only"
                           " configure a router that has the matching router "
@@ -500,6 +616,23 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
                    default='$state_path/metadata_proxy',
                    help=_('Location of Metadata Proxy UNIX domain '
                           'socket')),
+        cfg.IntOpt('sync_routers_chunk_size',
+                   default=256,
+                   help=_("Number of routers fetched from the server per "
+                          "request during a full synchronization. 0 fetches "
+                          "all routers in a single request.")),
+        cfg.IntOpt('iptables_apply_workers',
+                   default=4,
+                   help=_("Maximum number of iptables-restore processes "
+                          "run concurrently for the routers of the agent. "
+                          "Applies of the same router queued meanwhile are "
+                          "merged. 0 applies iptables rules immediately.")),
+        cfg.IntOpt('routers_check_interval',
+                   default=0,
+                   help=_("Seconds between checks of the checksums of the "
+                          "routers hosted by the agent against the server, "
+                          "fetching only the routers that differ. 0 disables "
+                          "the check.")),
     ]
 
     def __init__(self, host, conf=None):
@@ -529,6 +662,9 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
         self.updated_routers = set()
         self.removed_routers = set()
         self.sync_progress = False
+        # Checksums of the router data last received from the server
+        self._router_checksums = {}
+        self._last_routers_check = None
 
         # Get the list of service plugins from Neutron Server
         # This is the first place where we contact neutron-server on startup
@@ -572,6 +708,15 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
         self.fip_priorities = set(range(FIP_PR_START, FIP_PR_END))
 
         self._queue = RouterProcessingQueue()
+        self._garp_service = garp.GratuitousArpService(
+            self._arping,
+            senders_per_namespace=self.conf.send_arp_senders_per_namespace,
+            interface_interval=self.conf.send_arp_interface_interval)
+        self.iptables_apply_scheduler = None
+        if self.conf.iptables_apply_workers > 0:
+            self.iptables_apply_scheduler = (
+                iptables_manager.IptablesApplyScheduler(
+                    self.conf.iptables_apply_workers))
         super(L3NATAgent, self).__init__(conf=self.conf)
 
         self.target_ex_net_id = None
@@ -583,7 +728,8 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
             root_helper=self.root_helper,
             use_namespaces=self.conf.use_namespaces,
             router=router,
-            use_ipv6=self.use_ipv6)
+            use_ipv6=self.use_ipv6,
+            iptables_apply_scheduler=self.iptables_apply_scheduler)
 
     def _check_config_params(self):
         """Check items in configuration files.
@@ -778,14 +924,12 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
 
         if ri.is_ha:
             self.process_ha_router_added(ri)
-
-        if self.conf.enable_metadata_proxy:
-            if ri.is_ha:
-                self._add_keepalived_notifiers(ri)
-            else:
-                self._spawn_metadata_proxy(ri.router_id, ri.ns_name)
+            self._add_keepalived_notifiers(ri)
+        elif self.conf.enable_metadata_proxy:
+            self._spawn_metadata_proxy(ri.router_id, ri.ns_name)
 
     def _router_removed(self, router_id):
+        self._router_checksums.pop(router_id, None)
         ri = self.router_info.get(router_id)
         if ri is None:
             LOG.warn(_("Info for router %s were not found. "
@@ -803,10 +947,15 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
             ri.iptables_manager.ipv4['filter'].remove_rule(c, r)
         for c, r in self.metadata_nat_rules():
             ri.iptables_manager.ipv4['nat'].remove_rule(c, r)
+        if self.iptables_apply_scheduler:
+            # Apply right away, the namespace is about to be destroyed
+            self.iptables_apply_scheduler.release(ri.iptables_manager)
         ri.iptables_manager.apply()
         if self.conf.enable_metadata_proxy:
             self._destroy_metadata_proxy(ri.router_id, ri.ns_name)
         del self.router_info[router_id]
+        if self.iptables_apply_scheduler:
+            self.iptables_apply_scheduler.forget(ri.ns_name)
         self._destroy_router_namespace(ri.ns_name)
 
     def _get_metadata_proxy_callback(self, router_id):
@@ -881,13 +1030,100 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
         # TODO(mrsmith) - we shouldn't need to check here
         if 'distributed' not in ri.router:
             ri.router['distributed'] = False
-        ri.iptables_manager.defer_apply_on()
+        last_applied_router = ri.last_applied_router
+        if ri.force_full_process:
+            # Reset before processing, so that a request made meanwhile is
+            # kept for the next update.
+            ri.force_full_process = False
+            last_applied_router = None
+        changes = RouterChanges(last_applied_router, ri.router)
+        # Only remember the router as applied once it was fully processed,
+        # a failure below forces a full processing of the next update.
+        applied_router = copy.deepcopy(ri.router)
+        ri.last_applied_router = None
+        if not changes.any:
+            LOG.debug("No change to apply to router %s", ri.router_id)
+        if changes.snat or changes.floating_ips:
+            ri.iptables_manager.defer_apply_on()
         ex_gw_port = self._get_ex_gw_port(ri)
         internal_ports = ri.router.get(l3_constants.INTERFACE_KEY, [])
         snat_ports = ri.router.get(l3_constants.SNAT_ROUTER_INTF_KEY, [])
-        existing_port_ids = set([p['id'] for p in ri.internal_ports])
         current_port_ids = set([p['id'] for p in internal_ports
                                 if p['admin_state_up']])
+
+        if changes.interfaces:
+            self._process_internal_ports(ri, internal_ports,
+                                         current_port_ids)
+
+        # TODO(salv-orlando): RouterInfo would be a better place for
+        # this logic too
+        ex_gw_port_id = (ex_gw_port and ex_gw_port['id'] or
+                         ri.ex_gw_port and ri.ex_gw_port['id'])
+
+        interface_name = None
+        if ex_gw_port_id:
+            interface_name = self.get_external_device_name(ex_gw_port_id)
+        if changes.interfaces or changes.gateway:
+            existing_devices = self._get_existing_devices(ri)
+            current_internal_devs = set([n for n in existing_devices
+                                         if n.startswith(INTERNAL_DEV_PREFIX)])
+            current_port_devs = set([self.get_internal_device_name(id) for
+                                     id in current_port_ids])
+            stale_devs = current_internal_devs - current_port_devs
+            for stale_dev in stale_devs:
+                LOG.debug(_('Deleting stale internal router device: %s'),
+                          stale_dev)
+                self.driver.unplug(stale_dev,
+                                   namespace=ri.ns_name,
+                                   prefix=INTERNAL_DEV_PREFIX)
+
+        if changes.gateway:
+            self._process_external_gateway(ri, ex_gw_port, interface_name)
+            stale_devs = [dev for dev in existing_devices
+                          if dev.startswith(EXTERNAL_DEV_PREFIX)
+                          and dev != interface_name]
+            for stale_dev in stale_devs:
+                LOG.debug(_('Deleting stale external router device: %s'),
+                          stale_dev)
+                self.driver.unplug(stale_dev,
+                                   bridge=self.conf.external_network_bridge,
+                                   namespace=ri.ns_name,
+                                   prefix=EXTERNAL_DEV_PREFIX)
+
+        # Process static routes for router
+        if changes.routes:
+            self.routes_updated(ri)
+        # Process SNAT rules for external gateway
+        if changes.snat and (
+            not ri.router['distributed'] or
+            ex_gw_port and ri.router['gw_port_host'] == self.host):
+            # Get IPv4 only internal CIDRs
+            internal_cidrs = [p['ip_cidr'] for p in ri.internal_ports
+                              if netaddr.IPNetwork(p['ip_cidr']).version == 4]
+            ri.perform_snat_action(self._handle_router_snat_rules,
+                                   internal_cidrs, interface_name)
+
+        if changes.floating_ips:
+            self._process_floating_ips(ri, ex_gw_port, changes)
+        elif ex_gw_port and ri.iptables_manager.iptables_apply_deferred:
+            # Apply the SNAT rules which were deferred above
+            ri.iptables_manager.defer_apply_off()
+
+        # Update ex_gw_port and enable_snat on the router info cache
+        ri.ex_gw_port = ex_gw_port
+        ri.snat_ports = snat_ports
+        ri.enable_snat = ri.router.get('enable_snat')
+
+        if ri.is_ha:
+            if ri.ha_port:
+                ri.spawn_keepalived()
+            else:
+                ri.disable_keepalived()
+
+        ri.last_applied_router = applied_router
+
+    def _process_internal_ports(self, ri, internal_ports, current_port_ids):
+        existing_port_ids = set([p['id'] for p in ri.internal_ports])
         new_ports = [p for p in internal_ports if
                      p['id'] in current_port_ids and
                      p['id'] not in existing_port_ids]
@@ -919,27 +1155,7 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
                               self.get_internal_device_name,
                               self.root_helper)
 
-        existing_devices = self._get_existing_devices(ri)
-        current_internal_devs = set([n for n in existing_devices
-                                     if n.startswith(INTERNAL_DEV_PREFIX)])
-        current_port_devs = set([self.get_internal_device_name(id) for
-                                 id in current_port_ids])
-        stale_devs = current_internal_devs - current_port_devs
-        for stale_dev in stale_devs:
-            LOG.debug(_('Deleting stale internal router device: %s'),
-                      stale_dev)
-            self.driver.unplug(stale_dev,
-                               namespace=ri.ns_name,
-                               prefix=INTERNAL_DEV_PREFIX)
-
-        # TODO(salv-orlando): RouterInfo would be a better place for
-        # this logic too
-        ex_gw_port_id = (ex_gw_port and ex_gw_port['id'] or
-                         ri.ex_gw_port and ri.ex_gw_port['id'])
-
-        interface_name = None
-        if ex_gw_port_id:
-            interface_name = self.get_external_device_name(ex_gw_port_id)
+    def _process_external_gateway(self, ri, ex_gw_port, interface_name):
         if ex_gw_port:
             def _gateway_ports_equal(port1, port2):
                 def _get_filtered_dict(d, ignore):
@@ -959,34 +1175,13 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
         elif not ex_gw_port and ri.ex_gw_port:
             self.external_gateway_removed(ri, ri.ex_gw_port, interface_name)
 
-        stale_devs = [dev for dev in existing_devices
-                      if dev.startswith(EXTERNAL_DEV_PREFIX)
-                      and dev != interface_name]
-        for stale_dev in stale_devs:
-            LOG.debug(_('Deleting stale external router device: %s'),
-                      stale_dev)
-            self.driver.unplug(stale_dev,
-                               bridge=self.conf.external_network_bridge,
-                               namespace=ri.ns_name,
-                               prefix=EXTERNAL_DEV_PREFIX)
-
-        # Process static routes for router
-        self.routes_updated(ri)
-        # Process SNAT rules for external gateway
-        if (not ri.router['distributed'] or
-            ex_gw_port and ri.router['gw_port_host'] == self.host):
-            # Get IPv4 only internal CIDRs
-            internal_cidrs = [p['ip_cidr'] for p in ri.internal_ports
-                              if netaddr.IPNetwork(p['ip_cidr']).version == 4]
-            ri.perform_snat_action(self._handle_router_snat_rules,
-                                   internal_cidrs, interface_name)
-
+    def _process_floating_ips(self, ri, ex_gw_port, changes=None):
         # Process SNAT/DNAT rules for floating IPs
         fip_statuses = {}
         try:
             if ex_gw_port:
                 existing_floating_ips = ri.floating_ips
-                self.process_router_floating_ip_nat_rules(ri)
+                self.process_router_floating_ip_nat_rules(ri, changes)
                 ri.iptables_manager.defer_apply_off()
                 # Once NAT rules for floating IPs are safely in place
                 # configure their addresses on the external gateway port
@@ -1003,21 +1198,20 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
             ri.floating_ips = set(fip_statuses.keys())
             for fip_id in existing_floating_ips - ri.floating_ips:
                 fip_statuses[fip_id] = l3_constants.FLOATINGIP_STATUS_DOWN
+            if changes and changes.fips_added is not None:
+                # The status of the floating IPs which did not change was
+                # reported already
+                reported = (set(fip['id'] for fip in changes.fips_added) |
+                            existing_floating_ips - ri.floating_ips)
+                fip_statuses = dict(
+                    (fip_id, status)
+                    for fip_id, status in fip_statuses.iteritems()
+                    if fip_id in reported or
+                    status == l3_constants.FLOATINGIP_STATUS_ERROR)
             # Update floating IP status on the neutron server
             self.plugin_rpc.update_floatingip_statuses(
                 self.context, ri.router_id, fip_statuses)
 
-        # Update ex_gw_port and enable_snat on the router info cache
-        ri.ex_gw_port = ex_gw_port
-        ri.snat_ports = snat_ports
-        ri.enable_snat = ri.router.get('enable_snat')
-
-        if ri.is_ha:
-            if ri.ha_port:
-                ri.spawn_keepalived()
-            else:
-                ri.disable_keepalived()
-
     def _handle_router_snat_rules(self, ri, ex_gw_port, internal_cidrs,
                                   interface_name, action):
         # Remove all the rules
@@ -1077,23 +1271,32 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
             ri.iptables_manager.ipv4['nat'].add_rule(*rule)
         ri.iptables_manager.apply()
 
-    def process_router_floating_ip_nat_rules(self, ri):
+    def process_router_floating_ip_nat_rules(self, ri, changes=None):
         """Configure NAT rules for the router's floating IPs.
 
-        Configures iptables rules for the floating ips of the given router
+        Configures iptables rules for the floating ips of the given router.
+        When the RouterChanges of the router tell which floating IPs
+        changed, only the rules of those are replaced.
         """
-        # Clear out all iptables rules for floating ips
-        ri.iptables_manager.ipv4['nat'].clear_rules_by_tag('floating_ip')
+        nat = ri.iptables_manager.ipv4['nat']
+        if changes and changes.fips_added is not None:
+            for fip in changes.fips_removed:
+                for chain, rule in self.floating_forward_rules(
+                        fip['floating_ip_address'], fip['fixed_ip_address']):
+                    nat.remove_rule(chain, rule)
+            floating_ips = changes.fips_added
+        else:
+            # Clear out all iptables rules for floating ips
+            nat.clear_rules_by_tag('floating_ip')
+            floating_ips = self.get_floating_ips(ri)
 
-        floating_ips = self.get_floating_ips(ri)
         # Loop once to ensure that floating ips are configured.
         for fip in floating_ips:
             # Rebuild iptables rules for the floating ip.
             fixed = fip['fixed_ip_address']
             fip_ip = fip['floating_ip_address']
             for chain, rule in self.floating_forward_rules(fip_ip, fixed):
-                ri.iptables_manager.ipv4['nat'].add_rule(chain, rule,
-                                                         tag='floating_ip')
+                nat.add_rule(chain, rule, tag='floating_ip')
 
         ri.iptables_manager.apply()
 
@@ -1221,8 +1424,8 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
     def _send_gratuitous_arp_packet(self, ns_name, interface_name, ip_address,
                                     distributed=False):
         if self.conf.send_arp_for_ha > 0:
-            eventlet.spawn_n(self._arping, ns_name, interface_name, ip_address,
-                             distributed)
+            self._garp_service.add(ns_name, interface_name, ip_address,
+                                   distributed)
 
     def get_internal_port(self, ri, subnet_id):
         """Return internal router port based on subnet_id."""
@@ -1297,7 +1500,8 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
         ri.snat_iptables_manager = iptables_manager.IptablesManager(
             root_helper=self.root_helper,
             namespace=snat_ns_name,
-            use_ipv6=self.use_ipv6)
+            use_ipv6=self.use_ipv6,
+            apply_scheduler=self.iptables_apply_scheduler)
         # kicks the FW Agent to add rules for the snat namespace
         self.process_router_add(ri)
 
@@ -1603,7 +1807,8 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
         self._create_namespace(fip_ns_name)
         ri.fip_iptables_manager = iptables_manager.IptablesManager(
             root_helper=self.root_helper, namespace=fip_ns_name,
-            use_ipv6=self.use_ipv6)
+            use_ipv6=self.use_ipv6,
+            apply_scheduler=self.iptables_apply_scheduler)
         # no connection tracking needed in fip namespace
         ri.fip_iptables_manager.ipv4['raw'].add_rule('PREROUTING',
                                                      '-j CT --notrack')
@@ -1760,6 +1965,34 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
         if ri:
             self._update_arp_entry(ri, ip, mac, subnet_id, 'delete')
 
+    def _update_arp_entries(self, ri, arp_entries):
+        """Apply several arp updates to a router namespace at once."""
+        entries = []
+        for arp_entry in arp_entries:
+            port = self.get_internal_port(ri, arp_entry['subnet_id'])
+            # update arp entry only if the subnet is attached to the router
+            if port:
+                entries.append((arp_entry['operation'],
+                                arp_entry['ip_address'],
+                                arp_entry['mac_address'],
+                                self.get_internal_device_name(port['id'])))
+        if not entries:
+            return
+
+        try:
+            ip_wrapper = ip_lib.IPWrapper(self.root_helper,
+                                          namespace=ri.ns_name)
+            ip_wrapper.update_neighbours(entries)
+        except Exception:
+            LOG.exception(_("DVR: Failed updating arp entries"))
+            self.fullsync = True
+
+    def update_arp_entries(self, context, payload):
+        """Add or delete arp entries of a router.  Called from RPC."""
+        ri = self.router_info.get(payload['router_id'])
+        if ri:
+            self._update_arp_entries(ri, payload['arp_entries'])
+
     def routers_updated(self, context, routers):
         """Deal with routers modification and creation RPC message."""
         LOG.debug(_('Got routers updated notification :%s'), routers)
@@ -1802,6 +2035,9 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
                 [router['id'] for router in routers])
         cur_router_ids = set()
         for r in routers:
+            if self.conf.routers_check_interval:
+                self._router_checksums[r['id']] = r.get(
+                    l3_constants.ROUTER_CHECKSUM_KEY)
             # If namespaces are disabled, only process the router associated
             # with the configured agent id.
             if (not self.conf.use_namespaces and
@@ -1828,6 +2064,35 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
         pool.waitall()
 
     def _process_router_update(self):
+        # The iptables rules of a router updated several times in a row are
+        # applied once, when its updates stop coming
+        held = {}
+        try:
+            self._process_router_updates(held)
+        finally:
+            for router_id in held.keys():
+                self._release_iptables(held, router_id)
+
+    def _hold_iptables(self, held, router_id):
+        ri = self.router_info.get(router_id)
+        if (self.iptables_apply_scheduler and ri and
+                router_id not in held):
+            held[router_id] = ri.iptables_manager
+            self.iptables_apply_scheduler.hold(ri.iptables_manager)
+
+    def _release_iptables(self, held, router_id):
+        iptables_manager = held.pop(router_id, None)
+        if not iptables_manager:
+            return
+        try:
+            if self.iptables_apply_scheduler.release(iptables_manager):
+                self.iptables_apply_scheduler.apply(iptables_manager)
+        except Exception:
+            LOG.exception(_("Failed applying the iptables rules of router "
+                            "%s"), router_id)
+            self.fullsync = True
+
+    def _process_router_updates(self, held):
         for rp, update in self._queue.each_update_to_next_router():
             LOG.debug("Starting router update for %s", update.id)
             router = update.router
@@ -1849,7 +2114,9 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
                 self._router_removed(update.id)
                 continue
 
+            self._hold_iptables(held, update.id)
             self._process_routers([router])
+            self._ha_router_processed(update.id)
             LOG.debug("Finished a router update for %s", update.id)
             rp.fetched_and_processed(update.timestamp)
 
@@ -1873,14 +2140,53 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
     def periodic_sync_routers_task(self, context):
         self._sync_routers_task(context)
 
+    def _router_id_chunks(self, router_ids):
+        chunk_size = self.conf.sync_routers_chunk_size
+        if chunk_size <= 0:
+            chunk_size = len(router_ids) or 1
+        for i in range(0, len(router_ids), chunk_size):
+            yield router_ids[i:i + chunk_size]
+
+    def _fetch_routers(self, context, router_ids):
+        """Fetch routers from the server, in chunks when possible.
+
+        Yields lists of routers as they are received so that they can be
+        processed before the next chunk is requested.
+        """
+        if router_ids is None and self.conf.sync_routers_chunk_size > 0:
+            router_ids = self._get_router_ids(context)
+        if router_ids is None:
+            yield self.plugin_rpc.get_routers(context)
+            return
+        for chunk in self._router_id_chunks(router_ids):
+            yield self.plugin_rpc.get_routers(context, chunk)
+
+    def _get_router_ids(self, context):
+        """Return the IDs of the routers to host, None if unsupported."""
+        try:
+            return self.plugin_rpc.get_router_ids(context)
+        except n_rpc.RemoteError as e:
+            with excutils.save_and_reraise_exception() as ctx:
+                if e.exc_type == 'UnsupportedVersion':
+                    ctx.reraise = False
+                    LOG.warning(_LW('Neutron server does not support '
+                                    'get_router_ids, routers will be '
+                                    'fetched in a single request.'))
+
     def _sync_routers_task(self, context):
         if self.services_sync:
             super(L3NATAgent, self).process_services_sync(context)
         LOG.debug(_("Starting _sync_routers_task - fullsync:%s"),
                   self.fullsync)
         if not self.fullsync:
+            self._check_routers_task(context)
             return
 
+        # A full sync is triggered by errors, make sure every router gets
+        # fully processed again instead of only applying detected changes.
+        for ri in self.router_info.values():
+            ri.force_full_process = True
+
         # Capture a picture of namespaces *before* fetching the full list from
         # the database.  This is important to correctly identify stale ones.
         namespaces = set()
@@ -1893,17 +2199,18 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
             self.updated_routers.clear()
             self.removed_routers.clear()
             timestamp = timeutils.utcnow()
-            routers = self.plugin_rpc.get_routers(
-                context, router_ids)
-
-            LOG.debug(_('Processing :%r'), routers)
-            for r in routers:
-                update = RouterUpdate(r['id'],
-                                      PRIORITY_SYNC_ROUTERS_TASK,
-                                      router=r,
-                                      timestamp=timestamp)
-                self._queue.add(update)
+            curr_router_ids = set()
+            for routers in self._fetch_routers(context, router_ids):
+                LOG.debug(_('Processing :%r'), routers)
+                for r in routers:
+                    curr_router_ids.add(r['id'])
+                    update = RouterUpdate(r['id'],
+                                          PRIORITY_SYNC_ROUTERS_TASK,
+                                          router=r,
+                                          timestamp=timestamp)
+                    self._queue.add(update)
             self.fullsync = False
+            self._last_routers_check = timestamp
             LOG.debug(_("_sync_routers_task successfully completed"))
         except n_rpc.RPCException:
             LOG.exception(_("Failed synchronizing routers due to RPC error"))
@@ -1913,7 +2220,6 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
             self.fullsync = True
         else:
             # Resync is not necessary for the cleanup of stale namespaces
-            curr_router_ids = set([r['id'] for r in routers])
 
             # Two kinds of stale routers:  Routers for which info is cached in
             # self.router_info and the others.  First, handle the former.
@@ -1930,8 +2236,58 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
                 ids_to_keep = curr_router_ids | prev_router_ids
                 self._cleanup_namespaces(namespaces, ids_to_keep)
 
+    def _check_routers_task(self, context):
+        """Only resync the routers whose data changed on the server.
+
+        Compares the checksums of the routers scheduled to the agent with the
+        ones of the router data last received and queues an update for
+        routers which differ, are missing or failed to be processed.
+        """
+        interval = self.conf.routers_check_interval
+        if not interval or (self._last_routers_check and
+                            not timeutils.is_older_than(
+                                self._last_routers_check, interval)):
+            return
+        self._last_routers_check = timeutils.utcnow()
+
+        try:
+            router_ids = self._router_ids() or self._get_router_ids(context)
+            if router_ids is None:
+                return
+            checksums = {}
+            for chunk in self._router_id_chunks(router_ids):
+                checksums.update(
+                    self.plugin_rpc.get_router_checksums(context, chunk))
+        except Exception:
+            LOG.exception(_("Failed checking routers, a full "
+                            "synchronization will be performed"))
+            self.fullsync = True
+            return
+
+        for router_id, checksum in checksums.iteritems():
+            ri = self.router_info.get(router_id)
+            if (self._router_checksums.get(router_id) != checksum or
+                    ri and ri.last_applied_router is None):
+                LOG.debug("Router %s changed, queueing an update", router_id)
+                self._queue.add(RouterUpdate(router_id,
+                                             PRIORITY_SYNC_ROUTERS_TASK))
+        for router_id in set(self.router_info) - set(checksums):
+            self._queue.add(RouterUpdate(router_id,
+                                         PRIORITY_SYNC_ROUTERS_TASK,
+                                         action=DELETE_ROUTER))
+
+    def _ha_router_state_changed(self, ri):
+        """Process a HA router which has just changed state before others
+
+        The router is fully processed again, whatever the server returns,
+        even if it is being processed already.
+        """
+        ri.force_full_process = True
+        self._queue.add(RouterUpdate(ri.router_id, PRIORITY_HA_STATE_CHANGE))
+
     def after_start(self):
         eventlet.spawn_n(self._process_routers_loop)
+        self._start_ha_state_change_server()
         LOG.info(_("L3 agent started"))
 
     def _update_routing_table(self, ri, operation, route):
@@ -2012,6 +2368,21 @@ class L3NATAgentWithStateReport(L3NATAgent):
         configurations['ex_gw_ports'] = num_ex_gw_ports
         configurations['interfaces'] = num_interfaces
         configurations['floating_ips'] = num_floating_ips
+        if self.iptables_apply_scheduler:
+            stats = self.iptables_apply_scheduler.get_stats()
+            configurations['iptables_apply'] = dict(
+                (key, stats[key])
+                for key in ('count', 'avg', 'max', 'coalesced',
+                            'slowest_namespaces'))
+        failover_stats = self.get_ha_failover_stats()
+        if failover_stats['count']:
+            configurations['ha_failover'] = dict(
+                (key, failover_stats[key]) for key in ('count', 'avg', 'max'))
+        reload_stats = self.get_keepalived_reload_stats()
+        if reload_stats['count'] or reload_stats['skipped']:
+            configurations['keepalived_reload'] = dict(
+                (key, reload_stats[key])
+                for key in ('count', 'avg', 'max', 'skipped'))
         try:
             self.state_rpc.report_state(self.context, self.agent_state,
                                         self.use_call)
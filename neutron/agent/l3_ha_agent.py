@@ -16,12 +16,20 @@
 import os
 import shutil
 import signal
+import time
 
+import eventlet
+from eventlet import queue
 from oslo.config import cfg
+import webob
 
 from neutron.agent.linux import keepalived
+from neutron.agent.metadata import agent as metadata_agent
 from neutron.common import constants as l3_constants
+from neutron.common import utils as common_utils
+from neutron.openstack.common import excutils
 from neutron.openstack.common.gettextutils import _LE
+from neutron.openstack.common.gettextutils import _LI
 from neutron.openstack.common import log as logging
 from neutron.openstack.common import periodic_task
 
@@ -29,6 +37,11 @@ LOG = logging.getLogger(__name__)
 
 HA_DEV_PREFIX = 'ha-'
 
+# keepalived states and the HA router states known by the server
+TRANSLATION_MAP = {'master': 'active',
+                   'backup': 'standby',
+                   'fault': 'standby'}
+
 OPTS = [
     cfg.StrOpt('ha_confs_path',
                default='$state_path/ha_confs',
@@ -43,6 +56,11 @@ OPTS = [
     cfg.IntOpt('ha_vrrp_advert_int',
                default=2,
                help=_('The advertisement interval in seconds')),
+    cfg.StrOpt('ha_state_change_socket',
+               default='$state_path/ha_state_change',
+               help=_('Location of the UNIX domain socket used by keepalived '
+                      'notify scripts to push HA state changes to the '
+                      'agent')),
 ]
 
 
@@ -92,9 +110,36 @@ class RouterMixin(object):
         shutil.rmtree(conf_dir)
 
 
+class HaStateChangeHandler(object):
+    """Receive the HA state changes pushed by keepalived notify scripts."""
+
+    def __init__(self, agent):
+        self.agent = agent
+
+    @webob.dec.wsgify(RequestClass=webob.Request)
+    def __call__(self, req):
+        router_id = req.headers.get('X-Neutron-Router-Id')
+        state = req.headers.get('X-Neutron-State')
+        if not router_id or state not in keepalived.VALID_NOTIFY_STATES:
+            return webob.exc.HTTPBadRequest()
+
+        try:
+            timestamp = float(req.headers['X-Neutron-Timestamp'])
+        except (KeyError, ValueError):
+            timestamp = time.time()
+
+        self.agent.enqueue_state_change(router_id, state, timestamp)
+        return webob.Response()
+
+
 class AgentMixin(object):
     def __init__(self, host):
         self._init_ha_conf_path()
+        # HA state changes waiting to be reported to the server
+        self._ha_state_changes = queue.LightQueue()
+        # Time of the transitions of the routers being re-processed
+        self._ha_failovers = {}
+        self.ha_failover_latency = common_utils.LatencyHistogram()
         super(AgentMixin, self).__init__(host)
 
     def _init_ha_conf_path(self):
@@ -130,6 +175,83 @@ class AgentMixin(object):
         config.add_group(group)
         config.add_instance(instance)
 
+    def _start_ha_state_change_server(self):
+        socket_path = self.conf.ha_state_change_socket
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            with excutils.save_and_reraise_exception() as ctxt:
+                if not os.path.exists(socket_path):
+                    ctxt.reraise = False
+
+        server = metadata_agent.UnixDomainWSGIServer(
+            'neutron-l3-agent-ha-state-change')
+        server.start(HaStateChangeHandler(self), socket_path,
+                     workers=0, backlog=128)
+        eventlet.spawn_n(self._report_ha_states_loop)
+        return server
+
+    def get_state_change_command(self, router_id, state):
+        return ['neutron-keepalived-state-change',
+                '--router_id=%s' % router_id,
+                '--state=%s' % state,
+                '--socket_path=%s' % self.conf.ha_state_change_socket]
+
+    def enqueue_state_change(self, router_id, state, timestamp):
+        LOG.info(_LI('Router %(router_id)s transitioned to %(state)s'),
+                 {'router_id': router_id, 'state': state})
+        ri = self.router_info.get(router_id)
+        if ri is None or not ri.is_ha:
+            LOG.debug('Ignoring HA state change of unknown router %s',
+                      router_id)
+            return
+
+        self._ha_failovers[router_id] = timestamp
+        self._ha_router_state_changed(ri)
+        self._ha_state_changes.put((router_id, state))
+
+    def _ha_router_processed(self, router_id):
+        timestamp = self._ha_failovers.pop(router_id, None)
+        if timestamp is not None:
+            self.ha_failover_latency.observe(time.time() - timestamp)
+
+    def _report_ha_states_loop(self):
+        while True:
+            self._report_ha_states()
+
+    def _report_ha_states(self):
+        # Wait for a state change, then take all of those which were pushed
+        # meanwhile, a mass failover is reported in a few calls only.
+        changes = [self._ha_state_changes.get()]
+        while not self._ha_state_changes.empty():
+            changes.append(self._ha_state_changes.get_nowait())
+
+        states = dict((router_id, TRANSLATION_MAP[state])
+                      for router_id, state in changes)
+        LOG.debug('Reporting HA routers states %s', states)
+        try:
+            self.plugin_rpc.update_ha_routers_states(self.context, states)
+        except Exception:
+            LOG.exception(_LE('Failed to report HA routers states %s'),
+                          states)
+
+    def get_ha_failover_stats(self):
+        return self.ha_failover_latency.get_stats()
+
+    def get_keepalived_reload_stats(self):
+        """Return the keepalived reload stats summed over the HA routers."""
+        totals = {'count': 0, 'sum': 0.0, 'max': 0.0, 'skipped': 0}
+        for ri in self.router_info.values():
+            if not ri.keepalived_manager:
+                continue
+            stats = ri.keepalived_manager.get_reload_stats()
+            for key in ('count', 'sum', 'skipped'):
+                totals[key] += stats[key]
+            totals['max'] = max(totals['max'], stats['max'])
+        totals['avg'] = (totals['sum'] / totals['count']
+                         if totals['count'] else 0.0)
+        return totals
+
     def process_ha_router_added(self, ri):
         ha_port = ri.router.get(l3_constants.HA_INTERFACE_KEY)
         if not ha_port:
@@ -178,15 +300,22 @@ class AgentMixin(object):
         instance.remove_vips_vroutes_by_interface(interface)
 
     def _add_keepalived_notifiers(self, ri):
-        callback = self._get_metadata_proxy_callback(ri.router_id)
-        pm = self._get_metadata_proxy_process_manager(ri.router_id, ri.ns_name)
-        pid = pm.get_pid_file_name(ensure_pids_dir=True)
-        ri.keepalived_manager.add_notifier(
-            callback(pid), 'master', ri.ha_vr_id)
-        for state in ('backup', 'fault'):
+        scripts = dict((state, []) for state in TRANSLATION_MAP)
+        if self.conf.enable_metadata_proxy:
+            callback = self._get_metadata_proxy_callback(ri.router_id)
+            pm = self._get_metadata_proxy_process_manager(ri.router_id,
+                                                          ri.ns_name)
+            pid = pm.get_pid_file_name(ensure_pids_dir=True)
+            scripts['master'] = callback(pid)
+            for state in ('backup', 'fault'):
+                scripts[state] = ['kill', '-%s' % signal.SIGKILL,
+                                  '$(cat ' + pid + ')']
+
+        for state, script in scripts.items():
             ri.keepalived_manager.add_notifier(
-                ['kill', '-%s' % signal.SIGKILL,
-                 '$(cat ' + pid + ')'], state, ri.ha_vr_id)
+                script, state, ri.ha_vr_id,
+                state_change_cmd=self.get_state_change_command(
+                    ri.router_id, state))
 
     def _ha_external_gateway_updated(self, ri, ex_gw_port, interface_name):
         old_gateway_cidr = ri.ex_gw_port['ip_cidr']
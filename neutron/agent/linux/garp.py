@@ -0,0 +1,109 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import time
+
+import eventlet
+
+from neutron.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+class GratuitousArpService(object):
+    """Queue, deduplicate and rate limit gratuitous ARPs.
+
+    Requests are queued per namespace and sent by at most
+    senders_per_namespace green threads for each namespace, which live as
+    long as their namespace has pending requests. A request for an interface
+    and address which is already queued is dropped, and two sends on the same
+    interface are spaced by at least interface_interval seconds.
+
+    send_func(ns_name, interface_name, ip_address, *args) does the actual
+    sending, all the repetitions of a request at once.
+    """
+
+    def __init__(self, send_func, senders_per_namespace=4,
+                 interface_interval=0):
+        self._send_func = send_func
+        self._senders_per_namespace = senders_per_namespace
+        self._interface_interval = interface_interval
+        # ns_name -> OrderedDict of (interface_name, ip_address) -> args
+        self._queues = {}
+        self._senders = collections.defaultdict(int)
+        # (ns_name, interface_name) -> time the last send was scheduled at
+        self._next_send = {}
+        self.sent = 0
+        self.deduplicated = 0
+
+    def add(self, ns_name, interface_name, ip_address, *args):
+        queue = self._queues.setdefault(ns_name, collections.OrderedDict())
+        key = (interface_name, ip_address)
+        if key in queue:
+            self.deduplicated += 1
+            return
+        queue[key] = args
+
+        if self._senders[ns_name] < self._senders_per_namespace:
+            self._senders[ns_name] += 1
+            eventlet.spawn_n(self._sender, ns_name)
+
+    def pending(self, ns_name=None):
+        if ns_name:
+            return len(self._queues.get(ns_name, ()))
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _reserve_slot(self, ns_name, interface_name):
+        """Return how long to wait before sending on an interface."""
+        now = time.time()
+        key = (ns_name, interface_name)
+        send_at = max(now, self._next_send.get(key, 0))
+        self._next_send[key] = send_at + self._interface_interval
+        return send_at - now
+
+    def _sender(self, ns_name):
+        try:
+            while self._queues.get(ns_name):
+                queue = self._queues[ns_name]
+                key, args = queue.popitem(last=False)
+                interface_name, ip_address = key
+
+                delay = self._reserve_slot(ns_name, interface_name)
+                if delay > 0:
+                    eventlet.sleep(delay)
+
+                try:
+                    self._send_func(ns_name, interface_name, ip_address,
+                                    *args)
+                    self.sent += 1
+                except Exception:
+                    LOG.exception(_("Failed sending gratuitous ARP for "
+                                    "%(ip)s on %(interface)s"),
+                                  {'ip': ip_address,
+                                   'interface': interface_name})
+        finally:
+            self._senders[ns_name] -= 1
+            if not self._senders[ns_name]:
+                del self._senders[ns_name]
+                if not self._queues.get(ns_name):
+                    self._queues.pop(ns_name, None)
+                    self._forget_interfaces(ns_name)
+
+    def _forget_interfaces(self, ns_name):
+        now = time.time()
+        for key, send_at in self._next_send.items():
+            if key[0] == ns_name and send_at <= now:
+                del self._next_send[key]
@@ -143,6 +143,30 @@ class IPWrapper(SubProcessBase):
         """Delete a virtual interface between two namespaces."""
         self._as_root('', 'link', ('del', name))
 
+    def update_neighbours(self, entries):
+        """Add or delete several neighbour entries with a single ip process.
+
+        entries is a list of (operation, ip_address, mac_address, device)
+        tuples, where operation is 'add' or 'delete'.
+        """
+        lines = []
+        for operation, ip_address, mac_address, device in entries:
+            if operation == 'add':
+                lines.append('neigh replace %s lladdr %s nud permanent dev %s'
+                             % (ip_address, mac_address, device))
+            elif operation == 'delete':
+                lines.append('neigh del %s lladdr %s dev %s'
+                             % (ip_address, mac_address, device))
+        if not lines:
+            return
+
+        cmd = ['ip', '-force', '-batch', '-']
+        if self.namespace:
+            cmd = ['ip', 'netns', 'exec', self.namespace] + cmd
+        return utils.execute(cmd, root_helper=self.root_helper,
+                             process_input='\n'.join(lines) + '\n',
+                             log_fail_as_error=self.log_fail_as_error)
+
     def ensure_namespace(self, name):
         if not self.netns.exists(name):
             ip = self.netns.add(name)
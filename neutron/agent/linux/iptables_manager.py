@@ -21,7 +21,10 @@
 import inspect
 import os
 import re
+import time
 
+from eventlet import event
+from eventlet import semaphore
 from oslo.config import cfg
 
 from neutron.agent.common import config
@@ -296,7 +299,7 @@ class IptablesManager(object):
 
     def __init__(self, _execute=None, state_less=False,
                  root_helper=None, use_ipv6=False, namespace=None,
-                 binary_name=binary_name):
+                 binary_name=binary_name, apply_scheduler=None):
         if _execute:
             self.execute = _execute
         else:
@@ -307,6 +310,7 @@ class IptablesManager(object):
         self.root_helper = root_helper
         self.namespace = namespace
         self.iptables_apply_deferred = False
+        self.apply_scheduler = apply_scheduler
         self.wrap_name = binary_name[:16]
 
         self.ipv4 = {'filter': IptablesTable(binary_name=self.wrap_name)}
@@ -395,6 +399,12 @@ class IptablesManager(object):
         self._apply()
 
     def _apply(self):
+        if self.apply_scheduler:
+            return self.apply_scheduler.apply(self)
+        return self.apply_now()
+
+    def apply_now(self):
+        """Apply the rules right away, bypassing any apply scheduler."""
         lock_name = 'iptables'
         if self.namespace:
             lock_name += '-' + self.namespace
@@ -702,3 +712,113 @@ class IptablesManager(object):
                 acc['bytes'] += int(data[1])
 
         return acc
+
+
+class _PendingApply(object):
+    def __init__(self):
+        self.done = event.Event()
+
+
+class IptablesApplyScheduler(object):
+    """Coalesce and throttle the applies of many IptablesManager.
+
+    Callers of apply() block until an apply of their manager which started
+    after the call completed. Callers queued while an apply of the same
+    manager is still waiting for a free slot share its result, so a manager
+    updated several times in a row is only applied once. At most
+    max_concurrent iptables-save/iptables-restore runs are done at a time.
+
+    The applies of a held manager return right away and are only recorded,
+    the caller runs a single apply for all of them once it released the
+    manager. This merges the applies of updates which are processed one
+    after the other.
+
+    The latency of the applies is tracked for all the managers and per
+    namespace, get_stats reports the slowest namespaces.
+    """
+
+    # Number of namespaces reported by get_stats
+    SLOWEST_NAMESPACES = 5
+
+    def __init__(self, max_concurrent=4):
+        self._semaphore = semaphore.Semaphore(max_concurrent)
+        self._pending = {}
+        # iptables_manager -> whether an apply was held
+        self._held = {}
+        self.coalesced = 0
+        self.latency = utils.LatencyHistogram()
+        self.namespace_latencies = {}
+
+    def hold(self, iptables_manager):
+        """Record the applies of a manager instead of running them."""
+        self._held.setdefault(iptables_manager, False)
+
+    def release(self, iptables_manager):
+        """Stop holding a manager, return whether an apply was held."""
+        return self._held.pop(iptables_manager, False)
+
+    def apply(self, iptables_manager):
+        if iptables_manager in self._held:
+            if self._held[iptables_manager]:
+                self.coalesced += 1
+            self._held[iptables_manager] = True
+            return
+
+        start = time.time()
+        pending = self._pending.get(iptables_manager)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                return pending.done.wait()
+            finally:
+                self._observe(iptables_manager, time.time() - start)
+
+        pending = self._pending[iptables_manager] = _PendingApply()
+        try:
+            with self._semaphore:
+                # Rules changed from now on need another apply
+                self._forget_pending(iptables_manager, pending)
+                result = iptables_manager.apply_now()
+        except Exception as e:
+            self._forget_pending(iptables_manager, pending)
+            pending.done.send(exc=e)
+            raise
+        else:
+            pending.done.send(result)
+            return result
+        finally:
+            self._observe(iptables_manager, time.time() - start)
+
+    def _forget_pending(self, iptables_manager, pending):
+        if self._pending.get(iptables_manager) is pending:
+            del self._pending[iptables_manager]
+
+    def _observe(self, iptables_manager, seconds):
+        self.latency.observe(seconds)
+        histogram = self.namespace_latencies.get(iptables_manager.namespace)
+        if histogram is None:
+            histogram = utils.LatencyHistogram()
+            self.namespace_latencies[iptables_manager.namespace] = histogram
+        histogram.observe(seconds)
+
+    def forget(self, namespace):
+        """Drop the statistics kept for a namespace."""
+        self.namespace_latencies.pop(namespace, None)
+
+    def get_namespace_stats(self, namespace):
+        histogram = self.namespace_latencies.get(namespace)
+        return histogram.get_stats() if histogram else None
+
+    def get_stats(self):
+        stats = self.latency.get_stats()
+        stats['coalesced'] = self.coalesced
+        slowest = sorted(self.namespace_latencies.iteritems(),
+                         key=lambda item: item[1].max, reverse=True)
+        stats['slowest_namespaces'] = [
+            {'namespace': namespace,
+             'count': histogram.count,
+             'avg': histogram.sum / histogram.count,
+             'max': histogram.max}
+            for namespace, histogram in
+            slowest[:self.SLOWEST_NAMESPACES]]
+        return stats
@@ -21,6 +21,7 @@ from oslo.config import cfg
 from neutron.agent.linux import external_process
 from neutron.agent.linux import utils
 from neutron.common import exceptions
+from neutron.common import utils as common_utils
 from neutron.openstack.common.gettextutils import _LW
 from neutron.openstack.common import log as logging
 
@@ -272,16 +273,20 @@ class KeepalivedNotifierMixin(object):
         state_path = self._get_full_config_file_path('state')
         return '%s\necho -n %s > %s' % (script, state, state_path)
 
-    def add_notifier(self, script, state, ha_vr_id):
+    def add_notifier(self, script, state, ha_vr_id, state_change_cmd=None):
         """Add a master, backup or fault notifier.
 
         These notifiers are executed when keepalived invokes a state
         transition. Write a notifier to disk and add it to the
-        configuration.
+        configuration. The optional state_change_cmd is run last so that
+        the transition can be pushed to whoever is interested in it.
         """
 
         script_with_prefix = self._prepend_shebang(' '.join(script))
         full_script = self._append_state(script_with_prefix, state)
+        if state_change_cmd:
+            full_script = '%s\n%s' % (full_script,
+                                      ' '.join(state_change_cmd))
         self._write_notify_script(state, full_script)
 
         group = self.config.get_group(ha_vr_id)
@@ -317,11 +322,17 @@ class KeepalivedManager(KeepalivedNotifierMixin):
         self.conf = cfg.CONF
         self.process = None
         self.spawned = False
-
-    def _output_config_file(self):
-        config_str = self.config.get_config_str()
+        # Last config rendered to disk, used to skip no-op reloads
+        self._config_str = None
+        self.reload_latency = common_utils.LatencyHistogram()
+        self.reloads_skipped = 0
+
+    def _output_config_file(self, config_str=None):
+        if config_str is None:
+            config_str = self.config.get_config_str()
         config_path = self._get_full_config_file_path('keepalived.conf')
         utils.replace_file(config_path, config_str)
+        self._config_str = config_str
 
         return config_path
 
@@ -355,8 +366,18 @@ class KeepalivedManager(KeepalivedNotifierMixin):
 
     def restart(self):
         if self.process.active:
-            self._output_config_file()
-            self.process.reload_cfg()
+            config_str = self.config.get_config_str()
+            if config_str == self._config_str:
+                self.reloads_skipped += 1
+                LOG.debug('Keepalived config of %s is unchanged, '
+                          'skipping reload', self.resource_id)
+                return
+            # VIP and route changes are picked up by keepalived on SIGHUP,
+            # there is no need to restart the VRRP instances.
+            with self.reload_latency.time():
+                self._output_config_file(config_str)
+                self.process.reload_cfg()
+            LOG.debug('Keepalived of %s reloaded', self.resource_id)
         else:
             LOG.warn(_LW('A previous instance of keepalived seems to be dead, '
                          'unable to restart it, a new instance will be '
@@ -368,7 +389,13 @@ class KeepalivedManager(KeepalivedNotifierMixin):
         if self.process:
             self.process.disable(sig='15')
             self.spawned = False
+            self._config_str = None
 
     def revive(self):
         if self.spawned and not self.process.active:
             self.restart()
+
+    def get_reload_stats(self):
+        stats = self.reload_latency.get_stats()
+        stats['skipped'] = self.reloads_skipped
+        return stats
@@ -60,11 +60,7 @@ def _is_slaac(ra_mode):
             ra_mode == constants.DHCPV6_STATELESS)
 
 
-def _generate_radvd_conf(router_id, router_ports, dev_name_helper):
-    radvd_conf = utils.get_conf_file_name(cfg.CONF.ra_confs,
-                                          router_id,
-                                          'radvd.conf',
-                                          True)
+def _render_radvd_conf(router_ports, dev_name_helper):
     buf = six.StringIO()
     for p in router_ports:
         if netaddr.IPNetwork(p['subnet']['cidr']).version == 6:
@@ -75,12 +71,31 @@ def _generate_radvd_conf(router_id, router_ports, dev_name_helper):
             else:
                 conf_str = default_fmt % interface_name
             buf.write('%s' % conf_str)
+    return buf.getvalue()
+
+
+def _generate_radvd_conf(router_id, router_ports, dev_name_helper):
+    """Write the radvd config file of a router.
+
+    Returns the path of the file and whether its content changed. The file is
+    left untouched when the rendered config is the one already on disk.
+    """
+    radvd_conf = utils.get_conf_file_name(cfg.CONF.ra_confs,
+                                          router_id,
+                                          'radvd.conf',
+                                          True)
+    conf_str = _render_radvd_conf(router_ports, dev_name_helper)
+    if conf_str == utils.get_value_from_conf_file(cfg.CONF.ra_confs,
+                                                  router_id,
+                                                  'radvd.conf'):
+        return radvd_conf, False
 
-    utils.replace_file(radvd_conf, buf.getvalue())
-    return radvd_conf
+    utils.replace_file(radvd_conf, conf_str)
+    return radvd_conf, True
 
 
-def _spawn_radvd(router_id, radvd_conf, router_ns, root_helper):
+def _spawn_radvd(router_id, radvd_conf, router_ns, root_helper,
+                 reload_cfg=True):
     def callback(pid_file):
         radvd_cmd = ['radvd',
                      '-C', '%s' % radvd_conf,
@@ -92,7 +107,8 @@ def _spawn_radvd(router_id, radvd_conf, router_ns, root_helper):
                                             root_helper,
                                             router_ns,
                                             'radvd')
-    radvd.enable(callback, True)
+    # A running radvd is only sent a SIGHUP when its config changed
+    radvd.enable(callback, reload_cfg)
     LOG.debug("radvd enabled for router %s", router_id)
 
 
@@ -107,8 +123,10 @@ def enable_ipv6_ra(router_id, router_ns, router_ports,
         return
 
     LOG.debug("Enable IPv6 RA for router %s", router_id)
-    radvd_conf = _generate_radvd_conf(router_id, router_ports, dev_name_helper)
-    _spawn_radvd(router_id, radvd_conf, router_ns, root_helper)
+    radvd_conf, changed = _generate_radvd_conf(router_id, router_ports,
+                                               dev_name_helper)
+    _spawn_radvd(router_id, radvd_conf, router_ns, root_helper,
+                 reload_cfg=changed)
 
 
 def disable_ipv6_ra(router_id, router_ns, root_helper):
@@ -14,12 +14,14 @@
 
 import hashlib
 import hmac
+import itertools
 import os
 import socket
 import sys
 
 import eventlet
 eventlet.monkey_patch()
+from eventlet import pools
 
 import httplib2
 from neutronclient.v2_0 import client
@@ -90,7 +92,17 @@ class MetadataProxyHandler(object):
                    help=_("Client certificate for nova metadata api server.")),
         cfg.StrOpt('nova_client_priv_key',
                    default='',
-                   help=_("Private key of client certificate."))
+                   help=_("Private key of client certificate.")),
+        cfg.ListOpt('nova_metadata_hosts',
+                    default=[],
+                    help=_("List of <ip>:<port> Nova metadata servers "
+                           "requests are spread over in a round-robin "
+                           "fashion. Defaults to nova_metadata_ip and "
+                           "nova_metadata_port when empty.")),
+        cfg.IntOpt('nova_metadata_pool_size',
+                   default=16,
+                   help=_("Maximum number of persistent connections kept "
+                          "open to each Nova metadata server by a worker."))
     ]
 
     def __init__(self, conf):
@@ -100,6 +112,11 @@ class MetadataProxyHandler(object):
             self._cache = cache.get_cache(self.conf.cache_url)
         else:
             self._cache = False
+        self._nova_pool = NovaMetadataConnectionPool(conf)
+
+    def get_latency_stats(self):
+        """Return the latency stats of the requests by Nova server."""
+        return self._nova_pool.get_latency_stats()
 
     def _get_neutron_client(self):
         qclient = client.Client(
@@ -200,24 +217,11 @@ class MetadataProxyHandler(object):
             'X-Instance-ID-Signature': self._sign_instance_id(instance_id)
         }
 
-        nova_ip_port = '%s:%s' % (self.conf.nova_metadata_ip,
-                                  self.conf.nova_metadata_port)
-        url = urlparse.urlunsplit((
-            self.conf.nova_metadata_protocol,
-            nova_ip_port,
-            req.path_info,
-            req.query_string,
-            ''))
-
-        h = httplib2.Http(ca_certs=self.conf.auth_ca_cert,
-                          disable_ssl_certificate_validation=
-                          self.conf.nova_metadata_insecure)
-        if self.conf.nova_client_cert and self.conf.nova_client_priv_key:
-            h.add_certificate(self.conf.nova_client_priv_key,
-                              self.conf.nova_client_cert,
-                              nova_ip_port)
-        resp, content = h.request(url, method=req.method, headers=headers,
-                                  body=req.body)
+        resp, content = self._nova_pool.request(req.path_info,
+                                                req.query_string,
+                                                method=req.method,
+                                                headers=headers,
+                                                body=req.body)
 
         if resp.status == 200:
             LOG.debug(str(resp))
@@ -252,6 +256,56 @@ class MetadataProxyHandler(object):
                         hashlib.sha256).hexdigest()
 
 
+class NovaMetadataConnectionPool(object):
+    """Persistent HTTP clients to the Nova metadata servers.
+
+    Every configured server gets its own pool of httplib2.Http objects, each
+    of which keeps its connection alive between requests, so that proxied
+    requests do not pay for a TCP (and TLS) handshake each time. Servers are
+    picked in a round-robin fashion and per server latencies are recorded,
+    in histograms shared with the worker processes.
+    """
+
+    def __init__(self, conf):
+        self.conf = conf
+        hosts = conf.nova_metadata_hosts or [
+            '%s:%s' % (conf.nova_metadata_ip, conf.nova_metadata_port)]
+        self._pools = {}
+        self.latencies = {}
+        for host in hosts:
+            self._pools[host] = pools.Pool(
+                max_size=conf.nova_metadata_pool_size,
+                create=lambda host=host: self._create_http(host))
+            self.latencies[host] = utils.SharedLatencyHistogram()
+        self._hosts = itertools.cycle(hosts)
+
+    def _create_http(self, host):
+        h = httplib2.Http(ca_certs=self.conf.auth_ca_cert,
+                          disable_ssl_certificate_validation=
+                          self.conf.nova_metadata_insecure)
+        if self.conf.nova_client_cert and self.conf.nova_client_priv_key:
+            h.add_certificate(self.conf.nova_client_priv_key,
+                              self.conf.nova_client_cert,
+                              host)
+        return h
+
+    def request(self, path, query_string, **kwargs):
+        host = next(self._hosts)
+        url = urlparse.urlunsplit((
+            self.conf.nova_metadata_protocol,
+            host,
+            path,
+            query_string,
+            ''))
+        with self._pools[host].item() as h:
+            with self.latencies[host].time():
+                return h.request(url, **kwargs)
+
+    def get_latency_stats(self):
+        return dict((host, histogram.get_stats())
+                    for host, histogram in self.latencies.items())
+
+
 class UnixDomainHttpProtocol(eventlet.wsgi.HttpProtocol):
     def __init__(self, request, client_address, server):
         if client_address == '':
@@ -321,6 +375,9 @@ class UnixDomainMetadataProxy(object):
         else:
             os.makedirs(dirname, 0o755)
 
+        # Created before the workers are forked, which share its latency
+        # histograms
+        self.handler = MetadataProxyHandler(self.conf)
         self._init_state_reporting()
 
     def _init_state_reporting(self):
@@ -344,6 +401,11 @@ class UnixDomainMetadataProxy(object):
             self.heartbeat.start(interval=report_interval)
 
     def _report_state(self):
+        configurations = self.agent_state['configurations']
+        configurations['nova_metadata_latency'] = dict(
+            (host, dict((key, stats[key]) for key in ('count', 'avg', 'max')))
+            for host, stats in self.handler.get_latency_stats().items()
+            if stats['count'])
         try:
             self.state_rpc.report_state(
                 self.context,
@@ -362,7 +424,7 @@ class UnixDomainMetadataProxy(object):
 
     def run(self):
         server = UnixDomainWSGIServer('neutron-metadata-agent')
-        server.start(MetadataProxyHandler(self.conf),
+        server.start(self.handler,
                      self.conf.metadata_proxy_socket,
                      workers=self.conf.metadata_workers,
                      backlog=self.conf.metadata_backlog)
@@ -14,6 +14,8 @@
 #    under the License.
 
 import itertools
+
+from oslo.config import cfg
 from oslo import messaging
 
 from neutron.common import rpc as n_rpc
@@ -54,12 +56,24 @@ def create_consumers(endpoints, prefix, topic_details):
     return connection
 
 
+def get_plugin_topic(topic, group):
+    """Return the topic the calls of group to the core plugin are sent on.
+
+    :param topic: the topic of the plugin
+    :param group: the group of the calls, one of topics.RPC_GROUPS
+    """
+    if topic == topics.PLUGIN and cfg.CONF.rpc_topic_groups:
+        return topics.get_group_topic(topic, group)
+    return topic
+
+
 class PluginReportStateAPI(n_rpc.RpcProxy):
     BASE_RPC_API_VERSION = '1.0'
 
     def __init__(self, topic):
         super(PluginReportStateAPI, self).__init__(
-            topic=topic, default_version=self.BASE_RPC_API_VERSION)
+            topic=get_plugin_topic(topic, topics.RPC_GROUP_REPORTS),
+            default_version=self.BASE_RPC_API_VERSION)
 
     def report_state(self, context, agent_state, use_call=False):
         msg = self.make_msg('report_state',
@@ -87,11 +101,13 @@ class PluginApi(n_rpc.RpcProxy):
     def __init__(self, topic):
         super(PluginApi, self).__init__(
             topic=topic, default_version=self.BASE_RPC_API_VERSION)
+        self.devices_topic = get_plugin_topic(topic, topics.RPC_GROUP_DEVICES)
 
     def get_device_details(self, context, device, agent_id, host=None):
         return self.call(context,
                          self.make_msg('get_device_details', device=device,
-                                       agent_id=agent_id, host=host))
+                                       agent_id=agent_id, host=host),
+                         topic=self.devices_topic)
 
     def get_devices_details_list(self, context, devices, agent_id, host=None):
         res = []
@@ -101,7 +117,7 @@ class PluginApi(n_rpc.RpcProxy):
                                           devices=devices,
                                           agent_id=agent_id,
                                           host=host),
-                            version='1.3')
+                            topic=self.devices_topic, version='1.3')
         except messaging.UnsupportedVersion:
             # If the server has not been upgraded yet, a DVR-enabled agent
             # may not work correctly, however it can function in 'degraded'
@@ -111,7 +127,8 @@ class PluginApi(n_rpc.RpcProxy):
             res = [
                 self.call(context,
                           self.make_msg('get_device_details', device=device,
-                                        agent_id=agent_id, host=host))
+                                        agent_id=agent_id, host=host),
+                          topic=self.devices_topic)
                 for device in devices
             ]
         return res
@@ -119,14 +136,17 @@ class PluginApi(n_rpc.RpcProxy):
     def update_device_down(self, context, device, agent_id, host=None):
         return self.call(context,
                          self.make_msg('update_device_down', device=device,
-                                       agent_id=agent_id, host=host))
+                                       agent_id=agent_id, host=host),
+                         topic=self.devices_topic)
 
     def update_device_up(self, context, device, agent_id, host=None):
         return self.call(context,
                          self.make_msg('update_device_up', device=device,
-                                       agent_id=agent_id, host=host))
+                                       agent_id=agent_id, host=host),
+                         topic=self.devices_topic)
 
     def tunnel_sync(self, context, tunnel_ip, tunnel_type=None):
         return self.call(context,
                          self.make_msg('tunnel_sync', tunnel_ip=tunnel_ip,
-                                       tunnel_type=tunnel_type))
+                                       tunnel_type=tunnel_type),
+                         topic=self.devices_topic)
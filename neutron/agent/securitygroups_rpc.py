@@ -17,6 +17,7 @@
 from oslo.config import cfg
 from oslo import messaging
 
+from neutron.agent import rpc as agent_rpc
 from neutron.common import topics
 from neutron.openstack.common.gettextutils import _LW
 from neutron.openstack.common import importutils
@@ -83,12 +84,17 @@ def disable_security_group_extension_by_config(aliases):
 class SecurityGroupServerRpcApiMixin(object):
     """A mix-in that enable SecurityGroup support in plugin rpc."""
 
+    def _get_security_group_server_topic(self):
+        return agent_rpc.get_plugin_topic(self.topic,
+                                          topics.RPC_GROUP_SECURITY_GROUPS)
+
     def security_group_rules_for_devices(self, context, devices):
         LOG.debug(_("Get security group rules "
                     "for devices via rpc %r"), devices)
         return self.call(context,
                          self.make_msg('security_group_rules_for_devices',
                                        devices=devices),
+                         topic=self._get_security_group_server_topic(),
                          version='1.1')
 
     def security_group_info_for_devices(self, context, devices):
@@ -97,6 +103,7 @@ class SecurityGroupServerRpcApiMixin(object):
         return self.call(context,
                          self.make_msg('security_group_info_for_devices',
                                        devices=devices),
+                         topic=self._get_security_group_server_topic(),
                          version='1.2')
 
 
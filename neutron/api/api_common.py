@@ -13,9 +13,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
 import urllib
 
 from oslo.config import cfg
+import six
 from webob import exc
 
 from neutron.common import constants
@@ -121,6 +123,30 @@ def list_args(request, arg):
     return [v for v in request.GET.getall(arg) if v]
 
 
+def get_etag(data, revision_key='revision_number'):
+    """Return the ETag of a resource or a collection returned by the API.
+
+    It is computed from the ids, the attribute names and the revision
+    numbers of the resources in data, so it is known without rendering the
+    response. None is returned if a resource has no revision number.
+    """
+    if not isinstance(data, dict):
+        return None
+    digest = hashlib.sha1()
+    for key in sorted(data):
+        if key.endswith('_links'):
+            continue
+        items = data[key] if isinstance(data[key], list) else [data[key]]
+        digest.update(key)
+        for item in items:
+            if not isinstance(item, dict) or revision_key not in item:
+                return None
+            digest.update(six.text_type('%s:%s:%s;' % (
+                item.get('id'), item[revision_key],
+                ','.join(sorted(item)))).encode('utf-8'))
+    return digest.hexdigest()
+
+
 def get_sorts(request, attr_info):
     """Extract sort_key and sort_dir from request.
 
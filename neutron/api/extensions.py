@@ -26,6 +26,7 @@ import webob.dec
 import webob.exc
 
 from neutron.api.v2 import attributes
+from neutron.api.v2 import base
 from neutron.common import exceptions
 import neutron.extensions
 from neutron import manager
@@ -269,7 +270,7 @@ class ExtensionMiddleware(wsgi.Middleware):
                  ext_mgr=None):
         self.ext_mgr = (ext_mgr
                         or ExtensionManager(get_extensions_path()))
-        mapper = routes.Mapper()
+        mapper = wsgi.TrieMapper()
 
         # extended resources
         for resource in self.ext_mgr.get_resources():
@@ -405,6 +406,7 @@ class ExtensionManager(object):
         self.extensions = {}
         self._load_all_extensions()
         policy.reset()
+        base.reset_compiled_attr_info()
 
     def get_resources(self):
         """Returns a list of ResourceExtension objects."""
@@ -506,6 +508,7 @@ class ExtensionManager(object):
         # Extending extensions' attributes map.
         for ext in update_exts:
             ext.update_attributes_map(attr_map)
+        base.reset_compiled_attr_info()
 
     def _check_extension(self, extension):
         """Checks for required methods in extension objects."""
@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+
 from neutron.common import constants
 from neutron.common import rpc as n_rpc
 from neutron.common import topics
@@ -100,6 +102,14 @@ class DhcpAgentNotifyAPI(n_rpc.RpcProxy):
 
     def _notify_agents(self, context, method, payload, network_id):
         """Notify all the agents that are hosting the network."""
+        self._notify_agents_bulk(context, method, [payload], network_id)
+
+    def _notify_agents_bulk(self, context, method, payloads, network_id):
+        """Notify the agents hosting the network of several payloads.
+
+        The agents are looked up, and the network scheduled, once for all
+        the payloads.
+        """
         # fanout is required as we do not know who is "listening"
         no_agents = not utils.is_extension_supported(
             self.plugin, constants.DHCP_AGENT_SCHEDULER_EXT_ALIAS)
@@ -110,7 +120,8 @@ class DhcpAgentNotifyAPI(n_rpc.RpcProxy):
         cast_required = method != 'network_create_end'
 
         if fanout_required:
-            self._fanout_message(context, method, payload)
+            for payload in payloads:
+                self._fanout_message(context, method, payload)
         elif cast_required:
             admin_ctx = (context if context.is_admin else context.elevated())
             network = self.plugin.get_network(admin_ctx, network_id)
@@ -120,15 +131,18 @@ class DhcpAgentNotifyAPI(n_rpc.RpcProxy):
             # schedule the network first, if needed
             schedule_required = (
                 method == 'port_create_end' and
-                not self._is_reserved_dhcp_port(payload['port']))
+                any(not self._is_reserved_dhcp_port(payload['port'])
+                    for payload in payloads))
             if schedule_required:
                 agents = self._schedule_network(admin_ctx, network, agents)
 
             enabled_agents = self._get_enabled_agents(
-                context, network, agents, method, payload)
-            for agent in enabled_agents:
-                self._cast_message(
-                    context, method, payload, agent.host, agent.topic)
+                context, network, agents, method,
+                payloads[0] if len(payloads) == 1 else payloads)
+            for payload in payloads:
+                for agent in enabled_agents:
+                    self._cast_message(
+                        context, method, payload, agent.host, agent.topic)
 
     def _cast_message(self, context, method, payload, host,
                       topic=topics.DHCP_AGENT):
@@ -180,3 +194,22 @@ class DhcpAgentNotifyAPI(n_rpc.RpcProxy):
                                     network_id)
         else:
             self._notify_agents(context, method_name, data, network_id)
+
+    def notify_bulk(self, context, items, method_name):
+        """Notify a list of resources of the same type.
+
+        Created ports are notified per network, other resources one by one
+        through notify.
+        """
+        if method_name != 'port.create.end':
+            for data in items:
+                self.notify(context, data, method_name)
+            return
+        payloads = collections.OrderedDict()
+        for data in items:
+            network_id = data['port'].get('network_id')
+            if network_id:
+                payloads.setdefault(network_id, []).append(data)
+        for network_id, network_payloads in payloads.iteritems():
+            self._notify_agents_bulk(context, 'port_create_end',
+                                     network_payloads, network_id)
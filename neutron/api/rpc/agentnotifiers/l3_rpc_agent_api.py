@@ -73,6 +73,13 @@ class L3AgentNotifyAPI(n_rpc.RpcProxy):
     def _agent_notification_arp(self, context, method, router_id,
                                 operation, data):
         """Notify arp details to l3 agents hosting router."""
+        dvr_arptable = {'router_id': router_id,
+                        'arp_table': data}
+        self._notify_agents_hosting_router(context, method, router_id,
+                                           dvr_arptable, '1.2')
+
+    def _notify_agents_hosting_router(self, context, method, router_id,
+                                      payload, version):
         if not router_id:
             return
         adminContext = (context.is_admin and
@@ -90,11 +97,9 @@ class L3AgentNotifyAPI(n_rpc.RpcProxy):
             topic = '%s.%s' % (l3_agent.topic, l3_agent.host)
             LOG.debug('Casting message %(method)s with topic %(topic)s',
                       {'topic': topic, 'method': method})
-            dvr_arptable = {'router_id': router_id,
-                            'arp_table': data}
             self.cast(context,
-                      self.make_msg(method, payload=dvr_arptable),
-                      topic=topic, version='1.2')
+                      self.make_msg(method, payload=payload),
+                      topic=topic, version=version)
 
     def _notification(self, context, method, router_ids, operation,
                       shuffle_agents):
@@ -152,6 +157,17 @@ class L3AgentNotifyAPI(n_rpc.RpcProxy):
         self._agent_notification_arp(context, 'del_arp_entry', router_id,
                                      operation, arp_table)
 
+    def update_arp_entries(self, context, router_id, arp_entries):
+        """Add or delete several arp entries of a DVR router at once.
+
+        Each entry has the ip_address, mac_address and subnet_id keys of an
+        arp table, and an operation which is 'add' or 'delete'.
+        """
+        payload = {'router_id': router_id,
+                   'arp_entries': arp_entries}
+        self._notify_agents_hosting_router(context, 'update_arp_entries',
+                                           router_id, payload, '1.3')
+
     def router_removed_from_agent(self, context, router_id, host):
         self._notification_host(context, 'router_removed_from_agent',
                                 {'router_id': router_id}, host)
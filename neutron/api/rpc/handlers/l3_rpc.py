@@ -39,7 +39,9 @@ class L3RpcCallback(n_rpc.RpcCallback):
     # 1.2 Added methods for DVR support
     # 1.3 Added a method that returns the list of activated services
     # 1.4 Added L3 HA update_router_state
-    RPC_API_VERSION = '1.4'
+    # 1.5 Added get_router_ids and get_router_checksums
+    # 1.6 Added L3 HA update_ha_routers_states
+    RPC_API_VERSION = '1.6'
 
     @property
     def plugin(self):
@@ -65,26 +67,84 @@ class L3RpcCallback(n_rpc.RpcCallback):
         router_ids = kwargs.get('router_ids')
         host = kwargs.get('host')
         context = neutron_context.get_admin_context()
+        routers = self._get_sync_routers(context, host, router_ids)
+        LOG.debug(_("Routers returned to l3 agent:\n %s"),
+                  jsonutils.dumps(routers, indent=5))
+        return routers
+
+    def _get_sync_routers(self, context, host, router_ids):
         if not self.l3plugin:
             routers = {}
             LOG.error(_('No plugin for L3 routing registered! Will reply '
                         'to l3 agent with empty router dictionary.'))
-        elif utils.is_extension_supported(
-                self.l3plugin, constants.L3_AGENT_SCHEDULER_EXT_ALIAS):
-            if cfg.CONF.router_auto_schedule:
-                self.l3plugin.auto_schedule_routers(context, host, router_ids)
-            routers = (
-                self.l3plugin.list_active_sync_routers_on_active_l3_agent(
-                    context, host, router_ids))
         else:
-            routers = self.l3plugin.get_sync_data(context, router_ids)
+            scheduler = utils.is_extension_supported(
+                self.l3plugin, constants.L3_AGENT_SCHEDULER_EXT_ALIAS)
+            if scheduler and cfg.CONF.router_auto_schedule:
+                self.l3plugin.auto_schedule_routers(context, host, router_ids)
+            # NOTE: the checksums are computed before the sync data, a change
+            # in between only costs the agent one more update of the router
+            checksums = self._get_router_checksums(context, host, router_ids)
+            if scheduler:
+                routers = (
+                    self.l3plugin.list_active_sync_routers_on_active_l3_agent(
+                        context, host, router_ids))
+            else:
+                routers = self.l3plugin.get_sync_data(context, router_ids)
+            for router in routers:
+                router[constants.ROUTER_CHECKSUM_KEY] = checksums.get(
+                    router['id'])
         if utils.is_extension_supported(
             self.plugin, constants.PORT_BINDING_EXT_ALIAS):
             self._ensure_host_set_on_ports(context, host, routers)
-        LOG.debug(_("Routers returned to l3 agent:\n %s"),
-                  jsonutils.dumps(routers, indent=5))
         return routers
 
+    def get_router_ids(self, context, **kwargs):
+        """Get the IDs of the routers a specific agent should host.
+
+        This is the first, cheap step of a full synchronization: the agent
+        then fetches routers in chunks with sync_routers.
+        """
+        host = kwargs.get('host')
+        context = neutron_context.get_admin_context()
+        if not self.l3plugin:
+            LOG.error(_('No plugin for L3 routing registered! Will reply '
+                        'to l3 agent with empty router list.'))
+            return []
+        if utils.is_extension_supported(
+                self.l3plugin, constants.L3_AGENT_SCHEDULER_EXT_ALIAS):
+            if cfg.CONF.router_auto_schedule:
+                self.l3plugin.auto_schedule_routers(context, host, None)
+            return self.l3plugin.list_router_ids_on_host(context, host)
+        return [router['id'] for router in
+                self.l3plugin.get_routers(context, fields=['id'])]
+
+    def get_router_checksums(self, context, **kwargs):
+        """Get a checksum of the sync data of given routers.
+
+        The agent compares them to the checksums of the routers it has
+        processed and only fetches the ones which differ. They are computed
+        from revision numbers, without building the sync data.
+        """
+        router_ids = kwargs.get('router_ids')
+        host = kwargs.get('host')
+        context = neutron_context.get_admin_context()
+        if not self.l3plugin:
+            LOG.error(_('No plugin for L3 routing registered! Will reply '
+                        'to l3 agent with empty router checksums.'))
+            return {}
+        return self._get_router_checksums(context, host, router_ids)
+
+    def _get_router_checksums(self, context, host, router_ids):
+        if utils.is_extension_supported(
+                self.l3plugin, constants.L3_AGENT_SCHEDULER_EXT_ALIAS):
+            # Only active routers hosted by the agent are synced to it
+            router_ids = self.l3plugin.list_router_ids_on_host(
+                context, host, router_ids)
+            return self.l3plugin.get_router_checksums(
+                context, router_ids, active=True)
+        return self.l3plugin.get_router_checksums(context, router_ids)
+
     def _ensure_host_set_on_ports(self, context, host, routers):
         for router in routers:
             LOG.debug(_("Checking router: %(id)s for host: %(host)s"),
@@ -237,3 +297,15 @@ class L3RpcCallback(n_rpc.RpcCallback):
 
         return self.l3plugin.update_router_state(context, router_id, state,
                                                  host=host)
+
+    def update_ha_routers_states(self, context, **kwargs):
+        """Update the HA states of several routers hosted by an agent.
+
+        states is a dict of router_id to 'active' or 'standby'.
+        """
+        host = kwargs.get('host')
+        states = kwargs.get('states')
+
+        LOG.debug('Updating HA routers states on host %(host)s: %(states)s',
+                  {'host': host, 'states': states})
+        self.l3plugin.update_routers_states(context, states, host)
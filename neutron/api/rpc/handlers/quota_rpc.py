@@ -0,0 +1,51 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from neutron.common import rpc as n_rpc
+from neutron.common import topics
+from neutron.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+class QuotaLimitsNotifyAPI(n_rpc.RpcProxy):
+    """API for a server to notify all the API workers of limit updates."""
+
+    BASE_RPC_API_VERSION = '1.0'
+
+    def __init__(self, topic=topics.QUOTA_LIMITS):
+        super(QuotaLimitsNotifyAPI, self).__init__(
+            topic=topic, default_version=self.BASE_RPC_API_VERSION)
+
+    def quota_limits_changed(self, context, tenant_id):
+        LOG.debug("Fanout notify quota limits changed for tenant "
+                  "%(tenant_id)s at %(topic)s",
+                  {'tenant_id': tenant_id, 'topic': self.topic})
+        self.fanout_cast(context,
+                         self.make_msg('quota_limits_changed',
+                                       tenant_id=tenant_id))
+
+
+class QuotaLimitsCallback(n_rpc.RpcCallback):
+    """Invalidate the quota limits cached by an API worker."""
+
+    RPC_API_VERSION = '1.0'
+
+    def __init__(self, cache):
+        super(QuotaLimitsCallback, self).__init__()
+        self.cache = cache
+
+    def quota_limits_changed(self, context, tenant_id):
+        self.cache.invalidate(tenant_id)
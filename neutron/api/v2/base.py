@@ -13,7 +13,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import copy
+import itertools
 import netaddr
 import webob.exc
 
@@ -44,6 +46,114 @@ FAULT_MAP = {exceptions.NotFound: webob.exc.HTTPNotFound,
              }
 
 
+class CompiledAttributeInfo(object):
+    """Request body validation and conversion for an attribute map.
+
+    The attribute map is walked once: the attributes required, defaulted
+    or forbidden on create and update are listed, and the validators of
+    each attribute are resolved, so that preparing a request body only
+    visits the attributes it has to.
+    """
+
+    def __init__(self, attr_info):
+        self.attr_info = attr_info
+        self.attributes = frozenset(attr_info)
+        self.post_required = []
+        self.post_defaults = []
+        self.post_forbidden = []
+        self.put_forbidden = []
+        self.converters = []
+        for attr, attr_vals in attr_info.iteritems():
+            if attr_vals['allow_post']:
+                if 'default' in attr_vals:
+                    self.post_defaults.append((attr, attr_vals['default']))
+                else:
+                    self.post_required.append(attr)
+            else:
+                self.post_forbidden.append(attr)
+            if not attr_vals['allow_put']:
+                self.put_forbidden.append(attr)
+            validators = [(self._get_validator(rule), data)
+                          for rule, data in
+                          attr_vals.get('validate', {}).iteritems()]
+            if 'convert_to' in attr_vals or validators:
+                self.converters.append(
+                    (attr, attr_vals.get('convert_to'), validators))
+
+    @staticmethod
+    def _get_validator(rule):
+        try:
+            return attributes.validators[rule]
+        except KeyError:
+            # Validators can be registered after the map is compiled
+            return lambda data, valid_values: attributes.validators[rule](
+                data, valid_values)
+
+    def prepare(self, res_dict, is_create):
+        """Validate and convert the attributes of a resource in place."""
+        extra_keys = set(res_dict) - self.attributes
+        if extra_keys:
+            msg = _("Unrecognized attribute(s) '%s'") % ', '.join(extra_keys)
+            raise webob.exc.HTTPBadRequest(msg)
+
+        if is_create:  # POST
+            for attr in self.post_required:
+                if attr not in res_dict:
+                    msg = _("Failed to parse request. Required "
+                            "attribute '%s' not specified") % attr
+                    raise webob.exc.HTTPBadRequest(msg)
+            for attr in self.post_forbidden:
+                if attr in res_dict:
+                    msg = _("Attribute '%s' not allowed in POST") % attr
+                    raise webob.exc.HTTPBadRequest(msg)
+            for attr, default in self.post_defaults:
+                if attr not in res_dict:
+                    res_dict[attr] = default
+        else:  # PUT
+            for attr in self.put_forbidden:
+                if attr in res_dict:
+                    msg = _("Cannot update read-only attribute %s") % attr
+                    raise webob.exc.HTTPBadRequest(msg)
+
+        for attr, convert_to, validators in self.converters:
+            if (attr not in res_dict or
+                res_dict[attr] is attributes.ATTR_NOT_SPECIFIED):
+                continue
+            # Convert values if necessary
+            if convert_to:
+                res_dict[attr] = convert_to(res_dict[attr])
+            # Check that configured values are correct
+            for validator, data in validators:
+                res = validator(res_dict[attr], data)
+                if res:
+                    msg_dict = dict(attr=attr, reason=res)
+                    msg = _("Invalid input for %(attr)s. "
+                            "Reason: %(reason)s.") % msg_dict
+                    raise webob.exc.HTTPBadRequest(msg)
+
+
+# Compiled attribute maps by id of the attribute map
+_COMPILED_ATTR_INFO = {}
+
+
+def compile_attr_info(attr_info, refresh=False):
+    """Return the CompiledAttributeInfo of an attribute map.
+
+    It is compiled again when refresh is True. Extensions extend the maps
+    in place, the compiled maps are discarded with reset_compiled_attr_info
+    when the extensions and policies are reloaded.
+    """
+    compiled = _COMPILED_ATTR_INFO.get(id(attr_info))
+    if refresh or not compiled or compiled.attr_info is not attr_info:
+        compiled = _COMPILED_ATTR_INFO[id(attr_info)] = (
+            CompiledAttributeInfo(attr_info))
+    return compiled
+
+
+def reset_compiled_attr_info():
+    _COMPILED_ATTR_INFO.clear()
+
+
 class Controller(object):
     LIST = 'list'
     SHOW = 'show'
@@ -68,6 +178,8 @@ class Controller(object):
         self._native_sorting = self._is_native_sorting_supported()
         self._policy_attrs = [name for (name, info) in self._attr_info.items()
                               if info.get('required_by_policy')]
+        # Controllers are created once the extensions extended attr_info
+        compile_attr_info(attr_info, refresh=True)
         self._notifier = n_rpc.get_notifier('network')
         # use plugin's dhcp notifier, if this is already instantiated
         agent_notifiers = getattr(plugin, 'agent_notifiers', {})
@@ -149,6 +261,30 @@ class Controller(object):
             attributes_to_exclude.append(attr_name)
         return attributes_to_exclude
 
+    def _exclude_attributes_by_policy_bulk(self, context, items):
+        """Identifies attributes to exclude from each item of a list.
+
+        Same as _exclude_attributes_by_policy, but the policy of each
+        attribute is evaluated once for all the items with the same policy
+        inputs. Return a list with the attribute names to strip from each
+        item.
+        """
+        action = self._plugin_handlers[self.SHOW]
+        attributes_to_exclude = [[] for item in items]
+        for attr_name in set(itertools.chain.from_iterable(items)):
+            attr_data = self._attr_info.get(attr_name)
+            if attr_data and attr_data['is_visible']:
+                allowed = policy.check_bulk(
+                    context, '%s:%s' % (action, attr_name), items,
+                    might_not_exist=True)
+            else:
+                allowed = [False] * len(items)
+            for item, is_allowed, excluded in zip(items, allowed,
+                                                  attributes_to_exclude):
+                if not is_allowed and attr_name in item:
+                    excluded.append(attr_name)
+        return attributes_to_exclude
+
     def _view(self, context, data, fields_to_strip=None):
         """Build a view of an API resource.
 
@@ -247,25 +383,22 @@ class Controller(object):
             # FIXME(salvatore-orlando): obj_getter might return references to
             # other resources. Must check authZ on them too.
             # Omit items from list that should not be visible
-            obj_list = [obj for obj in obj_list
-                        if policy.check(request.context,
+            allowed = policy.check_bulk(request.context,
                                         self._plugin_handlers[self.SHOW],
-                                        obj,
-                                        plugin=self._plugin)]
-        # Use the first element in the list for discriminating which attributes
-        # should be filtered out because of authZ policies
+                                        obj_list)
+            obj_list = [obj for obj, is_allowed in zip(obj_list, allowed)
+                        if is_allowed]
         # fields_to_add contains a list of attributes added for request policy
         # checks but that were not required by the user. They should be
         # therefore stripped
         fields_to_strip = fields_to_add or []
-        if obj_list:
-            fields_to_strip += self._exclude_attributes_by_policy(
-                request.context, obj_list[0])
+        excluded = self._exclude_attributes_by_policy_bulk(request.context,
+                                                           obj_list)
         collection = {self._collection:
                       [self._filter_attributes(
                           request.context, obj,
-                          fields_to_strip=fields_to_strip)
-                       for obj in obj_list]}
+                          fields_to_strip=fields_to_strip + obj_excluded)
+                       for obj, obj_excluded in zip(obj_list, excluded)]}
         pagination_links = pagination_helper.get_links(obj_list)
         if pagination_links:
             collection[self._collection + "_links"] = pagination_links
@@ -290,9 +423,10 @@ class Controller(object):
     def _send_dhcp_notification(self, context, data, methodname):
         if cfg.CONF.dhcp_agent_notification:
             if self._collection in data:
-                for body in data[self._collection]:
-                    item = {self._resource: body}
-                    self._dhcp_agent_notifier.notify(context, item, methodname)
+                items = [{self._resource: body}
+                         for body in data[self._collection]]
+                self._dhcp_agent_notifier.notify_bulk(context, items,
+                                                      methodname)
             else:
                 self._dhcp_agent_notifier.notify(context, data, methodname)
 
@@ -382,38 +516,36 @@ class Controller(object):
         if self._collection in body:
             # Have to account for bulk create
             items = body[self._collection]
-            deltas = {}
-            bulk = True
         else:
             items = [body]
-            bulk = False
         # Ensure policy engine is initialized
         policy.init()
+        deltas = collections.defaultdict(int)
         for item in items:
             self._validate_network_tenant_ownership(request,
                                                     item[self._resource])
             policy.enforce(request.context,
                            action,
                            item[self._resource])
+            deltas[item[self._resource]['tenant_id']] += 1
+        reservations = []
+        try:
             try:
-                tenant_id = item[self._resource]['tenant_id']
-                count = quota.QUOTAS.count(request.context, self._resource,
-                                           self._plugin, self._collection,
-                                           tenant_id)
-                if bulk:
-                    delta = deltas.get(tenant_id, 0) + 1
-                    deltas[tenant_id] = delta
-                else:
-                    delta = 1
-                kwargs = {self._resource: count + delta}
+                for tenant_id, delta in deltas.iteritems():
+                    reservations.append(quota.QUOTAS.make_reservation(
+                        request.context, tenant_id, self._resource, delta,
+                        self._plugin, self._collection))
             except exceptions.QuotaResourceUnknown as e:
                 # We don't want to quota this resource
                 LOG.debug(e)
-            else:
-                quota.QUOTAS.limit_check(request.context,
-                                         item[self._resource]['tenant_id'],
-                                         **kwargs)
-
+            return self._create(request, body, action, parent_id)
+        finally:
+            for reservation in reservations:
+                quota.QUOTAS.release_reservation(request.context,
+                                                 reservation)
+
+    def _create(self, request, body, action, parent_id):
+        """Creates the entities of a validated and authorized body."""
         def notify(create_result):
             notifier_method = self._resource + '.create.end'
             self._notifier.info(request.context,
@@ -580,6 +712,7 @@ class Controller(object):
             raise webob.exc.HTTPBadRequest(_("Resource body required"))
 
         LOG.debug(_("Request body: %(body)s"), {'body': body})
+        compiled_attr_info = compile_attr_info(attr_info)
         if collection in body:
             if not allow_bulk:
                 raise webob.exc.HTTPBadRequest(_("Bulk operation "
@@ -587,68 +720,28 @@ class Controller(object):
             if not body[collection]:
                 raise webob.exc.HTTPBadRequest(_("Resources required"))
             bulk_body = [
-                Controller.prepare_request_body(
+                Controller._prepare_resource_body(
                     context, item if resource in item else {resource: item},
-                    is_create, resource, attr_info, allow_bulk
+                    is_create, resource, compiled_attr_info
                 ) for item in body[collection]
             ]
             return {collection: bulk_body}
 
+        return Controller._prepare_resource_body(context, body, is_create,
+                                                 resource, compiled_attr_info)
+
+    @staticmethod
+    def _prepare_resource_body(context, body, is_create, resource,
+                               compiled_attr_info):
         res_dict = body.get(resource)
         if res_dict is None:
             msg = _("Unable to find '%s' in request body") % resource
             raise webob.exc.HTTPBadRequest(msg)
 
         Controller._populate_tenant_id(context, res_dict, is_create)
-        Controller._verify_attributes(res_dict, attr_info)
-
-        if is_create:  # POST
-            for attr, attr_vals in attr_info.iteritems():
-                if attr_vals['allow_post']:
-                    if ('default' not in attr_vals and
-                        attr not in res_dict):
-                        msg = _("Failed to parse request. Required "
-                                "attribute '%s' not specified") % attr
-                        raise webob.exc.HTTPBadRequest(msg)
-                    res_dict[attr] = res_dict.get(attr,
-                                                  attr_vals.get('default'))
-                else:
-                    if attr in res_dict:
-                        msg = _("Attribute '%s' not allowed in POST") % attr
-                        raise webob.exc.HTTPBadRequest(msg)
-        else:  # PUT
-            for attr, attr_vals in attr_info.iteritems():
-                if attr in res_dict and not attr_vals['allow_put']:
-                    msg = _("Cannot update read-only attribute %s") % attr
-                    raise webob.exc.HTTPBadRequest(msg)
-
-        for attr, attr_vals in attr_info.iteritems():
-            if (attr not in res_dict or
-                res_dict[attr] is attributes.ATTR_NOT_SPECIFIED):
-                continue
-            # Convert values if necessary
-            if 'convert_to' in attr_vals:
-                res_dict[attr] = attr_vals['convert_to'](res_dict[attr])
-            # Check that configured values are correct
-            if 'validate' not in attr_vals:
-                continue
-            for rule in attr_vals['validate']:
-                res = attributes.validators[rule](res_dict[attr],
-                                                  attr_vals['validate'][rule])
-                if res:
-                    msg_dict = dict(attr=attr, reason=res)
-                    msg = _("Invalid input for %(attr)s. "
-                            "Reason: %(reason)s.") % msg_dict
-                    raise webob.exc.HTTPBadRequest(msg)
+        compiled_attr_info.prepare(res_dict, is_create)
         return body
 
-    @staticmethod
-    def _verify_attributes(res_dict, attr_info):
-        extra_keys = set(res_dict.keys()) - set(attr_info.keys())
-        if extra_keys:
-            msg = _("Unrecognized attribute(s) '%s'") % ', '.join(extra_keys)
-            raise webob.exc.HTTPBadRequest(msg)
-
     def _validate_network_tenant_ownership(self, request, resource_item):
         # TODO(salvatore-orlando): consider whether this check can be folded
         # in the policy engine
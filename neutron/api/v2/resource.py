@@ -24,6 +24,7 @@ import six
 import webob.dec
 import webob.exc
 
+from neutron.api import api_common
 from neutron.api.v2 import attributes
 from neutron.common import exceptions
 from neutron.openstack.common import gettextutils
@@ -137,6 +138,22 @@ def Resource(controller, faults=None, deserializers=None, serializers=None):
             raise webob.exc.HTTPInternalServerError(**kwargs)
 
         status = action_status.get(action, 200)
+        etag = None
+        if action in ('index', 'show'):
+            # The ETag is computed from the revision numbers of the
+            # resources, a conditional GET is answered before rendering
+            etag = api_common.get_etag(result)
+            if etag and etag in request.if_none_match:
+                response = webob.exc.HTTPNotModified()
+                response.etag = etag
+                return response
+        if action == 'index' and hasattr(serializer, 'serialize_iter'):
+            # NOTE: collections can be large, they are written out as they
+            # are encoded rather than serialized into a single string first
+            return webob.Response(request=request, status=status,
+                                  content_type=content_type,
+                                  app_iter=serializer.serialize_iter(result),
+                                  etag=etag)
         body = serializer.serialize(result)
         # NOTE(jkoelker) Comply with RFC2616 section 9.7
         if status == 204:
@@ -145,7 +162,7 @@ def Resource(controller, faults=None, deserializers=None, serializers=None):
 
         return webob.Response(request=request, status=status,
                               content_type=content_type,
-                              body=body)
+                              body=body, etag=etag)
     return resource
 
 
@@ -14,7 +14,6 @@
 # limitations under the License.
 
 from oslo.config import cfg
-import routes as routes_mapper
 import six.moves.urllib.parse as urlparse
 import webob
 import webob.dec
@@ -71,7 +70,7 @@ class APIRouter(wsgi.Router):
         return cls(**local_config)
 
     def __init__(self, **local_config):
-        mapper = routes_mapper.Mapper()
+        mapper = wsgi.TrieMapper()
         plugin = manager.NeutronManager.get_plugin()
         ext_mgr = extensions.PluginAwareExtensionManager.get_instance()
         ext_mgr.extend_resources("2.0", attributes.RESOURCE_ATTRIBUTE_MAP)
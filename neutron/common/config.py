@@ -53,6 +53,16 @@ core_opts = [
                help=_("The base MAC address Neutron will use for VIFs")),
     cfg.IntOpt('mac_generation_retries', default=16,
                help=_("How many times Neutron will retry MAC generation")),
+    cfg.StrOpt('ip_allocator',
+               default='neutron.db.ip_allocator.AvailabilityRangeAllocator',
+               help=_("The class the DB base plugin allocates IP addresses "
+                      "with. neutron.db.ip_allocator.RandomAllocator picks a "
+                      "random free address without locking, so that ports "
+                      "on the same subnet can be created in parallel")),
+    cfg.IntOpt('ip_allocation_retries', default=16,
+               help=_("How many addresses of a subnet the random IP "
+                      "allocator tries when they are allocated "
+                      "concurrently")),
     cfg.BoolOpt('allow_bulk', default=True,
                 help=_("Allow the usage of the bulk API")),
     cfg.BoolOpt('allow_pagination', default=False,
@@ -80,6 +90,12 @@ core_opts = [
                 help=_("Allow overlapping IP support in Neutron")),
     cfg.StrOpt('host', default=utils.get_hostname(),
                help=_("The hostname Neutron is running on")),
+    cfg.BoolOpt('rpc_topic_groups', default=False,
+                help=_("Send the state reports, device, security group and "
+                       "DHCP sync calls of the agents to the core plugin on "
+                       "a topic per group, so that dedicated RPC workers of "
+                       "the server can serve them. The core plugin must "
+                       "support them, as ML2 does")),
     cfg.BoolOpt('force_gateway_on_subnet', default=True,
                 help=_("Ensure that configured gateway is on subnet. "
                        "For IPv6, validate only if gateway is not a link "
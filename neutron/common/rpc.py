@@ -14,6 +14,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
+import inspect
+import time
+
 from oslo.config import cfg
 from oslo import messaging
 from oslo.messaging import serializer as om_serializer
@@ -30,6 +34,9 @@ LOG = logging.getLogger(__name__)
 
 TRANSPORT = None
 NOTIFIER = None
+# Metrics of the calls dispatched to the endpoints of the consumers, if
+# they are measured
+METRICS = None
 
 ALLOWED_EXMODS = [
     exceptions.__name__,
@@ -251,6 +258,56 @@ class Service(service.Service):
         super(Service, self).stop()
 
 
+class RpcMetrics(object):
+    """Number and duration of the calls dispatched to RPC endpoints."""
+
+    def __init__(self):
+        self.in_progress = 0
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def measure(self, func):
+        @functools.wraps(func)
+        def measured(*args, **kwargs):
+            self.in_progress += 1
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = time.time() - start
+                self.in_progress -= 1
+                self.calls += 1
+                self.total_time += duration
+                self.max_time = max(self.max_time, duration)
+        return measured
+
+
+class MeasuredEndpoint(object):
+    """An RPC endpoint measuring the calls of its methods."""
+
+    def __init__(self, endpoint, metrics):
+        self._endpoint = endpoint
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self._endpoint, name)
+        if inspect.ismethod(attr) and not name.startswith('_'):
+            return self._metrics.measure(attr)
+        return attr
+
+
+def measure_calls():
+    """Measure the calls to the endpoints of the consumers created next."""
+    global METRICS
+    if METRICS is None:
+        METRICS = RpcMetrics()
+    return METRICS
+
+
 class Connection(object):
 
     def __init__(self):
@@ -258,6 +315,9 @@ class Connection(object):
         self.servers = []
 
     def create_consumer(self, topic, endpoints, fanout=False):
+        if METRICS is not None:
+            endpoints = [MeasuredEndpoint(endpoint, METRICS)
+                         for endpoint in endpoints]
         target = messaging.Target(
             topic=topic, server=cfg.CONF.host, fanout=fanout)
         server = get_server(target, endpoints)
@@ -31,6 +31,17 @@ DHCP = 'q-dhcp-notifer'
 FIREWALL_PLUGIN = 'q-firewall-plugin'
 METERING_PLUGIN = 'q-metering-plugin'
 LOADBALANCER_PLUGIN = 'n-lbaas-plugin'
+QUOTA_LIMITS = 'q-quota-limits'
+
+# Groups of the calls of the agents to the plugin, which the plugins
+# supporting them also consume on a topic per group, so that they can be
+# served by dedicated RPC workers
+RPC_GROUP_REPORTS = 'reports'
+RPC_GROUP_DEVICES = 'devices'
+RPC_GROUP_SECURITY_GROUPS = 'security_groups'
+RPC_GROUP_SYNC = 'sync'
+RPC_GROUPS = (RPC_GROUP_REPORTS, RPC_GROUP_DEVICES,
+              RPC_GROUP_SECURITY_GROUPS, RPC_GROUP_SYNC)
 
 L3_AGENT = 'l3_agent'
 DHCP_AGENT = 'dhcp_agent'
@@ -56,3 +67,8 @@ def get_topic_name(prefix, table, operation, host=None):
     if host:
         return '%s-%s-%s.%s' % (prefix, table, operation, host)
     return '%s-%s-%s' % (prefix, table, operation)
+
+
+def get_group_topic(topic, group):
+    """Return the topic the calls of group to topic are consumed on."""
+    return '%s-%s' % (topic, group)
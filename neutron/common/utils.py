@@ -18,6 +18,8 @@
 
 """Utilities and helper functions."""
 
+import bisect
+import contextlib
 import datetime
 import functools
 import hashlib
@@ -27,6 +29,7 @@ import os
 import random
 import signal
 import socket
+import time
 import uuid
 
 from eventlet.green import subprocess
@@ -34,6 +37,7 @@ from oslo.config import cfg
 
 from neutron.common import constants as q_const
 from neutron.openstack.common import excutils
+from neutron.openstack.common import jsonutils
 from neutron.openstack.common import lockutils
 from neutron.openstack.common import log as logging
 
@@ -251,6 +255,11 @@ def dict2tuple(d):
     return tuple(items)
 
 
+def get_dict_checksum(d):
+    """Return a checksum of a JSON serializable dict, ignoring key order."""
+    return hashlib.sha1(jsonutils.dumps(d, sort_keys=True)).hexdigest()
+
+
 def diff_list_of_dict(old_list, new_list):
     new_set = set([dict2str(l) for l in new_list])
     old_set = set([dict2str(l) for l in old_list])
@@ -357,3 +366,91 @@ def is_dvr_serviced(device_owner):
                                       q_const.DEVICE_OWNER_DHCP)
         return (device_owner.startswith('compute:') or
                 device_owner in dvr_serviced_device_owners)
+
+
+class LatencyHistogram(object):
+    """Track a latency distribution in fixed cumulative buckets.
+
+    Bucket upper bounds are expressed in seconds; observations greater than
+    the last bound are only accounted for in the total count and sum.
+    """
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                       1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(sorted(buckets or self.DEFAULT_BUCKETS))
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    @contextlib.contextmanager
+    def time(self):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(time.time() - start)
+
+    def get_stats(self):
+        cumulative = 0
+        buckets = []
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return {'count': self.count,
+                'sum': self.sum,
+                'max': self.max,
+                'avg': self.sum / self.count if self.count else 0.0,
+                'buckets': buckets}
+
+
+def _shared_total(index, type_=float):
+    return property(lambda self: type_(self._totals[index]),
+                    lambda self, value: self._totals.__setitem__(index, value))
+
+
+class SharedLatencyHistogram(LatencyHistogram):
+    """LatencyHistogram shared with the processes forked after its creation.
+
+    Its counters live in shared memory, so that the observations of worker
+    processes can be reported by their parent.
+    """
+
+    def __init__(self, buckets=None):
+        self._lock = multiprocessing.Lock()
+        self._counts = multiprocessing.RawArray(
+            'l', len(buckets or self.DEFAULT_BUCKETS))
+        # The count, sum and max of the observations
+        self._totals = multiprocessing.RawArray('d', 3)
+        super(SharedLatencyHistogram, self).__init__(buckets)
+
+    counts = property(lambda self: self._counts)
+    count = _shared_total(0, int)
+    sum = _shared_total(1)
+    max = _shared_total(2)
+
+    def reset(self):
+        with self._lock:
+            self._counts[:] = [0] * len(self._counts)
+            self._totals[:] = [0.0] * len(self._totals)
+
+    def observe(self, seconds):
+        with self._lock:
+            super(SharedLatencyHistogram, self).observe(seconds)
+
+    def get_stats(self):
+        with self._lock:
+            return super(SharedLatencyHistogram, self).get_stats()
@@ -79,7 +79,8 @@ class AllowedAddressPairsMixin(object):
     def _delete_allowed_address_pairs(self, context, id):
         query = self._model_query(context, AllowedAddressPair)
         with context.session.begin(subtransactions=True):
-            query.filter(AllowedAddressPair.port_id == id).delete()
+            for pair in query.filter(AllowedAddressPair.port_id == id):
+                context.session.delete(pair)
 
     def _make_allowed_address_pairs_dict(self, allowed_address_pairs,
                                          fields=None):
@@ -0,0 +1,320 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Change log of networks and ports.
+
+A row is inserted in the changelog table in the transaction creating,
+updating or deleting a tracked resource, or one of the rows of other
+models which are part of its representation, e.g. the IP allocations of a
+port. The id of the row is the position of the change in the feed. The
+API workers keep the most recent changes in a ring buffer refreshed from
+the table at most every change_feed_poll_interval seconds, which serves
+the long-polling clients of the changes API.
+
+Ids are allocated when the rows are inserted, so a change may be committed
+after a change with a greater id. A missing id is a gap the feed waits
+for: the changes after it are not returned until it is read, or until
+GAP_TIMEOUT seconds passed and its transaction is assumed rolled back.
+Query level bulk deletes are not logged.
+"""
+
+import bisect
+import itertools
+import time
+
+from oslo.config import cfg
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy import orm
+from sqlalchemy.orm import util as orm_util
+
+from neutron.common import exceptions
+from neutron.db import allowedaddresspairs_db
+from neutron.db import extradhcpopt_db
+from neutron.db import model_base
+from neutron.db import models_v2
+from neutron.db import securitygroups_db
+from neutron.openstack.common import lockutils
+from neutron.openstack.common import log as logging
+from neutron.openstack.common import timeutils
+
+LOG = logging.getLogger(__name__)
+
+changelog_opts = [
+    cfg.IntOpt('change_log_size', default=100000,
+               help=_('Number of changes kept in the change log table, '
+                      'older changes are purged by the API workers')),
+    cfg.IntOpt('change_feed_cache_size', default=10000,
+               help=_('Number of the most recent changes each API worker '
+                      'keeps in memory to answer the changes API')),
+    cfg.IntOpt('change_feed_poll_interval', default=1,
+               help=_('Seconds between two reads of the change log table '
+                      'by an API worker with waiting clients')),
+    cfg.IntOpt('change_feed_timeout', default=30,
+               help=_('Maximum number of seconds a request to the changes '
+                      'API waits for a change')),
+]
+cfg.CONF.register_opts(changelog_opts)
+
+# Seconds between two purges of the change log table by an API worker
+PURGE_INTERVAL = 60
+# Maximum number of changes returned at once
+MAX_CHANGES = 1000
+# Seconds after which a missing change id is assumed to be rolled back
+GAP_TIMEOUT = 10
+# Maximum number of missing change ids waited for, the ids skipped by a
+# larger jump of the ids are not waited for
+MAX_GAPS = 1000
+
+
+class ChangesExpired(exceptions.NeutronException):
+    message = _("Changes after %(since)s were purged from the change log, "
+                "the resources must be listed again")
+
+
+class ChangeLog(model_base.BASEV2):
+    """Represents a change of a resource."""
+
+    id = sa.Column(sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+                   primary_key=True, autoincrement=True)
+    resource = sa.Column(sa.String(255), nullable=False)
+    resource_id = sa.Column(sa.String(36), nullable=False)
+    tenant_id = sa.Column(sa.String(255))
+    action = sa.Column(sa.String(16), nullable=False)
+    created_at = sa.Column(sa.DateTime, nullable=False)
+
+
+# Model: resource name
+_TRACKED_MODELS = {}
+# Child model: list of (parent model, attribute with the parent id)
+_PARENTS = {}
+
+
+def _make_change(resource, resource_id, tenant_id, action):
+    return {'resource': resource, 'resource_id': resource_id,
+            'tenant_id': tenant_id, 'action': action,
+            'created_at': timeutils.utcnow()}
+
+
+def _get_tenant_id(session, model, id):
+    obj = session.identity_map.get(orm_util.identity_key(model, id))
+    if obj is not None:
+        return obj.tenant_id
+    # NOTE: a query would autoflush the session being flushed
+    return session.execute(sa.select([model.tenant_id]).where(
+        model.id == id)).scalar()
+
+
+def _record_changes(session, flush_context):
+    # (model, id): change
+    changes = {}
+    for action, objs in (('create', session.new),
+                         ('update', session.dirty),
+                         ('delete', session.deleted)):
+        for obj in objs:
+            model = type(obj)
+            if (action == 'update' and
+                not session.is_modified(obj, include_collections=False)):
+                continue
+            resource = _TRACKED_MODELS.get(model)
+            if resource:
+                changes[(model, obj.id)] = _make_change(
+                    resource, obj.id, obj.tenant_id, action)
+    for objs in (session.new, session.dirty, session.deleted):
+        for obj in objs:
+            for parent_model, key in _PARENTS.get(type(obj), ()):
+                parent_id = getattr(obj, key)
+                if not parent_id or (parent_model, parent_id) in changes:
+                    continue
+                if (obj in session.dirty and
+                    not session.is_modified(obj, include_collections=False)):
+                    continue
+                changes[(parent_model, parent_id)] = _make_change(
+                    _TRACKED_MODELS[parent_model], parent_id,
+                    _get_tenant_id(session, parent_model, parent_id),
+                    'update')
+    if changes:
+        session.execute(ChangeLog.__table__.insert(), changes.values())
+
+
+def _listen():
+    if not event.contains(orm.Session, 'after_flush', _record_changes):
+        event.listen(orm.Session, 'after_flush', _record_changes)
+
+
+def track_changes(resource, model):
+    """Log the changes of the rows of model as changes of resource."""
+    _TRACKED_MODELS[model] = resource
+    _listen()
+
+
+def track_child_changes(model, parent_model, key):
+    """Log the changes of the rows of model as updates of their parent.
+
+    :param model: the model of the child rows
+    :param parent_model: the tracked model of the parent
+    :param key: the attribute of model holding the id of the parent
+    """
+    _PARENTS.setdefault(model, []).append((parent_model, key))
+    _listen()
+
+
+track_changes('network', models_v2.Network)
+track_changes('port', models_v2.Port)
+track_child_changes(models_v2.Subnet, models_v2.Network, 'network_id')
+track_child_changes(models_v2.IPAllocation, models_v2.Port, 'port_id')
+track_child_changes(securitygroups_db.SecurityGroupPortBinding,
+                    models_v2.Port, 'port_id')
+track_child_changes(allowedaddresspairs_db.AllowedAddressPair,
+                    models_v2.Port, 'port_id')
+track_child_changes(extradhcpopt_db.ExtraDhcpOpt, models_v2.Port, 'port_id')
+
+
+def _make_change_dict(change):
+    return {'id': change.id,
+            'resource': change.resource,
+            'resource_id': change.resource_id,
+            'tenant_id': change.tenant_id,
+            'action': change.action,
+            'created_at': timeutils.isotime(change.created_at)}
+
+
+class ChangeFeed(object):
+    """The most recent changes of the change log in an API worker."""
+
+    def __init__(self, size):
+        self.size = size
+        # Sorted ids of the changes read and the changes
+        self._ids = []
+        self._changes = []
+        # Missing change id: time it was found missing
+        self._gaps = {}
+        self._refreshed_at = 0
+        self._purged_at = time.time()
+
+    @property
+    def last_id(self):
+        """The id of the last change not following a missing change."""
+        if self._gaps:
+            return min(self._gaps) - 1
+        return self._ids[-1] if self._ids else 0
+
+    def _append(self, change, now):
+        if self._ids and 1 < change.id - self._ids[-1] <= MAX_GAPS + 1:
+            for gap in range(self._ids[-1] + 1, change.id):
+                self._gaps[gap] = now
+        self._ids.append(change.id)
+        self._changes.append(_make_change_dict(change))
+
+    def _insert(self, change):
+        del self._gaps[change.id]
+        position = bisect.bisect(self._ids, change.id)
+        self._ids.insert(position, change.id)
+        self._changes.insert(position, _make_change_dict(change))
+
+    @lockutils.synchronized('change-feed', 'neutron-')
+    def refresh(self, context):
+        """Read the changes logged since the last refresh."""
+        now = time.time()
+        if now - self._refreshed_at < cfg.CONF.change_feed_poll_interval:
+            return
+        self._refreshed_at = now
+        query = context.session.query(ChangeLog)
+        if self._gaps:
+            for change in query.filter(ChangeLog.id.in_(list(self._gaps))):
+                self._insert(change)
+        if self._ids:
+            changes = query.filter(ChangeLog.id > self._ids[-1]).order_by(
+                ChangeLog.id).limit(self.size).all()
+        else:
+            changes = query.order_by(ChangeLog.id.desc()).limit(
+                self.size).all()
+            changes.reverse()
+        for change in changes:
+            self._append(change, now)
+        excess = len(self._ids) - self.size
+        if excess > 0:
+            del self._ids[:excess]
+            del self._changes[:excess]
+        for gap, missing_at in self._gaps.items():
+            if gap < self._ids[0] or now - missing_at > GAP_TIMEOUT:
+                del self._gaps[gap]
+        if now - self._purged_at > PURGE_INTERVAL:
+            self._purged_at = now
+            self._purge(context)
+
+    def _purge(self, context):
+        with context.session.begin(subtransactions=True):
+            context.session.query(ChangeLog).filter(
+                ChangeLog.id <= self.last_id - cfg.CONF.change_log_size
+            ).delete(synchronize_session=False)
+
+    def _filter(self, context, changes, resources):
+        for change in changes:
+            if resources and change['resource'] not in resources:
+                continue
+            if not context.is_admin and change['tenant_id'] != (
+                context.tenant_id):
+                continue
+            yield change
+
+    def _get_logged_changes(self, context, since, last_id, resources,
+                            limit):
+        first = context.session.query(sa.func.min(ChangeLog.id)).scalar()
+        if first is None or first > since + 1:
+            raise ChangesExpired(since=since)
+        query = context.session.query(ChangeLog).filter(
+            ChangeLog.id > since, ChangeLog.id <= last_id)
+        if resources:
+            query = query.filter(ChangeLog.resource.in_(resources))
+        if not context.is_admin:
+            query = query.filter(ChangeLog.tenant_id == context.tenant_id)
+        return [_make_change_dict(change) for change in
+                query.order_by(ChangeLog.id).limit(limit)]
+
+    def get_changes(self, context, since, resources=None, limit=MAX_CHANGES):
+        """Return the changes following the change since.
+
+        The changes returned end at last_id, the changes following a
+        missing change are returned once it is read or assumed rolled
+        back.
+
+        :param since: id of the last change known to the client
+        :param resources: names of the resources to return the changes of
+        :param limit: maximum number of changes returned
+        :raises ChangesExpired: if the changes following since were purged
+        """
+        self.refresh(context)
+        last_id = self.last_id
+        if since >= last_id:
+            return []
+        if self._ids and since >= self._ids[0] - 1:
+            start = bisect.bisect_right(self._ids, since)
+            end = bisect.bisect_right(self._ids, last_id)
+            changes = self._filter(context, self._changes[start:end],
+                                   resources)
+            return list(itertools.islice(changes, limit))
+        return self._get_logged_changes(context, since, last_id, resources,
+                                        limit)
+
+
+_FEED = None
+
+
+def get_change_feed():
+    global _FEED
+    if _FEED is None:
+        _FEED = ChangeFeed(cfg.CONF.change_feed_cache_size)
+    return _FEED
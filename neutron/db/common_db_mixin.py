@@ -35,6 +35,16 @@ class CommonDbMixin(object):
     # TODO(salvatore-orlando): Avoid using class-level variables
     _dict_extend_functions = {}
 
+    # Attributes of api resources whose value is the value of the column of
+    # the same name of the model, keyed by model. Collection queries only
+    # select these columns when the requested fields are all projectable.
+    _projection_fields = {}
+
+    # Number of rows fetched at a time by projected collection queries. The
+    # rows are streamed from a server side cursor where the driver supports
+    # it, rather than buffered all at once.
+    _projection_batch_size = 1000
+
     @classmethod
     def register_model_query_hook(cls, model, name, query_hook, filter_hook,
                                   result_filters=None):
@@ -158,6 +168,8 @@ class CommonDbMixin(object):
                               page_reverse=False):
         collection = self._model_query(context, model)
         collection = self._apply_filters_to_query(collection, model, filters)
+        if limit:
+            sorts = sqlalchemyutils.get_keyset_sorts(model, sorts)
         if limit and page_reverse and sorts:
             sorts = [(s[0], not s[1]) for s in sorts]
         collection = sqlalchemyutils.paginate_query(collection, model, limit,
@@ -165,6 +177,29 @@ class CommonDbMixin(object):
                                                     marker_obj=marker_obj)
         return collection
 
+    def _is_projectable(self, model, fields):
+        return bool(fields) and set(fields).issubset(
+            self._projection_fields.get(model, ()))
+
+    def _project_query(self, query, model, fields):
+        """Return the fields of the objects of a model query as dicts.
+
+        Only the columns of the fields are selected, relationships are not
+        loaded and dict extend functions are not applied. Rows duplicated
+        by joins on the model query are returned once.
+        """
+        fields = list(set(fields))
+        columns = [getattr(model, field) for field in fields]
+        items = []
+        seen = set()
+        query = query.with_entities(model.id, *columns).yield_per(
+            self._projection_batch_size)
+        for row in query:
+            if row[0] not in seen:
+                seen.add(row[0])
+                items.append(dict(zip(fields, row[1:])))
+        return items
+
     def _get_collection(self, context, model, dict_func, filters=None,
                         fields=None, sorts=None, limit=None, marker_obj=None,
                         page_reverse=False):
@@ -173,7 +208,10 @@ class CommonDbMixin(object):
                                            limit=limit,
                                            marker_obj=marker_obj,
                                            page_reverse=page_reverse)
-        items = [dict_func(c, fields) for c in query]
+        if self._is_projectable(model, fields):
+            items = self._project_query(query, model, fields)
+        else:
+            items = [dict_func(c, fields) for c in query]
         if limit and page_reverse:
             items.reverse()
         return items
@@ -186,6 +224,25 @@ class CommonDbMixin(object):
             return getattr(self, '_get_%s' % resource)(context, marker)
         return None
 
+    def _get_marker_keys(self, context, resource, model, limit, marker,
+                         sorts):
+        """Return the sort keys of the marker of a page.
+
+        Same as _get_marker_obj, but only the sort key columns of the marker
+        are selected, its relationships are not loaded. The keys are returned
+        as a named tuple.
+        """
+        if not (limit and marker):
+            return None
+        columns = [sqlalchemyutils.get_sort_attr(model, key) for key, direction
+                   in sqlalchemyutils.get_keyset_sorts(model, sorts)]
+        marker_keys = self._model_query(context, model).filter(
+            model.id == marker).with_entities(*columns).first()
+        if marker_keys is None:
+            # Raise the not found error of the resource
+            getattr(self, '_get_%s' % resource)(context, marker)
+        return marker_keys
+
     def _filter_non_model_columns(self, data, model):
         """Remove all the attributes from data which are not columns of
         the model passed as second parameter.
@@ -28,12 +28,14 @@ from neutron.common import exceptions as n_exc
 from neutron.common import ipv6_utils
 from neutron import context as ctx
 from neutron.db import common_db_mixin
+from neutron.db import ip_allocator
 from neutron.db import models_v2
 from neutron.db import sqlalchemyutils
 from neutron.extensions import l3
 from neutron import manager
 from neutron import neutron_plugin_base_v2
 from neutron.openstack.common import excutils
+from neutron.openstack.common import importutils
 from neutron.openstack.common import log as logging
 from neutron.openstack.common import uuidutils
 from neutron.plugins.common import constants as service_constants
@@ -68,6 +70,25 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
     __native_pagination_support = True
     __native_sorting_support = True
 
+    # IP allocators by class name, see _get_ip_allocator
+    _ip_allocators = {}
+
+    # Attributes of the core resources which are copied from a column by
+    # _make_*_dict. A list request asking only for these is answered from
+    # the columns, without joins and dict extend functions. Plugins whose
+    # dicts differ from the columns for any of these must override this.
+    _projection_fields = {
+        models_v2.Network: frozenset(['id', 'name', 'tenant_id',
+                                      'admin_state_up', 'status', 'shared']),
+        models_v2.Subnet: frozenset(['id', 'name', 'tenant_id', 'network_id',
+                                     'ip_version', 'cidr', 'gateway_ip',
+                                     'enable_dhcp', 'ipv6_ra_mode',
+                                     'ipv6_address_mode', 'shared']),
+        models_v2.Port: frozenset(['id', 'name', 'network_id', 'tenant_id',
+                                   'mac_address', 'admin_state_up', 'status',
+                                   'device_id', 'device_owner']),
+    }
+
     def __init__(self):
         if cfg.CONF.notify_nova_on_port_status_changes:
             from neutron.notifiers import nova
@@ -126,16 +147,20 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
         return context.session.query(models_v2.Subnet).all()
 
     @staticmethod
-    def _generate_mac(context, network_id):
+    def _get_random_mac():
         base_mac = cfg.CONF.base_mac.split(':')
+        mac = [int(base_mac[0], 16), int(base_mac[1], 16),
+               int(base_mac[2], 16), random.randint(0x00, 0xff),
+               random.randint(0x00, 0xff), random.randint(0x00, 0xff)]
+        if base_mac[3] != '00':
+            mac[3] = int(base_mac[3], 16)
+        return ':'.join(map(lambda x: "%02x" % x, mac))
+
+    @staticmethod
+    def _generate_mac(context, network_id):
         max_retries = cfg.CONF.mac_generation_retries
         for i in range(max_retries):
-            mac = [int(base_mac[0], 16), int(base_mac[1], 16),
-                   int(base_mac[2], 16), random.randint(0x00, 0xff),
-                   random.randint(0x00, 0xff), random.randint(0x00, 0xff)]
-            if base_mac[3] != '00':
-                mac[3] = int(base_mac[3], 16)
-            mac_address = ':'.join(map(lambda x: "%02x" % x, mac))
+            mac_address = NeutronDbPluginV2._get_random_mac()
             if NeutronDbPluginV2._check_unique_mac(context, network_id,
                                                    mac_address):
                 LOG.debug(_("Generated mac for network %(network_id)s "
@@ -152,6 +177,36 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                   max_retries)
         raise n_exc.MacAddressGenerationFailure(net_id=network_id)
 
+    @staticmethod
+    def _generate_macs(context, network_id, count, exclude=()):
+        """Generate count MAC addresses unique on the network.
+
+        Each attempt checks all the missing candidates with one query.
+        """
+        macs = set()
+        max_retries = cfg.CONF.mac_generation_retries
+        for i in range(max_retries):
+            candidates = set(NeutronDbPluginV2._get_random_mac()
+                             for n in range(count - len(macs)))
+            candidates -= macs | set(exclude)
+            macs |= candidates - set(NeutronDbPluginV2._get_macs_in_use(
+                context, network_id, list(candidates)))
+            if len(macs) == count:
+                return list(macs)
+        LOG.error(_("Unable to generate %(count)s mac addresses after "
+                    "%(max_retries)s attempts"),
+                  {'count': count, 'max_retries': max_retries})
+        raise n_exc.MacAddressGenerationFailure(net_id=network_id)
+
+    @staticmethod
+    def _get_macs_in_use(context, network_id, mac_addresses):
+        if not mac_addresses:
+            return []
+        query = context.session.query(models_v2.Port.mac_address).filter(
+            models_v2.Port.network_id == network_id,
+            models_v2.Port.mac_address.in_(mac_addresses))
+        return [mac_address for mac_address, in query]
+
     @staticmethod
     def _check_unique_mac(context, network_id, mac_address):
         mac_qry = context.session.query(models_v2.Port)
@@ -171,10 +226,14 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                   {'ip_address': ip_address,
                    'network_id': network_id,
                    'subnet_id': subnet_id})
-        context.session.query(models_v2.IPAllocation).filter_by(
+        # NOTE: the allocations are deleted through the session, so that
+        # the revision number of their port is bumped
+        allocations = context.session.query(models_v2.IPAllocation).filter_by(
             network_id=network_id,
             ip_address=ip_address,
-            subnet_id=subnet_id).delete()
+            subnet_id=subnet_id)
+        for allocation in allocations:
+            context.session.delete(allocation)
 
     @staticmethod
     def _check_if_subnet_uses_eui64(subnet):
@@ -197,16 +256,23 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
             ip_address=ip_address,
             subnet_id=subnet_id
         )
-        context.session.add(allocated)
+        NeutronDbPluginV2._get_ip_allocator().store_ip_allocation(
+            context, allocated)
 
     @staticmethod
-    def _generate_ip(context, subnets):
-        try:
-            return NeutronDbPluginV2._try_generate_ip(context, subnets)
-        except n_exc.IpAddressGenerationFailure:
-            NeutronDbPluginV2._rebuild_availability_ranges(context, subnets)
+    def _get_ip_allocator():
+        allocator_class = cfg.CONF.ip_allocator
+        allocator = NeutronDbPluginV2._ip_allocators.get(allocator_class)
+        if not allocator:
+            allocator = importutils.import_object(allocator_class,
+                                                  NeutronDbPluginV2)
+            NeutronDbPluginV2._ip_allocators[allocator_class] = allocator
+        return allocator
 
-        return NeutronDbPluginV2._try_generate_ip(context, subnets)
+    @staticmethod
+    def _generate_ip(context, subnets):
+        return NeutronDbPluginV2._get_ip_allocator().generate_ip(context,
+                                                                 subnets)
 
     @staticmethod
     def _try_generate_ip(context, subnets):
@@ -266,36 +332,24 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
             LOG.debug(_("Rebuilding availability ranges for subnet %s")
                       % subnet)
 
-            # Create a set of all currently allocated addresses
-            ip_qry_results = ip_qry.filter_by(subnet_id=subnet['id'])
-            allocations = netaddr.IPSet([netaddr.IPAddress(i['ip_address'])
-                                        for i in ip_qry_results])
+            # Sorted integers of all currently allocated addresses
+            allocations = sorted(int(netaddr.IPAddress(i['ip_address']))
+                                 for i in ip_qry.filter_by(
+                                     subnet_id=subnet['id']))
 
             for pool in pool_qry.filter_by(subnet_id=subnet['id']):
-                # Create a set of all addresses in the pool
-                poolset = netaddr.IPSet(netaddr.iter_iprange(pool['first_ip'],
-                                                             pool['last_ip']))
-
-                # Use set difference to find free addresses in the pool
-                available = poolset - allocations
-
-                # Generator compacts an ip set into contiguous ranges
-                def ipset_to_ranges(ipset):
-                    first, last = None, None
-                    for cidr in ipset.iter_cidrs():
-                        if last and last + 1 != cidr.first:
-                            yield netaddr.IPRange(first, last)
-                            first = None
-                        first, last = first if first else cidr.first, cidr.last
-                    if first:
-                        yield netaddr.IPRange(first, last)
+                # Subtract the allocations from the pool interval
+                pool_range = (int(netaddr.IPAddress(pool['first_ip'])),
+                              int(netaddr.IPAddress(pool['last_ip'])))
+                free_ranges = ip_allocator.get_free_ranges([pool_range],
+                                                           allocations)
 
                 # Write the ranges to the db
-                for ip_range in ipset_to_ranges(available):
+                for first, last in free_ranges:
                     available_range = models_v2.IPAvailabilityRange(
                         allocation_pool_id=pool['id'],
-                        first_ip=str(netaddr.IPAddress(ip_range.first)),
-                        last_ip=str(netaddr.IPAddress(ip_range.last)))
+                        first_ip=str(netaddr.IPAddress(first)),
+                        last_ip=str(netaddr.IPAddress(last)))
                     context.session.add(available_range)
 
     @staticmethod
@@ -385,12 +439,10 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
         # Check if the requested IP is in a defined allocation pool
         pool_qry = context.session.query(models_v2.IPAllocationPool)
         allocation_pools = pool_qry.filter_by(subnet_id=subnet_id)
-        ip = netaddr.IPAddress(ip_address)
+        ip = int(netaddr.IPAddress(ip_address))
         for allocation_pool in allocation_pools:
-            allocation_pool_range = netaddr.IPRange(
-                allocation_pool['first_ip'],
-                allocation_pool['last_ip'])
-            if ip in allocation_pool_range:
+            if (int(netaddr.IPAddress(allocation_pool['first_ip'])) <= ip <=
+                    int(netaddr.IPAddress(allocation_pool['last_ip']))):
                 return True
         return False
 
@@ -465,7 +517,7 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
         for fixed in fixed_ips:
             if 'ip_address' in fixed:
                 # Remove the IP address from the allocation pool
-                NeutronDbPluginV2._allocate_specific_ip(
+                NeutronDbPluginV2._get_ip_allocator().allocate_specific_ip(
                     context, fixed['subnet_id'], fixed['ip_address'])
                 ips.append({'ip_address': fixed['ip_address'],
                             'subnet_id': fixed['subnet_id']})
@@ -514,12 +566,13 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
             ips = self._allocate_fixed_ips(context, to_add)
         return ips, prev_ips
 
-    def _allocate_ips_for_port(self, context, port):
+    def _allocate_ips_for_port(self, context, port, subnets=None):
         """Allocate IP addresses for the port.
 
         If port['fixed_ips'] is set to 'ATTR_NOT_SPECIFIED', allocate IP
         addresses for the port. If port['fixed_ips'] contains an IP address or
-        a subnet_id then allocate an IP address accordingly.
+        a subnet_id then allocate an IP address accordingly. subnets are the
+        subnets of the port network, if they were fetched already.
         """
         p = port['port']
         ips = []
@@ -531,8 +584,9 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                                                            p['fixed_ips'])
             ips = self._allocate_fixed_ips(context, configured_ips)
         else:
-            filter = {'network_id': [p['network_id']]}
-            subnets = self.get_subnets(context, filters=filter)
+            if subnets is None:
+                filter = {'network_id': [p['network_id']]}
+                subnets = self.get_subnets(context, filters=filter)
             # Split into v4 and v6 subnets
             v4 = []
             v6 = []
@@ -620,7 +674,7 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
         subnet_last_ip = netaddr.IPAddress(subnet.last - 1)
 
         LOG.debug(_("Performing IP validity checks on allocation pools"))
-        ip_sets = []
+        ip_ranges = []
         for ip_pool in ip_pools:
             try:
                 start_ip = netaddr.IPAddress(ip_pool['start'])
@@ -650,29 +704,28 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                     pool=ip_pool,
                     subnet_cidr=subnet_cidr)
             # Valid allocation pool
-            # Create an IPSet for it for easily verifying overlaps
-            ip_sets.append(netaddr.IPSet(netaddr.IPRange(
-                ip_pool['start'],
-                ip_pool['end']).cidrs()))
+            ip_ranges.append((int(start_ip), int(end_ip), ip_pool))
 
         LOG.debug(_("Checking for overlaps among allocation pools "
                     "and gateway ip"))
-        ip_ranges = ip_pools[:]
-
-        # Use integer cursors as an efficient way for implementing
-        # comparison and avoiding comparing the same pair twice
-        for l_cursor in range(len(ip_sets)):
-            for r_cursor in range(l_cursor + 1, len(ip_sets)):
-                if ip_sets[l_cursor] & ip_sets[r_cursor]:
-                    l_range = ip_ranges[l_cursor]
-                    r_range = ip_ranges[r_cursor]
-                    LOG.info(_("Found overlapping ranges: %(l_range)s and "
-                               "%(r_range)s"),
-                             {'l_range': l_range, 'r_range': r_range})
-                    raise n_exc.OverlappingAllocationPools(
-                        pool_1=l_range,
-                        pool_2=r_range,
-                        subnet_cidr=subnet_cidr)
+
+        # Sorted by first address, a pool overlaps a previous one if it
+        # starts before the furthest end seen so far
+        ip_ranges.sort(key=lambda ip_range: ip_range[:2])
+        last_range = None
+        for ip_range in ip_ranges:
+            if last_range and ip_range[0] <= last_range[1]:
+                l_range = last_range[2]
+                r_range = ip_range[2]
+                LOG.info(_("Found overlapping ranges: %(l_range)s and "
+                           "%(r_range)s"),
+                         {'l_range': l_range, 'r_range': r_range})
+                raise n_exc.OverlappingAllocationPools(
+                    pool_1=l_range,
+                    pool_2=r_range,
+                    subnet_cidr=subnet_cidr)
+            if not last_range or ip_range[1] > last_range[1]:
+                last_range = ip_range
 
     def _validate_host_route(self, route, ip_version):
         try:
@@ -938,8 +991,8 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                 self._delete_port(context, port['id'])
 
             # clean up subnets
-            subnets_qry = context.session.query(models_v2.Subnet)
-            subnets_qry.filter_by(network_id=id).delete()
+            for subnet in network.subnets:
+                context.session.delete(subnet)
             context.session.delete(network)
 
     def get_network(self, context, id, fields=None):
@@ -949,7 +1002,8 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
     def get_networks(self, context, filters=None, fields=None,
                      sorts=None, limit=None, marker=None,
                      page_reverse=False):
-        marker_obj = self._get_marker_obj(context, 'network', limit, marker)
+        marker_obj = self._get_marker_keys(
+            context, 'network', models_v2.Network, limit, marker, sorts)
         return self._get_collection(context, models_v2.Network,
                                     self._make_network_dict,
                                     filters=filters, fields=fields,
@@ -1182,8 +1236,10 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
         return new_routes
 
     def _update_subnet_allocation_pools(self, context, id, s):
-        context.session.query(models_v2.IPAllocationPool).filter_by(
-            subnet_id=id).delete()
+        pools = context.session.query(models_v2.IPAllocationPool).filter_by(
+            subnet_id=id)
+        for pool in pools:
+            context.session.delete(pool)
         new_pools = [models_v2.IPAllocationPool(
             first_ip=p['start'], last_ip=p['end'],
             subnet_id=id) for p in s['allocation_pools']]
@@ -1274,7 +1330,8 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
     def get_subnets(self, context, filters=None, fields=None,
                     sorts=None, limit=None, marker=None,
                     page_reverse=False):
-        marker_obj = self._get_marker_obj(context, 'subnet', limit, marker)
+        marker_obj = self._get_marker_keys(
+            context, 'subnet', models_v2.Subnet, limit, marker, sorts)
         return self._get_collection(context, models_v2.Subnet,
                                     self._make_subnet_dict,
                                     filters=filters, fields=fields,
@@ -1321,33 +1378,115 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                     raise n_exc.MacAddressInUse(net_id=network_id,
                                                 mac=p['mac_address'])
 
-            if 'status' not in p:
-                status = constants.PORT_STATUS_ACTIVE
-            else:
-                status = p['status']
-
-            db_port = models_v2.Port(tenant_id=tenant_id,
-                                     name=p['name'],
-                                     id=port_id,
-                                     network_id=network_id,
-                                     mac_address=p['mac_address'],
-                                     admin_state_up=p['admin_state_up'],
-                                     status=status,
-                                     device_id=p['device_id'],
-                                     device_owner=p['device_owner'])
-            context.session.add(db_port)
-
-            # Update the IP's for the port
-            ips = self._allocate_ips_for_port(context, port)
-            if ips:
-                for ip in ips:
-                    ip_address = ip['ip_address']
-                    subnet_id = ip['subnet_id']
-                    NeutronDbPluginV2._store_ip_allocation(
-                        context, ip_address, network_id, subnet_id, port_id)
+            db_port = self._add_port_db(context, port, port_id, tenant_id)
 
         return self._make_port_dict(db_port, process_extensions=False)
 
+    def _add_port_db(self, context, port, port_id, tenant_id, ips=None):
+        """Add a port with a validated MAC address and allocate its IPs.
+
+        ips are the addresses allocated to the port already, see
+        _allocate_ips_for_ports_bulk.
+        """
+        p = port['port']
+        network_id = p['network_id']
+        if 'status' not in p:
+            status = constants.PORT_STATUS_ACTIVE
+        else:
+            status = p['status']
+
+        db_port = models_v2.Port(tenant_id=tenant_id,
+                                 name=p['name'],
+                                 id=port_id,
+                                 network_id=network_id,
+                                 mac_address=p['mac_address'],
+                                 admin_state_up=p['admin_state_up'],
+                                 status=status,
+                                 device_id=p['device_id'],
+                                 device_owner=p['device_owner'])
+        context.session.add(db_port)
+
+        # Update the IP's for the port
+        if ips is None:
+            ips = self._allocate_ips_for_port(context, port)
+        if ips:
+            for ip in ips:
+                ip_address = ip['ip_address']
+                subnet_id = ip['subnet_id']
+                NeutronDbPluginV2._store_ip_allocation(
+                    context, ip_address, network_id, subnet_id, port_id)
+        return db_port
+
+    def _prepare_ports_bulk(self, context, ports):
+        """Validate the networks and MAC addresses of a list of ports.
+
+        Networks are fetched, and MAC addresses generated or checked, once
+        per network instead of once per port. Returns the tenant_id of each
+        port and the subnets of each network, to be passed to
+        _allocate_ips_for_ports_bulk within the same transaction.
+        """
+        tenant_ids = []
+        by_network = {}
+        for port in ports:
+            p = port['port']
+            tenant_id = self._get_tenant_id_for_create(context, p)
+            if p.get('device_owner') == constants.DEVICE_OWNER_ROUTER_INTF:
+                self._enforce_device_owner_not_router_intf_or_device_id(
+                    context, p, tenant_id)
+            tenant_ids.append(tenant_id)
+            by_network.setdefault(p['network_id'], []).append(p)
+
+        subnets = {}
+        for network_id, network_ports in by_network.iteritems():
+            # Ensure that the network exists.
+            self._get_network(context, network_id)
+
+            macs = [p['mac_address'] for p in network_ports
+                    if p['mac_address'] is not attributes.ATTR_NOT_SPECIFIED]
+            # Ensure that the macs on the network are unique, also among
+            # the ports being created
+            in_use = set(self._get_macs_in_use(context, network_id, macs))
+            seen = set()
+            for mac in macs:
+                if mac in in_use or mac in seen:
+                    raise n_exc.MacAddressInUse(net_id=network_id, mac=mac)
+                seen.add(mac)
+
+            new_macs = self._generate_macs(context, network_id,
+                                           len(network_ports) - len(macs),
+                                           exclude=macs)
+            for p in network_ports:
+                if p['mac_address'] is attributes.ATTR_NOT_SPECIFIED:
+                    p['mac_address'] = new_macs.pop()
+
+            subnets[network_id] = self.get_subnets(
+                context, filters={'network_id': [network_id]})
+        return tenant_ids, subnets
+
+    def _allocate_ips_for_ports_bulk(self, context, ports, subnets):
+        """Allocate the IP addresses of a list of ports.
+
+        The ports are not added to the session yet, so that the allocations
+        do not flush them one by one, and the ports and their IPs can then
+        be added by _add_port_db and inserted in one flush. An address given
+        to several ports of the list is in use, as if they were created one
+        after the other. Returns the IPs of each port.
+        """
+        allocated = set()
+        ips_by_port = []
+        for port in ports:
+            p = port['port']
+            ips = self._allocate_ips_for_port(
+                context, port, subnets=subnets[p['network_id']])
+            for ip in ips:
+                key = (ip['subnet_id'], ip['ip_address'])
+                if key in allocated:
+                    raise n_exc.IpAddressInUse(net_id=p['network_id'],
+                                               ip_address=ip['ip_address'])
+                allocated.add(key)
+            ips_by_port.append(ips)
+        return ips_by_port
+
     def update_port(self, context, id, port):
         p = port['port']
 
@@ -1416,11 +1555,14 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                           port_id)
 
     def _delete_port(self, context, id):
-        query = (context.session.query(models_v2.Port).
-                 enable_eagerloads(False).filter_by(id=id))
+        query = context.session.query(models_v2.Port).filter_by(id=id)
         if not context.is_admin:
             query = query.filter_by(tenant_id=context.tenant_id)
-        query.delete()
+        # NOTE: the port is deleted through the session, so that the mapper
+        # events of the quota usages and the change log see it
+        port = query.first()
+        if port:
+            context.session.delete(port)
 
     def get_port(self, context, id, fields=None):
         port = self._get_port(context, id)
@@ -1447,6 +1589,8 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                 query = query.filter(IPAllocation.subnet_id.in_(subnet_ids))
 
         query = self._apply_filters_to_query(query, Port, filters)
+        if limit:
+            sorts = sqlalchemyutils.get_keyset_sorts(Port, sorts)
         if limit and page_reverse and sorts:
             sorts = [(s[0], not s[1]) for s in sorts]
         query = sqlalchemyutils.paginate_query(query, Port, limit,
@@ -1456,12 +1600,16 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
     def get_ports(self, context, filters=None, fields=None,
                   sorts=None, limit=None, marker=None,
                   page_reverse=False):
-        marker_obj = self._get_marker_obj(context, 'port', limit, marker)
+        marker_obj = self._get_marker_keys(
+            context, 'port', models_v2.Port, limit, marker, sorts)
         query = self._get_ports_query(context, filters=filters,
                                       sorts=sorts, limit=limit,
                                       marker_obj=marker_obj,
                                       page_reverse=page_reverse)
-        items = [self._make_port_dict(c, fields) for c in query]
+        if self._is_projectable(models_v2.Port, fields):
+            items = self._project_query(query, models_v2.Port, fields)
+        else:
+            items = [self._make_port_dict(c, fields) for c in query]
         if limit and page_reverse:
             items.reverse()
         return items
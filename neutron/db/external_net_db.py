@@ -133,8 +133,10 @@ class External_net_db_mixin(object):
             if port:
                 raise external_net.ExternalNetworkInUse(net_id=net_id)
 
-            context.session.query(ExternalNetwork).filter_by(
-                network_id=net_id).delete()
+            ext_net = context.session.query(ExternalNetwork).filter_by(
+                network_id=net_id).first()
+            if ext_net:
+                context.session.delete(ext_net)
             net_data[external_net.EXTERNAL] = False
 
     def _process_l3_delete(self, context, network_id):
@@ -0,0 +1,243 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""IP address allocators of the DB base plugin.
+
+The allocator is selected with the ip_allocator option. It is asked for an
+address on one of a list of subnets, to reserve a specific address and to
+store the allocation of an address to a port.
+"""
+
+import abc
+import bisect
+import random
+
+import netaddr
+from oslo.config import cfg
+from oslo.db import exception as db_exc
+import six
+
+from neutron.common import exceptions as n_exc
+from neutron.db import models_v2
+from neutron.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+def get_free_ranges(pools, allocated):
+    """Return the free (first, last) integer ranges of allocation pools.
+
+    :param pools: iterable of (first, last) integer pool boundaries.
+    :param allocated: iterable of allocated integer addresses.
+    """
+    allocated = sorted(allocated)
+    free = []
+    for first, last in sorted(pools):
+        start = bisect.bisect_left(allocated, first)
+        end = bisect.bisect_right(allocated, last)
+        for ip in allocated[start:end]:
+            if ip > first:
+                free.append((first, ip - 1))
+            first = ip + 1
+        if first <= last:
+            free.append((first, last))
+    return free
+
+
+def remove_from_ranges(ranges, ip):
+    """Return ranges without the integer address ip."""
+    result = []
+    for first, last in ranges:
+        if first <= ip <= last:
+            if first < ip:
+                result.append((first, ip - 1))
+            if ip < last:
+                result.append((ip + 1, last))
+        else:
+            result.append((first, last))
+    return result
+
+
+def pick_random(ranges):
+    """Return a random integer address of ranges or None if empty."""
+    total = sum(last - first + 1 for first, last in ranges)
+    if not total:
+        return None
+    index = random.randrange(total)
+    for first, last in ranges:
+        size = last - first + 1
+        if index < size:
+            return first + index
+        index -= size
+
+
+@six.add_metaclass(abc.ABCMeta)
+class IpAllocator(object):
+    """Base class of IP address allocators.
+
+    :param plugin: the DB base plugin class, for allocators which use its
+                   availability range helpers.
+    """
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+
+    @abc.abstractmethod
+    def generate_ip(self, context, subnets):
+        """Allocate an address on one of subnets.
+
+        Returns a dict with the ip_address and subnet_id allocated, raises
+        IpAddressGenerationFailure if all the subnets are exhausted.
+        """
+
+    @abc.abstractmethod
+    def allocate_specific_ip(self, context, subnet_id, ip_address):
+        """Reserve an address which was validated as not in use."""
+
+    def store_ip_allocation(self, context, allocation):
+        """Store the IPAllocation of an address to a port."""
+        context.session.add(allocation)
+
+
+class AvailabilityRangeAllocator(IpAllocator):
+    """Allocate addresses from the IPAvailabilityRange table.
+
+    The first address of the first range of the subnet is handed out, the
+    range row is locked until the transaction ends. The ranges are rebuilt
+    from the allocation pools when they are exhausted.
+    """
+
+    def generate_ip(self, context, subnets):
+        try:
+            return self.plugin._try_generate_ip(context, subnets)
+        except n_exc.IpAddressGenerationFailure:
+            self.plugin._rebuild_availability_ranges(context, subnets)
+
+        return self.plugin._try_generate_ip(context, subnets)
+
+    def allocate_specific_ip(self, context, subnet_id, ip_address):
+        self.plugin._allocate_specific_ip(context, subnet_id, ip_address)
+
+
+class RandomAllocator(IpAllocator):
+    """Allocate a random free address without locking.
+
+    Random candidate addresses of the allocation pools of a subnet are
+    picked and only their allocations are queried, the first free one is
+    inserted in a savepoint. All the allocations of the subnet are only
+    loaded to compute its free ranges when the candidates are taken, which
+    is unlikely unless the subnet is nearly full. The unique constraint of
+    IPAllocation catches concurrent allocations of the same address, another
+    address is tried then. The address, or the specific address requested,
+    is reserved with no port until store_ip_allocation is called.
+
+    IPAvailabilityRange is not maintained, so the availability range
+    allocator can hand out addresses in use once it is enabled again.
+    """
+
+    def generate_ip(self, context, subnets):
+        for subnet in subnets:
+            ip_address = self._try_generate_ip(context, subnet)
+            if ip_address:
+                return {'ip_address': ip_address,
+                        'subnet_id': subnet['id']}
+            LOG.debug("No IP could be allocated from subnet %(subnet_id)s "
+                      "(%(cidr)s)",
+                      {'subnet_id': subnet['id'], 'cidr': subnet['cidr']})
+        raise n_exc.IpAddressGenerationFailure(net_id=subnets[0]['network_id'])
+
+    def _get_pools(self, context, subnet_id):
+        pools = context.session.query(
+            models_v2.IPAllocationPool.first_ip,
+            models_v2.IPAllocationPool.last_ip).filter_by(
+                subnet_id=subnet_id)
+        return [(int(netaddr.IPAddress(pool.first_ip)),
+                 int(netaddr.IPAddress(pool.last_ip))) for pool in pools]
+
+    def _get_allocated(self, context, subnet_id, ips=None):
+        """Return the allocated integer addresses of a subnet.
+
+        :param ips: only check these integer addresses if not None.
+        """
+        query = context.session.query(
+            models_v2.IPAllocation.ip_address).filter_by(
+                subnet_id=subnet_id)
+        if ips is not None:
+            query = query.filter(models_v2.IPAllocation.ip_address.in_(
+                [str(netaddr.IPAddress(ip)) for ip in ips]))
+        return set(int(netaddr.IPAddress(allocation.ip_address))
+                   for allocation in query)
+
+    def _insert_allocation(self, context, subnet, ip):
+        """Reserve the integer address ip, return None if it is taken."""
+        ip_address = str(netaddr.IPAddress(ip))
+        try:
+            with context.session.begin_nested():
+                context.session.add(models_v2.IPAllocation(
+                    network_id=subnet['network_id'],
+                    subnet_id=subnet['id'],
+                    ip_address=ip_address))
+                context.session.flush()
+            return ip_address
+        except db_exc.DBDuplicateEntry:
+            LOG.debug("IP %(ip_address)s of subnet %(subnet_id)s was "
+                      "allocated concurrently.",
+                      {'ip_address': ip_address, 'subnet_id': subnet['id']})
+
+    def _try_generate_ip(self, context, subnet):
+        retries = cfg.CONF.ip_allocation_retries
+        pools = self._get_pools(context, subnet['id'])
+        candidates = set(pick_random(pools) for i in range(retries))
+        candidates.discard(None)
+        if not candidates:
+            return
+        taken = self._get_allocated(context, subnet['id'], candidates)
+        for ip in candidates - taken:
+            ip_address = self._insert_allocation(context, subnet, ip)
+            if ip_address:
+                return ip_address
+            taken.add(ip)
+
+        free = get_free_ranges(
+            pools, self._get_allocated(context, subnet['id']) | taken)
+        for i in range(retries):
+            ip = pick_random(free)
+            if ip is None:
+                return
+            ip_address = self._insert_allocation(context, subnet, ip)
+            if ip_address:
+                return ip_address
+            free = remove_from_ranges(free, ip)
+
+    def allocate_specific_ip(self, context, subnet_id, ip_address):
+        # The address is reserved like a generated one, so that the
+        # addresses generated later in the transaction, e.g. for the other
+        # ports of a bulk request, avoid it.
+        network_id = context.session.query(
+            models_v2.Subnet.network_id).filter_by(id=subnet_id).scalar()
+        try:
+            with context.session.begin_nested():
+                context.session.add(models_v2.IPAllocation(
+                    network_id=network_id,
+                    subnet_id=subnet_id,
+                    ip_address=ip_address))
+                context.session.flush()
+        except db_exc.DBDuplicateEntry:
+            raise n_exc.IpAddressInUse(net_id=network_id,
+                                       ip_address=ip_address)
+
+    def store_ip_allocation(self, context, allocation):
+        # Picks up the address reserved by generate_ip in the session
+        context.session.merge(allocation)
@@ -47,7 +47,8 @@ API_TO_DB_COLUMN_MAP = {'port_id': 'fixed_port_id'}
 CORE_ROUTER_ATTRS = ('id', 'name', 'tenant_id', 'admin_state_up', 'status')
 
 
-class Router(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
+class Router(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant,
+             models_v2.HasRevision):
     """Represents a v2 neutron router."""
 
     name = sa.Column(sa.String(255))
@@ -57,7 +58,8 @@ class Router(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
     gw_port = orm.relationship(models_v2.Port, lazy='joined')
 
 
-class FloatingIP(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
+class FloatingIP(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant,
+                 models_v2.HasRevision):
     """Represents a floating IP address.
 
     This IP address may or may not be allocated to a tenant, and may or
@@ -567,6 +569,7 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase):
                'port_id': floatingip['fixed_port_id'],
                'fixed_ip_address': floatingip['fixed_ip_address'],
                'status': floatingip['status']}
+        self._apply_dict_extend_functions(l3.FLOATINGIPS, res, floatingip)
         return self._fields(res, fields)
 
     def _get_interface_ports_for_network(self, context, network_id):
@@ -778,9 +781,15 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase):
 
     def update_floatingip_status(self, context, floatingip_id, status):
         """Update operational status for floating IP in neutron DB."""
+        # NOTE: query updates are not seen by the session, the revision
+        # number is bumped in the same statement. Unchanged statuses are
+        # left alone, so that the reports of the agents keep the revision.
         fip_query = self._model_query(context, FloatingIP).filter(
-            FloatingIP.id == floatingip_id)
-        fip_query.update({'status': status}, synchronize_session=False)
+            FloatingIP.id == floatingip_id,
+            sa.or_(FloatingIP.status != status, FloatingIP.status.is_(None)))
+        fip_query.update({'status': status,
+                          'revision_number': FloatingIP.revision_number + 1},
+                         synchronize_session=False)
 
     def _delete_floatingip(self, context, id):
         floatingip = self._get_floatingip(context, id)
@@ -1026,6 +1035,67 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase):
         self._process_interfaces(routers_dict, interfaces)
         return routers_dict.values()
 
+    def get_sync_data_for_host(self, context, host, router_ids=None,
+                               active=None):
+        """Return the sync data of routers as needed by the agent of host.
+
+        Only distributed routers have host specific data, see the DVR mixin.
+        """
+        return self.get_sync_data(context, router_ids=router_ids,
+                                  active=active)
+
+    def get_router_checksums(self, context, router_ids=None, active=None):
+        """Return a checksum of the sync data of routers, by router id.
+
+        The checksum covers the revision numbers of the routers, of their
+        ports, of the subnets of the networks of these ports and of their
+        floating IPs with the ports they are associated to. It changes
+        whenever the sync data do without having to build them.
+        """
+        query = context.session.query(Router.id, Router.revision_number)
+        if router_ids is not None:
+            if not router_ids:
+                return {}
+            query = query.filter(Router.id.in_(router_ids))
+        if active is not None:
+            query = query.filter(Router.admin_state_up == active)
+        revisions = dict((router_id, {'router': revision, 'ports': {},
+                                      'subnets': {}, 'floatingips': {}})
+                         for router_id, revision in query)
+        if not revisions:
+            return {}
+        router_ids = list(revisions)
+
+        query = context.session.query(models_v2.Port.device_id,
+                                      models_v2.Port.id,
+                                      models_v2.Port.revision_number)
+        query = query.filter(models_v2.Port.device_id.in_(router_ids))
+        for router_id, port_id, revision in query:
+            revisions[router_id]['ports'][port_id] = revision
+
+        query = context.session.query(models_v2.Port.device_id,
+                                      models_v2.Subnet.id,
+                                      models_v2.Subnet.revision_number)
+        query = query.join(
+            models_v2.Subnet,
+            models_v2.Subnet.network_id == models_v2.Port.network_id)
+        query = query.filter(models_v2.Port.device_id.in_(router_ids))
+        for router_id, subnet_id, revision in query:
+            revisions[router_id]['subnets'][subnet_id] = revision
+
+        query = context.session.query(FloatingIP.router_id, FloatingIP.id,
+                                      FloatingIP.revision_number,
+                                      models_v2.Port.revision_number)
+        query = query.outerjoin(
+            models_v2.Port, models_v2.Port.id == FloatingIP.fixed_port_id)
+        query = query.filter(FloatingIP.router_id.in_(router_ids))
+        for router_id, fip_id, revision, port_revision in query:
+            revisions[router_id]['floatingips'][fip_id] = [revision,
+                                                          port_revision]
+
+        return dict((router_id, utils.get_dict_checksum(router_revisions))
+                    for router_id, router_revisions in revisions.iteritems())
+
 
 class L3RpcNotifierMixin(object):
     """Mixin class to add rpc notifier attribute to db_base_plugin_v2."""
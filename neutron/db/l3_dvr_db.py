@@ -12,12 +12,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
+import eventlet
 from oslo.config import cfg
 
 from neutron.api.v2 import attributes
 from neutron.common import constants as l3_const
 from neutron.common import exceptions as n_exc
 from neutron.common import utils as n_utils
+from neutron import context as n_context
 from neutron.db import l3_attrs_db
 from neutron.db import l3_db
 from neutron.db import l3_dvrscheduler_db as l3_dvrsched_db
@@ -41,10 +45,54 @@ router_distributed_opts = [
                 default=False,
                 help=_("System-wide flag to determine the type of router "
                        "that tenants can create. Only admin can override.")),
+    cfg.FloatOpt('dvr_arp_update_window',
+                 default=0,
+                 help=_("Seconds during which the ARP updates of a DVR router "
+                        "are coalesced before being sent to the L3 agents in "
+                        "a single message. 0 sends each update at once. The "
+                        "L3 agents must all support the RPC API 1.3 before "
+                        "it is enabled.")),
 ]
 cfg.CONF.register_opts(router_distributed_opts)
 
 
+class ArpUpdateCoalescer(object):
+    """Coalesce the ARP updates of DVR routers over a short window.
+
+    The first update of a router schedules a flush after the window, later
+    updates of the same router are merged into it. Only the last update of
+    an IP address on a subnet is kept. The flush runs in its own greenthread
+    with an admin context of its own, the updates are added once the
+    changes they describe are committed.
+    """
+
+    def __init__(self, window, flush):
+        self.window = window
+        self._flush_func = flush
+        # router_id -> OrderedDict of (ip_address, subnet_id) -> arp entry
+        self._pending = {}
+
+    def add(self, router_id, arp_entry):
+        updates = self._pending.get(router_id)
+        if updates is None:
+            updates = self._pending[router_id] = collections.OrderedDict()
+            eventlet.spawn_after(self.window, self._flush, router_id)
+        key = (arp_entry['ip_address'], arp_entry['subnet_id'])
+        updates.pop(key, None)
+        updates[key] = arp_entry
+
+    def _flush(self, router_id):
+        updates = self._pending.pop(router_id, None)
+        if not updates:
+            return
+        try:
+            self._flush_func(n_context.get_admin_context(), router_id,
+                             updates.values())
+        except Exception:
+            LOG.exception(_("DVR: Failed notifying ARP updates of router "
+                            "%s"), router_id)
+
+
 class L3_NAT_with_dvr_db_mixin(l3_db.L3_NAT_db_mixin,
                                l3_attrs_db.ExtraAttributesMixin):
     """Mixin class to enable DVR support."""
@@ -304,25 +352,37 @@ class L3_NAT_with_dvr_db_mixin(l3_db.L3_NAT_db_mixin,
                 router[SNAT_ROUTER_INTF_KEY] = snat_router_intfs
         return routers_dict
 
-    def _process_floating_ips(self, context, routers_dict, floating_ips):
+    def _process_floating_ips(self, context, routers_dict, floating_ips,
+                              host=None):
+        """Add the floating IPs and FIP agent ports to their routers.
+
+        When host is given, the floating IPs of distributed routers bound to
+        other hosts are left out, as the L3 agent of host does not use them.
+        """
+        # FIP agent gateway ports are looked up once per host
+        agent_intfs_by_host = {}
         for floating_ip in floating_ips:
             router = routers_dict.get(floating_ip['router_id'])
             if router:
                 router_floatingips = router.get(l3_const.FLOATINGIP_KEY, [])
                 floatingip_agent_intfs = []
                 if router['distributed']:
-                    floating_ip['host'] = self.get_vm_port_hostid(
-                        context, floating_ip['port_id'])
-                    LOG.debug("Floating IP host: %s", floating_ip['host'])
+                    if 'host' not in floating_ip:
+                        floating_ip['host'] = self.get_vm_port_hostid(
+                            context, floating_ip['port_id'])
+                    fip_host = floating_ip['host']
+                    LOG.debug("Floating IP host: %s", fip_host)
                     # if no VM there won't be an agent assigned
-                    if not floating_ip['host']:
+                    if not fip_host or (host and fip_host != host):
                         continue
-                    fip_agent = self._get_agent_by_type_and_host(
-                        context, l3_const.AGENT_TYPE_L3,
-                        floating_ip['host'])
-                    LOG.debug("FIP Agent : %s ", fip_agent['id'])
-                    floatingip_agent_intfs = self.get_fip_sync_interfaces(
-                        context, fip_agent['id'])
+                    if fip_host not in agent_intfs_by_host:
+                        fip_agent = self._get_agent_by_type_and_host(
+                            context, l3_const.AGENT_TYPE_L3, fip_host)
+                        LOG.debug("FIP Agent : %s ", fip_agent['id'])
+                        agent_intfs_by_host[fip_host] = (
+                            self.get_fip_sync_interfaces(context,
+                                                         fip_agent['id']))
+                    floatingip_agent_intfs = agent_intfs_by_host[fip_host]
                     LOG.debug("FIP Agent ports: %s", floatingip_agent_intfs)
                 router_floatingips.append(floating_ip)
                 router[l3_const.FLOATINGIP_KEY] = router_floatingips
@@ -342,15 +402,29 @@ class L3_NAT_with_dvr_db_mixin(l3_db.L3_NAT_db_mixin,
         return interfaces
 
     def get_sync_data(self, context, router_ids=None, active=None):
+        return self._get_dvr_sync_data(context, None, router_ids, active)
+
+    def get_sync_data_for_host(self, context, host, router_ids=None,
+                               active=None):
+        return self._get_dvr_sync_data(context, host, router_ids, active)
+
+    def _get_dvr_sync_data(self, context, host, router_ids, active):
         routers, interfaces, floating_ips = self._get_router_info_list(
             context, router_ids=router_ids, active=active,
             device_owners=[l3_const.DEVICE_OWNER_ROUTER_INTF,
                            DEVICE_OWNER_DVR_INTERFACE])
         # Add the port binding host to the floatingip dictionary
+        port_hosts = self.get_vm_ports_hostids(
+            context, [fip['port_id'] for fip in floating_ips])
         for fip in floating_ips:
-            fip['host'] = self.get_vm_port_hostid(context, fip['port_id'])
+            fip['host'] = port_hosts.get(fip['port_id'])
         routers_dict = self._process_routers(context, routers)
-        self._process_floating_ips(context, routers_dict, floating_ips)
+        self._process_floating_ips(context, routers_dict, floating_ips,
+                                   host=host)
+        # The interfaces are not filtered by host. A distributed router
+        # routes east-west traffic on the host of the sender, so every host
+        # needs the interfaces and ARP entries of all the subnets of the
+        # router, not only of those with ports bound to the host.
         self._process_interfaces(routers_dict, interfaces)
         return routers_dict.values()
 
@@ -362,6 +436,17 @@ class L3_NAT_with_dvr_db_mixin(l3_db.L3_NAT_db_mixin,
             device_owner == DEVICE_OWNER_AGENT_GW):
             return vm_port_db[portbindings.HOST_ID]
 
+    def get_vm_ports_hostids(self, context, port_ids):
+        """Return the portbinding host_id of several ports at once."""
+        port_ids = [port_id for port_id in port_ids if port_id]
+        if not port_ids:
+            return {}
+        ports = self._core_plugin.get_ports(context,
+                                            filters={'id': port_ids})
+        return dict((port['id'], self.get_vm_port_hostid(context, port['id'],
+                                                         port))
+                    for port in ports)
+
     def get_agent_gw_ports_exist_for_network(
             self, context, network_id, host, agent_id):
         """Return agent gw port if exist, or None otherwise."""
@@ -504,13 +589,13 @@ class L3_NAT_with_dvr_db_mixin(l3_db.L3_NAT_db_mixin,
             self._populate_subnet_for_ports(context, port_list)
         return port_list
 
-    def dvr_vmarp_table_update(self, context, port_id, action):
+    def dvr_vmarp_table_update(self, context, port_dict, action):
         """Notify the L3 agent of VM ARP table changes.
 
         Provide the details of the VM ARP to the L3 agent when
-        a Nova instance gets created or deleted.
+        a Nova instance gets created or deleted. It is called once the
+        port change is committed.
         """
-        port_dict = self._core_plugin._get_port(context, port_id)
         # Check this is a valid VM port
         if ("compute:" not in port_dict['device_owner'] or
             not port_dict['fixed_ips']):
@@ -527,6 +612,11 @@ class L3_NAT_with_dvr_db_mixin(l3_db.L3_NAT_db_mixin,
                     arp_table = {'ip_address': ip_address,
                                  'mac_address': port_dict['mac_address'],
                                  'subnet_id': subnet}
+                    if cfg.CONF.dvr_arp_update_window > 0:
+                        arp_table['operation'] = (
+                            'add' if action == "add" else 'delete')
+                        self._arp_coalescer.add(router_id, arp_table)
+                        return
                     if action == "add":
                         notify_action = self.l3_rpc_notifier.add_arp_entry
                     elif action == "del":
@@ -534,6 +624,17 @@ class L3_NAT_with_dvr_db_mixin(l3_db.L3_NAT_db_mixin,
                     notify_action(context, router_id, arp_table)
                     return
 
+    @property
+    def _arp_coalescer(self):
+        if not hasattr(self, '_arp_coalescer_instance'):
+            self._arp_coalescer_instance = ArpUpdateCoalescer(
+                cfg.CONF.dvr_arp_update_window, self._notify_arp_updates)
+        return self._arp_coalescer_instance
+
+    def _notify_arp_updates(self, context, router_id, arp_entries):
+        self.l3_rpc_notifier.update_arp_entries(context, router_id,
+                                                arp_entries)
+
     def delete_csnat_router_interface_ports(self, context,
                                             router, subnet_id=None):
         # Each csnat router interface port is associated
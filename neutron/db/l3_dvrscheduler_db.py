@@ -92,18 +92,28 @@ class L3_DVRsch_db_mixin(l3agent_sch_db.L3AgentSchedulerDbMixin):
     """
 
     def dvr_update_router_addvm(self, context, port):
-        ips = port['fixed_ips']
-        for ip in ips:
-            subnet = ip['subnet_id']
-            filter_sub = {'fixed_ips': {'subnet_id': [subnet]},
-                          'device_owner':
-                          [q_const.DEVICE_OWNER_DVR_INTERFACE]}
+        subnet_ids = [ip['subnet_id'] for ip in port['fixed_ips']]
+        if not subnet_ids:
+            return
+        # Fetch the DVR interfaces of all the subnets of the port at once
+        filter_sub = {'fixed_ips': {'subnet_id': subnet_ids},
+                      'device_owner': [q_const.DEVICE_OWNER_DVR_INTERFACE]}
+        ports = self._core_plugin.get_ports(context, filters=filter_sub)
+        routers_by_subnet = {}
+        for dvr_port in ports:
+            for ip in dvr_port['fixed_ips']:
+                routers_by_subnet.setdefault(ip['subnet_id'], []).append(
+                    dvr_port['device_id'])
+
+        distributed = {}
+        for subnet in subnet_ids:
             router_id = None
-            ports = self._core_plugin.get_ports(context, filters=filter_sub)
-            for port in ports:
-                router_id = port['device_id']
-                router_dict = self.get_router(context, router_id)
-                if router_dict.get('distributed', False):
+            for router_id in routers_by_subnet.get(subnet, []):
+                if router_id not in distributed:
+                    router_dict = self.get_router(context, router_id)
+                    distributed[router_id] = router_dict.get('distributed',
+                                                             False)
+                if distributed[router_id]:
                     payload = {'subnet_id': subnet}
                     self.l3_rpc_notifier.routers_updated(
                         context, [router_id], None, payload)
@@ -408,6 +408,20 @@ class L3_HA_NAT_db_mixin(l3_dvr_db.L3_NAT_with_dvr_db_mixin):
 
                 bindings[0].update({'state': state})
 
+    def update_routers_states(self, context, states, host):
+        """Update the HA state of several routers on a host at once.
+
+        :param states: dict of router_id to 'active' or 'standby'
+        """
+        if not states:
+            return
+
+        with context.session.begin(subtransactions=True):
+            bindings = self.get_ha_router_port_bindings(
+                context, states.keys(), host)
+            for binding in bindings:
+                binding.update({'state': states[binding.router_id]})
+
     def delete_router(self, context, id):
         router_db = self._get_router(context, id)
         if router_db.extra_attributes.ha:
@@ -454,7 +468,6 @@ class L3_HA_NAT_db_mixin(l3_dvr_db.L3_NAT_with_dvr_db_mixin):
 
     def get_ha_sync_data_for_host(self, context, host=None, router_ids=None,
                                   active=None):
-        sync_data = super(L3_HA_NAT_db_mixin, self).get_sync_data(context,
-                                                                  router_ids,
-                                                                  active)
+        sync_data = super(L3_HA_NAT_db_mixin, self).get_sync_data_for_host(
+            context, host, router_ids=router_ids, active=active)
         return self._process_sync_ha_data(context, sync_data, host)
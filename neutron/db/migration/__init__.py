@@ -69,6 +69,18 @@ def schema_has_column(table_name, column_name):
                            insp.get_columns(table_name)]
 
 
+@raise_if_offline
+def get_column_indexes(table_name, column_name):
+    """Return the names of the indexes on the column only of the table.
+
+    This method cannot be executed in offline mode.
+    """
+    bind = op.get_bind()
+    insp = sa.engine.reflection.Inspector.from_engine(bind)
+    return [index['name'] for index in insp.get_indexes(table_name)
+            if index['column_names'] == [column_name]]
+
+
 @raise_if_offline
 def alter_column_if_exists(table_name, column_name, **kwargs):
     """Alter a column only if it exists in the schema."""
@@ -0,0 +1,60 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""composite indexes for keyset pagination
+
+Revision ID: 2c4af419145b
+Revises: 40aa2bfe1649
+Create Date: 2014-09-18 14:27:05.519012
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '2c4af419145b'
+down_revision = '40aa2bfe1649'
+
+from alembic import context
+from alembic import op
+
+from neutron.db import migration
+
+
+INDEXES = [
+    ('ix_networks_tenant_id_id', 'networks', ['tenant_id', 'id']),
+    ('ix_subnets_tenant_id_id', 'subnets', ['tenant_id', 'id']),
+    ('ix_subnets_network_id_id', 'subnets', ['network_id', 'id']),
+    ('ix_ports_tenant_id_id', 'ports', ['tenant_id', 'id']),
+    ('ix_ports_network_id_id', 'ports', ['network_id', 'id']),
+    ('ix_ports_device_id_id', 'ports', ['device_id', 'id']),
+]
+
+
+def upgrade(active_plugins=None, options=None):
+    for name, table, columns in INDEXES:
+        # The composite index replaces the indexes on its first column
+        replaced = []
+        if not context.is_offline_mode():
+            replaced = migration.get_column_indexes(table, columns[0])
+        op.create_index(name, table, columns, unique=False)
+        for index in replaced:
+            op.drop_index(index, table_name=table)
+
+
+def downgrade(active_plugins=None, options=None):
+    for name, table, columns in INDEXES:
+        # NOTE: the foreign keys on network_id need an index on MySQL
+        op.create_index('ix_%s_%s' % (table, columns[0]), table,
+                        [columns[0]], unique=False)
+        op.drop_index(name, table_name=table)
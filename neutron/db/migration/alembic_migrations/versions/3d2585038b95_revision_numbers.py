@@ -0,0 +1,43 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""revision numbers of resources
+
+Revision ID: 3d2585038b95
+Revises: 2c4af419145b
+Create Date: 2014-09-22 09:41:17.804215
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3d2585038b95'
+down_revision = '2c4af419145b'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+TABLES = ['networks', 'subnets', 'ports', 'routers', 'floatingips']
+
+
+def upgrade(active_plugins=None, options=None):
+    for table in TABLES:
+        op.add_column(table, sa.Column('revision_number', sa.BigInteger(),
+                                       nullable=False, server_default='0'))
+
+
+def downgrade(active_plugins=None, options=None):
+    for table in TABLES:
+        op.drop_column(table, 'revision_number')
@@ -0,0 +1,39 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""revision numbers of security groups
+
+Revision ID: 4a1b7e9c2d3f
+Revises: 1f5b6a7c3e2d
+Create Date: 2014-09-26 14:05:32.118734
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4a1b7e9c2d3f'
+down_revision = '1f5b6a7c3e2d'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade(active_plugins=None, options=None):
+    op.add_column('securitygroups',
+                  sa.Column('revision_number', sa.BigInteger(),
+                            nullable=False, server_default='0'))
+
+
+def downgrade(active_plugins=None, options=None):
+    op.drop_column('securitygroups', 'revision_number')
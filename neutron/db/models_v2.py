@@ -36,6 +36,13 @@ class HasId(object):
                    default=uuidutils.generate_uuid)
 
 
+class HasRevision(object):
+    """Revision number mixin, see neutron.db.revision_db."""
+
+    revision_number = sa.Column(sa.BigInteger, nullable=False, default=0,
+                                server_default='0')
+
+
 class HasStatusDescription(object):
     """Status with description mixin."""
 
@@ -116,13 +123,24 @@ class SubnetRoute(model_base.BASEV2, Route):
                           primary_key=True)
 
 
-class Port(model_base.BASEV2, HasId, HasTenant):
+class Port(model_base.BASEV2, HasId, HasTenant, HasRevision):
     """Represents a port on a Neutron v2 network."""
 
+    # Composite indexes of the usual list filters and the id, so that pages
+    # sorted on id are read from an index from the marker on
+    __table_args__ = (
+        sa.Index('ix_ports_tenant_id_id', 'tenant_id', 'id'),
+        sa.Index('ix_ports_network_id_id', 'network_id', 'id'),
+        sa.Index('ix_ports_device_id_id', 'device_id', 'id'),
+        model_base.BASEV2.__table_args__,
+    )
+
     name = sa.Column(sa.String(255))
     network_id = sa.Column(sa.String(36), sa.ForeignKey("networks.id"),
                            nullable=False)
-    fixed_ips = orm.relationship(IPAllocation, backref='ports', lazy='joined')
+    # The allocations of a deleted port are deleted by the database
+    fixed_ips = orm.relationship(IPAllocation, backref='ports', lazy='joined',
+                                 passive_deletes='all')
     mac_address = sa.Column(sa.String(32), nullable=False)
     admin_state_up = sa.Column(sa.Boolean(), nullable=False)
     status = sa.Column(sa.String(16), nullable=False)
@@ -158,13 +176,19 @@ class DNSNameServer(model_base.BASEV2):
                           primary_key=True)
 
 
-class Subnet(model_base.BASEV2, HasId, HasTenant):
+class Subnet(model_base.BASEV2, HasId, HasTenant, HasRevision):
     """Represents a neutron subnet.
 
     When a subnet is created the first and last entries will be created. These
     are used for the IP allocation.
     """
 
+    __table_args__ = (
+        sa.Index('ix_subnets_tenant_id_id', 'tenant_id', 'id'),
+        sa.Index('ix_subnets_network_id_id', 'network_id', 'id'),
+        model_base.BASEV2.__table_args__,
+    )
+
     name = sa.Column(sa.String(255))
     network_id = sa.Column(sa.String(36), sa.ForeignKey('networks.id'))
     ip_version = sa.Column(sa.Integer, nullable=False)
@@ -192,9 +216,14 @@ class Subnet(model_base.BASEV2, HasId, HasTenant):
                                   name='ipv6_address_modes'), nullable=True)
 
 
-class Network(model_base.BASEV2, HasId, HasTenant):
+class Network(model_base.BASEV2, HasId, HasTenant, HasRevision):
     """Represents a v2 neutron network."""
 
+    __table_args__ = (
+        sa.Index('ix_networks_tenant_id_id', 'tenant_id', 'id'),
+        model_base.BASEV2.__table_args__,
+    )
+
     name = sa.Column(sa.String(255))
     ports = orm.relationship(Port, backref='networks')
     subnets = orm.relationship(Subnet, backref='networks',
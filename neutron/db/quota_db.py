@@ -13,11 +13,27 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+import os
+import time
+
+from oslo.config import cfg
+from oslo.db import exception as db_exc
 import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy import orm
+from sqlalchemy import sql
 
+from neutron.api.rpc.handlers import quota_rpc
 from neutron.common import exceptions
+from neutron.common import rpc as n_rpc
+from neutron.common import topics
 from neutron.db import model_base
 from neutron.db import models_v2
+from neutron.openstack.common import log as logging
+from neutron.openstack.common import timeutils
+
+LOG = logging.getLogger(__name__)
 
 
 class Quota(model_base.BASEV2, models_v2.HasId):
@@ -31,6 +47,104 @@ class Quota(model_base.BASEV2, models_v2.HasId):
     limit = sa.Column(sa.Integer)
 
 
+class QuotaUsage(model_base.BASEV2):
+    """Represent the number of resources of a kind owned by a tenant."""
+    tenant_id = sa.Column(sa.String(255), primary_key=True)
+    resource = sa.Column(sa.String(255), primary_key=True)
+    in_use = sa.Column(sa.Integer, nullable=False)
+    # Set when in_use has to be counted again
+    dirty = sa.Column(sa.Boolean, nullable=False, default=False)
+    synced_at = sa.Column(sa.DateTime, nullable=False)
+
+
+class Reservation(model_base.BASEV2, models_v2.HasId):
+    """Represent resources a tenant is creating."""
+    tenant_id = sa.Column(sa.String(255), index=True)
+    resource = sa.Column(sa.String(255))
+    amount = sa.Column(sa.Integer, nullable=False)
+    expiration = sa.Column(sa.DateTime, nullable=False)
+
+
+class TenantLimitCache(object):
+    """Cache of the quota limits set for tenants in an API worker.
+
+    Entries expire after ttl seconds. Limit updates are fanned out to the
+    caches of all the API workers, each worker consuming them once it
+    uses its cache.
+    """
+
+    # Expired entries are purged when the cache grows over this size
+    PURGE_SIZE = 1000
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.notifier = quota_rpc.QuotaLimitsNotifyAPI()
+        self._limits = {}
+        self._generation = 0
+        self._pid = None
+        self._connection = None
+
+    def _consume(self):
+        # The cache may have been created before the API workers forked
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._limits.clear()
+            self._connection = n_rpc.create_connection(new=True)
+            self._connection.create_consumer(
+                topics.QUOTA_LIMITS, [quota_rpc.QuotaLimitsCallback(self)],
+                fanout=True)
+            self._connection.consume_in_threads()
+
+    def get(self, tenant_id, load):
+        """Return the limits of a tenant, loading them on a miss."""
+        self._consume()
+        now = time.time()
+        entry = self._limits.get(tenant_id)
+        if entry and entry[0] > now:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        generation = self._generation
+        limits = load()
+        # Limits loaded while an update was notified may be outdated
+        if generation == self._generation:
+            if len(self._limits) >= self.PURGE_SIZE:
+                self._limits = dict(item for item in self._limits.items()
+                                    if item[1][0] > now)
+            self._limits[tenant_id] = (now + self.ttl, limits)
+        return limits
+
+    def invalidate(self, tenant_id):
+        self._generation += 1
+        self._limits.pop(tenant_id, None)
+        LOG.debug("Invalidated the quota limits of tenant %(tenant_id)s. "
+                  "Cache hits: %(hits)s, misses: %(misses)s",
+                  {'tenant_id': tenant_id, 'hits': self.hits,
+                   'misses': self.misses})
+
+
+_LIMIT_CACHE = None
+
+
+def _get_limit_cache():
+    global _LIMIT_CACHE
+    ttl = cfg.CONF.QUOTAS.limit_cache_ttl
+    if ttl <= 0:
+        return None
+    if _LIMIT_CACHE is None or _LIMIT_CACHE.ttl != ttl:
+        _LIMIT_CACHE = TenantLimitCache(ttl)
+    return _LIMIT_CACHE
+
+
+def _limits_changed(context, tenant_id):
+    cache = _get_limit_cache()
+    if cache:
+        cache.invalidate(tenant_id)
+        cache.notifier.quota_limits_changed(context, tenant_id)
+
+
 class DbQuotaDriver(object):
     """Driver to perform necessary checks to enforce quotas and obtain quota
     information.
@@ -54,11 +168,16 @@ class DbQuotaDriver(object):
                             for key, resource in resources.items())
 
         # update with tenant specific limits
-        q_qry = context.session.query(Quota).filter_by(tenant_id=tenant_id)
-        tenant_quota.update((q['resource'], q['limit']) for q in q_qry)
+        tenant_quota.update(DbQuotaDriver._get_tenant_limits(context,
+                                                             tenant_id))
 
         return tenant_quota
 
+    @staticmethod
+    def _get_tenant_limits(context, tenant_id):
+        q_qry = context.session.query(Quota).filter_by(tenant_id=tenant_id)
+        return dict((q['resource'], q['limit']) for q in q_qry)
+
     @staticmethod
     def delete_tenant_quota(context, tenant_id):
         """Delete the quota entries for a given tenant_id.
@@ -69,6 +188,7 @@ class DbQuotaDriver(object):
             tenant_quotas = context.session.query(Quota)
             tenant_quotas = tenant_quotas.filter_by(tenant_id=tenant_id)
             tenant_quotas.delete()
+        _limits_changed(context, tenant_id)
 
     @staticmethod
     def get_all_quotas(context, resources):
@@ -111,6 +231,7 @@ class DbQuotaDriver(object):
                                      resource=resource,
                                      limit=limit)
                 context.session.add(tenant_quota)
+        _limits_changed(context, tenant_id)
 
     def _get_quotas(self, context, tenant_id, resources, keys):
         """Retrieves the quotas for specific resources.
@@ -135,6 +256,12 @@ class DbQuotaDriver(object):
             raise exceptions.QuotaResourceUnknown(unknown=sorted(unknown))
 
         # Grab and return the quotas (without usages)
+        cache = _get_limit_cache()
+        if cache:
+            limits = cache.get(tenant_id, lambda: self._get_tenant_limits(
+                context, tenant_id))
+            return dict((key, limits.get(key, resource.default))
+                        for key, resource in sub_resources.items())
         quotas = DbQuotaDriver.get_tenant_quotas(
             context, sub_resources, tenant_id)
 
@@ -177,3 +304,186 @@ class DbQuotaDriver(object):
                  if quotas[key] >= 0 and quotas[key] < val]
         if overs:
             raise exceptions.OverQuota(overs=sorted(overs))
+
+
+# Models of the resources whose usage is tracked by UsageQuotaDriver
+TRACKED_RESOURCES = {'network': models_v2.Network,
+                     'subnet': models_v2.Subnet,
+                     'port': models_v2.Port}
+# Resources by tracked model, for the listeners of track_resource
+_TRACKED_MODELS = {}
+# Set once the listeners are registered by UsageQuotaDriver
+_listening = False
+
+
+def _update_usage(connection, resource, tenant_id, delta):
+    usages = QuotaUsage.__table__
+    connection.execute(usages.update().where(
+        sa.and_(usages.c.tenant_id == tenant_id,
+                usages.c.resource == resource)).values(
+        in_use=usages.c.in_use + delta))
+
+
+def _resource_inserted(mapper, connection, target):
+    _update_usage(connection, _TRACKED_MODELS[mapper.class_],
+                  target.tenant_id, 1)
+
+
+def _resource_deleted(mapper, connection, target):
+    _update_usage(connection, _TRACKED_MODELS[mapper.class_],
+                  target.tenant_id, -1)
+
+
+def _resources_bulk_deleted(delete_context):
+    # Rows deleted by a query do not go through the mapper events, the
+    # usages of the resource are counted again.
+    model = delete_context.query.column_descriptions[0]['type']
+    if model in _TRACKED_MODELS:
+        usages = QuotaUsage.__table__
+        delete_context.session.execute(usages.update().where(
+            usages.c.resource == _TRACKED_MODELS[model]).values(dirty=True))
+
+
+def _listen(model):
+    if not event.contains(model, 'after_insert', _resource_inserted):
+        event.listen(model, 'after_insert', _resource_inserted)
+        event.listen(model, 'after_delete', _resource_deleted)
+
+
+def track_resource(resource, model):
+    """Track the usage of a resource stored in a model.
+
+    Once UsageQuotaDriver is loaded, the usages of the tenants are updated
+    in the transactions inserting and deleting rows of the model.
+    """
+    TRACKED_RESOURCES[resource] = model
+    _TRACKED_MODELS[model] = resource
+    if _listening:
+        _listen(model)
+
+
+def start_tracking():
+    """Register the listeners updating the usages of tracked resources."""
+    global _listening
+    _listening = True
+    for resource, model in TRACKED_RESOURCES.items():
+        track_resource(resource, model)
+    if not event.contains(orm.Session, 'after_bulk_delete',
+                          _resources_bulk_deleted):
+        event.listen(orm.Session, 'after_bulk_delete',
+                     _resources_bulk_deleted)
+
+
+def stop_tracking():
+    """Remove the listeners registered by start_tracking."""
+    global _listening
+    _listening = False
+    for model in TRACKED_RESOURCES.values():
+        if event.contains(model, 'after_insert', _resource_inserted):
+            event.remove(model, 'after_insert', _resource_inserted)
+            event.remove(model, 'after_delete', _resource_deleted)
+    if event.contains(orm.Session, 'after_bulk_delete',
+                      _resources_bulk_deleted):
+        event.remove(orm.Session, 'after_bulk_delete',
+                     _resources_bulk_deleted)
+
+
+class UsageQuotaDriver(DbQuotaDriver):
+    """Quota driver checking limits against tracked usages.
+
+    The number of resources of each tenant is stored in the quotausages
+    table, and updated in the transactions creating and deleting them, so
+    checking a quota does not count the resources of the tenant. A usage
+    is counted again when it is marked dirty or after
+    usage_resync_interval seconds.
+
+    The resources being created are reserved for reservation_expiration
+    seconds, so that concurrent requests can not exceed a quota.
+    Resources not in TRACKED_RESOURCES are counted with the plugin.
+
+    NeutronManager loads the driver before the server forks its API and
+    RPC workers, so the usages are updated by the resources created and
+    deleted through either.
+    """
+
+    def __init__(self):
+        start_tracking()
+
+    @staticmethod
+    def is_tracked(resource):
+        return resource in TRACKED_RESOURCES
+
+    @staticmethod
+    def _needs_resync(usage):
+        interval = cfg.CONF.QUOTAS.usage_resync_interval
+        return usage.dirty or (interval >= 0 and timeutils.is_older_than(
+            usage.synced_at, interval))
+
+    def _get_usage(self, context, tenant_id, resource, lock=False):
+        query = context.session.query(QuotaUsage).filter_by(
+            tenant_id=tenant_id, resource=resource)
+        if lock:
+            query = query.with_lockmode('update')
+        usage = query.first()
+        if usage and not self._needs_resync(usage):
+            return usage.in_use
+
+        model = TRACKED_RESOURCES[resource]
+        in_use = context.session.query(model).filter_by(
+            tenant_id=tenant_id).count()
+        LOG.debug("Counted %(in_use)s %(resource)s for tenant %(tenant_id)s",
+                  {'in_use': in_use, 'resource': resource,
+                   'tenant_id': tenant_id})
+        if usage:
+            usage.update({'in_use': in_use, 'dirty': False,
+                          'synced_at': timeutils.utcnow()})
+            return in_use
+        try:
+            with context.session.begin_nested():
+                context.session.add(QuotaUsage(
+                    tenant_id=tenant_id, resource=resource, in_use=in_use,
+                    synced_at=timeutils.utcnow()))
+        except db_exc.DBDuplicateEntry:
+            # Counted concurrently
+            return query.one().in_use
+        return in_use
+
+    def get_usage(self, context, tenant_id, resource):
+        """Return the number of resources owned by a tenant."""
+        with context.session.begin(subtransactions=True):
+            return self._get_usage(context, tenant_id, resource)
+
+    def make_reservation(self, context, tenant_id, resources, resource,
+                         delta):
+        """Reserve the creation of resources by a tenant.
+
+        Raise OverQuota if the resources in use, reserved and about to be
+        created exceed the quota of the tenant. Return the id of the
+        reservation.
+        """
+        limit = self._get_quotas(context, tenant_id, resources,
+                                 [resource])[resource]
+        now = timeutils.utcnow()
+        with context.session.begin(subtransactions=True):
+            # The usage is locked until the reservation is stored
+            in_use = self._get_usage(context, tenant_id, resource, lock=True)
+            reservations = context.session.query(Reservation).filter_by(
+                tenant_id=tenant_id, resource=resource)
+            reservations.filter(Reservation.expiration < now).delete()
+            reserved = reservations.with_entities(
+                sql.func.sum(Reservation.amount)).scalar() or 0
+            if limit >= 0 and in_use + reserved + delta > limit:
+                raise exceptions.OverQuota(overs=[resource])
+            reservation = Reservation(
+                tenant_id=tenant_id, resource=resource, amount=delta,
+                expiration=now + datetime.timedelta(
+                    seconds=cfg.CONF.QUOTAS.reservation_expiration))
+            context.session.add(reservation)
+        return reservation.id
+
+    @staticmethod
+    def release_reservation(context, reservation_id):
+        """Release a reservation, the resources are tracked by now."""
+        with context.session.begin(subtransactions=True):
+            context.session.query(Reservation).filter_by(
+                id=reservation_id).delete()
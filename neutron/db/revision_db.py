@@ -0,0 +1,167 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Revision numbers of resources.
+
+The revision number of a resource is bumped in the transaction changing
+one of its columns, or adding, changing or removing one of the rows of
+other models which are part of its representation, e.g. the IP
+allocations of a port. It is bumped in SQL, so concurrent updates of a
+resource do not lose a revision, and it starts at 0.
+
+The rows of the child models must be deleted through the session, query
+level deletes are not seen by the session and do not bump the revision of
+the parent.
+"""
+
+import itertools
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy import orm
+from sqlalchemy.orm import util as orm_util
+
+from neutron.api.v2 import attributes
+from neutron.common import constants
+from neutron.db import allowedaddresspairs_db
+from neutron.db import db_base_plugin_v2
+from neutron.db import external_net_db
+from neutron.db import extradhcpopt_db
+from neutron.db import extraroute_db
+from neutron.db import l3_attrs_db
+from neutron.db import l3_db
+from neutron.db import models_v2
+from neutron.db import securitygroups_db
+from neutron.extensions import l3
+from neutron.extensions import revisions
+
+# Models with a revision number
+_TRACKED_MODELS = set()
+# Child model: list of (parent model, attribute with the parent id)
+_PARENTS = {}
+
+
+def _bump(model, obj):
+    obj.revision_number = model.revision_number + 1
+
+
+def _bump_revisions(session, flush_context, instances):
+    bumped = set()
+
+    def bump(model, obj):
+        if id(obj) not in bumped:
+            bumped.add(id(obj))
+            _bump(model, obj)
+
+    for obj in session.dirty:
+        model = type(obj)
+        if (model in _TRACKED_MODELS and
+            session.is_modified(obj, include_collections=False)):
+            bump(model, obj)
+
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        for parent_model, key in _PARENTS.get(type(obj), ()):
+            parent_id = (key(session, obj) if callable(key)
+                         else getattr(obj, key))
+            if not parent_id:
+                continue
+            parent = session.identity_map.get(
+                orm_util.identity_key(parent_model, parent_id))
+            if parent is None:
+                # NOTE: the parent is not loaded, it is not worth loading it
+                # with its eagerly loaded relationships to bump its revision
+                session.execute(
+                    parent_model.__table__.update().where(
+                        parent_model.id == parent_id).values(
+                            revision_number=parent_model.revision_number + 1))
+            elif parent not in session.new and parent not in session.deleted:
+                bump(parent_model, parent)
+
+
+def _listen():
+    if not event.contains(orm.Session, 'before_flush', _bump_revisions):
+        event.listen(orm.Session, 'before_flush', _bump_revisions)
+
+
+def track_revisions(model):
+    """Bump the revision number of model when its columns change."""
+    _TRACKED_MODELS.add(model)
+    _listen()
+
+
+def track_child(model, parent_model, key):
+    """Bump the revision number of the parent of the rows of model.
+
+    :param model: the model of the child rows
+    :param parent_model: the model of the parent, with a revision number
+    :param key: the attribute of model holding the id of the parent, or a
+                function of the session and a row returning it
+    """
+    _PARENTS.setdefault(model, []).append((parent_model, key))
+    _listen()
+
+
+def _get_gateway_router_id(session, allocation):
+    # The fixed IPs of the gateway port of a router are part of the router
+    if not allocation.port_id:
+        return
+    port = session.identity_map.get(
+        orm_util.identity_key(models_v2.Port, allocation.port_id))
+    if port is None:
+        # NOTE: a query would autoflush the session being flushed
+        port = session.execute(
+            sa.select([models_v2.Port.device_owner,
+                       models_v2.Port.device_id]).where(
+                models_v2.Port.id == allocation.port_id)).first()
+    if port and port.device_owner == constants.DEVICE_OWNER_ROUTER_GW:
+        return port.device_id
+
+
+track_revisions(models_v2.Network)
+track_revisions(models_v2.Subnet)
+track_revisions(models_v2.Port)
+track_revisions(l3_db.Router)
+track_revisions(l3_db.FloatingIP)
+track_revisions(securitygroups_db.SecurityGroup)
+track_child(models_v2.Subnet, models_v2.Network, 'network_id')
+track_child(external_net_db.ExternalNetwork, models_v2.Network, 'network_id')
+track_child(models_v2.IPAllocationPool, models_v2.Subnet, 'subnet_id')
+track_child(models_v2.DNSNameServer, models_v2.Subnet, 'subnet_id')
+track_child(models_v2.SubnetRoute, models_v2.Subnet, 'subnet_id')
+track_child(models_v2.IPAllocation, models_v2.Port, 'port_id')
+track_child(models_v2.IPAllocation, l3_db.Router, _get_gateway_router_id)
+track_child(securitygroups_db.SecurityGroupPortBinding, models_v2.Port,
+            'port_id')
+track_child(allowedaddresspairs_db.AllowedAddressPair, models_v2.Port,
+            'port_id')
+track_child(extradhcpopt_db.ExtraDhcpOpt, models_v2.Port, 'port_id')
+track_child(securitygroups_db.SecurityGroupRule,
+            securitygroups_db.SecurityGroup, 'security_group_id')
+track_child(extraroute_db.RouterRoute, l3_db.Router, 'router_id')
+track_child(l3_attrs_db.RouterExtraAttributes, l3_db.Router, 'router_id')
+
+
+class RevisionDbMixin(object):
+    """Mixin class adding the revision number to the resources."""
+
+    def _extend_revision_dict(self, res, db_obj):
+        res[revisions.REVISION] = db_obj.revision_number
+        return res
+
+
+for _resource in (attributes.NETWORKS, attributes.SUBNETS, attributes.PORTS,
+                  l3.ROUTERS, l3.FLOATINGIPS):
+    db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_funcs(
+        _resource, ['_extend_revision_dict'])
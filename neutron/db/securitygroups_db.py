@@ -33,7 +33,8 @@ IP_PROTOCOL_MAP = {constants.PROTO_NAME_TCP: constants.PROTO_NUM_TCP,
                    constants.PROTO_NAME_ICMP_V6: constants.PROTO_NUM_ICMP_V6}
 
 
-class SecurityGroup(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
+class SecurityGroup(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant,
+                    models_v2.HasRevision):
     """Represents a v2 neutron security group."""
 
     name = sa.Column(sa.String(255))
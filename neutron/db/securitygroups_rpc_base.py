@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
 import netaddr
 from sqlalchemy.orm import exc
 
@@ -20,6 +22,7 @@ from neutron.common import constants as q_const
 from neutron.common import ipv6_utils as ipv6
 from neutron.common import utils
 from neutron.db import models_v2
+from neutron.db import revision_db  # noqa
 from neutron.db import securitygroups_db as sg_db
 from neutron.extensions import securitygroup as ext_sg
 from neutron.openstack.common import log as logging
@@ -33,6 +36,109 @@ DIRECTION_IP_PREFIX = {'ingress': 'source_ip_prefix',
 DHCP_RULE_PORT = {4: (67, 68, q_const.IPv4), 6: (547, 546, q_const.IPv6)}
 
 
+def _make_rule_dict(rule_in_db):
+    direction = rule_in_db['direction']
+    rule_dict = {'direction': direction,
+                 'ethertype': rule_in_db['ethertype']}
+    for key in ('protocol', 'port_range_min', 'port_range_max',
+                'remote_ip_prefix', 'remote_group_id'):
+        if rule_in_db.get(key):
+            if key == 'remote_ip_prefix':
+                direction_ip_prefix = DIRECTION_IP_PREFIX[direction]
+                rule_dict[direction_ip_prefix] = rule_in_db[key]
+                continue
+            rule_dict[key] = rule_in_db[key]
+    return rule_dict
+
+
+def _make_unique_rule_dicts(rules_in_db):
+    rule_dicts = []
+    seen = set()
+    for rule_in_db in rules_in_db:
+        rule_dict = _make_rule_dict(rule_in_db)
+        key = tuple(sorted(rule_dict.items()))
+        if key not in seen:
+            seen.add(key)
+            rule_dicts.append(rule_dict)
+    return rule_dicts
+
+
+def _split_ips_by_ethertype(ips):
+    ips_by_ethertype = {q_const.IPv4: [], q_const.IPv6: []}
+    seen = set()
+    for ip in ips:
+        if ip not in seen:
+            seen.add(ip)
+            ethertype = 'IPv%d' % netaddr.IPAddress(ip).version
+            ips_by_ethertype[ethertype].append(ip)
+    return ips_by_ethertype
+
+
+class _LruCache(object):
+    """Mapping of at most size entries, evicting the least recently used."""
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        if key not in self._entries:
+            return default
+        entry = self._entries.pop(key)
+        self._entries[key] = entry
+        return entry
+
+    def set(self, key, entry):
+        self._entries.pop(key, None)
+        self._entries[key] = entry
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key):
+        self._entries.pop(key, None)
+
+
+class SecurityGroupInfoCache(object):
+    """Rules and member IPs of security groups.
+
+    Shared by the RPC callers of a process. The rules of a group are
+    cached with the revision number of the group, which is bumped when one
+    of its rules is created or deleted. The IPs of the members of a group
+    are cached with the ids and revision numbers of its member ports,
+    which are bumped when their IP addresses, allowed address pairs or
+    security groups change. Both are checked against the database on each
+    call, so the groups changed through another server process are read
+    again. The cached lists must not be modified by the callers.
+
+    A group is evicted when it is deleted through this process. The groups
+    deleted through other processes are evicted once more than MAX_GROUPS
+    groups were used since they were.
+    """
+
+    # Maximum number of groups whose rules, or member IPs, are cached
+    MAX_GROUPS = 10000
+
+    def __init__(self):
+        # Security group id: (revision number, rule dicts)
+        self.rules = _LruCache(self.MAX_GROUPS)
+        # Security group id: (set of (port id, revision number) of the
+        # member ports, {ethertype: IPs})
+        self.member_ips = _LruCache(self.MAX_GROUPS)
+
+    def evict(self, security_group_id):
+        self.rules.pop(security_group_id)
+        self.member_ips.pop(security_group_id)
+
+
+_CACHE = SecurityGroupInfoCache()
+
+
 class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
     """Mixin class to add agent-based security group implementation."""
 
@@ -73,6 +179,11 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
         self.notifier.security_groups_rule_updated(context, list(sgids))
         return rules
 
+    def delete_security_group(self, context, id):
+        super(SecurityGroupServerRpcMixin,
+              self).delete_security_group(context, id)
+        _CACHE.evict(id)
+
     def delete_security_group_rule(self, context, sgrid):
         rule = self.get_security_group_rule(context, sgrid)
         super(SecurityGroupServerRpcMixin,
@@ -147,51 +258,52 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
             self.notifier.security_groups_member_updated(
                 context, port.get(ext_sg.SECURITYGROUPS))
 
+    def notify_security_groups_member_updated_bulk(self, context, ports):
+        """Notify update event of security group members of many ports.
+
+        Like notify_security_groups_member_updated, but with at most one
+        provider update and one member update for all the ports.
+        """
+        provider_updated = False
+        security_groups = set()
+        for port in ports:
+            if port['device_owner'] == q_const.DEVICE_OWNER_DHCP:
+                provider_updated = True
+            elif port['device_owner'] == q_const.DEVICE_OWNER_ROUTER_INTF:
+                if any(netaddr.IPAddress(fixed_ip['ip_address']).version == 6
+                       for fixed_ip in port['fixed_ips']):
+                    provider_updated = True
+            else:
+                security_groups.update(port.get(ext_sg.SECURITYGROUPS) or [])
+        if provider_updated:
+            self.notifier.security_groups_provider_updated(context)
+        if security_groups:
+            self.notifier.security_groups_member_updated(
+                context, list(security_groups))
+
     def security_group_info_for_ports(self, context, ports):
         sg_info = {'devices': ports,
                    'security_groups': {},
                    'sg_member_ips': {}}
-        rules_in_db = self._select_rules_for_ports(context, ports)
+        bindings = self._select_sg_ids_for_ports(context, ports)
+        rules = self._get_security_group_rules(
+            context, set(sg_id for port_id, sg_id in bindings))
         remote_security_group_info = {}
-        for (binding, rule_in_db) in rules_in_db:
-            port_id = binding['port_id']
-            remote_gid = rule_in_db.get('remote_group_id')
-            security_group_id = rule_in_db.get('security_group_id')
-            ethertype = rule_in_db['ethertype']
-            if ('security_group_source_groups'
-                not in sg_info['devices'][port_id]):
-                sg_info['devices'][port_id][
-                    'security_group_source_groups'] = []
-
-            if remote_gid:
-                if (remote_gid
-                    not in sg_info['devices'][port_id][
-                        'security_group_source_groups']):
-                    sg_info['devices'][port_id][
-                        'security_group_source_groups'].append(remote_gid)
-                if remote_gid not in remote_security_group_info:
-                    remote_security_group_info[remote_gid] = {}
-                if ethertype not in remote_security_group_info[remote_gid]:
-                    remote_security_group_info[remote_gid][ethertype] = []
-
-            direction = rule_in_db['direction']
-            rule_dict = {
-                'direction': direction,
-                'ethertype': ethertype}
-
-            for key in ('protocol', 'port_range_min', 'port_range_max',
-                        'remote_ip_prefix', 'remote_group_id'):
-                if rule_in_db.get(key):
-                    if key == 'remote_ip_prefix':
-                        direction_ip_prefix = DIRECTION_IP_PREFIX[direction]
-                        rule_dict[direction_ip_prefix] = rule_in_db[key]
-                        continue
-                    rule_dict[key] = rule_in_db[key]
-            if security_group_id not in sg_info['security_groups']:
-                sg_info['security_groups'][security_group_id] = []
-            if rule_dict not in sg_info['security_groups'][security_group_id]:
-                sg_info['security_groups'][security_group_id].append(
-                    rule_dict)
+        for port_id, security_group_id in bindings:
+            sg_rules = rules.get(security_group_id)
+            if not sg_rules:
+                continue
+            sg_info['security_groups'][security_group_id] = sg_rules
+            source_groups = sg_info['devices'][port_id].setdefault(
+                'security_group_source_groups', [])
+            for rule in sg_rules:
+                remote_gid = rule.get('remote_group_id')
+                if not remote_gid:
+                    continue
+                if remote_gid not in source_groups:
+                    source_groups.append(remote_gid)
+                remote_security_group_info.setdefault(
+                    remote_gid, {})[rule['ethertype']] = []
 
         sg_info['sg_member_ips'] = remote_security_group_info
         # the provider rules do not belong to any security group, so these
@@ -201,16 +313,96 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
         return self._get_security_group_member_ips(context, sg_info)
 
     def _get_security_group_member_ips(self, context, sg_info):
-        ips = self._select_ips_for_remote_group(
+        ips = self._get_member_ips_for_remote_groups(
             context, sg_info['sg_member_ips'].keys())
-        for sg_id, member_ips in ips.items():
-            for ip in member_ips:
-                ethertype = 'IPv%d' % netaddr.IPAddress(ip).version
-                if (ethertype in sg_info['sg_member_ips'][sg_id]
-                    and ip not in sg_info['sg_member_ips'][sg_id][ethertype]):
-                    sg_info['sg_member_ips'][sg_id][ethertype].append(ip)
+        for sg_id, member_ips in sg_info['sg_member_ips'].items():
+            for ethertype in member_ips:
+                member_ips[ethertype] = ips[sg_id][ethertype]
         return sg_info
 
+    def _get_security_group_rules(self, context, security_group_ids):
+        """Return the rules of the security groups by security group id.
+
+        The rules of a group are read from the database when its revision
+        number changed since they were cached.
+        """
+        if not security_group_ids:
+            return {}
+        cache = _CACHE.rules
+        query = context.session.query(sg_db.SecurityGroup.id,
+                                      sg_db.SecurityGroup.revision_number)
+        revisions = dict(query.filter(
+            sg_db.SecurityGroup.id.in_(security_group_ids)))
+        for sg_id in set(security_group_ids) - set(revisions):
+            cache.pop(sg_id)
+        result = {}
+        stale = []
+        for sg_id, revision in revisions.iteritems():
+            cached = cache.get(sg_id)
+            if cached and cached[0] == revision:
+                result[sg_id] = cached[1]
+            else:
+                stale.append(sg_id)
+        if stale:
+            rules = dict((sg_id, []) for sg_id in stale)
+            query = context.session.query(sg_db.SecurityGroupRule)
+            query = query.filter(
+                sg_db.SecurityGroupRule.security_group_id.in_(stale))
+            for rule_in_db in query:
+                rules[rule_in_db['security_group_id']].append(rule_in_db)
+            for sg_id in stale:
+                result[sg_id] = _make_unique_rule_dicts(rules[sg_id])
+                cache.set(sg_id, (revisions[sg_id], result[sg_id]))
+        return result
+
+    def _get_member_ips_for_remote_groups(self, context, remote_group_ids):
+        """Return the IPs of the members of the groups by ethertype.
+
+        The IPs of the members of a group are read from the database when
+        a port joined or left the group, or when the revision number of
+        one of its member ports changed since they were cached.
+        """
+        if not remote_group_ids:
+            return {}
+        cache = _CACHE.member_ips
+        sg_binding_port = sg_db.SecurityGroupPortBinding.port_id
+        sg_binding_sgid = sg_db.SecurityGroupPortBinding.security_group_id
+
+        query = context.session.query(sg_binding_sgid, sg_binding_port,
+                                      models_v2.Port.revision_number)
+        query = query.join(models_v2.Port,
+                           sg_binding_port == models_v2.Port.id)
+        query = query.filter(sg_binding_sgid.in_(remote_group_ids))
+        members = dict((sg_id, set()) for sg_id in remote_group_ids)
+        for sg_id, port_id, revision in query:
+            members[sg_id].add((port_id, revision))
+        result = {}
+        stale = []
+        for sg_id in remote_group_ids:
+            cached = cache.get(sg_id)
+            if not members[sg_id]:
+                cache.pop(sg_id)
+                result[sg_id] = {q_const.IPv4: [], q_const.IPv6: []}
+            elif cached and cached[0] == members[sg_id]:
+                result[sg_id] = cached[1]
+            else:
+                stale.append(sg_id)
+        if stale:
+            ips = self._select_ips_for_remote_group(context, stale)
+            for sg_id in stale:
+                result[sg_id] = _split_ips_by_ethertype(ips[sg_id])
+                cache.set(sg_id, (members[sg_id], result[sg_id]))
+        return result
+
+    def _select_sg_ids_for_ports(self, context, ports):
+        if not ports:
+            return []
+        sg_binding_port = sg_db.SecurityGroupPortBinding.port_id
+        sg_binding_sgid = sg_db.SecurityGroupPortBinding.security_group_id
+        query = context.session.query(sg_binding_port, sg_binding_sgid)
+        query = query.filter(sg_binding_port.in_(ports.keys()))
+        return query.all()
+
     def _select_rules_for_ports(self, context, ports):
         if not ports:
             return []
@@ -420,20 +612,8 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
         for (binding, rule_in_db) in rules_in_db:
             port_id = binding['port_id']
             port = ports[port_id]
-            direction = rule_in_db['direction']
-            rule_dict = {
-                'security_group_id': rule_in_db['security_group_id'],
-                'direction': direction,
-                'ethertype': rule_in_db['ethertype'],
-            }
-            for key in ('protocol', 'port_range_min', 'port_range_max',
-                        'remote_ip_prefix', 'remote_group_id'):
-                if rule_in_db.get(key):
-                    if key == 'remote_ip_prefix':
-                        direction_ip_prefix = DIRECTION_IP_PREFIX[direction]
-                        rule_dict[direction_ip_prefix] = rule_in_db[key]
-                        continue
-                    rule_dict[key] = rule_in_db[key]
+            rule_dict = _make_rule_dict(rule_in_db)
+            rule_dict['security_group_id'] = rule_in_db['security_group_id']
             port['security_group_rules'].append(rule_dict)
         self._apply_provider_rule(context, ports)
         return self._convert_remote_group_id_to_ip_prefix(context, ports)
@@ -24,6 +24,45 @@ from neutron.openstack.common import log as logging
 LOG = logging.getLogger(__name__)
 
 
+def get_sort_attr(model, sort_key):
+    """Return the column attribute of model to sort on for sort_key."""
+    try:
+        sort_key_attr = getattr(model, sort_key)
+    except AttributeError:
+        # Extension attribute doesn't support for sorting. Because it
+        # existed in attr_info, it will be catched at here
+        msg = _("%s is invalid attribute for sort_key") % sort_key
+        raise n_exc.BadRequest(resource=model.__tablename__, msg=msg)
+    if isinstance(sort_key_attr.property, RelationshipProperty):
+        msg = _("The attribute '%(attr)s' is reference to other "
+                "resource, can't used by sort "
+                "'%(resource)s'") % {'attr': sort_key,
+                                     'resource': model.__tablename__}
+        raise n_exc.BadRequest(resource=model.__tablename__, msg=msg)
+    return sort_key_attr
+
+
+def get_keyset_sorts(model, sorts):
+    """Return sorts completed into a unique ordering of the rows of model.
+
+    The primary key columns which are not sorted on yet are appended in
+    ascending order, and the sort keys following the primary key are dropped
+    as they do not change the order. Sorting on (sort keys, primary key)
+    lets the rows following a marker be found with the composite indexes
+    of the sort keys and the primary key.
+    """
+    primary_key = model.__table__.primary_key.columns.keys()
+    keyset = []
+    missing = set(primary_key)
+    for sort_key, sort_direction in sorts or []:
+        if not missing:
+            break
+        keyset.append((sort_key, sort_direction))
+        missing.discard(sort_key)
+    keyset.extend((key, True) for key in primary_key if key in missing)
+    return keyset
+
+
 def paginate_query(query, model, limit, sorts, marker_obj=None):
     """Returns a query with sorting / pagination criteria added.
 
@@ -65,20 +104,7 @@ def paginate_query(query, model, limit, sorts, marker_obj=None):
     # Add sorting
     for sort_key, sort_direction in sorts:
         sort_dir_func = sqlalchemy.asc if sort_direction else sqlalchemy.desc
-        try:
-            sort_key_attr = getattr(model, sort_key)
-        except AttributeError:
-            # Extension attribute doesn't support for sorting. Because it
-            # existed in attr_info, it will be catched at here
-            msg = _("%s is invalid attribute for sort_key") % sort_key
-            raise n_exc.BadRequest(resource=model.__tablename__, msg=msg)
-        if isinstance(sort_key_attr.property, RelationshipProperty):
-            msg = _("The attribute '%(attr)s' is reference to other "
-                    "resource, can't used by sort "
-                    "'%(resource)s'") % {'attr': sort_key,
-                                         'resource': model.__tablename__}
-            raise n_exc.BadRequest(resource=model.__tablename__, msg=msg)
-        query = query.order_by(sort_dir_func(sort_key_attr))
+        query = query.order_by(sort_dir_func(get_sort_attr(model, sort_key)))
 
     # Add pagination
     if marker_obj:
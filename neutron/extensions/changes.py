@@ -0,0 +1,118 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import eventlet
+from oslo.config import cfg
+import webob
+
+from neutron.api import api_common
+from neutron.api import extensions
+from neutron.api.v2 import base
+from neutron.api.v2 import resource
+from neutron.common import exceptions as n_exc
+from neutron.db import changelog_db
+from neutron import wsgi
+
+RESOURCE_COLLECTION = 'changes'
+
+
+class ChangesController(wsgi.Controller):
+    """Long polling of the change log.
+
+    GET /changes?since=<id> returns the changes following the change of
+    id since, waiting up to timeout seconds for one. The response has the
+    id of the last change of the log as last_change_id, a client gets it
+    before listing the resources, and follows the changes from it.
+    """
+
+    def _get_int_param(self, request, name, default):
+        try:
+            value = int(request.GET.get(name, default))
+            if value >= 0:
+                return value
+        except ValueError:
+            pass
+        msg = _("%s must be an integer 0 or greater") % name
+        raise n_exc.BadRequest(resource=RESOURCE_COLLECTION, msg=msg)
+
+    def index(self, request):
+        context = request.context
+        feed = changelog_db.get_change_feed()
+        resources = api_common.list_args(request, 'resource')
+        timeout = min(self._get_int_param(request, 'timeout',
+                                          cfg.CONF.change_feed_timeout),
+                      cfg.CONF.change_feed_timeout)
+        limit = min(self._get_int_param(request, 'limit',
+                                        changelog_db.MAX_CHANGES) or
+                    changelog_db.MAX_CHANGES, changelog_db.MAX_CHANGES)
+        if 'since' not in request.GET:
+            feed.refresh(context)
+            return {RESOURCE_COLLECTION: [], 'last_change_id': feed.last_id}
+        since = self._get_int_param(request, 'since', 0)
+        deadline = time.time() + timeout
+        while True:
+            # Read before the feed is refreshed, so that no change up to
+            # it is left out of the changes returned
+            last_id = feed.last_id
+            changes = feed.get_changes(context, since, resources, limit)
+            if changes or time.time() >= deadline:
+                break
+            eventlet.sleep(cfg.CONF.change_feed_poll_interval)
+        if len(changes) >= limit:
+            # The changes were truncated, the client resumes after them
+            last_id = changes[-1]['id']
+        else:
+            last_id = max([last_id, since] +
+                          [change['id'] for change in changes])
+        return {RESOURCE_COLLECTION: changes, 'last_change_id': last_id}
+
+
+class Changes(extensions.ExtensionDescriptor):
+    """Extension class supporting the change feed."""
+
+    @classmethod
+    def get_name(cls):
+        return "Change feed"
+
+    @classmethod
+    def get_alias(cls):
+        return RESOURCE_COLLECTION
+
+    @classmethod
+    def get_description(cls):
+        return ("Long polling of the changes of networks and ports, so that "
+                "consumers sync incrementally instead of listing them")
+
+    @classmethod
+    def get_namespace(cls):
+        return "http://docs.openstack.org/ext/changes/api/v1.0"
+
+    @classmethod
+    def get_updated(cls):
+        return "2014-09-24T10:00:00-00:00"
+
+    @classmethod
+    def get_resources(cls):
+        """Returns Ext Resources."""
+        faults = dict(base.FAULT_MAP)
+        faults[changelog_db.ChangesExpired] = webob.exc.HTTPGone
+        controller = resource.Resource(ChangesController(), faults=faults)
+        return [extensions.ResourceExtension(RESOURCE_COLLECTION,
+                                             controller)]
+
+    def get_extended_resources(self, version):
+        return {}
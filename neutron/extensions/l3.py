@@ -77,6 +77,7 @@ class RouterExternalGatewayInUseByFloatingIp(qexception.InUse):
                 "more floating IPs.")
 
 ROUTERS = 'routers'
+FLOATINGIPS = 'floatingips'
 EXTERNAL_GW_INFO = 'external_gateway_info'
 
 RESOURCE_ATTRIBUTE_MAP = {
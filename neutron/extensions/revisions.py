@@ -0,0 +1,54 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from neutron.api import extensions
+
+REVISION = 'revision_number'
+EXTENDED_ATTRIBUTES_2_0 = dict(
+    (resource, {REVISION: {'allow_post': False, 'allow_put': False,
+                           'is_visible': True}})
+    for resource in ('networks', 'subnets', 'ports', 'routers', 'floatingips'))
+
+
+class Revisions(extensions.ExtensionDescriptor):
+    """Extension class supporting revision numbers of resources."""
+
+    @classmethod
+    def get_name(cls):
+        return "Resource revision numbers"
+
+    @classmethod
+    def get_alias(cls):
+        return "revisions"
+
+    @classmethod
+    def get_description(cls):
+        return ("Expose a revision number bumped on each change of "
+                "networks, subnets, ports, routers and floating IPs. "
+                "The ETags of the responses are computed from it.")
+
+    @classmethod
+    def get_namespace(cls):
+        return "http://docs.openstack.org/ext/revisions/api/v1.0"
+
+    @classmethod
+    def get_updated(cls):
+        return "2014-09-22T10:00:00-00:00"
+
+    def get_extended_resources(self, version):
+        if version == "2.0":
+            return EXTENDED_ATTRIBUTES_2_0
+        else:
+            return {}
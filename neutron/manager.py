@@ -23,6 +23,7 @@ from neutron.openstack.common import importutils
 from neutron.openstack.common import log as logging
 from neutron.openstack.common import periodic_task
 from neutron.plugins.common import constants
+from neutron import quota
 
 from stevedore import driver
 
@@ -123,6 +124,9 @@ class NeutronManager(object):
         # the rest of service plugins
         self.service_plugins = {constants.CORE: self.plugin}
         self._load_service_plugins()
+        # The quota driver is loaded before the API and RPC workers are
+        # forked, so that the usages it tracks are updated by all of them
+        quota.QUOTAS.get_driver()
 
     def _get_plugin_instance(self, namespace, plugin_provider):
         try:
@@ -350,3 +350,28 @@ class NeutronPluginBaseV2(object):
         """
         return (self.__class__.start_rpc_listeners !=
                 NeutronPluginBaseV2.start_rpc_listeners)
+
+    def start_rpc_group_listeners(self, groups):
+        """Start the RPC listeners of groups of calls of the agents.
+
+        The calls of each group of topics.RPC_GROUPS are consumed on the
+        topic returned by topics.get_group_topic, in addition to the topic
+        the plugin consumes with start_rpc_listeners, so that they can be
+        served by dedicated RPC workers.
+
+        :param groups: the groups of calls to consume
+        :returns: the RPC servers started
+
+        .. note:: this method is optional, as it was not part of the originally
+                  defined plugin API.
+        """
+        raise NotImplementedError()
+
+    def rpc_groups_supported(self):
+        """Return whether the plugin supports dedicated RPC workers.
+
+        .. note:: this method is optional, as it was not part of the originally
+                  defined plugin API.
+        """
+        return (self.__class__.start_rpc_group_listeners !=
+                NeutronPluginBaseV2.start_rpc_group_listeners)
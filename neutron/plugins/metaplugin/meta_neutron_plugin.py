@@ -206,6 +206,13 @@ class MetaPluginV2(db_base_plugin_v2.NeutronDbPluginV2,
         return (self.rpc_flavor and
                 self.plugins[self.rpc_flavor].rpc_workers_supported())
 
+    def start_rpc_group_listeners(self, groups):
+        return self.plugins[self.rpc_flavor].start_rpc_group_listeners(groups)
+
+    def rpc_groups_supported(self):
+        return (self.rpc_flavor and
+                self.plugins[self.rpc_flavor].rpc_groups_supported())
+
     def create_network(self, context, network):
         n = network['network']
         flavor = n.get(ext_flavor.FLAVOR_NETWORK)
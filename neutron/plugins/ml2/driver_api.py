@@ -590,6 +590,31 @@ class MechanismDriver(object):
         """
         pass
 
+    def create_port_bulk_precommit(self, contexts):
+        """Allocate resources for a list of new ports.
+
+        :param contexts: list of PortContext instances describing the ports.
+
+        Called instead of create_port_precommit when ports are created in
+        bulk, inside the transaction of all the ports. The default
+        implementation calls create_port_precommit for each port.
+        """
+        for context in contexts:
+            self.create_port_precommit(context)
+
+    def create_port_bulk_postcommit(self, contexts):
+        """Create a list of ports.
+
+        :param contexts: list of PortContext instances describing the ports.
+
+        Called instead of create_port_postcommit when ports are created in
+        bulk, after the transaction completes. Raising an exception will
+        result in the deletion of all the ports. The default implementation
+        calls create_port_postcommit for each port.
+        """
+        for context in contexts:
+            self.create_port_postcommit(context)
+
     def update_port_precommit(self, context):
         """Update resources of a port.
 
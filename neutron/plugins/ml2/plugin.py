@@ -36,12 +36,14 @@ from neutron.db import agents_db
 from neutron.db import agentschedulers_db
 from neutron.db import allowedaddresspairs_db as addr_pair_db
 from neutron.db import api as db_api
+from neutron.db import changelog_db
 from neutron.db import db_base_plugin_v2
 from neutron.db import dvr_mac_db
 from neutron.db import external_net_db
 from neutron.db import extradhcpopt_db
 from neutron.db import models_v2
 from neutron.db import quota_db  # noqa
+from neutron.db import revision_db
 from neutron.db import securitygroups_rpc_base as sg_db_rpc
 from neutron.extensions import allowedaddresspairs as addr_pair
 from neutron.extensions import extra_dhcp_opt as edo_ext
@@ -80,7 +82,8 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                 sg_db_rpc.SecurityGroupServerRpcMixin,
                 agentschedulers_db.DhcpAgentSchedulerDbMixin,
                 addr_pair_db.AllowedAddressPairsMixin,
-                extradhcpopt_db.ExtraDhcpOptMixin):
+                extradhcpopt_db.ExtraDhcpOptMixin,
+                revision_db.RevisionDbMixin):
 
     """Implement the Neutron L2 abstractions using modules.
 
@@ -103,7 +106,17 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                                     "quotas", "security-group", "agent",
                                     "dhcp_agent_scheduler",
                                     "multi-provider", "allowed-address-pairs",
-                                    "extra_dhcp_opt"]
+                                    "extra_dhcp_opt", "revisions", "changes"]
+
+    # The port bindings and the network segments are part of the ports and
+    # the networks returned by the API
+    revision_db.track_child(models.PortBinding, models_v2.Port, 'port_id')
+    revision_db.track_child(models.NetworkSegment, models_v2.Network,
+                            'network_id')
+    changelog_db.track_child_changes(models.PortBinding, models_v2.Port,
+                                     'port_id')
+    changelog_db.track_child_changes(models.NetworkSegment,
+                                     models_v2.Network, 'network_id')
 
     @property
     def supported_extension_aliases(self):
@@ -153,6 +166,21 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                                   fanout=False)
         return self.conn.consume_in_threads()
 
+    def start_rpc_group_listeners(self, groups):
+        endpoints = {
+            topics.RPC_GROUP_REPORTS: [agents_db.AgentExtRpcCallback()],
+            topics.RPC_GROUP_DEVICES: [rpc.RpcCallbacks(self.notifier,
+                                                        self.type_manager)],
+            topics.RPC_GROUP_SECURITY_GROUPS: [
+                securitygroups_rpc.SecurityGroupServerRpcCallback()],
+            topics.RPC_GROUP_SYNC: [dhcp_rpc.DhcpRpcCallback()],
+        }
+        conn = n_rpc.create_connection(new=True)
+        for group in groups:
+            conn.create_consumer(topics.get_group_topic(topics.PLUGIN, group),
+                                 endpoints[group], fanout=False)
+        return conn.consume_in_threads()
+
     def _filter_nets_provider(self, context, nets, filters):
         # TODO(rkukura): Implement filtering.
         return nets
@@ -769,31 +797,44 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
             # the fact that an error occurred.
             LOG.error(_("mechanism_manager.delete_subnet_postcommit failed"))
 
+    def _process_port_create(self, context, port, result, network=None):
+        """Create the ML2 records of a port added by the base plugin.
+
+        Returns the PortContext of the port and the port if its host
+        changed.
+        """
+        attrs = port['port']
+        session = context.session
+        self._ensure_default_security_group_on_port(context, port)
+        sgids = self._get_security_groups_on_port(context, port)
+        dhcp_opts = attrs.get(edo_ext.EXTRADHCPOPTS, [])
+        self.extension_manager.process_create_port(session, attrs, result)
+        self._process_port_create_security_group(context, result, sgids)
+        if not network:
+            network = self.get_network(context, result['network_id'])
+        binding = db.add_port_binding(session, result['id'])
+        mech_context = driver_context.PortContext(self, context, result,
+                                                  network, binding)
+        new_host_port = self._get_host_port_if_changed(mech_context, attrs)
+        self._process_port_binding(mech_context, attrs)
+
+        result[addr_pair.ADDRESS_PAIRS] = (
+            self._process_create_allowed_address_pairs(
+                context, result,
+                attrs.get(addr_pair.ADDRESS_PAIRS)))
+        self._process_port_create_extra_dhcp_opts(context, result,
+                                                  dhcp_opts)
+        return mech_context, new_host_port
+
     def create_port(self, context, port):
         attrs = port['port']
         attrs['status'] = const.PORT_STATUS_DOWN
 
         session = context.session
         with session.begin(subtransactions=True):
-            self._ensure_default_security_group_on_port(context, port)
-            sgids = self._get_security_groups_on_port(context, port)
-            dhcp_opts = port['port'].get(edo_ext.EXTRADHCPOPTS, [])
             result = super(Ml2Plugin, self).create_port(context, port)
-            self.extension_manager.process_create_port(session, attrs, result)
-            self._process_port_create_security_group(context, result, sgids)
-            network = self.get_network(context, result['network_id'])
-            binding = db.add_port_binding(session, result['id'])
-            mech_context = driver_context.PortContext(self, context, result,
-                                                      network, binding)
-            new_host_port = self._get_host_port_if_changed(mech_context, attrs)
-            self._process_port_binding(mech_context, attrs)
-
-            result[addr_pair.ADDRESS_PAIRS] = (
-                self._process_create_allowed_address_pairs(
-                    context, result,
-                    attrs.get(addr_pair.ADDRESS_PAIRS)))
-            self._process_port_create_extra_dhcp_opts(context, result,
-                                                      dhcp_opts)
+            mech_context, new_host_port = self._process_port_create(
+                context, port, result)
             self.mechanism_manager.create_port_precommit(mech_context)
 
         # Notification must be sent after the above transaction is complete
@@ -820,6 +861,85 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                 self.delete_port(context, result['id'])
         return bound_context._port
 
+    def create_port_bulk(self, context, ports):
+        """Create a list of ports in one transaction.
+
+        Networks, subnets and MAC addresses are looked up once per network,
+        the IPs of all the ports are allocated before any port is added, so
+        that the port and IP allocation rows of the whole list are inserted
+        in one flush, and the mechanism drivers are called once with the
+        list of port contexts. The failure of any port rolls back the whole
+        list.
+        """
+        items = ports['ports']
+        session = context.session
+        with session.begin(subtransactions=True):
+            tenant_ids, subnets = self._prepare_ports_bulk(context, items)
+            ips_by_port = self._allocate_ips_for_ports_bulk(context, items,
+                                                            subnets)
+            db_ports = []
+            for item, tenant_id, ips in zip(items, tenant_ids, ips_by_port):
+                attrs = item['port']
+                attrs['status'] = const.PORT_STATUS_DOWN
+                port_id = attrs.get('id') or uuidutils.generate_uuid()
+                db_ports.append(self._add_port_db(context, item, port_id,
+                                                  tenant_id, ips=ips))
+            session.flush()
+
+            networks = {}
+            mech_contexts = []
+            new_host_ports = []
+            for item, db_port in zip(items, db_ports):
+                result = self._make_port_dict(db_port,
+                                              process_extensions=False)
+                network_id = result['network_id']
+                if network_id not in networks:
+                    networks[network_id] = self.get_network(context,
+                                                            network_id)
+                mech_context, new_host_port = self._process_port_create(
+                    context, item, result, network=networks[network_id])
+                mech_contexts.append(mech_context)
+                if new_host_port:
+                    new_host_ports.append(new_host_port)
+            self.mechanism_manager.create_port_bulk_precommit(mech_contexts)
+
+        # Notifications must be sent after the above transaction is complete
+        for new_host_port in new_host_ports:
+            self._notify_l3_agent_new_port(context, new_host_port)
+
+        results = [mech_context.current for mech_context in mech_contexts]
+        try:
+            self.mechanism_manager.create_port_bulk_postcommit(mech_contexts)
+        except ml2_exc.MechanismDriverError:
+            with excutils.save_and_reraise_exception():
+                LOG.error(_("mechanism_manager.create_port_bulk_postcommit "
+                            "failed, deleting ports %s"),
+                          [result['id'] for result in results])
+                self._delete_ports(context, results)
+
+        self.notify_security_groups_member_updated_bulk(context, results)
+
+        bound_ports = []
+        for mech_context in mech_contexts:
+            try:
+                bound_context = self._bind_port_if_needed(mech_context)
+            except ml2_exc.MechanismDriverError:
+                with excutils.save_and_reraise_exception():
+                    LOG.error(_("_bind_port_if_needed failed for port "
+                                "'%(port)s', deleting ports %(ports)s"),
+                              {'port': mech_context.current['id'],
+                               'ports': [result['id'] for result in results]})
+                    self._delete_ports(context, results)
+            bound_ports.append(bound_context._port)
+        return bound_ports
+
+    def _delete_ports(self, context, ports):
+        for port in ports:
+            try:
+                self.delete_port(context, port['id'])
+            except exc.PortNotFound:
+                pass
+
     def update_port(self, context, id, port):
         attrs = port['port']
         need_port_update_notify = False
@@ -1009,8 +1129,6 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
             if l3plugin:
                 router_ids = l3plugin.disassociate_floatingips(
                     context, id, do_notify=False)
-                if is_dvr_enabled:
-                    l3plugin.dvr_vmarp_table_update(context, id, "del")
 
             LOG.debug("Calling delete_port for %(port_id)s owned by %(owner)s"
                       % {"port_id": id, "owner": device_owner})
@@ -1019,6 +1137,8 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         # now that we've left db transaction, we are safe to notify
         if l3plugin:
             l3plugin.notify_routers_updated(context, router_ids)
+            if is_dvr_enabled:
+                l3plugin.dvr_vmarp_table_update(context, port, "del")
             for router in removed_routers:
                 try:
                     l3plugin.remove_router_from_l3_agent(
@@ -61,6 +61,11 @@ class DhcpAgentNotifyAPI(dhcp_rpc_agent_api.DhcpAgentNotifyAPI):
             # back, since they were modified
             plugin.port_special_owners.remove(const.DEVICE_OWNER_DHCP)
 
+    def notify_bulk(self, context, items, methodname):
+        # Each network may or may not have a LSN, notify one by one
+        for data in items:
+            self.notify(context, data, methodname)
+
 
 def handle_network_dhcp_access(plugin, context, network, action):
     nsx_svc.handle_network_dhcp_access(plugin, context, network, action)
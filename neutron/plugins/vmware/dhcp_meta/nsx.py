@@ -89,6 +89,10 @@ class DhcpAgentNotifyAPI(object):
         elif resource == 'port' and action == 'update':
             self._port_update(context, data['port'])
 
+    def notify_bulk(self, context, items, methodname):
+        for data in items:
+            self.notify(context, data, methodname)
+
     def _port_update(self, context, port):
         # With no fixed IP's there's nothing that can be updated
         if not port["fixed_ips"]:
@@ -38,6 +38,9 @@ from neutron.openstack.common import policy
 LOG = log.getLogger(__name__)
 _POLICY_PATH = None
 _POLICY_CACHE = {}
+# Compiled read rules by action, see _get_compiled_rule
+_COMPILED_RULES = {}
+_COMPILED_RULES_SOURCE = None
 ADMIN_CTX_POLICY = 'context_is_admin'
 # Maps deprecated 'extension' policies to new-style policies
 DEPRECATED_POLICY_MAP = {
@@ -64,6 +67,7 @@ def reset():
     global _POLICY_CACHE
     _POLICY_PATH = None
     _POLICY_CACHE = {}
+    _COMPILED_RULES.clear()
     policy.reset()
 
 
@@ -119,6 +123,7 @@ def _set_rules(data):
                 LOG.error(_LE("Backward compatibility unavailable for "
                               "deprecated policy %s. The policy will "
                               "not be enforced"), pol)
+    _COMPILED_RULES.clear()
     policy.set_rules(policies)
 
 
@@ -380,6 +385,122 @@ def check(context, action, target, plugin=None, might_not_exist=False):
     return policy.check(*(_prepare_check(context, action, target)))
 
 
+def _deny(target, creds):
+    return False
+
+
+def _compile_rule(rule, target_keys, expanding=()):
+    """Compile a policy rule tree into a closure.
+
+    Rule references are resolved once, and the closure evaluates the
+    tree without the lookups. The keys of the target the result depends
+    on are added to target_keys; None is added if it cannot be determined
+    (e.g. http checks, which send the whole target).
+    """
+    if isinstance(rule, policy.RuleCheck):
+        if rule.match in expanding:
+            # Recursive rule, leave it to the policy engine
+            target_keys.add(None)
+            return rule
+        try:
+            referenced = policy._rules[rule.match]
+        except KeyError:
+            return _deny
+        return _compile_rule(referenced, target_keys,
+                             expanding + (rule.match,))
+    if isinstance(rule, (policy.AndCheck, policy.OrCheck)):
+        funcs = [_compile_rule(r, target_keys, expanding)
+                 for r in rule.rules]
+        if isinstance(rule, policy.AndCheck):
+            return lambda target, creds: all(f(target, creds)
+                                             for f in funcs)
+        return lambda target, creds: any(f(target, creds) for f in funcs)
+    if isinstance(rule, policy.NotCheck):
+        func = _compile_rule(rule.rule, target_keys, expanding)
+        return lambda target, creds: not func(target, creds)
+    if isinstance(rule, policy.RoleCheck):
+        role = rule.match.lower()
+        return lambda target, creds: role in [r.lower()
+                                              for r in creds['roles']]
+    if isinstance(rule, OwnerCheck):
+        target_keys.add(rule.target_field)
+        # The owner of a parent resource is fetched with its foreign key
+        for separator in (':', '_'):
+            parent_res = rule.target_field.split(separator, 1)[0]
+            foreign_key = attributes.RESOURCE_FOREIGN_KEYS.get(
+                '%ss' % parent_res)
+            if foreign_key:
+                target_keys.add(foreign_key)
+    elif isinstance(rule, FieldCheck):
+        target_keys.add(rule.field)
+    elif isinstance(rule, policy.GenericCheck):
+        target_keys.update(re.findall(r'%\(([^)]+)\)s', rule.match))
+    elif not isinstance(rule, (policy.TrueCheck, policy.FalseCheck)):
+        target_keys.add(None)
+    return rule
+
+
+def _get_compiled_rule(action):
+    """Return the compiled rule of a read action and its target keys.
+
+    Compiled rules are discarded when the policy rules are replaced.
+    """
+    global _COMPILED_RULES_SOURCE
+    if _COMPILED_RULES_SOURCE is not policy._rules:
+        _COMPILED_RULES.clear()
+        _COMPILED_RULES_SOURCE = policy._rules
+    if action not in _COMPILED_RULES:
+        target_keys = set()
+        func = _compile_rule(policy.RuleCheck('rule', action), target_keys)
+        _COMPILED_RULES[action] = (
+            func, None if None in target_keys else tuple(target_keys))
+    return _COMPILED_RULES[action]
+
+
+def check_bulk(context, action, targets, might_not_exist=False):
+    """Verifies that a read action is valid on each of a list of targets.
+
+    Equivalent to calling check for each target, but the rule is compiled
+    once and targets with the same values for the keys the rule depends
+    on share a single evaluation.
+
+    :param context: neutron context
+    :param action: string representing a read action, e.g. get_port or
+        get_port:binding:host_id
+    :param targets: list of dictionaries representing the objects of the
+        action
+    :param might_not_exist: If True the policy check is skipped if the
+        specified policy does not exist.
+
+    :return: Returns a list with True for each target on which access is
+        permitted and False otherwise.
+    """
+    if might_not_exist and not (policy._rules and action in policy._rules):
+        return [True] * len(targets)
+    if not policy._rules or get_resource_and_action(action)[1]:
+        # Attribute checks of write actions depend on the whole target
+        return [check(context, action, target) for target in targets]
+    func, target_keys = _get_compiled_rule(action)
+    credentials = context.to_dict()
+    results = []
+    cache = {}
+    for target in targets:
+        if target_keys is None:
+            results.append(bool(func(target, credentials)))
+            continue
+        key = tuple(target.get(k) for k in target_keys)
+        try:
+            result = cache.get(key)
+        except TypeError:
+            # Unhashable values, e.g. lists
+            results.append(bool(func(target, credentials)))
+            continue
+        if result is None:
+            result = cache[key] = bool(func(target, credentials))
+        results.append(result)
+    return results
+
+
 def enforce(context, action, target, plugin=None):
     """Verifies that the action is valid on the target in this context.
 
@@ -52,6 +52,24 @@ quota_opts = [
     cfg.StrOpt('quota_driver',
                default=QUOTA_DB_DRIVER,
                help=_('Default driver to use for quota checks')),
+    cfg.IntOpt('reservation_expiration',
+               default=120,
+               help=_('Number of seconds the resources reserved by a '
+                      'request are accounted for by quota drivers '
+                      'tracking usages, if the request does not release '
+                      'them.')),
+    cfg.IntOpt('usage_resync_interval',
+               default=3600,
+               help=_('Number of seconds after which quota drivers '
+                      'tracking usages count the resources of a tenant '
+                      'again. A negative value means usages are only '
+                      'counted again when they are marked dirty.')),
+    cfg.IntOpt('limit_cache_ttl',
+               default=0,
+               help=_('Number of seconds the quota limits of a tenant are '
+                      'cached by each API worker of the database quota '
+                      'drivers. Workers are notified of limit updates. 0 '
+                      'disables the cache.')),
 ]
 # Register the configuration options
 cfg.CONF.register_opts(quota_opts, 'QUOTAS')
@@ -297,6 +315,40 @@ class QuotaEngine(object):
         return self.get_driver().limit_check(context, tenant_id,
                                              self._resources, values)
 
+    def make_reservation(self, context, tenant_id, resource, delta, plugin,
+                         collection):
+        """Check the quota of a tenant before creating resources.
+
+        If the driver tracks the usage of the resource, the resources are
+        reserved for the tenant and the reservation is returned. It must
+        be released once the resources are created or failed to. Otherwise
+        the resources of the tenant are counted with the plugin, and None
+        is returned.
+
+        This method will raise a QuotaResourceUnknown exception if the
+        resource is unknown, and an OverQuota exception if creating delta
+        resources would put the tenant over its quota.
+
+        :param context: The request context, for access checks.
+        :param tenant_id: The tenant_id to check the quota.
+        :param resource: The name of the resource, as a string.
+        :param delta: The number of resources about to be created.
+        :param plugin: The plugin the resources are counted with.
+        :param collection: The collection name of the resource.
+        """
+        driver = self.get_driver()
+        is_tracked = getattr(driver, 'is_tracked', None)
+        if resource in self._resources and is_tracked and is_tracked(resource):
+            return driver.make_reservation(context, tenant_id,
+                                           self._resources, resource, delta)
+        count = self.count(context, resource, plugin, collection, tenant_id)
+        self.limit_check(context, tenant_id, **{resource: count + delta})
+
+    def release_reservation(self, context, reservation):
+        """Release a reservation returned by make_reservation."""
+        if reservation:
+            self.get_driver().release_reservation(context, reservation)
+
     @property
     def resources(self):
         return self._resources
@@ -19,10 +19,13 @@ import os
 import random
 
 from oslo.config import cfg
+from oslo.messaging import opts as messaging_opts
 from oslo.messaging import server as rpc_server
 
 from neutron.common import config
+from neutron.common import exceptions
 from neutron.common import rpc as n_rpc
+from neutron.common import topics
 from neutron import context
 from neutron.db import api as session
 from neutron import manager
@@ -44,6 +47,23 @@ service_opts = [
     cfg.IntOpt('rpc_workers',
                default=0,
                help=_('Number of RPC worker processes for service')),
+    cfg.DictOpt('rpc_worker_pools',
+                default={},
+                help=_('Number of RPC worker processes dedicated to groups '
+                       'of calls of the agents, e.g. reports:1,devices:4. '
+                       'The groups are reports, devices, security_groups '
+                       'and sync. The other groups are served by the '
+                       'rpc_workers')),
+    cfg.DictOpt('rpc_worker_pool_sizes',
+                default={},
+                help=_('Number of greenthreads of the dedicated RPC worker '
+                       'processes of groups, e.g. reports:16, defaults to '
+                       'rpc_thread_pool_size')),
+    cfg.IntOpt('rpc_metrics_interval',
+               default=60,
+               help=_('Seconds between two logs of the number, duration '
+                      'and concurrency of the calls served by each RPC '
+                      'worker. 0 disables them')),
     cfg.IntOpt('periodic_fuzzy_delay',
                default=5,
                help=_('Range of seconds to randomly delay when starting the '
@@ -109,17 +129,60 @@ def serve_wsgi(cls):
 
 
 class RpcWorker(object):
-    """Wraps a worker to be handled by ProcessLauncher"""
-    def __init__(self, plugin):
+    """Wraps a worker to be handled by ProcessLauncher
+
+    A worker of the default pool consumes the plugin topics and the topics
+    of the groups of calls without dedicated workers. A worker of the pool
+    dedicated to a group only consumes the topic of the group.
+    """
+    def __init__(self, plugin, groups=(), pool=None, thread_pool_size=None):
         self._plugin = plugin
+        self._groups = groups
+        self._pool = pool
+        self._thread_pool_size = thread_pool_size
         self._servers = []
+        self._metrics = None
+        self._metrics_timer = None
+
+    def _set_thread_pool_size(self):
+        # NOTE: the executor of the RPC servers registers this option when
+        # it is created, and sizes its greenthread pool with it
+        for opt in dict(messaging_opts.list_opts())[None]:
+            if opt.dest == 'rpc_thread_pool_size':
+                cfg.CONF.register_opt(opt)
+        cfg.CONF.set_override('rpc_thread_pool_size', self._thread_pool_size)
+
+    def _log_metrics(self):
+        metrics = self._metrics
+        LOG.info(_('RPC worker pool %(pool)s: %(calls)d calls, '
+                   '%(in_progress)d in progress, average duration '
+                   '%(average).3fs, maximum duration %(max).3fs'),
+                 {'pool': self._pool or 'default',
+                  'calls': metrics.calls,
+                  'in_progress': metrics.in_progress,
+                  'average': metrics.total_time / (metrics.calls or 1),
+                  'max': metrics.max_time})
+        metrics.reset()
 
     def start(self):
         # We may have just forked from parent process.  A quick disposal of the
         # existing sql connections avoids producing errors later when they are
         # discovered to be broken.
         session.get_engine().pool.dispose()
-        self._servers = self._plugin.start_rpc_listeners()
+        if self._thread_pool_size:
+            self._set_thread_pool_size()
+        if cfg.CONF.rpc_metrics_interval > 0:
+            self._metrics = n_rpc.measure_calls()
+            self._metrics_timer = loopingcall.FixedIntervalLoopingCall(
+                self._log_metrics)
+            self._metrics_timer.start(
+                interval=cfg.CONF.rpc_metrics_interval)
+        self._servers = []
+        if self._pool is None:
+            self._servers.extend(self._plugin.start_rpc_listeners())
+        if self._groups:
+            self._servers.extend(
+                self._plugin.start_rpc_group_listeners(self._groups))
 
     def wait(self):
         for server in self._servers:
@@ -127,12 +190,28 @@ class RpcWorker(object):
                 server.wait()
 
     def stop(self):
+        if self._metrics_timer:
+            self._metrics_timer.stop()
+            self._metrics_timer = None
         for server in self._servers:
             if isinstance(server, rpc_server.MessageHandlingServer):
                 server.kill()
             self._servers = []
 
 
+def _get_rpc_group_values(opt_name):
+    values = {}
+    for group, value in getattr(cfg.CONF, opt_name).iteritems():
+        try:
+            values[group] = int(value)
+        except ValueError:
+            values[group] = -1
+        if group not in topics.RPC_GROUPS or values[group] < 0:
+            raise exceptions.InvalidConfigurationOption(
+                opt_name=opt_name, opt_value='%s:%s' % (group, value))
+    return values
+
+
 def serve_rpc():
     plugin = manager.NeutronManager.get_plugin()
 
@@ -148,15 +227,38 @@ def serve_rpc():
             LOG.error(msg, cfg.CONF.rpc_workers)
         raise NotImplementedError()
 
+    pools = {}
+    shared_groups = ()
+    if plugin.rpc_groups_supported():
+        pools = dict((group, workers) for group, workers in
+                     _get_rpc_group_values('rpc_worker_pools').iteritems()
+                     if workers)
+        shared_groups = [group for group in topics.RPC_GROUPS
+                         if group not in pools]
+    elif cfg.CONF.rpc_worker_pools:
+        LOG.error(_("'rpc_worker_pools' ignored because "
+                    "start_rpc_group_listeners is not implemented."))
+    pool_sizes = _get_rpc_group_values('rpc_worker_pool_sizes')
+
     try:
-        rpc = RpcWorker(plugin)
+        rpc = RpcWorker(plugin, shared_groups)
 
-        if cfg.CONF.rpc_workers < 1:
+        if cfg.CONF.rpc_workers < 1 and not pools:
             rpc.start()
             return rpc
         else:
             launcher = common_service.ProcessLauncher(wait_interval=1.0)
-            launcher.launch_service(rpc, workers=cfg.CONF.rpc_workers)
+            for group, workers in pools.iteritems():
+                launcher.launch_service(
+                    RpcWorker(plugin, [group], pool=group,
+                              thread_pool_size=pool_sizes.get(group)),
+                    workers=workers)
+            if cfg.CONF.rpc_workers < 1:
+                # The dedicated workers are forked before the listeners of
+                # the parent process are started
+                rpc.start()
+            else:
+                launcher.launch_service(rpc, workers=cfg.CONF.rpc_workers)
             return launcher
     except Exception:
         with excutils.save_and_reraise_exception():
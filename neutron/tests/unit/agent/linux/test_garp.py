@@ -0,0 +1,74 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from neutron.agent.linux import garp
+from neutron.tests import base
+
+
+class TestGratuitousArpService(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestGratuitousArpService, self).setUp()
+        self.spawn_n = mock.patch.object(garp.eventlet, 'spawn_n').start()
+        self.sleep = mock.patch.object(garp.eventlet, 'sleep').start()
+        self.send = mock.Mock()
+        self.service = garp.GratuitousArpService(
+            self.send, senders_per_namespace=2, interface_interval=0.5)
+
+    def _run_senders(self):
+        for call in self.spawn_n.call_args_list:
+            call[0][0](*call[0][1:])
+
+    def test_add_deduplicates_queued_requests(self):
+        self.service.add('ns1', 'qg-1', '1.1.1.1', False)
+        self.service.add('ns1', 'qg-1', '1.1.1.1', False)
+        self.service.add('ns1', 'qg-1', '1.1.1.2', False)
+
+        self.assertEqual(2, self.service.pending('ns1'))
+        self.assertEqual(1, self.service.deduplicated)
+
+    def test_senders_per_namespace_are_bounded(self):
+        for i in range(5):
+            self.service.add('ns1', 'qg-1', '1.1.1.%d' % i)
+        self.service.add('ns2', 'qg-2', '2.2.2.2')
+
+        self.assertEqual(3, self.spawn_n.call_count)
+        self._run_senders()
+        self.assertEqual(6, self.send.call_count)
+        self.assertEqual(0, self.service.pending())
+        self.send.assert_any_call('ns1', 'qg-1', '1.1.1.0')
+        self.send.assert_any_call('ns2', 'qg-2', '2.2.2.2')
+
+    def test_sends_on_same_interface_are_rate_limited(self):
+        with mock.patch('time.time', return_value=100.0):
+            self.service.add('ns1', 'qg-1', '1.1.1.1')
+            self.service.add('ns1', 'qg-1', '1.1.1.2')
+            self.service.add('ns1', 'qr-1', '10.0.0.1')
+            self.service.add('ns1', 'qg-1', '1.1.1.3')
+            self._run_senders()
+
+        self.assertEqual([mock.call(0.5), mock.call(1.0)],
+                         self.sleep.call_args_list)
+
+    def test_send_failure_does_not_stop_sender(self):
+        self.send.side_effect = [RuntimeError(), None]
+        self.service.add('ns1', 'qg-1', '1.1.1.1')
+        self.service.add('ns1', 'qg-1', '1.1.1.2')
+        self._run_senders()
+
+        self.assertEqual(2, self.send.call_count)
+        self.assertEqual(1, self.service.sent)
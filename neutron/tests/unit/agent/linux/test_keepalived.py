@@ -12,6 +12,8 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import mock
+
 from neutron.agent.linux import keepalived
 from neutron.tests import base
 
@@ -239,3 +241,57 @@ class KeepalivedVirtualRouteTestCase(base.BaseTestCase):
     def test_virtual_route_without_dev(self):
         route = keepalived.KeepalivedVirtualRoute('50.0.0.0/8', '1.2.3.4')
         self.assertEqual('50.0.0.0/8 via 1.2.3.4', route.build_config())
+
+
+class KeepalivedManagerTestCase(base.BaseTestCase,
+                                KeepalivedConfBaseMixin):
+    def setUp(self):
+        super(KeepalivedManagerTestCase, self).setUp()
+        self.replace_file = mock.patch.object(
+            keepalived.utils, 'replace_file').start()
+        mock.patch.object(keepalived.os, 'makedirs').start()
+        self.process_cls = mock.patch.object(
+            keepalived.external_process, 'ProcessManager').start()
+        self.process = self.process_cls.return_value
+        self.process.active = True
+        self.manager = keepalived.KeepalivedManager(
+            'router1', self._get_config(), conf_path='/tmp/ha')
+
+    def test_restart_skips_unchanged_config(self):
+        self.manager.spawn_or_restart()
+        self.manager.spawn_or_restart()
+
+        self.assertEqual(1, self.replace_file.call_count)
+        self.assertFalse(self.process.reload_cfg.called)
+        self.assertEqual(1, self.manager.get_reload_stats()['skipped'])
+
+    def test_restart_reloads_changed_config(self):
+        self.manager.spawn_or_restart()
+        instance = self.manager.config.get_instance(1)
+        instance.virtual_routes.append(
+            keepalived.KeepalivedVirtualRoute('10.0.0.0/8', '192.168.1.2'))
+        self.manager.spawn_or_restart()
+
+        self.assertEqual(2, self.replace_file.call_count)
+        self.process.reload_cfg.assert_called_once_with()
+        self.assertFalse(self.process.disable.called)
+        stats = self.manager.get_reload_stats()
+        self.assertEqual(1, stats['count'])
+        self.assertEqual(0, stats['skipped'])
+
+    def test_restart_respawns_dead_process(self):
+        self.manager.spawn_or_restart()
+        self.process.active = False
+        self.manager.spawn_or_restart()
+
+        self.assertEqual(2, self.replace_file.call_count)
+        self.process.disable.assert_called_once_with()
+        self.assertEqual(2, self.process.enable.call_count)
+
+    def test_disable_resets_rendered_config(self):
+        self.manager.spawn_or_restart()
+        self.manager.disable()
+        self.manager.spawn_or_restart()
+
+        self.assertEqual(2, self.replace_file.call_count)
+        self.process.reload_cfg.assert_called_once_with()
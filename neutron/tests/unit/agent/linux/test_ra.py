@@ -0,0 +1,60 @@
+# Copyright 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from neutron.agent.linux import ra
+from neutron.common import constants
+from neutron.tests import base
+
+
+class TestEnableIpv6Ra(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestEnableIpv6Ra, self).setUp()
+        mock.patch.object(ra.utils, 'get_conf_file_name',
+                          return_value='/ra/router1.radvd.conf').start()
+        self.get_value = mock.patch.object(
+            ra.utils, 'get_value_from_conf_file').start()
+        self.replace_file = mock.patch.object(ra.utils,
+                                              'replace_file').start()
+        process_cls = mock.patch.object(ra.external_process,
+                                        'ProcessManager').start()
+        self.process = process_cls.return_value
+        self.ports = [{'id': 'port1',
+                       'subnet': {'cidr': 'fd00::/64',
+                                  'ipv6_ra_mode': constants.IPV6_SLAAC}}]
+
+    def _enable_ipv6_ra(self):
+        ra.enable_ipv6_ra('router1', 'qrouter-router1', self.ports,
+                          lambda port_id: 'qr-' + port_id, 'sudo')
+
+    def test_enable_ipv6_ra_writes_new_config(self):
+        self.get_value.return_value = None
+        self._enable_ipv6_ra()
+
+        conf_str = self.replace_file.call_args[0][1]
+        self.assertIn('interface qr-port1', conf_str)
+        self.assertIn('prefix fd00::/64', conf_str)
+        self.process.enable.assert_called_once_with(mock.ANY, True)
+
+    def test_enable_ipv6_ra_unchanged_config(self):
+        self.get_value.return_value = ra._render_radvd_conf(
+            self.ports, lambda port_id: 'qr-' + port_id)
+        self._enable_ipv6_ra()
+
+        self.assertFalse(self.replace_file.called)
+        # radvd is still spawned if it is not running, but not reloaded
+        self.process.enable.assert_called_once_with(mock.ANY, False)
@@ -153,3 +153,36 @@ class TestDhcpAgentNotifyAPI(base.BaseTestCase):
     def test__cast_message(self):
         self.notifier._cast_message(mock.ANY, mock.ANY, mock.ANY)
         self.assertEqual(1, self.mock_cast.call_count)
+
+    def test_notify_bulk_ports_per_network(self):
+        ports = [{'port': {'id': 'p1', 'network_id': 'n1'}},
+                 {'port': {'id': 'p2', 'network_id': 'n2'}},
+                 {'port': {'id': 'p3', 'network_id': 'n1'}}]
+        with mock.patch.object(self.notifier, '_notify_agents_bulk') as n:
+            self.notifier.notify_bulk(mock.ANY, ports, 'port.create.end')
+        n.assert_has_calls([
+            mock.call(mock.ANY, 'port_create_end', [ports[0], ports[2]], 'n1'),
+            mock.call(mock.ANY, 'port_create_end', [ports[1]], 'n2')])
+
+    def test_notify_bulk_networks_one_by_one(self):
+        networks = [{'network': {'id': 'n1'}}, {'network': {'id': 'n2'}}]
+        with mock.patch.object(self.notifier, 'notify') as notify:
+            self.notifier.notify_bulk(mock.ANY, networks,
+                                      'network.create.end')
+        self.assertEqual(2, notify.call_count)
+
+    def test__notify_agents_bulk_schedules_once(self):
+        with mock.patch.object(self.notifier, '_schedule_network') as f:
+            with mock.patch.object(self.notifier, '_get_enabled_agents') as g:
+                agent = agents_db.Agent()
+                agent.admin_state_up = True
+                agent.heartbeat_timestamp = timeutils.utcnow()
+                g.return_value = [agent]
+                payloads = [{'port': {}}, {'port': {}}]
+                self.notifier._notify_agents_bulk(
+                    mock.Mock(), 'port_create_end', payloads,
+                    'foo_network_id')
+                self.assertEqual(1, f.call_count)
+                self.assertEqual(
+                    1, self.notifier.plugin.get_network.call_count)
+                self.assertEqual(2, self.mock_cast.call_count)
@@ -0,0 +1,217 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from neutron.api.v2 import attributes
+from neutron import context
+from neutron.db import changelog_db
+from neutron.db import db_base_plugin_v2
+from neutron.extensions import changes
+from neutron.openstack.common import timeutils
+from neutron.tests.unit import testlib_api
+from neutron import wsgi
+
+
+class TestChangeLogDb(testlib_api.SqlTestCase):
+
+    def setUp(self):
+        super(TestChangeLogDb, self).setUp()
+        self.config(change_feed_poll_interval=0)
+        self.plugin = db_base_plugin_v2.NeutronDbPluginV2()
+        self.context = context.get_admin_context()
+        self.feed = changelog_db.ChangeFeed(3)
+
+    def _create_network(self, tenant_id='tenant'):
+        return self.plugin.create_network(self.context, {
+            'network': {'name': 'net', 'admin_state_up': True,
+                        'tenant_id': tenant_id, 'shared': False}})
+
+    def _create_port(self, network):
+        return self.plugin.create_port(self.context, {'port': {
+            'tenant_id': network['tenant_id'], 'name': '',
+            'network_id': network['id'], 'admin_state_up': True,
+            'device_id': '', 'device_owner': '',
+            'mac_address': attributes.ATTR_NOT_SPECIFIED,
+            'fixed_ips': attributes.ATTR_NOT_SPECIFIED}})
+
+    def _create_subnet(self, network):
+        return self.plugin.create_subnet(self.context, {'subnet': {
+            'tenant_id': network['tenant_id'], 'name': 'subnet',
+            'network_id': network['id'], 'cidr': '10.0.0.0/24',
+            'ip_version': 4, 'enable_dhcp': False,
+            'gateway_ip': attributes.ATTR_NOT_SPECIFIED,
+            'allocation_pools': attributes.ATTR_NOT_SPECIFIED,
+            'dns_nameservers': attributes.ATTR_NOT_SPECIFIED,
+            'host_routes': attributes.ATTR_NOT_SPECIFIED}})
+
+    def _log_change(self, id):
+        with self.context.session.begin():
+            self.context.session.add(changelog_db.ChangeLog(
+                id=id, resource='network', resource_id='net',
+                tenant_id='tenant', action='update',
+                created_at=timeutils.utcnow()))
+
+    def _get_actions(self, changes):
+        return [(change['resource'], change['resource_id'], change['action'])
+                for change in changes]
+
+    def test_changes_logged(self):
+        network = self._create_network()
+        self.plugin.update_network(self.context, network['id'],
+                                   {'network': {'name': 'new'}})
+        self.plugin.delete_network(self.context, network['id'])
+        changes = self.feed.get_changes(self.context, 0)
+        self.assertEqual([('network', network['id'], 'create'),
+                          ('network', network['id'], 'update'),
+                          ('network', network['id'], 'delete')],
+                         self._get_actions(changes))
+        self.assertEqual(changes[-1]['id'], self.feed.last_id)
+
+    def test_unchanged_update_not_logged(self):
+        network = self._create_network()
+        self.plugin.update_network(self.context, network['id'],
+                                   {'network': {'name': 'net'}})
+        changes = self.feed.get_changes(self.context, 0)
+        self.assertEqual([('network', network['id'], 'create')],
+                         self._get_actions(changes))
+
+    def test_get_changes_since(self):
+        network = self._create_network()
+        since = self.feed.get_changes(self.context, 0)[-1]['id']
+        self.assertEqual([], self.feed.get_changes(self.context, since))
+        port = self._create_port(network)
+        changes = self.feed.get_changes(self.context, since)
+        self.assertEqual([('port', port['id'], 'create')],
+                         self._get_actions(changes))
+
+    def test_get_changes_resource_filter(self):
+        network = self._create_network()
+        port = self._create_port(network)
+        changes = self.feed.get_changes(self.context, 0, ['port'])
+        self.assertEqual([('port', port['id'], 'create')],
+                         self._get_actions(changes))
+
+    def test_get_changes_tenant_filter(self):
+        self._create_network()
+        network = self._create_network('other')
+        ctx = context.Context('', 'other')
+        changes = self.feed.get_changes(ctx, 0)
+        self.assertEqual([('network', network['id'], 'create')],
+                         self._get_actions(changes))
+
+    def test_get_changes_limit(self):
+        for i in range(3):
+            self._create_network()
+        self.assertEqual(2, len(self.feed.get_changes(self.context, 0,
+                                                      limit=2)))
+
+    def test_get_changes_older_than_buffer(self):
+        networks = [self._create_network() for i in range(5)]
+        self.feed.refresh(self.context)
+        self.assertEqual(3, len(self.feed._ids))
+        changes = self.feed.get_changes(self.context, 0)
+        self.assertEqual([network['id'] for network in networks],
+                         [change['resource_id'] for change in changes])
+
+    def test_get_changes_expired(self):
+        for i in range(5):
+            self._create_network()
+        self.config(change_log_size=2)
+        self.feed._purged_at = 0
+        self.feed.refresh(self.context)
+        self.assertRaises(changelog_db.ChangesExpired,
+                          self.feed.get_changes, self.context, 0)
+        since = self.feed.last_id - 2
+        self.assertEqual(2, len(self.feed.get_changes(self.context, since)))
+
+    def test_port_delete_logged(self):
+        network = self._create_network()
+        port = self._create_port(network)
+        self.plugin.delete_port(self.context, port['id'])
+        changes = self.feed.get_changes(self.context, 0, ['port'])
+        self.assertEqual([('port', port['id'], 'create'),
+                          ('port', port['id'], 'delete')],
+                         self._get_actions(changes))
+        self.assertEqual('tenant', changes[-1]['tenant_id'])
+
+    def test_fixed_ips_change_logged(self):
+        network = self._create_network()
+        self._create_subnet(network)
+        port = self._create_port(network)
+        since = self.feed.get_changes(self.context, 0)[-1]['id']
+        self.plugin.update_port(self.context, port['id'],
+                                {'port': {'fixed_ips': []}})
+        changes = self.feed.get_changes(self.context, since)
+        self.assertEqual([('port', port['id'], 'update')],
+                         self._get_actions(changes))
+        self.assertEqual('tenant', changes[0]['tenant_id'])
+
+    def test_get_changes_waits_for_missing_change(self):
+        self._log_change(1)
+        self._log_change(3)
+        self.assertEqual([1], [change['id'] for change in
+                               self.feed.get_changes(self.context, 0)])
+        self.assertEqual(1, self.feed.last_id)
+        self._log_change(2)
+        self.assertEqual([2, 3], [change['id'] for change in
+                                  self.feed.get_changes(self.context, 1)])
+        self.assertEqual(3, self.feed.last_id)
+
+    def test_get_changes_missing_change_rolled_back(self):
+        self._log_change(1)
+        self._log_change(3)
+        self.assertEqual(1, len(self.feed.get_changes(self.context, 0)))
+        with mock.patch.object(changelog_db, 'GAP_TIMEOUT', -1):
+            self.assertEqual([3], [change['id'] for change in
+                                   self.feed.get_changes(self.context, 1)])
+
+
+class TestChangesController(testlib_api.SqlTestCase):
+
+    def setUp(self):
+        super(TestChangesController, self).setUp()
+        self.config(change_feed_poll_interval=0)
+        self.feed = changelog_db.ChangeFeed(10)
+        mock.patch.object(changelog_db, '_FEED', self.feed).start()
+        self.context = context.get_admin_context()
+        self.controller = changes.ChangesController()
+        with self.context.session.begin():
+            for i in range(1, 4):
+                self.context.session.add(changelog_db.ChangeLog(
+                    id=i, resource='network', resource_id='net%d' % i,
+                    tenant_id='tenant', action='create',
+                    created_at=timeutils.utcnow()))
+
+    def _index(self, query):
+        request = wsgi.Request.blank('/changes?' + query)
+        request.environ['neutron.context'] = self.context
+        return self.controller.index(request)
+
+    def test_index_last_change_id(self):
+        result = self._index('')
+        self.assertEqual({'changes': [], 'last_change_id': 3}, result)
+
+    def test_index_since(self):
+        result = self._index('since=1')
+        self.assertEqual([2, 3], [change['id'] for change in
+                                  result['changes']])
+        self.assertEqual(3, result['last_change_id'])
+
+    def test_index_truncated(self):
+        result = self._index('since=0&limit=2')
+        self.assertEqual([1, 2], [change['id'] for change in
+                                  result['changes']])
+        self.assertEqual(2, result['last_change_id'])
@@ -0,0 +1,207 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+
+import mock
+from oslo.config import cfg
+from oslo.db import exception as db_exc
+
+from neutron.common import exceptions as n_exc
+from neutron import context
+from neutron.db import db_base_plugin_v2
+from neutron.db import ip_allocator
+from neutron.db import models_v2
+from neutron.tests import base
+from neutron.tests.unit import testlib_api
+
+
+class TestFreeRanges(base.BaseTestCase):
+
+    def test_get_free_ranges(self):
+        pools = [(100, 120), (3, 10)]
+        allocated = [3, 78, 7, 110, 11, 4, 111, 120]
+        self.assertEqual([(5, 6), (8, 10), (100, 109), (112, 119)],
+                         ip_allocator.get_free_ranges(pools, allocated))
+
+    def test_get_free_ranges_all_allocated(self):
+        self.assertEqual([], ip_allocator.get_free_ranges([(1, 2)], [2, 1]))
+
+    def test_remove_from_ranges(self):
+        ranges = [(1, 1), (3, 7)]
+        self.assertEqual([(3, 7)], ip_allocator.remove_from_ranges(ranges, 1))
+        self.assertEqual([(1, 1), (3, 4), (6, 7)],
+                         ip_allocator.remove_from_ranges(ranges, 5))
+        self.assertEqual([(1, 1), (4, 7)],
+                         ip_allocator.remove_from_ranges(ranges, 3))
+
+    def test_pick_random(self):
+        ranges = [(1, 2), (10, 10)]
+        with mock.patch.object(ip_allocator.random, 'randrange',
+                               return_value=2) as randrange:
+            self.assertEqual(10, ip_allocator.pick_random(ranges))
+        randrange.assert_called_once_with(3)
+
+    def test_pick_random_empty(self):
+        self.assertIsNone(ip_allocator.pick_random([]))
+
+
+class TestRandomAllocator(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestRandomAllocator, self).setUp()
+        self.allocator = ip_allocator.RandomAllocator(
+            db_base_plugin_v2.NeutronDbPluginV2)
+        self.context = mock.MagicMock()
+        self.subnets = [{'id': 's1', 'network_id': 'n', 'cidr': '10.0.0.0/30'},
+                        {'id': 's2', 'network_id': 'n', 'cidr': '10.0.1.0/24'}]
+
+    def _generate_ip(self, pools, allocated=()):
+        def get_allocated(context, subnet_id, ips=None):
+            if ips is None:
+                return set(allocated)
+            return set(allocated) & ips
+
+        with contextlib.nested(
+            mock.patch.object(self.allocator, '_get_pools',
+                              side_effect=pools),
+            mock.patch.object(self.allocator, '_get_allocated',
+                              side_effect=get_allocated)
+        ) as (get_pools, self.get_allocated):
+            return self.allocator.generate_ip(self.context, self.subnets)
+
+    def test_generate_ip(self):
+        result = self._generate_ip([[(167772161, 167772161)]])
+        self.assertEqual({'ip_address': '10.0.0.1', 'subnet_id': 's1'},
+                         result)
+        self.context.session.begin_nested.assert_called_once_with()
+        allocation = self.context.session.add.call_args[0][0]
+        self.assertEqual('10.0.0.1', allocation.ip_address)
+        self.assertIsNone(allocation.port_id)
+
+    def test_generate_ip_checks_candidates_only(self):
+        self._generate_ip([[(167772161, 167772161)]])
+        self.get_allocated.assert_called_once_with(
+            self.context, 's1', set([167772161]))
+
+    def test_generate_ip_candidates_taken(self):
+        with mock.patch.object(ip_allocator.random, 'randrange',
+                               return_value=0):
+            result = self._generate_ip([[(167772161, 167772162)]],
+                                       allocated=[167772161])
+        self.assertEqual('10.0.0.2', result['ip_address'])
+        self.assertEqual(
+            [mock.call(self.context, 's1', set([167772161])),
+             mock.call(self.context, 's1')],
+            self.get_allocated.call_args_list)
+
+    def test_generate_ip_retries_concurrent_allocation(self):
+        self.context.session.flush.side_effect = [
+            db_exc.DBDuplicateEntry(), None]
+        with mock.patch.object(ip_allocator.random, 'randrange',
+                               return_value=0):
+            result = self._generate_ip([[(167772161, 167772162)]])
+        self.assertEqual('10.0.0.2', result['ip_address'])
+        self.assertEqual(2, self.context.session.flush.call_count)
+
+    def test_generate_ip_next_subnet(self):
+        result = self._generate_ip([[], [(167772417, 167772417)]])
+        self.assertEqual({'ip_address': '10.0.1.1', 'subnet_id': 's2'},
+                         result)
+
+    def test_generate_ip_exhausted(self):
+        cfg.CONF.set_override('ip_allocation_retries', 1)
+        self.context.session.flush.side_effect = db_exc.DBDuplicateEntry()
+        self.assertRaises(n_exc.IpAddressGenerationFailure,
+                          self._generate_ip,
+                          [[(167772161, 167772162)], []])
+
+    def test_allocate_specific_ip_reserves_address(self):
+        self.context.session.query.return_value.filter_by.return_value.\
+            scalar.return_value = 'n'
+        self.allocator.allocate_specific_ip(self.context, 's1', '10.0.0.2')
+        self.context.session.begin_nested.assert_called_once_with()
+        allocation = self.context.session.add.call_args[0][0]
+        self.assertEqual(('n', 's1', '10.0.0.2'),
+                         (allocation.network_id, allocation.subnet_id,
+                          allocation.ip_address))
+        self.assertIsNone(allocation.port_id)
+
+    def test_allocate_specific_ip_in_use(self):
+        self.context.session.flush.side_effect = db_exc.DBDuplicateEntry()
+        self.assertRaises(n_exc.IpAddressInUse,
+                          self.allocator.allocate_specific_ip,
+                          self.context, 's1', '10.0.0.2')
+
+    def test_store_ip_allocation_merges_reservation(self):
+        allocation = mock.Mock()
+        self.allocator.store_ip_allocation(self.context, allocation)
+        self.context.session.merge.assert_called_once_with(allocation)
+
+
+class TestRandomAllocatorDb(testlib_api.SqlTestCase):
+
+    def setUp(self):
+        super(TestRandomAllocatorDb, self).setUp()
+        self.allocator = ip_allocator.RandomAllocator(
+            db_base_plugin_v2.NeutronDbPluginV2)
+        self.context = context.get_admin_context()
+        self.subnet = {'id': 's1', 'network_id': 'n1',
+                       'cidr': '10.0.0.0/29'}
+        # The rows are flushed in the order of their foreign keys
+        for row in (models_v2.Network(id='n1', tenant_id='tenant',
+                                      name='net', status='ACTIVE',
+                                      admin_state_up=True, shared=False),
+                    models_v2.Subnet(id='s1', tenant_id='tenant',
+                                     network_id='n1', ip_version=4,
+                                     cidr='10.0.0.0/29', shared=False),
+                    models_v2.IPAllocationPool(subnet_id='s1',
+                                               first_ip='10.0.0.1',
+                                               last_ip='10.0.0.2'),
+                    models_v2.IPAllocation(network_id='n1', subnet_id='s1',
+                                           ip_address='10.0.0.1')):
+            with self.context.session.begin():
+                self.context.session.add(row)
+
+    def _get_ip_addresses(self):
+        return sorted(allocation.ip_address for allocation in
+                      self.context.session.query(models_v2.IPAllocation))
+
+    def test_generate_ip_retries_in_savepoint(self):
+        get_allocated = self.allocator._get_allocated
+
+        def get_allocated_concurrently(context, subnet_id, ips=None):
+            # 10.0.0.1 is allocated after its candidate was checked
+            if ips is not None:
+                return set()
+            return get_allocated(context, subnet_id)
+
+        with contextlib.nested(
+            mock.patch.object(ip_allocator.random, 'randrange',
+                              return_value=0),
+            mock.patch.object(self.allocator, '_get_allocated',
+                              side_effect=get_allocated_concurrently)):
+            with self.context.session.begin():
+                self.context.session.add(models_v2.Network(
+                    id='n2', tenant_id='tenant', name='outer',
+                    status='ACTIVE', admin_state_up=True, shared=False))
+                result = self.allocator.generate_ip(self.context,
+                                                    [self.subnet])
+
+        self.assertEqual({'ip_address': '10.0.0.2', 'subnet_id': 's1'},
+                         result)
+        self.assertEqual(['10.0.0.1', '10.0.0.2'], self._get_ip_addresses())
+        self.assertIsNotNone(self.context.session.query(
+            models_v2.Network).filter_by(id='n2').first())
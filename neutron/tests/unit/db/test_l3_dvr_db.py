@@ -21,6 +21,7 @@ from neutron import context
 from neutron.db import l3_dvr_db
 from neutron import manager
 from neutron.openstack.common import uuidutils
+from neutron.tests import base
 from neutron.tests.unit import testlib_api
 
 _uuid = uuidutils.generate_uuid
@@ -257,7 +258,7 @@ class L3DvrTestCase(testlib_api.SqlTestCase):
         mock_fip_clear = self._delete_floatingip_test_setup(floatingip)
         self.assertTrue(mock_fip_clear.called)
 
-    def _floatingip_on_port_test_setup(self, hostid):
+    def _floatingip_on_port_test_setup(self, hostid, host=None):
         router = {'id': 'foo_router_id', 'distributed': True}
         floatingip = {
             'id': _uuid(),
@@ -280,7 +281,8 @@ class L3DvrTestCase(testlib_api.SqlTestCase):
         self.mixin.get_fip_sync_interfaces = mock.Mock(
             return_value='fip_interface')
 
-        self.mixin._process_floating_ips(self.ctx, routers, [floatingip])
+        self.mixin._process_floating_ips(self.ctx, routers, [floatingip],
+                                         host=host)
         return (router, floatingip)
 
     def test_floatingip_on_port_no_host(self):
@@ -305,3 +307,122 @@ class L3DvrTestCase(testlib_api.SqlTestCase):
         self.assertIn(fip, router[l3_const.FLOATINGIP_KEY])
         self.assertIn('fip_interface',
             router[l3_const.FLOATINGIP_AGENT_INTF_KEY])
+
+    def test_floatingip_on_port_with_host_filter(self):
+        router, fip = self._floatingip_on_port_test_setup('host1',
+                                                          host='host1')
+
+        self.assertIn(fip, router[l3_const.FLOATINGIP_KEY])
+        self.assertIn('fip_interface',
+                      router[l3_const.FLOATINGIP_AGENT_INTF_KEY])
+
+    def test_floatingip_on_port_of_other_host_filtered(self):
+        router, fip = self._floatingip_on_port_test_setup('host1',
+                                                          host='host2')
+
+        self.assertFalse(self.mixin._get_agent_by_type_and_host.called)
+        self.assertFalse(self.mixin.get_fip_sync_interfaces.called)
+        self.assertNotIn(l3_const.FLOATINGIP_KEY, router)
+
+    def test_floatingips_agent_interfaces_fetched_once_per_host(self):
+        router = {'id': 'foo_router_id', 'distributed': True}
+        floatingips = [{'id': _uuid(), 'port_id': _uuid(),
+                        'router_id': 'foo_router_id', 'host': 'host1'}
+                       for i in range(3)]
+        self.mixin._get_agent_by_type_and_host = mock.Mock(
+            return_value={'id': _uuid()})
+        self.mixin.get_fip_sync_interfaces = mock.Mock(
+            return_value=['fip_interface'])
+        self.mixin.get_vm_port_hostid = mock.Mock()
+
+        self.mixin._process_floating_ips(
+            self.ctx, {'foo_router_id': router}, floatingips)
+
+        self.assertEqual(3, len(router[l3_const.FLOATINGIP_KEY]))
+        self.assertEqual(1, self.mixin.get_fip_sync_interfaces.call_count)
+        self.assertFalse(self.mixin.get_vm_port_hostid.called)
+
+    def test_dvr_sync_data_for_host_keeps_all_interfaces(self):
+        router = {'id': 'foo_router_id', 'distributed': True,
+                  'gw_port_id': None}
+        interfaces = [{'id': _uuid(), 'device_id': 'foo_router_id',
+                       'fixed_ips': [{'subnet_id': _uuid(),
+                                      'ip_address': '10.0.%d.1' % i}]}
+                      for i in range(2)]
+        self.mixin._get_router_info_list = mock.Mock(
+            return_value=([router], interfaces, []))
+        self.mixin.get_vm_ports_hostids = mock.Mock(return_value={})
+
+        routers = self.mixin.get_sync_data_for_host(self.ctx, 'host1')
+
+        # Including the subnets without any port bound to host1, which it
+        # routes the traffic of its own ports to
+        self.assertEqual(interfaces,
+                         routers[0][l3_const.INTERFACE_KEY])
+
+    def test_get_vm_ports_hostids(self):
+        ports = [{'id': 'port1', 'device_owner': 'compute:nova',
+                  'binding:host_id': 'host1'},
+                 {'id': 'port2', 'device_owner': 'network:router_gateway',
+                  'binding:host_id': 'host2'}]
+        with mock.patch.object(manager.NeutronManager, 'get_plugin') as gp:
+            plugin = gp.return_value
+            plugin.get_ports.return_value = ports
+            hostids = self.mixin.get_vm_ports_hostids(
+                self.ctx, ['port1', 'port2', None])
+
+        plugin.get_ports.assert_called_once_with(
+            self.ctx, filters={'id': ['port1', 'port2']})
+        self.assertEqual({'port1': 'host1', 'port2': None}, hostids)
+
+
+class ArpUpdateCoalescerTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(ArpUpdateCoalescerTestCase, self).setUp()
+        self.spawn_after = mock.patch.object(l3_dvr_db.eventlet,
+                                             'spawn_after').start()
+        # The updates are sent with a context of the flush greenthread
+        mock.patch.object(l3_dvr_db.n_context, 'get_admin_context',
+                          return_value='ctx').start()
+        self.flush = mock.Mock()
+        self.coalescer = l3_dvr_db.ArpUpdateCoalescer(0.5, self.flush)
+
+    def _arp_entry(self, ip_address, operation, subnet_id='subnet1'):
+        return {'ip_address': ip_address,
+                'mac_address': 'fa:16:3e:00:00:01',
+                'subnet_id': subnet_id,
+                'operation': operation}
+
+    def _run_flushes(self):
+        for call in self.spawn_after.call_args_list:
+            call[0][1](*call[0][2:])
+
+    def test_updates_of_a_router_are_sent_once(self):
+        self.coalescer.add('r1', self._arp_entry('10.0.0.3', 'add'))
+        self.coalescer.add('r1', self._arp_entry('10.0.0.4', 'add'))
+        self.coalescer.add('r2', self._arp_entry('10.0.1.3', 'add'))
+
+        self.assertEqual(2, self.spawn_after.call_count)
+        self._run_flushes()
+        self.flush.assert_has_calls([
+            mock.call('ctx', 'r1', [self._arp_entry('10.0.0.3', 'add'),
+                                    self._arp_entry('10.0.0.4', 'add')]),
+            mock.call('ctx', 'r2', [self._arp_entry('10.0.1.3', 'add')])])
+
+    def test_last_update_of_an_address_wins(self):
+        self.coalescer.add('r1', self._arp_entry('10.0.0.3', 'add'))
+        self.coalescer.add('r1', self._arp_entry('10.0.0.4', 'add'))
+        self.coalescer.add('r1', self._arp_entry('10.0.0.3', 'delete'))
+        self._run_flushes()
+
+        self.flush.assert_called_once_with(
+            'ctx', 'r1', [self._arp_entry('10.0.0.4', 'add'),
+                          self._arp_entry('10.0.0.3', 'delete')])
+
+    def test_new_window_after_flush(self):
+        self.coalescer.add('r1', self._arp_entry('10.0.0.3', 'add'))
+        self._run_flushes()
+        self.coalescer.add('r1', self._arp_entry('10.0.0.4', 'add'))
+
+        self.assertEqual(2, self.spawn_after.call_count)
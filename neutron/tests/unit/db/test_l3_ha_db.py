@@ -132,6 +132,23 @@ class L3HAGetSyncDataTestCase(L3HATestFramework):
         state = routers[0].get(constants.HA_ROUTER_STATE_KEY)
         self.assertEqual('active', state)
 
+    def test_update_routers_states(self):
+        router1 = self._create_router()
+        self._bind_router(router1.id)
+        router2 = self._create_router()
+        self._bind_router(router2.id)
+
+        self.plugin.update_routers_states(
+            self.admin_ctx, {router1.id: 'active', router2.id: 'standby'},
+            self.agent1['host'])
+
+        routers = self.plugin.get_ha_sync_data_for_host(self.admin_ctx,
+                                                        self.agent1['host'])
+        states = dict((r['id'], r[constants.HA_ROUTER_STATE_KEY])
+                      for r in routers)
+        self.assertEqual({router1.id: 'active', router2.id: 'standby'},
+                         states)
+
 
 class L3HATestCase(L3HATestFramework):
 
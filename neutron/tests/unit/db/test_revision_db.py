@@ -0,0 +1,149 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from testtools import matchers
+
+from neutron.api import api_common
+from neutron.api.v2 import attributes
+from neutron.common import constants
+from neutron import context
+from neutron.db import db_base_plugin_v2
+from neutron.db import l3_db
+from neutron.db import revision_db
+from neutron.tests.unit import testlib_api
+
+
+class FakePlugin(db_base_plugin_v2.NeutronDbPluginV2,
+                 l3_db.L3_NAT_db_mixin,
+                 revision_db.RevisionDbMixin):
+    """A fake plugin class exposing revision numbers."""
+
+
+class TestRevisionDb(testlib_api.SqlTestCase):
+
+    def setUp(self):
+        super(TestRevisionDb, self).setUp()
+        self.plugin = FakePlugin()
+        self.context = context.get_admin_context()
+        self.network = self.plugin.create_network(self.context, {
+            'network': {'name': 'net', 'admin_state_up': True,
+                        'tenant_id': 'tenant', 'shared': False}})
+
+    def _get_network(self):
+        return self.plugin.get_network(self.context, self.network['id'])
+
+    def _get_port(self, id):
+        return self.plugin.get_port(self.context, id)
+
+    def _create_subnet(self):
+        return self.plugin.create_subnet(self.context, {'subnet': {
+            'tenant_id': 'tenant', 'name': 'subnet',
+            'network_id': self.network['id'], 'cidr': '10.0.0.0/24',
+            'ip_version': 4, 'enable_dhcp': False,
+            'gateway_ip': attributes.ATTR_NOT_SPECIFIED,
+            'allocation_pools': attributes.ATTR_NOT_SPECIFIED,
+            'dns_nameservers': attributes.ATTR_NOT_SPECIFIED,
+            'host_routes': attributes.ATTR_NOT_SPECIFIED}})
+
+    def _create_port(self, device_id='', device_owner=''):
+        return self.plugin.create_port(self.context, {'port': {
+            'tenant_id': 'tenant', 'name': '',
+            'network_id': self.network['id'], 'admin_state_up': True,
+            'device_id': device_id, 'device_owner': device_owner,
+            'mac_address': attributes.ATTR_NOT_SPECIFIED,
+            'fixed_ips': attributes.ATTR_NOT_SPECIFIED}})
+
+    def test_new_resource_revision(self):
+        self.assertEqual(0, self._get_network()['revision_number'])
+
+    def test_update_bumps_revision(self):
+        self.plugin.update_network(self.context, self.network['id'],
+                                   {'network': {'name': 'new'}})
+        self.plugin.update_network(self.context, self.network['id'],
+                                   {'network': {'name': 'newer'}})
+        self.assertEqual(2, self._get_network()['revision_number'])
+
+    def test_unchanged_update_keeps_revision(self):
+        self.plugin.update_network(self.context, self.network['id'],
+                                   {'network': {'name': 'net'}})
+        self.assertEqual(0, self._get_network()['revision_number'])
+
+    def test_child_bumps_parent_revision(self):
+        self._create_subnet()
+        self.assertEqual(1, self._get_network()['revision_number'])
+
+    def test_fixed_ips_update_bumps_port_revision(self):
+        subnet = self._create_subnet()
+        port = self._create_port()
+        revision = self._get_port(port['id'])['revision_number']
+        self.plugin.update_port(self.context, port['id'], {
+            'port': {'fixed_ips': [{'subnet_id': subnet['id'],
+                                    'ip_address': '10.0.0.10'}]}})
+        self.assertThat(self._get_port(port['id'])['revision_number'],
+                        matchers.GreaterThan(revision))
+
+    def test_fixed_ips_removal_bumps_port_revision(self):
+        self._create_subnet()
+        port = self._create_port()
+        revision = self._get_port(port['id'])['revision_number']
+        self.plugin.update_port(self.context, port['id'],
+                                {'port': {'fixed_ips': []}})
+        self.assertThat(self._get_port(port['id'])['revision_number'],
+                        matchers.GreaterThan(revision))
+
+    def test_gateway_fixed_ips_update_bumps_router_revision(self):
+        subnet = self._create_subnet()
+        with self.context.session.begin():
+            router = l3_db.Router(tenant_id='tenant', name='router',
+                                  status='ACTIVE', admin_state_up=True)
+            self.context.session.add(router)
+        port = self._create_port(
+            device_id=router.id,
+            device_owner=constants.DEVICE_OWNER_ROUTER_GW)
+        with self.context.session.begin():
+            router.gw_port_id = port['id']
+        revision = self.plugin.get_router(
+            self.context, router.id)['revision_number']
+        self.plugin.update_port(self.context, port['id'], {
+            'port': {'fixed_ips': [{'subnet_id': subnet['id'],
+                                    'ip_address': '10.0.0.10'}]}})
+        self.assertThat(
+            self.plugin.get_router(self.context,
+                                   router.id)['revision_number'],
+            matchers.GreaterThan(revision))
+
+    def test_floatingip_status_update_changes_etag(self):
+        port = self._create_port()
+        with self.context.session.begin():
+            fip = l3_db.FloatingIP(
+                tenant_id='tenant', floating_ip_address='172.24.4.2',
+                floating_network_id=self.network['id'],
+                floating_port_id=port['id'],
+                status=constants.FLOATINGIP_STATUS_DOWN)
+            self.context.session.add(fip)
+
+        def get_etag():
+            # The session of self.context does not see query updates
+            fip_dict = self.plugin.get_floatingip(
+                context.get_admin_context(), fip.id)
+            return api_common.get_etag({'floatingip': fip_dict})
+
+        etag = get_etag()
+        self.plugin.update_floatingip_status(
+            self.context, fip.id, constants.FLOATINGIP_STATUS_DOWN)
+        self.assertEqual(etag, get_etag())
+        self.plugin.update_floatingip_status(
+            self.context, fip.id, constants.FLOATINGIP_STATUS_ACTIVE)
+        self.assertNotEqual(etag, get_etag())
@@ -0,0 +1,57 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from neutron.common import exceptions as n_exc
+from neutron.db import models_v2
+from neutron.db import sqlalchemyutils
+from neutron.tests import base
+
+
+class TestKeysetSorts(base.BaseTestCase):
+
+    def test_primary_key_appended(self):
+        self.assertEqual([('name', False), ('id', True)],
+                         sqlalchemyutils.get_keyset_sorts(
+                             models_v2.Port, [('name', False)]))
+
+    def test_no_sorts(self):
+        self.assertEqual([('id', True)],
+                         sqlalchemyutils.get_keyset_sorts(models_v2.Port,
+                                                          None))
+
+    def test_keys_after_primary_key_dropped(self):
+        self.assertEqual([('name', True), ('id', False)],
+                         sqlalchemyutils.get_keyset_sorts(
+                             models_v2.Port,
+                             [('name', True), ('id', False),
+                              ('status', True)]))
+
+    def test_composite_primary_key(self):
+        self.assertEqual([('subnet_id', True), ('address', True)],
+                         sqlalchemyutils.get_keyset_sorts(
+                             models_v2.DNSNameServer, [('subnet_id', True)]))
+
+    def test_get_sort_attr(self):
+        self.assertEqual(models_v2.Port.name,
+                         sqlalchemyutils.get_sort_attr(models_v2.Port,
+                                                       'name'))
+
+    def test_get_sort_attr_relationship(self):
+        self.assertRaises(n_exc.BadRequest, sqlalchemyutils.get_sort_attr,
+                          models_v2.Port, 'fixed_ips')
+
+    def test_get_sort_attr_invalid(self):
+        self.assertRaises(n_exc.BadRequest, sqlalchemyutils.get_sort_attr,
+                          models_v2.Port, 'foo')
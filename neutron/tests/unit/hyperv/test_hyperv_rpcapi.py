@@ -106,7 +106,7 @@ class rpcHyperVApiTestCase(base.BaseTestCase):
     def test_device_details(self):
         rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
         self._test_hyperv_neutron_api(
-            rpcapi, None,
+            rpcapi, topics.PLUGIN,
             'get_device_details', rpc_method='call',
             device='fake_device',
             agent_id='fake_agent_id',
@@ -115,7 +115,7 @@ class rpcHyperVApiTestCase(base.BaseTestCase):
     def test_devices_details_list(self):
         rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
         self._test_hyperv_neutron_api(
-            rpcapi, None,
+            rpcapi, topics.PLUGIN,
             'get_devices_details_list', rpc_method='call',
             devices=['fake_device1', 'fake_device2'],
             agent_id='fake_agent_id', host='fake_host',
@@ -124,7 +124,7 @@ class rpcHyperVApiTestCase(base.BaseTestCase):
     def test_update_device_down(self):
         rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
         self._test_hyperv_neutron_api(
-            rpcapi, None,
+            rpcapi, topics.PLUGIN,
             'update_device_down', rpc_method='call',
             device='fake_device',
             agent_id='fake_agent_id',
@@ -133,7 +133,7 @@ class rpcHyperVApiTestCase(base.BaseTestCase):
     def test_tunnel_sync(self):
         rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
         self._test_hyperv_neutron_api(
-            rpcapi, None,
+            rpcapi, topics.PLUGIN,
             'tunnel_sync', rpc_method='call',
             tunnel_ip='fake_tunnel_ip',
             tunnel_type=None)
@@ -289,16 +289,8 @@ class TestCiscoPortsV2(CiscoML2MechanismTestCase,
         self.assertEqual(status, expected_http)
 
     def test_create_ports_bulk_emulated_plugin_failure(self):
-        real_has_attr = hasattr
-
         #ensures the API chooses the emulation code path
-        def fakehasattr(item, attr):
-            if attr.endswith('__native_bulk_support'):
-                return False
-            return real_has_attr(item, attr)
-
-        with mock.patch('__builtin__.hasattr',
-                        new=fakehasattr):
+        with self._emulated_bulk():
             plugin_obj = manager.NeutronManager.get_plugin()
             orig = plugin_obj.create_port
             with mock.patch.object(plugin_obj,
@@ -334,9 +326,9 @@ class TestCiscoPortsV2(CiscoML2MechanismTestCase,
         ctx = context.get_admin_context()
         with self.network() as net:
             plugin_obj = manager.NeutronManager.get_plugin()
-            orig = plugin_obj.create_port
+            orig = plugin_obj._process_port_create
             with mock.patch.object(plugin_obj,
-                                   'create_port') as patched_plugin:
+                                   '_process_port_create') as patched_plugin:
 
                 def side_effect(*args, **kwargs):
                     return self._fail_second_call(patched_plugin, orig,
@@ -17,12 +17,15 @@ import contextlib
 import mock
 import testtools
 import uuid
+from sqlalchemy import event
 import webob
 
 from neutron.common import constants
 from neutron.common import exceptions as exc
+from neutron.common import topics
 from neutron.common import utils
 from neutron import context
+from neutron.db import api as db_api
 from neutron.db import db_base_plugin_v2 as base_plugin
 from neutron.extensions import external_net as external_net
 from neutron.extensions import l3agentscheduler
@@ -105,6 +108,24 @@ class TestMl2BulkToggleWithoutBulkless(Ml2PluginV2TestCase):
         self.assertFalse(self._skip_native_bulk)
 
 
+class TestMl2RpcGroupListeners(Ml2PluginV2TestCase):
+
+    def test_rpc_groups_supported(self):
+        plugin = manager.NeutronManager.get_plugin()
+        self.assertTrue(plugin.rpc_groups_supported())
+
+    def test_start_rpc_group_listeners(self):
+        plugin = manager.NeutronManager.get_plugin()
+        with mock.patch('neutron.common.rpc.create_connection') as create:
+            conn = create.return_value
+            servers = plugin.start_rpc_group_listeners(
+                [topics.RPC_GROUP_REPORTS, topics.RPC_GROUP_DEVICES])
+        self.assertEqual(conn.consume_in_threads.return_value, servers)
+        self.assertEqual(['q-plugin-reports', 'q-plugin-devices'],
+                         [call[0][0] for call in
+                          conn.create_consumer.call_args_list])
+
+
 class TestMl2BasicGet(test_plugin.TestBasicGet,
                       Ml2PluginV2TestCase):
     pass
@@ -215,6 +236,78 @@ class TestMl2PortsV2(test_plugin.TestPortsV2, Ml2PluginV2TestCase):
             # by the called method
             self.assertIsNone(l3plugin.disassociate_floatingips(ctx, port_id))
 
+    def test_create_ports_bulk_native_plugin_failure(self):
+        ctx = context.get_admin_context()
+        with self.network() as net:
+            plugin = manager.NeutronManager.get_plugin()
+            orig = plugin._process_port_create
+            with mock.patch.object(plugin,
+                                   '_process_port_create') as patched_plugin:
+
+                def side_effect(*args, **kwargs):
+                    return self._fail_second_call(patched_plugin, orig,
+                                                  *args, **kwargs)
+
+                patched_plugin.side_effect = side_effect
+                res = self._create_port_bulk(self.fmt, 2, net['network']['id'],
+                                             'test', True, context=ctx)
+                # We expect a 500 as we injected a fault in the plugin
+                self._validate_behavior_on_bulk_failure(
+                    res, 'ports', webob.exc.HTTPServerError.code)
+
+    def test_create_ports_bulk_calls_drivers_once(self):
+        with contextlib.nested(
+            self.network(),
+            mock.patch.object(mech_test.TestMechanismDriver,
+                              'create_port_bulk_precommit'),
+            mock.patch.object(mech_test.TestMechanismDriver,
+                              'create_port_bulk_postcommit'),
+            mock.patch.object(mech_test.TestMechanismDriver,
+                              'create_port_precommit')
+        ) as (net, bulk_precommit, bulk_postcommit, precommit):
+            res = self._create_port_bulk(self.fmt, 2, net['network']['id'],
+                                         'test', True)
+            self._validate_behavior_on_bulk_success(res, 'ports')
+            ports = self.deserialize(self.fmt, res)['ports']
+            self.assertEqual(2, len(set(p['mac_address'] for p in ports)))
+            self.assertEqual(1, bulk_precommit.call_count)
+            self.assertEqual(2, len(bulk_precommit.call_args[0][0]))
+            self.assertEqual(1, bulk_postcommit.call_count)
+            self.assertFalse(precommit.called)
+            for p in ports:
+                self._delete('ports', p['id'])
+
+    def test_create_ports_bulk_inserts_once(self):
+        statements = []
+
+        def before_execute(conn, cursor, statement, *args):
+            statements.append(statement.split('(')[0].strip())
+
+        engine = db_api.get_engine()
+        with self.subnet() as subnet:
+            event.listen(engine, 'before_cursor_execute', before_execute)
+            try:
+                res = self._create_port_bulk(
+                    self.fmt, 2, subnet['subnet']['network_id'], 'test', True)
+            finally:
+                event.remove(engine, 'before_cursor_execute', before_execute)
+            self._validate_behavior_on_bulk_success(res, 'ports')
+            self.assertEqual(1, statements.count('INSERT INTO ports'))
+            self.assertEqual(1, statements.count('INSERT INTO ipallocations'))
+            for p in self.deserialize(self.fmt, res)['ports']:
+                self._delete('ports', p['id'])
+
+    def test_create_ports_bulk_same_fixed_ip(self):
+        with self.subnet() as subnet:
+            fixed_ips = [{'subnet_id': subnet['subnet']['id'],
+                          'ip_address': '10.0.0.5'}]
+            res = self._create_port_bulk(
+                self.fmt, 2, subnet['subnet']['network_id'], 'test', True,
+                override={0: {'fixed_ips': fixed_ips},
+                          1: {'fixed_ips': fixed_ips}})
+            self._validate_behavior_on_bulk_failure(
+                res, 'ports', webob.exc.HTTPConflict.code)
+
 
 class TestMl2DvrPortsV2(TestMl2PortsV2):
     def setUp(self):
@@ -260,6 +353,10 @@ class TestMl2DvrPortsV2(TestMl2PortsV2):
                 mock.call(self.context, ns_to_delete['agent_id'],
                           ns_to_delete['router_id'])
             ])
+            # The ARP entry is removed with the port deleted, once committed
+            arp_update = self.l3plugin.dvr_vmarp_table_update
+            arp_update.assert_called_once_with(self.context, mock.ANY, 'del')
+            self.assertEqual(port_id, arp_update.call_args[0][1]['id'])
 
     def test_delete_last_vm_port(self):
         self._test_delete_dvr_serviced_port(device_owner='compute:None')
@@ -67,17 +67,17 @@ class RpcCallbacksTestCase(base.BaseTestCase):
         }
         self._test_update_device_up(['router', 'dvr'], kwargs)
         self.l3plugin.dvr_vmarp_table_update.assert_called_once_with(
-            mock.ANY, mock.ANY, 'add')
+            mock.ANY, self.plugin._get_port.return_value, 'add')
 
     def test_update_device_up_with_dvr_when_port_not_found(self):
         kwargs = {
             'agent_id': 'foo_agent',
             'device': 'foo_device'
         }
-        self.l3plugin.dvr_vmarp_table_update.side_effect = (
+        self.plugin._get_port.side_effect = (
             exceptions.PortNotFound(port_id='foo_port_id'))
         self._test_update_device_up(['router', 'dvr'], kwargs)
-        self.assertTrue(self.l3plugin.dvr_vmarp_table_update.call_count)
+        self.assertFalse(self.l3plugin.dvr_vmarp_table_update.call_count)
 
     def test_get_device_details_without_port_context(self):
         self.plugin.get_bound_port_context.return_value = None
@@ -221,7 +221,7 @@ class RpcApiTestCase(base.BaseTestCase):
 
     def test_device_details(self):
         rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
-        self._test_rpc_api(rpcapi, None,
+        self._test_rpc_api(rpcapi, topics.PLUGIN,
                            'get_device_details', rpc_method='call',
                            device='fake_device',
                            agent_id='fake_agent_id',
@@ -229,7 +229,7 @@ class RpcApiTestCase(base.BaseTestCase):
 
     def test_devices_details_list(self):
         rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
-        self._test_rpc_api(rpcapi, None,
+        self._test_rpc_api(rpcapi, topics.PLUGIN,
                            'get_devices_details_list', rpc_method='call',
                            devices=['fake_device1', 'fake_device2'],
                            agent_id='fake_agent_id', host='fake_host',
@@ -237,7 +237,7 @@ class RpcApiTestCase(base.BaseTestCase):
 
     def test_update_device_down(self):
         rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
-        self._test_rpc_api(rpcapi, None,
+        self._test_rpc_api(rpcapi, topics.PLUGIN,
                            'update_device_down', rpc_method='call',
                            device='fake_device',
                            agent_id='fake_agent_id',
@@ -245,14 +245,14 @@ class RpcApiTestCase(base.BaseTestCase):
 
     def test_tunnel_sync(self):
         rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
-        self._test_rpc_api(rpcapi, None,
+        self._test_rpc_api(rpcapi, topics.PLUGIN,
                            'tunnel_sync', rpc_method='call',
                            tunnel_ip='fake_tunnel_ip',
                            tunnel_type=None)
 
     def test_update_device_up(self):
         rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
-        self._test_rpc_api(rpcapi, None,
+        self._test_rpc_api(rpcapi, topics.PLUGIN,
                            'update_device_up', rpc_method='call',
                            device='fake_device',
                            agent_id='fake_agent_id',
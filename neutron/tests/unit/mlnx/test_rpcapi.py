@@ -135,7 +135,7 @@ class rpcApiTestCase(base.BaseTestCase):
 
     def test_device_details(self):
         rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
-        self._test_mlnx_api(rpcapi, None,
+        self._test_mlnx_api(rpcapi, topics.PLUGIN,
                             'get_device_details', rpc_method='call',
                             device='fake_device',
                             agent_id='fake_agent_id',
@@ -143,7 +143,7 @@ class rpcApiTestCase(base.BaseTestCase):
 
     def test_devices_details_list(self):
         rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
-        self._test_mlnx_api(rpcapi, None,
+        self._test_mlnx_api(rpcapi, topics.PLUGIN,
                             'get_devices_details_list', rpc_method='call',
                             devices=['fake_device1', 'fake_device1'],
                             agent_id='fake_agent_id', host='fake_host',
@@ -151,7 +151,7 @@ class rpcApiTestCase(base.BaseTestCase):
 
     def test_update_device_down(self):
         rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
-        self._test_mlnx_api(rpcapi, None,
+        self._test_mlnx_api(rpcapi, topics.PLUGIN,
                             'update_device_down', rpc_method='call',
                             device='fake_device',
                             agent_id='fake_agent_id',
@@ -159,7 +159,7 @@ class rpcApiTestCase(base.BaseTestCase):
 
     def test_update_device_up(self):
         rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
-        self._test_mlnx_api(rpcapi, None,
+        self._test_mlnx_api(rpcapi, topics.PLUGIN,
                             'update_device_up', rpc_method='call',
                             device='fake_device',
                             agent_id='fake_agent_id',
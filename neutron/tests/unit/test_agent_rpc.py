@@ -17,6 +17,7 @@ import mock
 from oslo import messaging
 
 from neutron.agent import rpc
+from neutron.common import topics
 from neutron.openstack.common import context
 from neutron.tests import base
 
@@ -93,6 +94,33 @@ class AgentPluginReportState(base.BaseTestCase):
                                   str)
 
 
+class AgentRPCTopicGroups(base.BaseTestCase):
+    def test_get_plugin_topic(self):
+        self.assertEqual(topics.PLUGIN, rpc.get_plugin_topic(
+            topics.PLUGIN, topics.RPC_GROUP_REPORTS))
+
+    def test_get_plugin_topic_groups(self):
+        self.config(rpc_topic_groups=True)
+        self.assertEqual('q-plugin-reports', rpc.get_plugin_topic(
+            topics.PLUGIN, topics.RPC_GROUP_REPORTS))
+        self.assertEqual(topics.L3PLUGIN, rpc.get_plugin_topic(
+            topics.L3PLUGIN, topics.RPC_GROUP_REPORTS))
+
+    def test_plugin_api_devices_topic(self):
+        self.config(rpc_topic_groups=True)
+        agent = rpc.PluginApi(topics.PLUGIN)
+        ctxt = context.RequestContext('fake_user', 'fake_project')
+        with mock.patch('neutron.common.rpc.RpcProxy.call') as rpc_call:
+            agent.update_device_up(ctxt, 'fake_device', 'fake_agent_id')
+        self.assertEqual('q-plugin-devices',
+                         rpc_call.call_args[1]['topic'])
+
+    def test_report_state_topic(self):
+        self.config(rpc_topic_groups=True)
+        report_state_api = rpc.PluginReportStateAPI(topics.PLUGIN)
+        self.assertEqual('q-plugin-reports', report_state_api.topic)
+
+
 class AgentRPCMethods(base.BaseTestCase):
     def test_create_consumers(self):
         endpoints = [mock.Mock()]
@@ -92,3 +92,31 @@ class APICommonTestCase(base.BaseTestCase):
                           self.controller._prepare_request_body,
                           body,
                           params)
+
+
+class GetEtagTestCase(base.BaseTestCase):
+
+    def test_resource(self):
+        etag = common.get_etag({'port': {'id': 'a', 'revision_number': 1}})
+        self.assertEqual(etag, common.get_etag(
+            {'port': {'id': 'a', 'revision_number': 1}}))
+        self.assertNotEqual(etag, common.get_etag(
+            {'port': {'id': 'a', 'revision_number': 2}}))
+
+    def test_collection(self):
+        ports = [{'id': 'a', 'revision_number': 1},
+                 {'id': 'b', 'revision_number': 3}]
+        etag = common.get_etag({'ports': ports, 'ports_links': []})
+        self.assertEqual(etag, common.get_etag({'ports': ports}))
+        self.assertNotEqual(etag, common.get_etag({'ports': ports[:1]}))
+        self.assertNotEqual(etag, common.get_etag({'ports': ports[::-1]}))
+
+    def test_attributes_change_etag(self):
+        etag = common.get_etag({'port': {'id': 'a', 'revision_number': 1}})
+        self.assertNotEqual(etag, common.get_etag(
+            {'port': {'id': 'a', 'revision_number': 1, 'name': ''}}))
+
+    def test_no_revision(self):
+        self.assertIsNone(common.get_etag(
+            {'ports': [{'id': 'a', 'revision_number': 1}, {'id': 'b'}]}))
+        self.assertIsNone(common.get_etag(None))
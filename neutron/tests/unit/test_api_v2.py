@@ -561,6 +561,27 @@ class JSONV2TestCase(APIv2TestBase, testlib_api.WebTestCase):
         tenant_id = _uuid()
         self._test_list(tenant_id + "bad", tenant_id)
 
+    def test_list_strips_attributes_per_item(self):
+        tenant_id = _uuid()
+        networks = [{'id': _uuid(), 'name': 'net%d' % i, 'shared': True,
+                     'admin_state_up': True, 'status': 'ACTIVE',
+                     'tenant_id': tenant, 'subnets': []}
+                    for i, tenant in enumerate([tenant_id, _uuid()])]
+        instance = self.plugin.return_value
+        instance.get_networks.return_value = networks
+        policy.init()
+        common_policy._rules['get_network:name'] = common_policy.parse_rule(
+            "rule:admin_or_owner")
+        env = {'neutron.context': context.Context('', tenant_id)}
+        try:
+            res = self.api.get(_get_path('networks', fmt=self.fmt),
+                               extra_environ=env)
+        finally:
+            del common_policy._rules['get_network:name']
+        res = self.deserialize(res)
+        self.assertEqual('net0', res['networks'][0]['name'])
+        self.assertNotIn('name', res['networks'][1])
+
     def test_list_pagination(self):
         id1 = str(_uuid())
         id2 = str(_uuid())
@@ -1525,3 +1546,54 @@ class CreateResourceTestCase(base.BaseTestCase):
     def test_resource_creation(self):
         resource = v2_base.create_resource('fakes', 'fake', None, {})
         self.assertIsInstance(resource, webob.dec.wsgify)
+
+
+class PrepareRequestBodyTestCase(base.BaseTestCase):
+    def setUp(self):
+        super(PrepareRequestBodyTestCase, self).setUp()
+        self.context = context.Context('', 'tenant')
+        self.attr_info = {
+            'tenant_id': {'allow_post': True, 'allow_put': False},
+            'name': {'allow_post': True, 'allow_put': True,
+                     'validate': {'type:string': 10}},
+            'size': {'allow_post': True, 'allow_put': True, 'default': 1,
+                     'convert_to': attributes.convert_to_int},
+            'status': {'allow_post': False, 'allow_put': False}}
+
+    def _prepare(self, body, is_create=True, allow_bulk=False):
+        return v2_base.Controller.prepare_request_body(
+            self.context, body, is_create, 'fake', self.attr_info,
+            allow_bulk=allow_bulk)
+
+    def test_create_defaults_and_converts(self):
+        body = self._prepare({'fake': {'name': 'n', 'size': '2'}})
+        self.assertEqual({'tenant_id': 'tenant', 'name': 'n', 'size': 2},
+                         body['fake'])
+        body = self._prepare({'fake': {'name': 'n'}})
+        self.assertEqual(1, body['fake']['size'])
+
+    def test_create_bulk(self):
+        body = self._prepare({'fakes': [{'name': 'a'},
+                                        {'fake': {'name': 'b'}}]},
+                             allow_bulk=True)
+        self.assertEqual(['a', 'b'], [f['fake']['name']
+                                      for f in body['fakes']])
+
+    def test_create_errors(self):
+        for res_dict in [{}, {'name': 'n', 'status': 'UP'},
+                         {'name': 'n', 'unknown': 1},
+                         {'name': 'n' * 11}]:
+            self.assertRaises(webob.exc.HTTPBadRequest, self._prepare,
+                              {'fake': res_dict})
+
+    def test_update_read_only(self):
+        self._prepare({'fake': {'name': 'n'}}, is_create=False)
+        self.assertRaises(webob.exc.HTTPBadRequest, self._prepare,
+                          {'fake': {'status': 'UP'}}, is_create=False)
+
+    def test_attributes_added_to_map(self):
+        self._prepare({'fake': {'name': 'n'}})
+        self.attr_info['extra'] = {'allow_post': True, 'allow_put': True}
+        v2_base.reset_compiled_attr_info()
+        body = self._prepare({'fake': {'name': 'n', 'extra': 'x'}})
+        self.assertEqual('x', body['fake']['extra'])
@@ -343,6 +343,65 @@ class ResourceTestCase(base.BaseTestCase):
         res = resource.get('', extra_environ=environ)
         self.assertEqual(res.status_int, 200)
 
+    def test_index_streamed(self):
+        controller = mock.MagicMock()
+        controller.index = lambda request: {'foos': [{'id': 1}, {'id': 2}]}
+
+        resource = webtest.TestApp(wsgi_resource.Resource(controller))
+
+        environ = {'wsgiorg.routing_args': (None, {'action': 'index'})}
+        with mock.patch.object(wsgi.JSONDictSerializer, 'serialize',
+                               side_effect=AssertionError) as serialize:
+            res = resource.get('', extra_environ=environ)
+        self.assertEqual(res.status_int, 200)
+        self.assertFalse(serialize.called)
+        self.assertEqual({'foos': [{'id': 1}, {'id': 2}]}, res.json)
+
+    def test_index_xml_not_streamed(self):
+        controller = mock.MagicMock()
+        controller.index = lambda request: {'foos': [{'id': 1}]}
+
+        resource = webtest.TestApp(wsgi_resource.Resource(controller))
+
+        environ = {'wsgiorg.routing_args': (None, {'action': 'index',
+                                                   'format': 'xml'})}
+        res = resource.get('', extra_environ=environ)
+        self.assertEqual(res.status_int, 200)
+        self.assertIn('foos', res.body)
+
+    def test_show_etag(self):
+        controller = mock.MagicMock()
+        controller.show = lambda request, id: {
+            'foo': {'id': id, 'revision_number': 3}}
+
+        resource = webtest.TestApp(wsgi_resource.Resource(controller))
+
+        environ = {'wsgiorg.routing_args': (None, {'action': 'show',
+                                                   'id': 'x'})}
+        res = resource.get('', extra_environ=environ)
+        self.assertEqual(res.status_int, 200)
+        self.assertTrue(res.etag)
+
+        res = resource.get('', extra_environ=environ,
+                           headers={'If-None-Match': '"%s"' % res.etag})
+        self.assertEqual(res.status_int, 304)
+        self.assertEqual('', res.body)
+
+    def test_index_etag_changed(self):
+        controller = mock.MagicMock()
+        foos = [{'id': 1, 'revision_number': 1}]
+        controller.index = lambda request: {'foos': foos}
+
+        resource = webtest.TestApp(wsgi_resource.Resource(controller))
+
+        environ = {'wsgiorg.routing_args': (None, {'action': 'index'})}
+        etag = resource.get('', extra_environ=environ).etag
+        foos[0]['revision_number'] = 2
+        res = resource.get('', extra_environ=environ,
+                           headers={'If-None-Match': '"%s"' % etag})
+        self.assertEqual(res.status_int, 200)
+        self.assertNotEqual(etag, res.etag)
+
     def test_status_204(self):
         controller = mock.MagicMock()
         controller.test = lambda request: {'foo': 'bar'}
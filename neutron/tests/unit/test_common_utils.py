@@ -12,6 +12,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import multiprocessing
+
 import eventlet
 import mock
 import testtools
@@ -370,6 +372,12 @@ class TestDictUtils(base.BaseTestCase):
         dic = {"key1": "value1", "key2": "value2"}
         self.assertEqual(utils.str2dict(utils.dict2str(dic)), dic)
 
+    def test_get_dict_checksum_ignores_key_order(self):
+        self.assertEqual(utils.get_dict_checksum({'a': 1, 'b': [1, 2]}),
+                         utils.get_dict_checksum({'b': [1, 2], 'a': 1}))
+        self.assertNotEqual(utils.get_dict_checksum({'a': 1}),
+                            utils.get_dict_checksum({'a': 2}))
+
     def test_diff_list_of_dict(self):
         old_list = [{"key1": "value1"},
                     {"key2": "value2"},
@@ -543,3 +551,59 @@ class TestDvrServices(base.BaseTestCase):
 
     def test_is_dvr_serviced_with_vm_port(self):
         self._test_is_dvr_serviced('compute:', True)
+
+
+class TestLatencyHistogram(base.BaseTestCase):
+
+    def test_observe_buckets_are_cumulative(self):
+        histogram = utils.LatencyHistogram(buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(2.0)
+        stats = histogram.get_stats()
+        self.assertEqual(3, stats['count'])
+        self.assertEqual([(0.1, 1), (1.0, 2)], stats['buckets'])
+        self.assertEqual(2.0, stats['max'])
+
+    def test_time_observes_elapsed(self):
+        histogram = utils.LatencyHistogram()
+        with mock.patch.object(utils.time, 'time', side_effect=[10.0, 10.2]):
+            with histogram.time():
+                pass
+        self.assertEqual(1, histogram.count)
+        self.assertAlmostEqual(0.2, histogram.sum)
+
+    def test_empty_stats(self):
+        stats = utils.LatencyHistogram().get_stats()
+        self.assertEqual(0, stats['count'])
+        self.assertEqual(0.0, stats['avg'])
+
+
+class TestSharedLatencyHistogram(base.BaseTestCase):
+
+    def test_observe_buckets_are_cumulative(self):
+        histogram = utils.SharedLatencyHistogram(buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(2.0)
+        stats = histogram.get_stats()
+        self.assertEqual(3, stats['count'])
+        self.assertEqual([(0.1, 1), (1.0, 2)], stats['buckets'])
+        self.assertEqual(2.0, stats['max'])
+        self.assertAlmostEqual(2.55, stats['sum'])
+
+    def test_observations_of_forked_process(self):
+        histogram = utils.SharedLatencyHistogram()
+        process = multiprocessing.Process(target=histogram.observe,
+                                          args=(0.2,))
+        process.start()
+        process.join()
+        self.assertEqual(1, histogram.get_stats()['count'])
+        self.assertAlmostEqual(0.2, histogram.get_stats()['max'])
+
+    def test_reset(self):
+        histogram = utils.SharedLatencyHistogram()
+        histogram.observe(0.2)
+        histogram.reset()
+        self.assertEqual(utils.LatencyHistogram().get_stats(),
+                         histogram.get_stats())
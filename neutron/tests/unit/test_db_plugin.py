@@ -483,6 +483,25 @@ class NeutronDbPluginV2TestCase(testlib_api.WebTestCase,
         self.assertEqual(res.status_int, webob.exc.HTTPOk.code)
         return self.deserialize(fmt, res)
 
+    @contextlib.contextmanager
+    def _emulated_bulk(self):
+        """Make the API emulate the bulk requests with the plugin.
+
+        The API checks for native bulk support when it is built, so it is
+        built again with the support of the plugin hidden.
+        """
+        plugin = manager.NeutronManager.get_plugin()
+        native_bulk_attr_name = ("_%s__native_bulk_support"
+                                 % plugin.__class__.__name__)
+        api = self.api
+        with mock.patch.object(plugin, native_bulk_attr_name, False,
+                               create=True):
+            self.api = router.APIRouter()
+        try:
+            yield
+        finally:
+            self.api = api
+
     def _fail_second_call(self, patched_plugin, orig, *args, **kwargs):
         """Invoked by test cases for injecting failures in plugin."""
         def second_call(*args, **kwargs):
@@ -872,16 +891,9 @@ class TestPortsV2(NeutronDbPluginV2TestCase):
             self.assertEqual(len(ports['ports']), 0)
 
     def test_create_ports_bulk_emulated_plugin_failure(self):
-        real_has_attr = hasattr
-
-        #ensures the API choose the emulation code path
-        def fakehasattr(item, attr):
-            if attr.endswith('__native_bulk_support'):
-                return False
-            return real_has_attr(item, attr)
-
-        with mock.patch('__builtin__.hasattr',
-                        new=fakehasattr):
+        # Plugins with a native bulk create_port_bulk do not call
+        # create_port, ensure the API chooses the emulation code path
+        with self._emulated_bulk():
             orig = manager.NeutronManager.get_plugin().create_port
             with mock.patch.object(manager.NeutronManager.get_plugin(),
                                    'create_port') as patched_plugin:
@@ -1700,9 +1712,14 @@ fixed_ips=ip_address%%3D%s&fixed_ips=ip_address%%3D%s&fixed_ips=subnet_id%%3D%s
                     self.assertRaises(n_exc.NeutronException,
                                       plugin.delete_ports_by_device_id,
                                       ctx, 'owner1', network_id)
-                self._show('ports', p1['port']['id'],
+                # The ports of the device are deleted in no specific order
+                deleted_id, kept_id = [call[0][1] for call in
+                                       del_port.call_args_list]
+                self.assertEqual(set([p1['port']['id'], p2['port']['id']]),
+                                 set([deleted_id, kept_id]))
+                self._show('ports', deleted_id,
                            expected_code=webob.exc.HTTPNotFound.code)
-                self._show('ports', p2['port']['id'],
+                self._show('ports', kept_id,
                            expected_code=webob.exc.HTTPOk.code)
                 self._show('ports', p3['port']['id'],
                            expected_code=webob.exc.HTTPOk.code)
@@ -3880,7 +3897,7 @@ class DbModelTestCase(base.BaseTestCase):
         actual_repr_output = repr(network)
         exp_start_with = "<neutron.db.models_v2.Network"
         exp_middle = "[object at %x]" % id(network)
-        exp_end_with = (" {tenant_id=None, id=None, "
+        exp_end_with = (" {tenant_id=None, id=None, revision_number=None, "
                         "name='net_net', status='OK', "
                         "admin_state_up=True, shared=None}>")
         final_exp = exp_start_with + exp_middle + exp_end_with
@@ -3962,6 +3979,90 @@ class TestNeutronDbPluginV2(base.BaseTestCase):
                           ['b', '192.168.1.100', '192.168.1.109'],
                           ['b', '192.168.1.112', '192.168.1.120']], actual)
 
+    def test_rebuild_availability_ranges_ipv6(self):
+        pools = [{'id': 'a',
+                  'first_ip': 'fd00::2',
+                  'last_ip': 'fd00::ffff:ffff:ffff:fffe'}]
+        allocations = [{'ip_address': 'fd00::2'},
+                       {'ip_address': 'fd00::1:0'}]
+
+        qry = mock.Mock()
+        qry.options.return_value = qry
+        qry.with_lockmode.return_value = qry
+        qry.filter_by.side_effect = [allocations, pools]
+        context = mock.Mock()
+        context.session.query.return_value = qry
+
+        db_base_plugin_v2.NeutronDbPluginV2._rebuild_availability_ranges(
+            context, [mock.MagicMock()])
+
+        actual = [[args[0].first_ip, args[0].last_ip]
+                  for _name, args, _kwargs in context.session.add.mock_calls]
+        self.assertEqual([['fd00::3', 'fd00::ffff'],
+                          ['fd00::1:1', 'fd00::ffff:ffff:ffff:fffe']], actual)
+
+    def test_generate_macs_retries_macs_in_use(self):
+        with contextlib.nested(
+            mock.patch.object(db_base_plugin_v2.NeutronDbPluginV2,
+                              '_get_random_mac',
+                              side_effect=['fa:16:3e:00:00:01',
+                                           'fa:16:3e:00:00:02',
+                                           'fa:16:3e:00:00:03']),
+            mock.patch.object(db_base_plugin_v2.NeutronDbPluginV2,
+                              '_get_macs_in_use',
+                              side_effect=[['fa:16:3e:00:00:02'], []])
+        ) as (random_mac, in_use):
+            macs = db_base_plugin_v2.NeutronDbPluginV2._generate_macs(
+                'c', 'n', 2)
+        self.assertEqual(set(['fa:16:3e:00:00:01', 'fa:16:3e:00:00:03']),
+                         set(macs))
+        self.assertEqual(2, in_use.call_count)
+
+    def test_generate_macs_failure(self):
+        cfg.CONF.set_override('mac_generation_retries', 2)
+        with contextlib.nested(
+            mock.patch.object(db_base_plugin_v2.NeutronDbPluginV2,
+                              '_get_random_mac',
+                              return_value='fa:16:3e:00:00:01'),
+            mock.patch.object(db_base_plugin_v2.NeutronDbPluginV2,
+                              '_get_macs_in_use',
+                              return_value=['fa:16:3e:00:00:01'])
+        ):
+            self.assertRaises(
+                n_exc.MacAddressGenerationFailure,
+                db_base_plugin_v2.NeutronDbPluginV2._generate_macs,
+                'c', 'n', 1)
+
+    def _validate_allocation_pools(self, pools, cidr):
+        cfg.CONF.set_override('notify_nova_on_port_status_changes', False)
+        plugin = db_base_plugin_v2.NeutronDbPluginV2()
+        return plugin._validate_allocation_pools(pools, cidr)
+
+    def test_validate_allocation_pools_overlap(self):
+        pools = [{'start': '10.0.0.100', 'end': '10.0.0.200'},
+                 {'start': '10.0.0.2', 'end': '10.0.0.10'},
+                 {'start': '10.0.0.5', 'end': '10.0.0.5'}]
+        e = self.assertRaises(n_exc.OverlappingAllocationPools,
+                              self._validate_allocation_pools,
+                              pools, '10.0.0.0/24')
+        self.assertIn("10.0.0.10", str(e))
+
+    def test_validate_allocation_pools_adjacent(self):
+        pools = [{'start': '10.0.0.11', 'end': '10.0.0.20'},
+                 {'start': '10.0.0.2', 'end': '10.0.0.10'}]
+        self.assertIsNone(self._validate_allocation_pools(pools,
+                                                          '10.0.0.0/24'))
+
+    def test_check_ip_in_allocation_pool(self):
+        context = mock.Mock()
+        context.session.query.return_value.filter_by.return_value = [
+            {'first_ip': '10.0.0.2', 'last_ip': '10.0.0.10'}]
+        plugin = db_base_plugin_v2.NeutronDbPluginV2
+        check = plugin._check_ip_in_allocation_pool
+        self.assertTrue(check(context, 's', '10.0.0.1', '10.0.0.10'))
+        self.assertFalse(check(context, 's', '10.0.0.1', '10.0.0.11'))
+        self.assertFalse(check(context, 's', '10.0.0.1', '10.0.0.1'))
+
 
 class NeutronDbPluginV2AsMixinTestCase(testlib_api.SqlTestCase):
     """Tests for NeutronDbPluginV2 as Mixin.
@@ -3997,6 +4098,64 @@ class NeutronDbPluginV2AsMixinTestCase(testlib_api.SqlTestCase):
         net = self.plugin.create_network(self.context, self.net_data)
         self.assertEqual(net['status'], 'BUILD')
 
+    def test_get_networks_projects_column_fields(self):
+        self.plugin.create_network(self.context, self.net_data)
+        with mock.patch.object(self.plugin, '_make_network_dict') as make:
+            nets = self.plugin.get_networks(self.context,
+                                            fields=['id', 'name'])
+        self.assertEqual([{'id': 'fake-id', 'name': 'net1'}], nets)
+        self.assertFalse(make.called)
+
+    def test_get_networks_non_column_field_builds_dicts(self):
+        self.plugin.create_network(self.context, self.net_data)
+        nets = self.plugin.get_networks(self.context,
+                                        fields=['id', 'subnets'])
+        self.assertEqual([{'id': 'fake-id', 'subnets': []}], nets)
+
+    def test_get_ports_projects_column_fields(self):
+        self.plugin.create_network(self.context, self.net_data)
+        port = self.plugin.create_port(self.context, {'port': {
+            'tenant_id': 'test-tenant', 'name': '', 'network_id': 'fake-id',
+            'admin_state_up': True, 'device_id': 'dev', 'device_owner': '',
+            'mac_address': attributes.ATTR_NOT_SPECIFIED,
+            'fixed_ips': attributes.ATTR_NOT_SPECIFIED}})
+        with mock.patch.object(self.plugin, '_make_port_dict') as make:
+            ports = self.plugin.get_ports(self.context,
+                                          fields=['id', 'device_id'])
+        self.assertEqual([{'id': port['id'], 'device_id': 'dev'}], ports)
+        self.assertFalse(make.called)
+
+    def _create_networks(self, names):
+        for i, name in enumerate(names):
+            self.net_data['network'].update(id='id-%d' % i, name=name)
+            self.plugin.create_network(self.context, self.net_data)
+
+    def test_get_networks_keyset_pagination(self):
+        self._create_networks(['b', 'a', 'b', 'a'])
+        sorts = [('name', True)]
+        with mock.patch.object(self.plugin, '_get_network') as get_network:
+            page1 = self.plugin.get_networks(self.context, fields=['id'],
+                                             sorts=sorts, limit=3)
+            page2 = self.plugin.get_networks(self.context, fields=['id'],
+                                             sorts=sorts, limit=3,
+                                             marker=page1[-1]['id'])
+        self.assertEqual(['id-1', 'id-3', 'id-0'],
+                         [net['id'] for net in page1])
+        self.assertEqual(['id-2'], [net['id'] for net in page2])
+        self.assertFalse(get_network.called)
+
+    def test_get_networks_keyset_pagination_reverse(self):
+        self._create_networks(['b', 'a', 'b', 'a'])
+        nets = self.plugin.get_networks(self.context, fields=['id'],
+                                        sorts=[('name', True)], limit=2,
+                                        marker='id-0', page_reverse=True)
+        self.assertEqual(['id-1', 'id-3'], [net['id'] for net in nets])
+
+    def test_get_networks_marker_not_found(self):
+        self.assertRaises(n_exc.NetworkNotFound, self.plugin.get_networks,
+                          self.context, sorts=[('name', True)], limit=1,
+                          marker='fake-marker')
+
 
 class TestBasicGetXML(TestBasicGet):
     fmt = 'xml'
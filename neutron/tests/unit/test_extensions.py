@@ -21,6 +21,7 @@ import webob
 import webtest
 
 from neutron.api import extensions
+from neutron.api.v2 import base as v2_base
 from neutron.common import config
 from neutron.common import exceptions
 from neutron.db import db_base_plugin_v2
@@ -474,6 +475,15 @@ class ExtensionManagerTest(base.BaseTestCase):
         self.assertIn('valid_extension', ext_mgr.extensions)
         self.assertNotIn('invalid_extension', ext_mgr.extensions)
 
+    def test_extend_resources_discards_compiled_attr_info(self):
+        attr_map = {'ports': {'name': {'allow_post': True,
+                                       'allow_put': True}}}
+        ext_mgr = extensions.ExtensionManager('')
+        compiled = v2_base.compile_attr_info(attr_map['ports'])
+        ext_mgr.extend_resources('2.0', attr_map)
+        self.assertIsNot(compiled,
+                         v2_base.compile_attr_info(attr_map['ports']))
+
 
 class PluginAwareExtensionManagerTest(base.BaseTestCase):
 
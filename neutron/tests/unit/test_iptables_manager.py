@@ -16,6 +16,8 @@
 import inspect
 import os
 
+import eventlet
+from eventlet import event
 import mock
 from oslo.config import cfg
 
@@ -1049,3 +1051,109 @@ class IptablesManagerStateLessTestCase(base.BaseTestCase):
 
     def test_nat_not_found(self):
         self.assertNotIn('nat', self.iptables.ipv4)
+
+
+class IptablesApplySchedulerTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(IptablesApplySchedulerTestCase, self).setUp()
+        cfg.CONF.register_opts(a_cfg.IPTABLES_OPTS, 'AGENT')
+        self.scheduler = iptables_manager.IptablesApplyScheduler(
+            max_concurrent=1)
+
+    def _get_manager(self, namespace='ns'):
+        manager = iptables_manager.IptablesManager(
+            namespace=namespace, apply_scheduler=self.scheduler)
+        manager.apply_now = mock.Mock()
+        return manager
+
+    def _apply_while_busy(self, *applies):
+        """Run applies while the only slot is held by another manager."""
+        busy = self._get_manager('busy')
+        release = event.Event()
+        busy.apply_now.side_effect = release.wait
+        pool = eventlet.GreenPool()
+        pool.spawn(self.scheduler.apply, busy)
+        # The busy apply holds the slot until it is released
+        eventlet.sleep(0)
+        for apply in applies:
+            pool.spawn(apply)
+        # All the applies are queued before the slot is released
+        eventlet.sleep(0)
+        release.send()
+        pool.waitall()
+        return busy
+
+    def test_manager_apply_goes_through_scheduler(self):
+        manager = self._get_manager()
+        with mock.patch.object(self.scheduler, 'apply') as apply:
+            manager.apply()
+        apply.assert_called_once_with(manager)
+
+    def test_queued_applies_are_coalesced(self):
+        manager = self._get_manager()
+        busy = self._apply_while_busy(
+            *[lambda: self.scheduler.apply(manager)] * 3)
+        self.assertEqual(1, busy.apply_now.call_count)
+        self.assertEqual(1, manager.apply_now.call_count)
+        self.assertEqual(2, self.scheduler.get_stats()['coalesced'])
+        self.assertEqual(3, self.scheduler.namespace_latencies['ns'].count)
+        self.assertEqual(4, self.scheduler.latency.count)
+
+    def test_apply_after_completion_is_not_coalesced(self):
+        manager = self._get_manager()
+        self.scheduler.apply(manager)
+        self.scheduler.apply(manager)
+        self.assertEqual(2, manager.apply_now.call_count)
+
+    def test_apply_failure_is_raised_to_all_waiters(self):
+        manager = self._get_manager()
+        manager.apply_now.side_effect = RuntimeError
+        results = []
+
+        def _apply():
+            try:
+                self.scheduler.apply(manager)
+            except RuntimeError:
+                results.append('error')
+
+        self._apply_while_busy(_apply, _apply)
+        self.assertEqual(['error', 'error'], results)
+        self.assertEqual(1, manager.apply_now.call_count)
+        self.assertEqual({}, self.scheduler._pending)
+
+    def test_held_applies_are_coalesced(self):
+        manager = self._get_manager()
+        self.scheduler.hold(manager)
+        for i in range(3):
+            manager.apply()
+        self.assertFalse(manager.apply_now.called)
+
+        self.assertTrue(self.scheduler.release(manager))
+        self.assertEqual(2, self.scheduler.get_stats()['coalesced'])
+        manager.apply()
+        manager.apply_now.assert_called_once_with()
+
+    def test_release_without_held_apply(self):
+        manager = self._get_manager()
+        self.scheduler.hold(manager)
+        self.assertFalse(self.scheduler.release(manager))
+        self.assertFalse(manager.apply_now.called)
+
+    def test_get_stats_reports_slowest_namespaces(self):
+        self.scheduler.SLOWEST_NAMESPACES = 2
+        for namespace, seconds in (('ns1', 0.1), ('ns2', 0.5), ('ns3', 0.2),
+                                   ('ns2', 0.1)):
+            self.scheduler._observe(self._get_manager(namespace), seconds)
+        stats = self.scheduler.get_stats()
+        self.assertEqual(
+            [{'namespace': 'ns2', 'count': 2, 'avg': 0.3, 'max': 0.5},
+             {'namespace': 'ns3', 'count': 1, 'avg': 0.2, 'max': 0.2}],
+            stats['slowest_namespaces'])
+        self.assertEqual(1, self.scheduler.get_namespace_stats('ns1')['count'])
+        self.assertIsNone(self.scheduler.get_namespace_stats('ns4'))
+
+    def test_forget(self):
+        self.scheduler.apply(self._get_manager())
+        self.scheduler.forget('ns')
+        self.assertNotIn('ns', self.scheduler.namespace_latencies)
@@ -22,6 +22,7 @@ import netaddr
 from oslo.config import cfg
 from oslo import messaging
 from testtools import matchers
+import webob
 
 from neutron.agent.common import config as agent_config
 from neutron.agent import l3_agent
@@ -32,6 +33,7 @@ from neutron.common import constants as l3_constants
 from neutron.common import exceptions as n_exc
 from neutron.common import rpc as n_rpc
 from neutron.openstack.common import processutils
+from neutron.openstack.common import timeutils
 from neutron.openstack.common import uuidutils
 from neutron.plugins.common import constants as p_const
 from neutron.tests import base
@@ -417,6 +419,7 @@ class TestBasicRouterOperations(base.BaseTestCase):
 
     def test__sync_routers_task_raise_exception(self):
         agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        self.plugin_api.get_router_ids.return_value = [_uuid()]
         self.plugin_api.get_routers.side_effect = Exception()
         with mock.patch.object(agent, '_cleanup_namespaces') as f:
             agent._sync_routers_task(agent.context)
@@ -429,6 +432,84 @@ class TestBasicRouterOperations(base.BaseTestCase):
             agent._sync_routers_task(agent.context)
         self.assertTrue(f.called)
 
+    def test__sync_routers_task_raise_exception_getting_ids(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        self.plugin_api.get_router_ids.side_effect = Exception()
+        with mock.patch.object(agent, '_cleanup_namespaces') as f:
+            agent._sync_routers_task(agent.context)
+        self.assertFalse(f.called)
+        self.assertTrue(agent.fullsync)
+
+    def test__sync_routers_task_fetches_by_chunk(self):
+        self.conf.set_override('sync_routers_chunk_size', 2)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router_ids = [_uuid() for i in range(5)]
+        self.plugin_api.get_router_ids.return_value = router_ids
+        self.plugin_api.get_routers.side_effect = (
+            lambda context, ids: [{'id': id} for id in ids])
+        with mock.patch.object(agent, '_queue') as queue:
+            agent._sync_routers_task(agent.context)
+        self.plugin_api.get_routers.assert_has_calls([
+            mock.call(agent.context, router_ids[0:2]),
+            mock.call(agent.context, router_ids[2:4]),
+            mock.call(agent.context, router_ids[4:5])])
+        self.assertEqual(5, queue.add.call_count)
+        self.assertFalse(agent.fullsync)
+
+    def test__sync_routers_task_without_chunks(self):
+        self.conf.set_override('sync_routers_chunk_size', 0)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        self.plugin_api.get_routers.return_value = []
+        agent._sync_routers_task(agent.context)
+        self.assertFalse(self.plugin_api.get_router_ids.called)
+        self.plugin_api.get_routers.assert_called_once_with(agent.context)
+
+    def test__sync_routers_task_server_without_router_ids(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        self.plugin_api.get_router_ids.side_effect = (
+            n_rpc.RemoteError('UnsupportedVersion'))
+        self.plugin_api.get_routers.return_value = []
+        agent._sync_routers_task(agent.context)
+        self.plugin_api.get_routers.assert_called_once_with(agent.context)
+        self.assertFalse(agent.fullsync)
+
+    def _test_check_routers_task(self, router_checksums, server_checksums):
+        self.conf.set_override('routers_check_interval', 60)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent.fullsync = False
+        agent._router_checksums = router_checksums
+        for router_id in router_checksums:
+            agent.router_info[router_id] = mock.Mock()
+        self.plugin_api.get_router_ids.return_value = server_checksums.keys()
+        self.plugin_api.get_router_checksums.return_value = server_checksums
+        with mock.patch.object(agent, '_queue') as queue:
+            agent._sync_routers_task(agent.context)
+            return dict((call[0][0].id, call[0][0].action)
+                        for call in queue.add.call_args_list)
+
+    def test__check_routers_task_queues_changed_routers(self):
+        updates = self._test_check_routers_task(
+            {'r1': 'a', 'r2': 'b', 'r3': 'c'},
+            {'r1': 'a', 'r2': 'changed', 'r4': 'd'})
+        self.assertEqual({'r2': None,
+                          'r3': l3_agent.DELETE_ROUTER,
+                          'r4': None}, updates)
+        self.assertFalse(self.plugin_api.get_routers.called)
+
+    def test__check_routers_task_disabled(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent.fullsync = False
+        agent._sync_routers_task(agent.context)
+        self.assertFalse(self.plugin_api.get_router_checksums.called)
+
+    def test__check_routers_task_respects_interval(self):
+        self.conf.set_override('routers_check_interval', 60)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent.fullsync = False
+        agent._last_routers_check = timeutils.utcnow()
+        agent._sync_routers_task(agent.context)
+        self.assertFalse(self.plugin_api.get_router_checksums.called)
+
     def test_router_info_create(self):
         id = _uuid()
         ri = l3_agent.RouterInfo(id, self.conf.root_helper,
@@ -660,6 +741,7 @@ class TestBasicRouterOperations(base.BaseTestCase):
     def _test_arping(self, namespace):
         if not namespace:
             self.conf.set_override('use_namespaces', False)
+        self.conf.set_override('send_arp_for_ha', 3)
 
         router_id = _uuid()
         ri = l3_agent.RouterInfo(router_id, self.conf.root_helper,
@@ -671,9 +753,9 @@ class TestBasicRouterOperations(base.BaseTestCase):
 
         arping_cmd = ['arping', '-A',
                       '-I', interface_name,
-                      '-c', self.conf.send_arp_for_ha,
+                      '-c', 3,
                       floating_ip]
-        self.mock_ip.netns.execute.assert_any_call(
+        self.mock_ip.netns.execute.assert_called_once_with(
             arping_cmd, check_exit_code=True)
 
     def test_arping_namespace(self):
@@ -682,6 +764,17 @@ class TestBasicRouterOperations(base.BaseTestCase):
     def test_arping_no_namespace(self):
         self._test_arping(namespace=False)
 
+    def test_arping_distributed_adds_address_once(self):
+        self.conf.set_override('send_arp_for_ha', 3)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent._arping('fip-ns', 'fpr-1', '20.0.0.101', distributed=True)
+
+        self.assertEqual(1, self.mock_ip.netns.execute.call_count)
+        self.mock_ip_dev.addr.add.assert_called_once_with(
+            4, '20.0.0.101/32', '20.0.0.101')
+        self.mock_ip_dev.addr.delete.assert_called_once_with(
+            4, '20.0.0.101/32')
+
     def test_agent_remove_external_gateway(self):
         router = prepare_router_data(num_internal_ports=2)
         self._test_external_gateway_action('remove', router)
@@ -949,6 +1042,36 @@ class TestBasicRouterOperations(base.BaseTestCase):
             4, '1.5.25.15', '00:44:33:22:11:55')
         agent.router_deleted(None, router['id'])
 
+    def test_update_arp_entries(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router = prepare_router_data(num_internal_ports=2)
+        ports = router[l3_constants.INTERFACE_KEY]
+        arp_entries = [{'ip_address': '1.7.23.11',
+                        'mac_address': '00:11:22:33:44:55',
+                        'subnet_id': _get_subnet_id(ports[0]),
+                        'operation': 'add'},
+                       {'ip_address': '1.7.23.12',
+                        'mac_address': '00:11:22:33:44:56',
+                        'subnet_id': _get_subnet_id(ports[1]),
+                        'operation': 'delete'},
+                       {'ip_address': '1.7.23.13',
+                        'mac_address': '00:11:22:33:44:57',
+                        'subnet_id': _uuid(),
+                        'operation': 'add'}]
+        payload = {'arp_entries': arp_entries, 'router_id': router['id']}
+        agent._router_added(router['id'], router)
+        self.mock_ip.reset_mock()
+
+        agent.update_arp_entries(None, payload)
+
+        self.mock_ip.update_neighbours.assert_called_once_with(
+            [('add', '1.7.23.11', '00:11:22:33:44:55',
+              agent.get_internal_device_name(ports[0]['id'])),
+             ('delete', '1.7.23.12', '00:11:22:33:44:56',
+              agent.get_internal_device_name(ports[1]['id']))])
+        self.assertFalse(self.mock_ip_dev.neigh.add.called)
+        agent.router_deleted(None, router['id'])
+
     def test_process_cent_router(self):
         router = prepare_router_data()
         ri = l3_agent.RouterInfo(router['id'], self.conf.root_helper,
@@ -967,6 +1090,49 @@ class TestBasicRouterOperations(base.BaseTestCase):
         ri.router['gw_port_host'] = None
         self._test_process_router(ri)
 
+    def _get_iptables_restores(self):
+        return [call[1]['process_input']
+                for call in self.utils_exec.call_args_list
+                if 'iptables-restore' in call[0][0]]
+
+    def test_process_router_updates_apply_iptables_once(self):
+        self.utils_exec.return_value = ''
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router = prepare_router_data()
+        agent._router_added(router['id'], router)
+        updated = prepare_router_data(enable_floating_ip=True)
+        updated['id'] = router['id']
+        agent.conf.set_override('gateway_external_network_id',
+                                router['gw_port']['network_id'])
+        for r in (router, updated):
+            r['external_gateway_info'] = {
+                'network_id': router['gw_port']['network_id']}
+        agent.process_router_floating_ip_addresses = mock.Mock(
+            return_value={})
+        agent.plugin_rpc.get_routers.side_effect = [[router], [updated]]
+
+        def _queue_second_update(router_id):
+            if agent._ha_router_processed.call_count == 1:
+                # Another worker gets an update while the router is processed
+                agent._queue.add(l3_agent.RouterUpdate(
+                    router_id, l3_agent.PRIORITY_RPC,
+                    timestamp=(timeutils.utcnow() +
+                               datetime.timedelta(seconds=1))))
+                agent._process_router_update()
+
+        agent._ha_router_processed = mock.Mock(
+            side_effect=_queue_second_update)
+        agent._queue.add(l3_agent.RouterUpdate(router['id'],
+                                               l3_agent.PRIORITY_RPC))
+        self.utils_exec.reset_mock()
+        agent._process_router_update()
+
+        self.assertEqual(2, agent.plugin_rpc.get_routers.call_count)
+        restores = self._get_iptables_restores()
+        self.assertEqual(1, len(restores))
+        # The rules of the second update are in the single restore
+        self.assertIn('-s 10.0.0.1 -j SNAT --to 19.4.4.2', restores[0])
+
     def _test_process_router(self, ri):
         router = ri.router
         agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
@@ -987,7 +1153,8 @@ class TestBasicRouterOperations(base.BaseTestCase):
         agent.process_router_floating_ip_addresses.assert_called_with(
             ri, ex_gw_port)
         agent.process_router_floating_ip_addresses.reset_mock()
-        agent.process_router_floating_ip_nat_rules.assert_called_with(ri)
+        agent.process_router_floating_ip_nat_rules.assert_called_with(
+            ri, mock.ANY)
         agent.process_router_floating_ip_nat_rules.reset_mock()
         agent.external_gateway_added.reset_mock()
 
@@ -1001,7 +1168,8 @@ class TestBasicRouterOperations(base.BaseTestCase):
         agent.process_router_floating_ip_addresses.assert_called_with(
             ri, ex_gw_port)
         agent.process_router_floating_ip_addresses.reset_mock()
-        agent.process_router_floating_ip_nat_rules.assert_called_with(ri)
+        agent.process_router_floating_ip_nat_rules.assert_called_with(
+            ri, mock.ANY)
         agent.process_router_floating_ip_nat_rules.reset_mock()
         self.assertEqual(agent.external_gateway_added.call_count, 0)
         self.assertEqual(agent.external_gateway_updated.call_count, 0)
@@ -1029,7 +1197,8 @@ class TestBasicRouterOperations(base.BaseTestCase):
         agent.process_router_floating_ip_addresses.assert_called_with(
             ri, ex_gw_port)
         agent.process_router_floating_ip_addresses.reset_mock()
-        agent.process_router_floating_ip_nat_rules.assert_called_with(ri)
+        agent.process_router_floating_ip_nat_rules.assert_called_with(
+            ri, mock.ANY)
         agent.process_router_floating_ip_nat_rules.reset_mock()
 
         # now no ports so state is torn down
@@ -1607,6 +1776,341 @@ vrrp_instance VR_1 {
                 mock.ANY, ri.router_id,
                 {fip_id: l3_constants.FLOATINGIP_STATUS_ERROR})
 
+    def test_process_router_without_changes(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router = prepare_router_data(enable_floating_ip=True)
+        ri = l3_agent.RouterInfo(router['id'], self.conf.root_helper,
+                                 self.conf.use_namespaces, router=router)
+        agent.external_gateway_added = mock.Mock()
+        agent.process_router(ri)
+
+        with contextlib.nested(
+            mock.patch.object(agent, '_get_existing_devices'),
+            mock.patch.object(agent, 'routes_updated'),
+            mock.patch.object(agent, '_handle_router_snat_rules'),
+            mock.patch.object(agent, 'process_router_floating_ip_nat_rules'),
+            mock.patch.object(agent.plugin_rpc, 'update_floatingip_statuses')
+        ) as (get_devices, routes_updated, snat_rules, fip_nat_rules,
+              update_fip_statuses):
+            ri.router = copy.deepcopy(router)
+            agent.process_router(ri)
+            self.assertFalse(get_devices.called)
+            self.assertFalse(routes_updated.called)
+            self.assertFalse(snat_rules.called)
+            self.assertFalse(fip_nat_rules.called)
+            self.assertFalse(update_fip_statuses.called)
+
+    def test_process_router_floating_ip_change_only(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router = prepare_router_data(enable_floating_ip=True)
+        ri = l3_agent.RouterInfo(router['id'], self.conf.root_helper,
+                                 self.conf.use_namespaces, router=router)
+        agent.external_gateway_added = mock.Mock()
+        agent.process_router(ri)
+
+        router = copy.deepcopy(router)
+        router[l3_constants.FLOATINGIP_KEY][0]['fixed_ip_address'] = '10.0.0.2'
+        with contextlib.nested(
+            mock.patch.object(agent, '_get_existing_devices'),
+            mock.patch.object(agent, 'external_gateway_updated'),
+            mock.patch.object(agent, '_handle_router_snat_rules'),
+            mock.patch.object(agent, 'process_router_floating_ip_nat_rules'),
+            mock.patch.object(agent, 'process_router_floating_ip_addresses')
+        ) as (get_devices, gateway_updated, snat_rules, fip_nat_rules,
+              fip_addresses):
+            ri.router = router
+            agent.process_router(ri)
+            self.assertFalse(get_devices.called)
+            self.assertFalse(gateway_updated.called)
+            self.assertFalse(snat_rules.called)
+            fip_nat_rules.assert_called_once_with(ri, mock.ANY)
+            changes = fip_nat_rules.call_args[0][1]
+            self.assertEqual(router[l3_constants.FLOATINGIP_KEY],
+                             changes.fips_added)
+            fip_addresses.assert_called_once_with(ri, router['gw_port'])
+
+    def test_process_router_failure_forces_full_processing(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router = prepare_router_data()
+        ri = l3_agent.RouterInfo(router['id'], self.conf.root_helper,
+                                 self.conf.use_namespaces, router=router)
+        agent.external_gateway_added = mock.Mock()
+        agent.process_router(ri)
+        self.assertIsNotNone(ri.last_applied_router)
+
+        with mock.patch.object(agent, '_handle_router_snat_rules',
+                               side_effect=RuntimeError):
+            router['enable_snat'] = False
+            ri.router = router
+            self.assertRaises(RuntimeError, agent.process_router, ri)
+        self.assertIsNone(ri.last_applied_router)
+
+    def test_process_router_forced_full_processing(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router = prepare_router_data()
+        ri = l3_agent.RouterInfo(router['id'], self.conf.root_helper,
+                                 self.conf.use_namespaces, router=router)
+        agent.external_gateway_added = mock.Mock()
+        agent.process_router(ri)
+        ri.force_full_process = True
+
+        with mock.patch.object(agent, '_process_external_gateway') as gw:
+            agent.process_router(ri)
+        self.assertTrue(gw.called)
+        self.assertFalse(ri.force_full_process)
+
+    def test_process_router_keeps_force_requested_while_processing(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router = prepare_router_data()
+        ri = l3_agent.RouterInfo(router['id'], self.conf.root_helper,
+                                 self.conf.use_namespaces, router=router)
+        ri.force_full_process = True
+
+        def state_changed(*args):
+            agent._ha_router_state_changed(ri)
+
+        with mock.patch.object(agent, '_process_external_gateway',
+                               side_effect=state_changed):
+            agent.process_router(ri)
+        self.assertIsNotNone(ri.last_applied_router)
+        self.assertTrue(ri.force_full_process)
+
+    def test_router_changes_floating_ips_diff(self):
+        router = prepare_router_data(enable_floating_ip=True)
+        unchanged_fip = router[l3_constants.FLOATINGIP_KEY][0]
+        old_router = copy.deepcopy(router)
+        old_fip = {'id': _uuid(),
+                   'floating_ip_address': '15.1.2.4',
+                   'fixed_ip_address': '192.168.0.2'}
+        old_router[l3_constants.FLOATINGIP_KEY].append(old_fip)
+        new_fip = dict(old_fip, fixed_ip_address='192.168.0.3')
+        added_fip = {'id': _uuid(),
+                     'floating_ip_address': '15.1.2.5',
+                     'fixed_ip_address': '192.168.0.4'}
+        router[l3_constants.FLOATINGIP_KEY] += [new_fip, added_fip]
+
+        changes = l3_agent.RouterChanges(old_router, router)
+        self.assertTrue(changes.floating_ips)
+        self.assertNotIn(unchanged_fip, changes.fips_added)
+        self.assertEqual(sorted([new_fip, added_fip]),
+                         sorted(changes.fips_added))
+        self.assertEqual([old_fip], changes.fips_removed)
+
+    def test_router_changes_floating_ips_gateway_changed(self):
+        router = prepare_router_data(enable_floating_ip=True)
+        old_router = copy.deepcopy(router)
+        router['gw_port']['fixed_ips'][0]['ip_address'] = '20.0.0.31'
+        changes = l3_agent.RouterChanges(old_router, router)
+        self.assertTrue(changes.floating_ips)
+        self.assertIsNone(changes.fips_added)
+        self.assertIsNone(changes.fips_removed)
+
+    def test_process_router_floating_ip_nat_rules_changes_only(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router = prepare_router_data(enable_floating_ip=True)
+        ri = l3_agent.RouterInfo(router['id'], self.conf.root_helper,
+                                 self.conf.use_namespaces, router=router)
+        agent.process_router_floating_ip_nat_rules(ri)
+        old_router = copy.deepcopy(router)
+        added_fip = {'id': _uuid(),
+                     'floating_ip_address': '15.1.2.5',
+                     'fixed_ip_address': '192.168.0.4'}
+        router[l3_constants.FLOATINGIP_KEY] = [added_fip]
+        changes = l3_agent.RouterChanges(old_router, router)
+
+        nat = ri.iptables_manager.ipv4['nat']
+        with contextlib.nested(
+            mock.patch.object(nat, 'clear_rules_by_tag'),
+            mock.patch.object(ri.iptables_manager, 'apply')
+        ) as (clear_rules, apply):
+            agent.process_router_floating_ip_nat_rules(ri, changes)
+        self.assertFalse(clear_rules.called)
+        rules = [str(rule) for rule in nat.rules]
+        self.assertFalse([rule for rule in rules if '19.4.4.2' in rule])
+        self.assertTrue([rule for rule in rules if '15.1.2.5' in rule])
+
+    def test_process_floating_ips_reports_changed_statuses(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router = prepare_router_data(enable_floating_ip=True)
+        ri = l3_agent.RouterInfo(router['id'], self.conf.root_helper,
+                                 self.conf.use_namespaces, router=router)
+        unchanged_id = router[l3_constants.FLOATINGIP_KEY][0]['id']
+        old_router = copy.deepcopy(router)
+        added_fip = {'id': _uuid(),
+                     'floating_ip_address': '15.1.2.5',
+                     'fixed_ip_address': '192.168.0.4'}
+        router[l3_constants.FLOATINGIP_KEY].append(added_fip)
+        changes = l3_agent.RouterChanges(old_router, router)
+        ri.floating_ips = set([unchanged_id])
+
+        with contextlib.nested(
+            mock.patch.object(agent, 'process_router_floating_ip_nat_rules'),
+            mock.patch.object(
+                agent, 'process_router_floating_ip_addresses',
+                return_value={
+                    unchanged_id: l3_constants.FLOATINGIP_STATUS_ACTIVE,
+                    added_fip['id']: l3_constants.FLOATINGIP_STATUS_ACTIVE}),
+            mock.patch.object(agent.plugin_rpc, 'update_floatingip_statuses')
+        ) as (nat_rules, addresses, update_statuses):
+            agent._process_floating_ips(ri, router['gw_port'], changes)
+        update_statuses.assert_called_once_with(
+            agent.context, ri.router_id,
+            {added_fip['id']: l3_constants.FLOATINGIP_STATUS_ACTIVE})
+        self.assertEqual(set([unchanged_id, added_fip['id']]),
+                         ri.floating_ips)
+
+    def test_router_changes_ignore_agent_port_keys(self):
+        router = prepare_router_data()
+        old_router = copy.deepcopy(router)
+        router['gw_port']['ip_cidr'] = '19.4.4.4/24'
+        changes = l3_agent.RouterChanges(old_router, router)
+        self.assertFalse(changes.any)
+
+    def test_router_changes_without_applied_router(self):
+        changes = l3_agent.RouterChanges(None, prepare_router_data())
+        self.assertTrue(changes.interfaces)
+        self.assertTrue(changes.gateway)
+        self.assertTrue(changes.routes)
+        self.assertTrue(changes.floating_ips)
+
+    def test_router_changes_distributed_router(self):
+        router = prepare_router_data()
+        router['distributed'] = True
+        changes = l3_agent.RouterChanges(copy.deepcopy(router), router)
+        self.assertTrue(changes.full)
+        self.assertTrue(changes.any)
+
+    def test_router_changes_routes_only(self):
+        router = prepare_router_data()
+        old_router = copy.deepcopy(router)
+        router['routes'] = [{'destination': '8.8.8.8/32',
+                             'nexthop': '19.4.4.10'}]
+        changes = l3_agent.RouterChanges(old_router, router)
+        self.assertTrue(changes.routes)
+        self.assertFalse(changes.interfaces)
+        self.assertFalse(changes.gateway)
+        self.assertFalse(changes.snat)
+        self.assertFalse(changes.floating_ips)
+
+    def _prepare_ha_router_info(self, agent):
+        router = prepare_router_data(enable_ha=True, enable_floating_ip=True)
+        ri = l3_agent.RouterInfo(router['id'], self.conf.root_helper,
+                                 self.conf.use_namespaces, router=router)
+        ri.last_applied_router = copy.deepcopy(router)
+        agent.router_info[ri.router_id] = ri
+        return ri
+
+    def test_enqueue_state_change_prioritizes_router(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        ri = self._prepare_ha_router_info(agent)
+        with mock.patch.object(agent._queue, 'add') as queue_add:
+            agent.enqueue_state_change(ri.router_id, 'master', 1.0)
+
+        update = queue_add.call_args[0][0]
+        self.assertEqual(ri.router_id, update.id)
+        self.assertEqual(l3_agent.PRIORITY_HA_STATE_CHANGE, update.priority)
+        self.assertTrue(ri.force_full_process)
+
+    def test_enqueue_state_change_unknown_router(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        with mock.patch.object(agent._queue, 'add') as queue_add:
+            agent.enqueue_state_change(_uuid(), 'master', 1.0)
+        self.assertFalse(queue_add.called)
+        self.assertTrue(agent._ha_state_changes.empty())
+
+    def test_report_ha_states_batches_changes(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        ri1 = self._prepare_ha_router_info(agent)
+        ri2 = self._prepare_ha_router_info(agent)
+        agent.enqueue_state_change(ri1.router_id, 'master', 1.0)
+        agent.enqueue_state_change(ri2.router_id, 'master', 1.0)
+        agent.enqueue_state_change(ri1.router_id, 'fault', 2.0)
+
+        agent._report_ha_states()
+
+        self.plugin_api.update_ha_routers_states.assert_called_once_with(
+            agent.context, {ri1.router_id: 'standby',
+                            ri2.router_id: 'active'})
+        self.assertTrue(agent._ha_state_changes.empty())
+
+    def test_ha_router_processed_records_failover_latency(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        ri = self._prepare_ha_router_info(agent)
+        with mock.patch('time.time', return_value=12.5):
+            agent.enqueue_state_change(ri.router_id, 'master', 10.0)
+            agent._ha_router_processed(ri.router_id)
+            agent._ha_router_processed(ri.router_id)
+
+        stats = agent.get_ha_failover_stats()
+        self.assertEqual(1, stats['count'])
+        self.assertEqual(2.5, stats['max'])
+
+    def _get_state_report_agent(self):
+        agent_config.register_agent_state_opts_helper(self.conf)
+        self.conf.set_override('report_interval', 0, 'AGENT')
+        agent = l3_agent.L3NATAgentWithStateReport(HOSTNAME, self.conf)
+        agent.state_rpc = mock.Mock()
+        return agent
+
+    def test_report_state_iptables_apply_stats(self):
+        agent = self._get_state_report_agent()
+        manager = mock.Mock(namespace='qrouter-1')
+        agent.iptables_apply_scheduler._observe(manager, 0.5)
+        agent._report_state()
+
+        report = agent.agent_state['configurations']['iptables_apply']
+        self.assertEqual(1, report['count'])
+        self.assertEqual(0, report['coalesced'])
+        self.assertEqual([{'namespace': 'qrouter-1', 'count': 1,
+                           'avg': 0.5, 'max': 0.5}],
+                         report['slowest_namespaces'])
+
+    def test_report_state_keepalived_reload_stats(self):
+        agent = self._get_state_report_agent()
+        for router_id, stats in (
+                ('r1', {'count': 1, 'sum': 0.1, 'max': 0.1, 'skipped': 2}),
+                ('r2', {'count': 2, 'sum': 0.5, 'max': 0.3, 'skipped': 0})):
+            ri = l3_agent.RouterInfo(router_id, self.conf.root_helper,
+                                     self.conf.use_namespaces, {})
+            ri.keepalived_manager = mock.Mock()
+            ri.keepalived_manager.get_reload_stats.return_value = stats
+            agent.router_info[router_id] = ri
+        agent.router_info['r3'] = l3_agent.RouterInfo(
+            'r3', self.conf.root_helper, self.conf.use_namespaces, {})
+        agent._report_state()
+
+        report = agent.agent_state['configurations']['keepalived_reload']
+        self.assertEqual({'count': 3, 'max': 0.3, 'skipped': 2},
+                         dict((key, report[key])
+                              for key in ('count', 'max', 'skipped')))
+        self.assertAlmostEqual(0.2, report['avg'])
+
+    def test_ha_state_change_handler(self):
+        agent = mock.Mock()
+        handler = l3_ha_agent.HaStateChangeHandler(agent)
+        req = webob.Request.blank('/', method='PUT', headers={
+            'X-Neutron-Router-Id': 'router1',
+            'X-Neutron-State': 'backup',
+            'X-Neutron-Timestamp': '3.5'})
+
+        resp = req.get_response(handler)
+
+        self.assertEqual(200, resp.status_int)
+        agent.enqueue_state_change.assert_called_once_with(
+            'router1', 'backup', 3.5)
+
+    def test_ha_state_change_handler_invalid_state(self):
+        agent = mock.Mock()
+        handler = l3_ha_agent.HaStateChangeHandler(agent)
+        req = webob.Request.blank('/', method='PUT', headers={
+            'X-Neutron-Router-Id': 'router1',
+            'X-Neutron-State': 'unknown'})
+
+        resp = req.get_response(handler)
+
+        self.assertEqual(400, resp.status_int)
+        self.assertFalse(agent.enqueue_state_change.called)
+
     def test_handle_router_snat_rules_distributed_without_snat_manager(self):
         ri = l3_agent.RouterInfo(
             'foo_router_id', mock.ANY, True, {'distributed': True})
@@ -1919,6 +2423,21 @@ vrrp_instance VR_1 {
         self.assertIn(routers[0]['id'], agent.router_info)
         self.assertFalse(self.plugin_api.get_external_network_id.called)
 
+    def test_process_routers_keeps_server_checksums(self):
+        self.conf.set_override('routers_check_interval', 60)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        self.plugin_api.get_external_network_id.return_value = 'aaa'
+        router_id = _uuid()
+        routers = [
+            {'id': router_id,
+             'routes': [],
+             'admin_state_up': True,
+             'external_gateway_info': {'network_id': 'aaa'},
+             l3_constants.ROUTER_CHECKSUM_KEY: 'c1'}]
+
+        agent._process_routers(routers)
+        self.assertEqual({router_id: 'c1'}, agent._router_checksums)
+
     def test_process_routers_with_stale_cached_ext_net(self):
         agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
         self.plugin_api.get_external_network_id.return_value = 'aaa'
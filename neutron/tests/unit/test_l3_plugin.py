@@ -1871,6 +1871,64 @@ class L3AgentDbTestCaseBase(L3NatTestCaseMixin):
             self.assertIsNotNone(floatingips[0]['fixed_ip_address'])
             self.assertIsNotNone(floatingips[0]['router_id'])
 
+    def test_get_router_checksums_floatingip_changed(self):
+        with self.floatingip_with_assoc() as fip:
+            ctx = context.get_admin_context()
+            router_id = fip['floatingip']['router_id']
+            checksums = self.plugin.get_router_checksums(ctx, [router_id])
+            self.assertEqual([router_id], checksums.keys())
+            self.assertEqual(
+                checksums, self.plugin.get_router_checksums(ctx, [router_id]))
+            self._update('floatingips', fip['floatingip']['id'],
+                         {'floatingip': {'port_id': None}})
+            self.assertNotEqual(
+                checksums, self.plugin.get_router_checksums(ctx, [router_id]))
+
+    def test_get_router_checksums_floatingip_status_changed(self):
+        with self.floatingip_with_assoc() as fip:
+            ctx = context.get_admin_context()
+            fip_id = fip['floatingip']['id']
+            router_id = fip['floatingip']['router_id']
+            self.plugin.update_floatingip_status(
+                ctx, fip_id, l3_constants.FLOATINGIP_STATUS_DOWN)
+            checksums = self.plugin.get_router_checksums(ctx, [router_id])
+            self.plugin.update_floatingip_status(
+                ctx, fip_id, l3_constants.FLOATINGIP_STATUS_DOWN)
+            self.assertEqual(
+                checksums, self.plugin.get_router_checksums(ctx, [router_id]))
+            self.plugin.update_floatingip_status(
+                ctx, fip_id, l3_constants.FLOATINGIP_STATUS_ACTIVE)
+            self.assertNotEqual(
+                checksums, self.plugin.get_router_checksums(ctx, [router_id]))
+
+    def test_get_router_checksums_subnet_added(self):
+        with contextlib.nested(self.router(), self.network()) as (r, n):
+            with self.subnet(network=n) as s:
+                self._router_interface_action('add', r['router']['id'],
+                                              s['subnet']['id'], None)
+                ctx = context.get_admin_context()
+                checksums = self.plugin.get_router_checksums(ctx)
+                with self.subnet(network=n, cidr='10.0.1.0/24'):
+                    self.assertNotEqual(
+                        checksums, self.plugin.get_router_checksums(ctx))
+                self._router_interface_action('remove', r['router']['id'],
+                                              s['subnet']['id'], None)
+
+    def test_get_router_checksums_active(self):
+        with contextlib.nested(self.router(), self.router()) as (r1, r2):
+            self._update('routers', r2['router']['id'],
+                         {'router': {'admin_state_up': False}})
+            ctx = context.get_admin_context()
+            router_ids = [r1['router']['id'], r2['router']['id']]
+            self.assertEqual(
+                sorted(router_ids),
+                sorted(self.plugin.get_router_checksums(ctx, router_ids)))
+            self.assertEqual(
+                [r1['router']['id']],
+                self.plugin.get_router_checksums(ctx, router_ids,
+                                                 active=True).keys())
+            self.assertEqual({}, self.plugin.get_router_checksums(ctx, []))
+
     def _test_notify_op_agent(self, target_func, *args):
         l3_rpc_agent_api_str = (
             'neutron.api.rpc.agentnotifiers.l3_rpc_agent_api.L3AgentNotifyAPI')
@@ -2109,6 +2167,69 @@ class L3RpcCallbackTestCase(base.BaseTestCase):
         actual_message = mock_log.call_args[0][0]
         self.assertEqual(expected_message, actual_message)
 
+    def test_get_router_ids(self):
+        self.l3_rpc_cb.l3plugin.list_router_ids_on_host.return_value = ['r1']
+        with mock.patch.object(l3_rpc.utils, 'is_extension_supported',
+                               return_value=True):
+            router_ids = self.l3_rpc_cb.get_router_ids(mock.ANY, host='h1')
+        self.assertEqual(['r1'], router_ids)
+        l3plugin = self.l3_rpc_cb.l3plugin
+        l3plugin.list_router_ids_on_host.assert_called_once_with(
+            mock.ANY, 'h1')
+
+    def test_get_router_ids_without_scheduler(self):
+        self.l3_rpc_cb.l3plugin.get_routers.return_value = [{'id': 'r1'}]
+        with mock.patch.object(l3_rpc.utils, 'is_extension_supported',
+                               return_value=False):
+            router_ids = self.l3_rpc_cb.get_router_ids(mock.ANY, host='h1')
+        self.assertEqual(['r1'], router_ids)
+
+    def test_get_router_checksums(self):
+        l3plugin = self.l3_rpc_cb.l3plugin
+        l3plugin.list_router_ids_on_host.return_value = ['r1']
+        l3plugin.get_router_checksums.return_value = {'r1': 'c1'}
+        with mock.patch.object(l3_rpc.utils, 'is_extension_supported',
+                               return_value=True):
+            checksums = self.l3_rpc_cb.get_router_checksums(
+                mock.ANY, host='h1', router_ids=['r1', 'r2'])
+        self.assertEqual({'r1': 'c1'}, checksums)
+        l3plugin.list_router_ids_on_host.assert_called_once_with(
+            mock.ANY, 'h1', ['r1', 'r2'])
+        l3plugin.get_router_checksums.assert_called_once_with(
+            mock.ANY, ['r1'], active=True)
+        self.assertFalse(l3plugin.get_sync_data.called)
+        self.assertFalse(
+            l3plugin.list_active_sync_routers_on_active_l3_agent.called)
+
+    def test_get_router_checksums_without_scheduler(self):
+        l3plugin = self.l3_rpc_cb.l3plugin
+        l3plugin.get_router_checksums.return_value = {'r1': 'c1'}
+        with mock.patch.object(l3_rpc.utils, 'is_extension_supported',
+                               return_value=False):
+            checksums = self.l3_rpc_cb.get_router_checksums(
+                mock.ANY, host='h1', router_ids=['r1'])
+        self.assertEqual({'r1': 'c1'}, checksums)
+        l3plugin.get_router_checksums.assert_called_once_with(
+            mock.ANY, ['r1'])
+
+    def test_sync_routers_sets_checksums(self):
+        l3plugin = self.l3_rpc_cb.l3plugin
+        l3plugin.get_router_checksums.return_value = {'r1': 'c1'}
+        l3plugin.get_sync_data.return_value = [{'id': 'r1'}]
+        with mock.patch.object(l3_rpc.utils, 'is_extension_supported',
+                               return_value=False):
+            routers = self.l3_rpc_cb.sync_routers(mock.ANY, host='h1',
+                                                  router_ids=['r1'])
+        self.assertEqual(
+            [{'id': 'r1', l3_constants.ROUTER_CHECKSUM_KEY: 'c1'}], routers)
+
+    def test_update_ha_routers_states(self):
+        states = {'r1': 'active', 'r2': 'standby'}
+        self.l3_rpc_cb.update_ha_routers_states(mock.ANY, host='h1',
+                                                states=states)
+        self.l3_rpc_cb.l3plugin.update_routers_states.assert_called_once_with(
+            mock.ANY, states, 'h1')
+
 
 class L3AgentDbIntTestCase(L3BaseForIntTests, L3AgentDbTestCaseBase):
 
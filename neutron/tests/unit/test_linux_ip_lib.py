@@ -204,6 +204,26 @@ class TestIpWrapper(base.BaseTestCase):
         self.execute_p = mock.patch.object(ip_lib.IPWrapper, '_execute')
         self.execute = self.execute_p.start()
 
+    def test_update_neighbours(self):
+        with mock.patch.object(ip_lib.utils, 'execute') as execute:
+            ip_lib.IPWrapper('sudo', 'ns').update_neighbours(
+                [('add', '10.0.0.3', 'cc:dd:ee:ff:ab:cd', 'qr-1'),
+                 ('delete', '10.0.0.4', 'cc:dd:ee:ff:ab:ce', 'qr-1')])
+
+        execute.assert_called_once_with(
+            ['ip', 'netns', 'exec', 'ns', 'ip', '-force', '-batch', '-'],
+            root_helper='sudo',
+            process_input='neigh replace 10.0.0.3 lladdr cc:dd:ee:ff:ab:cd '
+                          'nud permanent dev qr-1\n'
+                          'neigh del 10.0.0.4 lladdr cc:dd:ee:ff:ab:ce '
+                          'dev qr-1\n',
+            log_fail_as_error=True)
+
+    def test_update_neighbours_no_entries(self):
+        with mock.patch.object(ip_lib.utils, 'execute') as execute:
+            ip_lib.IPWrapper('sudo', 'ns').update_neighbours([])
+        self.assertFalse(execute.called)
+
     def test_get_devices(self):
         self.execute.return_value = '\n'.join(LINK_SAMPLE)
         retval = ip_lib.IPWrapper('sudo').get_devices()
@@ -48,6 +48,8 @@ class FakeConf(object):
     nova_metadata_insecure = True
     nova_client_cert = 'nova_cert'
     nova_client_priv_key = 'nova_priv_key'
+    nova_metadata_hosts = []
+    nova_metadata_pool_size = 4
     cache_url = ''
 
 
@@ -457,6 +459,16 @@ class TestMetadataProxyHandlerCache(base.BaseTestCase):
         with testtools.ExpectedException(Exception):
             self._proxy_request_test_helper(302)
 
+    def test_proxy_request_reuses_connection(self):
+        self._proxy_request_test_helper(200)
+        req = mock.Mock(path_info='/the_path', query_string='',
+                        headers={}, method='GET', body='')
+        with mock.patch('httplib2.Http') as mock_http:
+            resp = mock.MagicMock(status=200)
+            mock_http.return_value.request.return_value = (resp, 'content')
+            self.handler._proxy_request('the_id', 'tenant_id', req)
+            self.assertFalse(mock_http.called)
+
     def test_sign_instance_id(self):
         self.assertEqual(
             self.handler._sign_instance_id('foo'),
@@ -478,6 +490,38 @@ class TestMetadataProxyHandlerNoCache(TestMetadataProxyHandlerCache):
             2, self.qclient.return_value.list_ports.call_count)
 
 
+class TestNovaMetadataConnectionPool(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestNovaMetadataConnectionPool, self).setUp()
+        self.conf = FakeConf()
+        self.conf.nova_metadata_hosts = ['1.1.1.1:8775', '2.2.2.2:8775']
+        self.http_p = mock.patch('httplib2.Http')
+        self.http = self.http_p.start()
+        self.http.return_value.request.return_value = (mock.Mock(), '')
+        self.pool = agent.NovaMetadataConnectionPool(self.conf)
+
+    def test_default_host(self):
+        self.conf.nova_metadata_hosts = []
+        pool = agent.NovaMetadataConnectionPool(self.conf)
+        self.assertEqual(['9.9.9.9:8775'], pool.latencies.keys())
+
+    def test_request_round_robin(self):
+        for i in range(3):
+            self.pool.request('/path', 'a=b', method='GET')
+        self.http.return_value.request.assert_has_calls([
+            mock.call('http://1.1.1.1:8775/path?a=b', method='GET'),
+            mock.call('http://2.2.2.2:8775/path?a=b', method='GET'),
+            mock.call('http://1.1.1.1:8775/path?a=b', method='GET')])
+        self.assertEqual(2, self.http.call_count)
+
+    def test_request_records_latency(self):
+        self.pool.request('/path', '', method='GET')
+        stats = self.pool.get_latency_stats()
+        self.assertEqual(1, stats['1.1.1.1:8775']['count'])
+        self.assertEqual(0, stats['2.2.2.2:8775']['count'])
+
+
 class TestUnixDomainHttpProtocol(base.BaseTestCase):
     def test_init_empty_client(self):
         u = agent.UnixDomainHttpProtocol(mock.Mock(), '', mock.Mock())
@@ -530,6 +574,9 @@ class TestUnixDomainMetadataProxy(base.BaseTestCase):
         looping_call_p = mock.patch(
             'neutron.openstack.common.loopingcall.FixedIntervalLoopingCall')
         self.looping_mock = looping_call_p.start()
+        self.handler = mock.patch.object(agent,
+                                         'MetadataProxyHandler').start()
+        self.handler.return_value.get_latency_stats.return_value = {}
         self.cfg.CONF.metadata_proxy_socket = '/the/path'
         self.cfg.CONF.metadata_workers = 0
         self.cfg.CONF.metadata_backlog = 128
@@ -631,3 +678,17 @@ class TestUnixDomainMetadataProxy(base.BaseTestCase):
                 state_api_inst = state_api.return_value
                 state_api_inst.report_state.assert_called_once_with(
                     proxy.context, proxy.agent_state, use_call=True)
+
+    def test_report_state_nova_metadata_latency(self):
+        self.handler.return_value.get_latency_stats.return_value = {
+            'h1:8775': {'count': 2, 'sum': 0.3, 'avg': 0.15, 'max': 0.2,
+                        'buckets': []},
+            'h2:8775': {'count': 0, 'sum': 0.0, 'avg': 0.0, 'max': 0.0,
+                        'buckets': []}}
+        with mock.patch('neutron.agent.rpc.PluginReportStateAPI'):
+            with mock.patch('os.makedirs'):
+                proxy = agent.UnixDomainMetadataProxy(mock.Mock())
+                proxy._report_state()
+        self.assertEqual(
+            {'h1:8775': {'count': 2, 'avg': 0.15, 'max': 0.2}},
+            proxy.agent_state['configurations']['nova_metadata_latency'])
@@ -0,0 +1,129 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+
+import mock
+
+from neutron.common import exceptions
+from neutron.common import rpc as n_rpc
+from neutron.common import topics
+from neutron import service
+from neutron.tests import base
+
+
+class RpcWorkerTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(RpcWorkerTestCase, self).setUp()
+        mock.patch.object(service.session, 'get_engine').start()
+        self.plugin = mock.Mock()
+        self.plugin.start_rpc_listeners.return_value = ['plugin']
+        self.plugin.start_rpc_group_listeners.return_value = ['group']
+        self.config(rpc_metrics_interval=0)
+
+    def test_start_default_pool(self):
+        worker = service.RpcWorker(self.plugin, [topics.RPC_GROUP_SYNC])
+        worker.start()
+        self.plugin.start_rpc_group_listeners.assert_called_once_with(
+            [topics.RPC_GROUP_SYNC])
+        self.assertEqual(['plugin', 'group'], worker._servers)
+
+    def test_start_dedicated_pool(self):
+        worker = service.RpcWorker(self.plugin, [topics.RPC_GROUP_REPORTS],
+                                   pool=topics.RPC_GROUP_REPORTS)
+        worker.start()
+        self.assertFalse(self.plugin.start_rpc_listeners.called)
+        self.assertEqual(['group'], worker._servers)
+
+    def test_start_metrics(self):
+        self.config(rpc_metrics_interval=10)
+        with contextlib.nested(
+            mock.patch.object(n_rpc, 'METRICS', None),
+            mock.patch.object(service.loopingcall,
+                              'FixedIntervalLoopingCall')) as (metrics, timer):
+            worker = service.RpcWorker(self.plugin)
+            worker.start()
+            self.assertIsNotNone(n_rpc.METRICS)
+            timer.return_value.start.assert_called_once_with(interval=10)
+            worker.stop()
+            timer.return_value.stop.assert_called_once_with()
+
+
+class ServeRpcTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(ServeRpcTestCase, self).setUp()
+        self.plugin = mock.Mock()
+        get_plugin = mock.patch.object(service.manager.NeutronManager,
+                                       'get_plugin').start()
+        get_plugin.return_value = self.plugin
+        self.worker = mock.patch.object(service, 'RpcWorker').start()
+        self.launcher = mock.patch.object(service.common_service,
+                                          'ProcessLauncher').start()
+
+    def test_serve_rpc(self):
+        self.assertEqual(self.worker.return_value, service.serve_rpc())
+        self.worker.assert_called_once_with(self.plugin,
+                                            list(topics.RPC_GROUPS))
+        self.worker.return_value.start.assert_called_once_with()
+
+    def test_serve_rpc_pools(self):
+        self.config(rpc_workers=2,
+                    rpc_worker_pools={'reports': '1', 'sync': '0'},
+                    rpc_worker_pool_sizes={'reports': '8'})
+        self.assertEqual(self.launcher.return_value, service.serve_rpc())
+        self.assertEqual(
+            [mock.call(self.plugin, [topics.RPC_GROUP_DEVICES,
+                                     topics.RPC_GROUP_SECURITY_GROUPS,
+                                     topics.RPC_GROUP_SYNC]),
+             mock.call(self.plugin, [topics.RPC_GROUP_REPORTS],
+                       pool=topics.RPC_GROUP_REPORTS, thread_pool_size=8)],
+            self.worker.call_args_list)
+        self.assertEqual(
+            [mock.call(self.worker.return_value, workers=1),
+             mock.call(self.worker.return_value, workers=2)],
+            self.launcher.return_value.launch_service.call_args_list)
+
+    def test_serve_rpc_groups_not_supported(self):
+        self.config(rpc_worker_pools={'reports': '1'})
+        self.plugin.rpc_groups_supported.return_value = False
+        service.serve_rpc()
+        self.worker.assert_called_once_with(self.plugin, ())
+        self.assertFalse(self.launcher.called)
+
+    def test_serve_rpc_invalid_pool(self):
+        self.config(rpc_worker_pools={'routers': '1'})
+        self.assertRaises(exceptions.InvalidConfigurationOption,
+                          service.serve_rpc)
+
+
+class RpcMetricsTestCase(base.BaseTestCase):
+
+    def test_measured_endpoint(self):
+        class Endpoint(object):
+            target = 'target'
+
+            def method(self, context):
+                return context
+
+        metrics = n_rpc.RpcMetrics()
+        endpoint = n_rpc.MeasuredEndpoint(Endpoint(), metrics)
+        self.assertEqual('target', endpoint.target)
+        self.assertEqual('ctxt', endpoint.method('ctxt'))
+        self.assertEqual(1, metrics.calls)
+        self.assertEqual(0, metrics.in_progress)
+        metrics.reset()
+        self.assertEqual(0, metrics.calls)
@@ -316,6 +316,41 @@ class NeutronPolicyTestCase(base.BaseTestCase):
     def test_nonadmin_read_on_shared_succeeds(self):
         self._test_nonadmin_action_on_attr('get', 'shared', True)
 
+    def _get_network_targets(self):
+        return [{'tenant_id': 'fake', 'shared': False},
+                {'tenant_id': 'fake', 'shared': False},
+                {'tenant_id': 'other', 'shared': False},
+                {'tenant_id': 'other', 'shared': True}]
+
+    def test_check_bulk(self):
+        policy.init()
+        targets = self._get_network_targets()
+        self.assertEqual(
+            [policy.check(self.context, 'get_network', t) for t in targets],
+            policy.check_bulk(self.context, 'get_network', targets))
+
+    def test_check_bulk_evaluates_identical_targets_once(self):
+        policy.init()
+        with mock.patch.object(policy.OwnerCheck, '__call__', autospec=True,
+                               return_value=False) as owner_check:
+            policy.check_bulk(self.context, 'get_network',
+                              self._get_network_targets())
+        self.assertEqual(3, owner_check.call_count)
+
+    def test_check_bulk_rules_replaced(self):
+        policy.init()
+        targets = self._get_network_targets()
+        policy.check_bulk(self.context, 'get_network', targets)
+        self.rules['get_network'] = common_policy.parse_rule('!')
+        policy.init()
+        self.assertEqual([False] * 4, policy.check_bulk(
+            self.context, 'get_network', targets))
+
+    def test_check_bulk_might_not_exist(self):
+        self.assertEqual([True, True], policy.check_bulk(
+            self.context, 'get_network:unknown', [{}, {}],
+            might_not_exist=True))
+
     def _test_enforce_adminonly_attribute(self, action, **kwargs):
         admin_context = context.get_admin_context()
         target = {'shared': True}
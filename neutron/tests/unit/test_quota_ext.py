@@ -17,15 +17,21 @@ import sys
 
 import mock
 from oslo.config import cfg
+from sqlalchemy import event
+from sqlalchemy import orm
 import testtools
 import webtest
 
 from neutron.api import extensions
+from neutron.api.rpc.handlers import quota_rpc
 from neutron.api.v2 import attributes
 from neutron.common import config
 from neutron.common import exceptions
 from neutron import context
+from neutron.db import db_base_plugin_v2
+from neutron.db import models_v2
 from neutron.db import quota_db
+from neutron import manager
 from neutron import quota
 from neutron.tests import base
 from neutron.tests.unit import test_api_v2
@@ -398,6 +404,209 @@ class TestDbQuotaDriver(base.BaseTestCase):
                                                       target_tenant)
 
 
+class TestUsageQuotaDriver(testlib_api.SqlTestCase):
+    """Test for neutron.db.quota_db.UsageQuotaDriver."""
+
+    def setUp(self):
+        super(TestUsageQuotaDriver, self).setUp()
+        self.driver = quota_db.UsageQuotaDriver()
+        self.addCleanup(quota_db.stop_tracking)
+        self.context = context.get_admin_context()
+        self.resources = {'network': quota.CountableResource(
+            'network', None, 'quota_network')}
+        cfg.CONF.set_override('quota_network', 3, group='QUOTAS')
+
+    def _add_networks(self, count, tenant_id='foo'):
+        with self.context.session.begin():
+            for i in range(count):
+                self.context.session.add(models_v2.Network(
+                    tenant_id=tenant_id, name='', admin_state_up=True,
+                    status='ACTIVE', shared=False))
+
+    def _get_usage(self, tenant_id='foo'):
+        return self.context.session.query(quota_db.QuotaUsage).filter_by(
+            tenant_id=tenant_id, resource='network').one()
+
+    def test_get_usage_counts_once(self):
+        self._add_networks(2)
+        self.assertEqual(2, self.driver.get_usage(self.context, 'foo',
+                                                  'network'))
+        self._add_networks(1)
+        self._add_networks(1, tenant_id='bar')
+        with mock.patch.object(self.driver, '_needs_resync',
+                               return_value=False):
+            self.assertEqual(3, self.driver.get_usage(self.context, 'foo',
+                                                      'network'))
+
+    def test_usage_decremented_on_delete(self):
+        self._add_networks(2)
+        self.driver.get_usage(self.context, 'foo', 'network')
+        with self.context.session.begin():
+            self.context.session.delete(
+                self.context.session.query(models_v2.Network).first())
+        self.assertEqual(1, self._get_usage().in_use)
+
+    def test_bulk_delete_marks_usage_dirty(self):
+        self._add_networks(2)
+        self.driver.get_usage(self.context, 'foo', 'network')
+        with self.context.session.begin():
+            self.context.session.query(models_v2.Network).delete()
+        self.assertTrue(self._get_usage().dirty)
+        self.assertEqual(0, self.driver.get_usage(self.context, 'foo',
+                                                  'network'))
+
+    def test_port_delete_keeps_other_usages(self):
+        plugin = db_base_plugin_v2.NeutronDbPluginV2()
+        self._add_networks(1)
+        network = self.context.session.query(models_v2.Network).one()
+        port = plugin.create_port(self.context, {'port': {
+            'tenant_id': 'foo', 'name': '', 'network_id': network.id,
+            'admin_state_up': True, 'device_id': '', 'device_owner': '',
+            'mac_address': attributes.ATTR_NOT_SPECIFIED,
+            'fixed_ips': attributes.ATTR_NOT_SPECIFIED}})
+        self.driver.get_usage(self.context, 'foo', 'port')
+        self.driver.get_usage(self.context, 'bar', 'port')
+        plugin.delete_port(self.context, port['id'])
+        usages = self.context.session.query(quota_db.QuotaUsage).filter_by(
+            resource='port')
+        self.assertEqual([('bar', 0, False), ('foo', 0, False)],
+                         sorted((usage.tenant_id, usage.in_use, usage.dirty)
+                                for usage in usages))
+
+    def test_db_quota_driver_does_not_track_usages(self):
+        quota_db.stop_tracking()
+        quota_db.DbQuotaDriver()
+        self.assertFalse(event.contains(
+            models_v2.Network, 'after_insert', quota_db._resource_inserted))
+        self.assertFalse(event.contains(
+            orm.Session, 'after_bulk_delete',
+            quota_db._resources_bulk_deleted))
+        self.driver.get_usage(self.context, 'foo', 'network')
+        self._add_networks(1)
+        self.assertEqual(0, self._get_usage().in_use)
+
+    def test_make_reservation(self):
+        self._add_networks(1)
+        reservation = self.driver.make_reservation(
+            self.context, 'foo', self.resources, 'network', 2)
+        self.assertRaises(exceptions.OverQuota,
+                          self.driver.make_reservation,
+                          self.context, 'foo', self.resources, 'network', 1)
+        self.driver.release_reservation(self.context, reservation)
+        self.driver.make_reservation(
+            self.context, 'foo', self.resources, 'network', 2)
+
+    def test_expired_reservation_ignored(self):
+        cfg.CONF.set_override('reservation_expiration', -1, group='QUOTAS')
+        self.driver.make_reservation(
+            self.context, 'foo', self.resources, 'network', 3)
+        self.driver.make_reservation(
+            self.context, 'foo', self.resources, 'network', 3)
+
+    def test_quota_engine_counts_untracked_resources(self):
+        engine = quota.QuotaEngine(self.driver)
+        engine.register_resource_by_name('fake')
+        plugin = mock.Mock()
+        plugin.get_fakes_count.return_value = 10
+        cfg.CONF.set_override('default_quota', 10, group='QUOTAS')
+        self.assertRaises(exceptions.OverQuota, engine.make_reservation,
+                          self.context, 'foo', 'fake', 1, plugin, 'fakes')
+        plugin.get_fakes_count.assert_called_once_with(
+            self.context, filters={'tenant_id': ['foo']})
+
+
+class TestUsageTrackingOutsideApi(testlib_api.SqlTestCase,
+                                  testlib_plugin.PluginSetupHelper):
+    """Usages of the resources created by the RPC workers, for instance."""
+
+    def setUp(self):
+        super(TestUsageTrackingOutsideApi, self).setUp()
+        cfg.CONF.set_override('quota_driver',
+                              'neutron.db.quota_db.UsageQuotaDriver',
+                              group='QUOTAS')
+        quota.QUOTAS._driver = None
+        self.addCleanup(setattr, quota.QUOTAS, '_driver', None)
+        self.addCleanup(quota_db.stop_tracking)
+        self.setup_coreplugin(
+            'neutron.db.db_base_plugin_v2.NeutronDbPluginV2')
+        self.plugin = manager.NeutronManager.get_plugin()
+        self.context = context.get_admin_context()
+
+    def test_port_created_by_plugin_tracked(self):
+        network = self.plugin.create_network(self.context, {'network': {
+            'tenant_id': 'foo', 'name': 'net', 'admin_state_up': True,
+            'shared': False}})
+        # Loaded with the plugin, not by a request to the API
+        driver = quota.QUOTAS._driver
+        self.assertIsInstance(driver, quota_db.UsageQuotaDriver)
+        self.assertEqual(0, driver.get_usage(self.context, 'foo', 'port'))
+        self.plugin.create_port(self.context, {'port': {
+            'tenant_id': 'foo', 'name': '', 'network_id': network['id'],
+            'admin_state_up': True, 'device_id': 'dhcp',
+            'device_owner': 'network:dhcp',
+            'mac_address': attributes.ATTR_NOT_SPECIFIED,
+            'fixed_ips': attributes.ATTR_NOT_SPECIFIED}})
+        with mock.patch.object(driver, '_needs_resync', return_value=False):
+            self.assertEqual(1, driver.get_usage(self.context, 'foo',
+                                                 'port'))
+
+
+class TestTenantLimitCache(testlib_api.SqlTestCase):
+    """Test for neutron.db.quota_db.TenantLimitCache."""
+
+    def setUp(self):
+        super(TestTenantLimitCache, self).setUp()
+        cfg.CONF.set_override('limit_cache_ttl', 60, group='QUOTAS')
+        self.addCleanup(setattr, quota_db, '_LIMIT_CACHE', None)
+        self.cache = quota_db._get_limit_cache()
+        self.context = context.get_admin_context()
+        self.driver = quota_db.DbQuotaDriver()
+        self.resources = {'network': quota.CountableResource(
+            'network', None, 'quota_network')}
+
+    def test_get_loads_once(self):
+        load = mock.Mock(return_value={'network': 5})
+        self.assertEqual({'network': 5}, self.cache.get('foo', load))
+        self.assertEqual({'network': 5}, self.cache.get('foo', load))
+        self.assertEqual(1, load.call_count)
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+    def test_get_expired(self):
+        load = mock.Mock(return_value={})
+        self.cache.get('foo', load)
+        with mock.patch.object(quota_db.time, 'time',
+                               return_value=quota_db.time.time() + 61):
+            self.cache.get('foo', load)
+        self.assertEqual(2, load.call_count)
+
+    def test_limits_invalidated_while_loading_not_cached(self):
+        def load():
+            self.cache.invalidate('foo')
+            return {}
+        self.cache.get('foo', load)
+        load = mock.Mock(return_value={})
+        self.cache.get('foo', load)
+        self.assertTrue(load.called)
+
+    def test_update_quota_limit_notifies_workers(self):
+        self.assertEqual({'network': 10}, self.driver._get_quotas(
+            self.context, 'foo', self.resources, ['network']))
+        with mock.patch.object(self.cache.notifier,
+                               'quota_limits_changed') as notify:
+            self.driver.update_quota_limit(self.context, 'foo', 'network', 2)
+        notify.assert_called_once_with(self.context, 'foo')
+        self.assertEqual({'network': 2}, self.driver._get_quotas(
+            self.context, 'foo', self.resources, ['network']))
+
+    def test_notification_invalidates(self):
+        self.cache.get('foo', mock.Mock(return_value={'network': 1}))
+        callback = quota_rpc.QuotaLimitsCallback(self.cache)
+        callback.quota_limits_changed(self.context, tenant_id='foo')
+        load = mock.Mock(return_value={})
+        self.cache.get('foo', load)
+        self.assertTrue(load.called)
+
+
 class TestQuotaDriverLoad(base.BaseTestCase):
     def setUp(self):
         super(TestQuotaDriverLoad, self).setUp()
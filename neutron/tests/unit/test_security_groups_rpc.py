@@ -73,6 +73,7 @@ class SecurityGroupRpcTestPlugin(test_sg.SecurityGroupTestPlugin,
         self.devices[id] = updated_port
         self.update_security_group_on_port(
             context, id, port, original_port, updated_port)
+        return updated_port
 
     def delete_port(self, context, id):
         port = self.get_port(context, id)
@@ -83,6 +84,7 @@ class SecurityGroupRpcTestPlugin(test_sg.SecurityGroupTestPlugin,
     def get_port_from_device(self, device):
         device = self.devices.get(device)
         if device:
+            device = dict(device)
             device['security_group_rules'] = []
             device['security_group_source_groups'] = []
             device['fixed_ips'] = [ip['ip_address']
@@ -456,6 +458,183 @@ class SGServerRpcCallBackTestCase(test_sg.SecurityGroupDBTestCase):
                 self._delete('ports', port_id1)
                 self._delete('ports', port_id2)
 
+    def test_security_group_info_for_devices_rules_cached(self):
+        with self.network() as n:
+            with contextlib.nested(self.subnet(n),
+                                   self.security_group()) as (subnet_v4,
+                                                              sg1):
+                sg1_id = sg1['security_group']['id']
+                res1 = self._create_port(
+                    self.fmt, n['network']['id'],
+                    security_groups=[sg1_id])
+                port_id1 = self.deserialize(self.fmt, res1)['port']['id']
+                ctx = context.get_admin_context()
+                make_rules = mock.patch.object(
+                    sg_db_rpc, '_make_unique_rule_dicts',
+                    wraps=sg_db_rpc._make_unique_rule_dicts).start()
+                ports_rpc = self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id1])
+                self.assertEqual(2, len(ports_rpc['security_groups'][sg1_id]))
+                self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id1])
+                self.assertEqual(1, make_rules.call_count)
+
+                rule1 = self._build_security_group_rule(
+                    sg1_id, 'ingress', const.PROTO_NAME_TCP, '22', '22')
+                res = self._create_security_group_rule(self.fmt, rule1)
+                rule_id = self.deserialize(
+                    self.fmt, res)['security_group_rule']['id']
+                ports_rpc = self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id1])
+                self.assertEqual(2, make_rules.call_count)
+                self.assertIn({'direction': 'ingress',
+                               'ethertype': const.IPv4,
+                               'protocol': const.PROTO_NAME_TCP,
+                               'port_range_min': 22,
+                               'port_range_max': 22},
+                              ports_rpc['security_groups'][sg1_id])
+
+                self._delete('security-group-rules', rule_id)
+                ports_rpc = self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id1])
+                self.assertEqual(2, len(ports_rpc['security_groups'][sg1_id]))
+                self._delete('ports', port_id1)
+
+    def test_security_group_info_for_devices_member_ips_cached(self):
+        with self.network() as n:
+            with contextlib.nested(self.subnet(n),
+                                   self.security_group(),
+                                   self.security_group()) as (subnet_v4,
+                                                              sg1,
+                                                              sg2):
+                sg1_id = sg1['security_group']['id']
+                sg2_id = sg2['security_group']['id']
+                rule1 = self._build_security_group_rule(
+                    sg1_id, 'ingress', const.PROTO_NAME_TCP, '22', '22',
+                    remote_group_id=sg2_id)
+                self._create_security_group_rule(self.fmt, rule1)
+                res1 = self._create_port(
+                    self.fmt, n['network']['id'],
+                    security_groups=[sg1_id])
+                port_id1 = self.deserialize(self.fmt, res1)['port']['id']
+                res2 = self._create_port(
+                    self.fmt, n['network']['id'],
+                    security_groups=[sg2_id])
+                port_id2 = self.deserialize(self.fmt, res2)['port']['id']
+                plugin = manager.NeutronManager.get_plugin()
+                select_ips = mock.patch.object(
+                    plugin, '_select_ips_for_remote_group',
+                    wraps=plugin._select_ips_for_remote_group).start()
+                ctx = context.get_admin_context()
+                ports_rpc = self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id1])
+                self.assertEqual({sg2_id: {const.IPv4: ['10.0.0.3']}},
+                                 ports_rpc['sg_member_ips'])
+                self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id1])
+                self.assertEqual(1, select_ips.call_count)
+
+                data = {'port': {'fixed_ips': [
+                    {'subnet_id': subnet_v4['subnet']['id'],
+                     'ip_address': '10.0.0.10'}]}}
+                self._update('ports', port_id2, data)
+                ports_rpc = self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id1])
+                self.assertEqual(['10.0.0.10'],
+                                 ports_rpc['sg_member_ips'][sg2_id]['IPv4'])
+
+                self._update('ports', port_id2, {'port': {'fixed_ips': []}})
+                ports_rpc = self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id1])
+                self.assertEqual([],
+                                 ports_rpc['sg_member_ips'][sg2_id]['IPv4'])
+                self.assertEqual(3, select_ips.call_count)
+
+                self._delete('ports', port_id2)
+                ports_rpc = self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id1])
+                self.assertEqual([],
+                                 ports_rpc['sg_member_ips'][sg2_id]['IPv4'])
+                self.assertEqual(3, select_ips.call_count)
+                self._delete('ports', port_id1)
+
+    def test_security_group_delete_evicts_cache(self):
+        with self.network() as n:
+            with contextlib.nested(
+                    self.subnet(n),
+                    self.security_group(do_delete=False),
+                    self.security_group(do_delete=False)) as (subnet_v4,
+                                                              sg1, sg2):
+                sg1_id = sg1['security_group']['id']
+                sg2_id = sg2['security_group']['id']
+                rule1 = self._build_security_group_rule(
+                    sg1_id, 'ingress', const.PROTO_NAME_TCP, '22', '22',
+                    remote_group_id=sg2_id)
+                self._create_security_group_rule(self.fmt, rule1)
+                res1 = self._create_port(
+                    self.fmt, n['network']['id'],
+                    security_groups=[sg1_id])
+                port_id1 = self.deserialize(self.fmt, res1)['port']['id']
+                res2 = self._create_port(
+                    self.fmt, n['network']['id'],
+                    security_groups=[sg2_id])
+                port_id2 = self.deserialize(self.fmt, res2)['port']['id']
+                self.rpc.security_group_info_for_devices(
+                    context.get_admin_context(), devices=[port_id1])
+                self.assertIn(sg1_id, sg_db_rpc._CACHE.rules)
+                self.assertIn(sg2_id, sg_db_rpc._CACHE.member_ips)
+
+                self._delete('ports', port_id1)
+                self._delete('ports', port_id2)
+                self._delete('security-groups', sg1_id)
+                self._delete('security-groups', sg2_id)
+                self.assertNotIn(sg1_id, sg_db_rpc._CACHE.rules)
+                self.assertNotIn(sg2_id, sg_db_rpc._CACHE.member_ips)
+
+    def test_security_group_info_for_devices_member_addr_pair_removed(self):
+        plugin_obj = manager.NeutronManager.get_plugin()
+        if ('allowed-address-pairs'
+            not in plugin_obj.supported_extension_aliases):
+            self.skipTest("Test depends on allowed-address-pairs extension")
+        with self.network() as n:
+            with contextlib.nested(self.subnet(n),
+                                   self.security_group(),
+                                   self.security_group()) as (subnet_v4,
+                                                              sg1,
+                                                              sg2):
+                sg1_id = sg1['security_group']['id']
+                sg2_id = sg2['security_group']['id']
+                rule1 = self._build_security_group_rule(
+                    sg1_id, 'ingress', const.PROTO_NAME_TCP, '22', '22',
+                    remote_group_id=sg2_id)
+                self._create_security_group_rule(self.fmt, rule1)
+                res1 = self._create_port(
+                    self.fmt, n['network']['id'],
+                    security_groups=[sg1_id])
+                port_id1 = self.deserialize(self.fmt, res1)['port']['id']
+                address_pairs = [{'mac_address': '00:00:00:00:00:01',
+                                  'ip_address': '11.0.0.1'}]
+                res2 = self._create_port(
+                    self.fmt, n['network']['id'],
+                    security_groups=[sg2_id],
+                    arg_list=(addr_pair.ADDRESS_PAIRS,),
+                    allowed_address_pairs=address_pairs)
+                port_id2 = self.deserialize(self.fmt, res2)['port']['id']
+                ctx = context.get_admin_context()
+                ports_rpc = self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id1])
+                self.assertIn('11.0.0.1',
+                              ports_rpc['sg_member_ips'][sg2_id]['IPv4'])
+
+                data = {'port': {addr_pair.ADDRESS_PAIRS: []}}
+                self._update('ports', port_id2, data)
+                ports_rpc = self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id1])
+                self.assertNotIn('11.0.0.1',
+                                 ports_rpc['sg_member_ips'][sg2_id]['IPv4'])
+                self._delete('ports', port_id1)
+                self._delete('ports', port_id2)
+
     def test_security_group_rules_for_devices_ipv6_ingress(self):
         fake_prefix = FAKE_PREFIX[const.IPv6]
         fake_gateway = FAKE_IP[const.IPv6]
@@ -974,6 +1153,32 @@ class SGServerRpcCallBackTestCaseXML(SGServerRpcCallBackTestCase):
     fmt = 'xml'
 
 
+class SecurityGroupInfoCacheTestCase(base.BaseTestCase):
+
+    def test_least_recently_used_groups_evicted(self):
+        with mock.patch.object(sg_db_rpc.SecurityGroupInfoCache,
+                               'MAX_GROUPS', 2):
+            cache = sg_db_rpc.SecurityGroupInfoCache()
+        cache.rules.set('sg1', (0, []))
+        cache.rules.set('sg2', (0, []))
+        cache.rules.get('sg1')
+        cache.rules.set('sg3', (0, []))
+        self.assertEqual(2, len(cache.rules))
+        self.assertIn('sg1', cache.rules)
+        self.assertNotIn('sg2', cache.rules)
+        cache.rules.set('sg1', (1, []))
+        self.assertEqual((1, []), cache.rules.get('sg1'))
+
+    def test_evict(self):
+        cache = sg_db_rpc.SecurityGroupInfoCache()
+        cache.rules.set('sg1', (0, []))
+        cache.member_ips.set('sg1', (set(), {}))
+        cache.evict('sg1')
+        cache.evict('sg2')
+        self.assertEqual(0, len(cache.rules))
+        self.assertEqual(0, len(cache.member_ips))
+
+
 class SGAgentRpcCallBackMixinTestCase(base.BaseTestCase):
     def setUp(self):
         super(SGAgentRpcCallBackMixinTestCase, self).setUp()
@@ -1449,7 +1654,7 @@ class SecurityGroupServerRpcApiTestCase(base.BaseTestCase):
                  {'devices': ['fake_device']},
               'method': 'security_group_rules_for_devices',
               'namespace': None},
-             version='1.1')])
+             topic='fake_topic', version='1.1')])
 
 
 class FakeSGNotifierAPI(n_rpc.RpcProxy,
@@ -19,6 +19,7 @@ import urllib2
 
 import mock
 from oslo.config import cfg
+import routes
 import testtools
 import webob
 import webob.exc
@@ -26,6 +27,7 @@ import webob.exc
 from neutron.api.v2 import attributes
 from neutron.common import constants
 from neutron.common import exceptions as exception
+from neutron.openstack.common import jsonutils
 from neutron.tests import base
 from neutron import wsgi
 
@@ -606,6 +608,38 @@ class JSONDictSerializerTest(base.BaseTestCase):
 
         self.assertEqual(result, expected_json)
 
+    def test_serialize_iter(self):
+        input_dict = {'networks': [{'id': 1, 'name': u'\u7f51\u7edc'},
+                                   {'id': 2, 'tags': (3, 4)}],
+                      'networks_links': [],
+                      'count': 2}
+        serializer = wsgi.JSONDictSerializer()
+        result = ''.join(serializer.serialize_iter(input_dict))
+
+        self.assertEqual(serializer.serialize(input_dict), result)
+
+    def test_serialize_iter_generator(self):
+        input_dict = {'ports': (dict(id=i) for i in range(3))}
+        serializer = wsgi.JSONDictSerializer()
+        result = ''.join(serializer.serialize_iter(input_dict))
+
+        self.assertEqual({'ports': [{'id': 0}, {'id': 1}, {'id': 2}]},
+                         jsonutils.loads(result))
+
+    def test_serialize_iter_chunks(self):
+        input_dict = {'ports': [{'id': 'x' * 10} for i in range(100)]}
+        serializer = wsgi.JSONDictSerializer()
+        serializer.chunk_size = 100
+        chunks = list(serializer.serialize_iter(input_dict))
+
+        self.assertTrue(len(chunks) > 1)
+        self.assertTrue(all(len(chunk) < 200 for chunk in chunks))
+        self.assertEqual(input_dict, jsonutils.loads(''.join(chunks)))
+
+    def test_serialize_iter_not_dict(self):
+        serializer = wsgi.JSONDictSerializer()
+        self.assertEqual(['[1, 2]'], list(serializer.serialize_iter([1, 2])))
+
 
 class TextDeserializerTest(base.BaseTestCase):
 
@@ -843,6 +877,87 @@ class ResourceTest(base.BaseTestCase):
         self.assertEqual(500, result.status_int)
 
 
+class TrieMapperTest(base.BaseTestCase):
+
+    REQUESTS = [('GET', '/'),
+                ('GET', '/networks'),
+                ('GET', '/networks.json'),
+                ('POST', '/networks'),
+                ('GET', '/networks/3c0f8b2e-1b8a-4d8b-9f3e-27e3a3d8c1a0'),
+                ('PUT', '/networks/3c0f8b2e-1b8a-4d8b-9f3e-27e3a3d8c1a0.xml'),
+                ('DELETE', '/networks/3c0f8b2e-1b8a-4d8b-9f3e-27e3a3d8c1a0'),
+                ('GET', '/networks/'),
+                ('GET', '/networks/abc'),
+                ('GET', '/net'),
+                ('GET', '/routers'),
+                ('PUT', '/routers/1/add_router_interface'),
+                ('PUT', '/routers/1/add_router_interface.json'),
+                ('GET', '/routers/1/l3-agents'),
+                ('GET', '/routers/1/l3-agents.json'),
+                ('GET', '/lb/pools/1/stats'),
+                ('POST', '/lb/pools/1/health_monitors'),
+                ('GET', '/lb/pools/1/health_monitors/2'),
+                ('GET', '/extensions/alias'),
+                ('GET', '/v1.0/a/b/c'),
+                ('GET', '/unknown')]
+
+    def _build(self, mapper):
+        requirements = {'id': attributes.UUID_PATTERN, 'format': 'xml|json'}
+        mapper.connect('index', '/', controller='index')
+        mapper.collection('networks', 'network', controller='networks',
+                          requirements=requirements,
+                          collection_actions=['index', 'create'],
+                          member_actions=['show', 'update', 'delete'])
+        mapper.resource('router', 'routers', controller='routers',
+                        member={'add_router_interface': 'PUT'})
+        mapper.resource('l3-agent', 'l3-agents', controller='l3-agents',
+                        parent_resource={'collection_name': 'routers',
+                                         'member_name': 'router'})
+        mapper.resource('pool', 'pools', controller='pools',
+                        path_prefix='/lb', member={'stats': 'GET'})
+        mapper.resource('health_monitor', 'health_monitors',
+                        controller='health_monitors',
+                        path_prefix='/lb/pools/{pool_id}')
+        mapper.connect(None, '/extensions/{id}', controller='extensions')
+        mapper.connect(None, '/v1.0/{path_info:.*}', controller='app')
+        return mapper
+
+    def _routematch(self, mapper, method, path):
+        result = mapper.routematch(environ={'REQUEST_METHOD': method,
+                                            'PATH_INFO': path})
+        return result and (result[0], result[1].routepath)
+
+    def test_routematch_same_as_routes(self):
+        mapper = self._build(routes.Mapper())
+        trie_mapper = self._build(wsgi.TrieMapper())
+        for method, path in self.REQUESTS:
+            expected = self._routematch(mapper, method, path)
+            self.assertEqual(expected,
+                             self._routematch(trie_mapper, method, path),
+                             '%s %s' % (method, path))
+
+    def test_routematch_candidates(self):
+        trie_mapper = self._build(wsgi.TrieMapper())
+        trie_mapper.create_regs()
+        candidates = trie_mapper._get_candidates('/lb/pools/1/stats')
+        self.assertTrue(candidates)
+        for position, route in candidates:
+            self.assertTrue(route.routepath.startswith('/lb/pools') or
+                            route.routepath.startswith('/{'),
+                            route.routepath)
+        self.assertEqual(['/'], [route.routepath for position, route in
+                                 trie_mapper._get_candidates('/')])
+
+    def test_minimization_falls_back_to_routes(self):
+        mapper = wsgi.TrieMapper(explicit=False)
+        mapper.minimization = True
+        mapper.connect(None, '/servers/{action}/{id}', controller='servers')
+        match, routepath = self._routematch(mapper, 'GET', '/servers/show')
+        self.assertEqual({'controller': 'servers', 'action': 'show',
+                          'id': None}, match)
+        self.assertIsNone(mapper._trie)
+
+
 class MiddlewareTest(base.BaseTestCase):
     def test_process_response(self):
         def application(environ, start_response):
@@ -18,12 +18,16 @@ Utility methods for working with WSGI servers
 """
 from __future__ import print_function
 
+import bisect
 import errno
+import itertools
+import operator
 import os
 import socket
 import ssl
 import sys
 import time
+import types
 from xml.etree import ElementTree as etree
 from xml.parsers import expat
 
@@ -388,11 +392,53 @@ class DictSerializer(ActionDispatcher):
 class JSONDictSerializer(DictSerializer):
     """Default JSON request body serialization."""
 
+    # Approximate size in bytes of the chunks yielded by serialize_iter
+    chunk_size = 65536
+
     def default(self, data):
         def sanitizer(obj):
             return unicode(obj)
         return jsonutils.dumps(data, default=sanitizer)
 
+    def _iter_parts(self, data):
+        if not isinstance(data, dict):
+            yield self.default(data)
+            return
+        yield '{'
+        for i, (key, value) in enumerate(data.iteritems()):
+            if i:
+                yield ', '
+            yield '%s: ' % self.default(key)
+            if isinstance(value, (list, tuple, types.GeneratorType)):
+                yield '['
+                for j, item in enumerate(value):
+                    if j:
+                        yield ', '
+                    yield self.default(item)
+                yield ']'
+            else:
+                yield self.default(value)
+        yield '}'
+
+    def serialize_iter(self, data):
+        """Serialize data as a sequence of JSON chunks.
+
+        The items of the lists in data are encoded one at a time, so a large
+        collection is never held in memory as a single string. The output
+        is the same as the one of serialize.
+        """
+        chunk = []
+        size = 0
+        for part in self._iter_parts(data):
+            chunk.append(part)
+            size += len(part)
+            if size >= self.chunk_size:
+                yield ''.join(chunk)
+                chunk = []
+                size = 0
+        if chunk:
+            yield ''.join(chunk)
+
 
 class XMLDictSerializer(DictSerializer):
 
@@ -964,6 +1010,93 @@ class Debug(Middleware):
         print()
 
 
+class _PathTrieNode(object):
+    __slots__ = ('children', 'routes', 'prefix_lens')
+
+    def __init__(self):
+        # Path segment: node of the routes starting with it
+        self.children = {}
+        # Literal start of the next path segment: [(position, route)]
+        self.routes = {}
+        # Sorted lengths of the keys of routes
+        self.prefix_lens = []
+
+
+class TrieMapper(routes.Mapper):
+    """A routes.Mapper matching requests with a trie of path segments.
+
+    routes.Mapper tries the regexps of the routes one after the other. The
+    routes are indexed here by the literal segments their path starts with,
+    and only the regexps of the routes whose literal start is the start of
+    the requested path are tried, in the order the routes were connected,
+    so the route matched is the same. The routes without variables only
+    match their path, they are indexed by it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TrieMapper, self).__init__(*args, **kwargs)
+        self._trie = None
+        # Path of the routes without variables: [(position, route)]
+        self._literal_routes = {}
+
+    def _create_regs(self, *args, **kwargs):
+        super(TrieMapper, self)._create_regs(*args, **kwargs)
+        root = _PathTrieNode()
+        literal_routes = {}
+        for position, route in enumerate(self.matchlist):
+            if route.static:
+                continue
+            if route.minimization:
+                # Minimized routes match without their trailing parts
+                self._trie = None
+                return
+            literal_parts = list(itertools.takewhile(
+                lambda part: not isinstance(part, dict), route.routelist))
+            literal = ''.join(literal_parts)
+            if len(literal_parts) == len(route.routelist):
+                literal_routes.setdefault(literal, []).append(
+                    (position, route))
+                continue
+            segments = literal.split('/')
+            node = root
+            for segment in segments[:-1]:
+                node = node.children.setdefault(segment, _PathTrieNode())
+            prefix = segments[-1]
+            node.routes.setdefault(prefix, []).append((position, route))
+            if len(prefix) not in node.prefix_lens:
+                bisect.insort(node.prefix_lens, len(prefix))
+        self._trie = root
+        self._literal_routes = literal_routes
+
+    def _get_candidates(self, url):
+        candidates = list(self._literal_routes.get(url, ()))
+        node = self._trie
+        for segment in url.split('/'):
+            for length in node.prefix_lens:
+                if length > len(segment):
+                    break
+                candidates.extend(node.routes.get(segment[:length], ()))
+            node = node.children.get(segment)
+            if node is None:
+                break
+        candidates.sort(key=operator.itemgetter(0))
+        return candidates
+
+    def _match(self, url, environ):
+        if not self._created_regs and self.controller_scan:
+            self.create_regs()
+        if (not self._created_regs or self._trie is None or self.prefix or
+                self.always_scan or self.debug):
+            return super(TrieMapper, self)._match(url, environ)
+        environ = environ or self.environ
+        for position, route in self._get_candidates(url):
+            match = route.match(url, environ, self.sub_domains,
+                                self.sub_domains_ignore, self.domain_match)
+            if isinstance(match, dict) or match:
+                return match, route, []
+        return None, None, []
+
+
 class Router(object):
     """WSGI middleware that maps incoming requests to WSGI apps."""
 
@@ -981,7 +1114,7 @@ class Router(object):
         the request to the action method.
 
         Examples:
-          mapper = routes.Mapper()
+          mapper = TrieMapper()
           sc = ServerController()
 
           # Explicit mapping of one route to a controller+action
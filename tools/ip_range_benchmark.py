@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark availability range computation on large allocation pools.
+
+Compares the netaddr IPSet based computation the DB base plugin used to
+rebuild availability ranges with the integer interval subtraction it uses
+now, for a /16, a /8 and an IPv6 /64 pool with a number of random
+allocations. The IPSet computation expands the pool address by address, it
+is skipped for pools larger than --max-legacy-size.
+
+    python tools/ip_range_benchmark.py --allocations 10000
+"""
+
+import random
+import sys
+import time
+
+import netaddr
+from oslo.config import cfg
+
+from neutron.db import ip_allocator
+
+POOLS = [('/16', '10.0.0.0/16'),
+         ('/8', '10.0.0.0/8'),
+         ('IPv6 /64', 'fd00::/64')]
+
+OPTS = [
+    cfg.IntOpt('allocations', default=10000,
+               help='Number of allocated addresses in each pool'),
+    cfg.IntOpt('max_legacy_size', default=2 ** 17,
+               help='Largest pool the IPSet computation is run on'),
+]
+
+
+def legacy_free_ranges(first_ip, last_ip, allocations):
+    allocations = netaddr.IPSet([netaddr.IPAddress(ip) for ip in allocations])
+    poolset = netaddr.IPSet(netaddr.iter_iprange(first_ip, last_ip))
+    available = poolset - allocations
+    ranges = []
+    first, last = None, None
+    for cidr in available.iter_cidrs():
+        if last and last + 1 != cidr.first:
+            ranges.append((first, last))
+            first = None
+        first, last = first if first else cidr.first, cidr.last
+    if first:
+        ranges.append((first, last))
+    return ranges
+
+
+def interval_free_ranges(first_ip, last_ip, allocations):
+    pool = (int(netaddr.IPAddress(first_ip)), int(netaddr.IPAddress(last_ip)))
+    return ip_allocator.get_free_ranges(
+        [pool], sorted(int(netaddr.IPAddress(ip)) for ip in allocations))
+
+
+def _timed(func, *args):
+    start = time.time()
+    result = func(*args)
+    return result, time.time() - start
+
+
+def run(name, cidr, conf):
+    net = netaddr.IPNetwork(cidr)
+    first_ip = str(netaddr.IPAddress(net.first + 1))
+    last_ip = str(netaddr.IPAddress(net.last - 1))
+    allocations = set(str(netaddr.IPAddress(
+        random.randint(net.first + 1, net.last - 1)))
+        for i in range(conf.allocations))
+
+    ranges, elapsed = _timed(interval_free_ranges, first_ip, last_ip,
+                             allocations)
+    print('%s pool, %d allocations, %d free ranges' %
+          (name, len(allocations), len(ranges)))
+    print('  intervals: %.4fs' % elapsed)
+    if net.size > conf.max_legacy_size:
+        print('  IPSet:     skipped, %d addresses' % net.size)
+        return
+    legacy_ranges, legacy_elapsed = _timed(legacy_free_ranges, first_ip,
+                                           last_ip, allocations)
+    print('  IPSet:     %.4fs' % legacy_elapsed)
+    if legacy_ranges != ranges:
+        print('  results differ!')
+
+
+def main():
+    conf = cfg.CONF
+    conf.register_cli_opts(OPTS)
+    conf(sys.argv[1:], project='neutron')
+    for name, cidr in POOLS:
+        run(name, cidr, conf)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark the validation of bulk port create request bodies.
+
+Compares the attribute map walk prepare_request_body used to do for each
+item of a bulk body with the compiled attribute map it uses now.
+
+    python tools/request_body_benchmark.py --ports 5000
+"""
+
+import copy
+import sys
+import time
+
+from oslo.config import cfg
+
+from neutron.api.v2 import attributes
+from neutron.api.v2 import base
+from neutron import context as n_context
+from neutron.openstack.common import uuidutils
+
+OPTS = [
+    cfg.IntOpt('ports', default=5000,
+               help='Number of ports in the bulk create body'),
+    cfg.IntOpt('repeat', default=5,
+               help='Number of times each body is validated'),
+]
+
+
+def legacy_prepare(res_dict, attr_info):
+    extra_keys = set(res_dict.keys()) - set(attr_info.keys())
+    if extra_keys:
+        raise ValueError(extra_keys)
+    for attr, attr_vals in attr_info.iteritems():
+        if attr_vals['allow_post']:
+            if 'default' not in attr_vals and attr not in res_dict:
+                raise ValueError(attr)
+            res_dict[attr] = res_dict.get(attr, attr_vals.get('default'))
+        elif attr in res_dict:
+            raise ValueError(attr)
+    for attr, attr_vals in attr_info.iteritems():
+        if (attr not in res_dict or
+                res_dict[attr] is attributes.ATTR_NOT_SPECIFIED):
+            continue
+        if 'convert_to' in attr_vals:
+            res_dict[attr] = attr_vals['convert_to'](res_dict[attr])
+        if 'validate' not in attr_vals:
+            continue
+        for rule in attr_vals['validate']:
+            if attributes.validators[rule](res_dict[attr],
+                                           attr_vals['validate'][rule]):
+                raise ValueError(attr)
+
+
+def legacy(context, body, attr_info):
+    for item in body['ports']:
+        base.Controller._populate_tenant_id(context, item['port'], True)
+        legacy_prepare(item['port'], attr_info)
+
+
+def compiled(context, body, attr_info):
+    base.Controller.prepare_request_body(context, body, True, 'port',
+                                         attr_info, allow_bulk=True)
+
+
+def _make_body(ports):
+    network_id = uuidutils.generate_uuid()
+    return {'ports': [{'port': {'network_id': network_id,
+                                'name': 'port%d' % i,
+                                'admin_state_up': 'true',
+                                'device_owner': 'compute:nova',
+                                'device_id': uuidutils.generate_uuid()}}
+                      for i in range(ports)]}
+
+
+def run(name, func, conf):
+    context = n_context.Context('', 'bench')
+    attr_info = attributes.RESOURCE_ATTRIBUTE_MAP['ports']
+    body = _make_body(conf.ports)
+    elapsed = 0
+    for i in range(conf.repeat):
+        item_body = copy.deepcopy(body)
+        start = time.time()
+        func(context, item_body, attr_info)
+        elapsed += time.time() - start
+    print('%-10s %.4fs per body, %.1f us per port' %
+          (name, elapsed / conf.repeat,
+           elapsed / conf.repeat / conf.ports * 1e6))
+
+
+def main():
+    conf = cfg.CONF
+    conf.register_cli_opts(OPTS)
+    conf(sys.argv[1:], project='neutron')
+    run('legacy', legacy, conf)
+    run('compiled', compiled, conf)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark the routing of API requests.
+
+Maps the core resources the way the API router does, and the resources of
+the ML2, L3, LBaaS, FWaaS, VPNaaS and metering extensions the way the
+extension middleware does, in a routes.Mapper and in the TrieMapper used
+now, and compares the time spent matching requests on each of them.
+
+    python tools/route_benchmark.py --requests 100000
+"""
+
+import random
+import sys
+import time
+
+from oslo.config import cfg
+import routes
+
+from neutron.api.v2 import router
+from neutron import wsgi
+
+UUID = '3c0f8b2e-1b8a-4d8b-9f3e-27e3a3d8c1a0'
+
+# Path prefix: [(collection, member actions, collection actions)]
+EXTENSION_RESOURCES = {
+    '': [('routers', {'add_router_interface': 'PUT',
+                      'remove_router_interface': 'PUT'}, {}),
+         ('floatingips', {}, {}),
+         ('security-groups', {}, {}),
+         ('security-group-rules', {}, {}),
+         ('agents', {}, {}),
+         ('quotas', {}, {'tenant': 'GET'}),
+         ('extensions', {}, {}),
+         ('service-providers', {}, {}),
+         ('metering-labels', {}, {}),
+         ('metering-label-rules', {}, {}),
+         ('network-profiles', {}, {}),
+         ('policy-profiles', {}, {}),
+         ('network-gateways', {'connect_network': 'PUT',
+                               'disconnect_network': 'PUT'}, {}),
+         ('qos-queues', {}, {})],
+    '/lb': [('pools', {'stats': 'GET'}, {}),
+            ('vips', {}, {}),
+            ('members', {}, {}),
+            ('health_monitors', {}, {})],
+    '/fw': [('firewalls', {}, {}),
+            ('firewall_policies', {'insert_rule': 'PUT',
+                                   'remove_rule': 'PUT'}, {}),
+            ('firewall_rules', {}, {})],
+    '/vpn': [('vpnservices', {}, {}),
+             ('ikepolicies', {}, {}),
+             ('ipsecpolicies', {}, {}),
+             ('ipsec-site-connections', {}, {})],
+}
+
+# Parent collection: [sub-resource collections]
+SUB_RESOURCES = {
+    'routers': ['l3-agents'],
+    'agents': ['l3-routers', 'dhcp-networks'],
+}
+
+OPTS = [
+    cfg.IntOpt('requests', default=100000,
+               help='Number of requests routed on each mapper'),
+]
+
+
+def build_mapper(mapper):
+    """Map the resources the way the API router and extensions do."""
+    for collection in router.RESOURCES.values():
+        mapper.collection(collection, collection[:-1], controller=collection,
+                          requirements=router.REQUIREMENTS,
+                          collection_actions=router.COLLECTION_ACTIONS,
+                          member_actions=router.MEMBER_ACTIONS)
+    for path_prefix, resources in EXTENSION_RESOURCES.iteritems():
+        for collection, member_actions, collection_actions in resources:
+            for action, method in collection_actions.iteritems():
+                path = "/%s/%s" % (collection, action)
+                with mapper.submapper(controller=collection, action=action,
+                                      path_prefix=path_prefix,
+                                      conditions=dict(method=[method])) as sm:
+                    sm.connect(path)
+                    sm.connect("%s.:(format)" % path)
+            mapper.resource(collection, collection, controller=collection,
+                            member=member_actions, path_prefix=path_prefix)
+    for parent, collections in SUB_RESOURCES.iteritems():
+        for collection in collections:
+            mapper.resource(collection, collection, controller=collection,
+                            parent_resource={'collection_name': parent,
+                                             'member_name': parent[:-1]})
+    return mapper
+
+
+def get_requests():
+    requests = []
+    collections = [('', collection)
+                   for collection in router.RESOURCES.values()]
+    for path_prefix, resources in EXTENSION_RESOURCES.iteritems():
+        collections.extend((path_prefix, resource[0])
+                           for resource in resources)
+    for path_prefix, collection in collections:
+        path = '%s/%s' % (path_prefix, collection)
+        requests.extend([('GET', path + '.json'),
+                         ('POST', path + '.json'),
+                         ('GET', '%s/%s.json' % (path, UUID)),
+                         ('PUT', '%s/%s.json' % (path, UUID)),
+                         ('DELETE', '%s/%s.json' % (path, UUID))])
+    for parent, collections in SUB_RESOURCES.iteritems():
+        for collection in collections:
+            requests.append(('GET', '/%s/%s/%s.json' % (parent, UUID,
+                                                        collection)))
+    requests.append(('PUT', '/routers/%s/add_router_interface.json' % UUID))
+    requests.append(('GET', '/unknown.json'))
+    return requests
+
+
+def route(mapper, requests):
+    start = time.time()
+    results = []
+    for method, path in requests:
+        result = mapper.routematch(environ={'REQUEST_METHOD': method,
+                                            'PATH_INFO': path})
+        results.append(result and (result[0], result[1].routepath))
+    return results, time.time() - start
+
+
+def main():
+    conf = cfg.CONF
+    conf.register_cli_opts(OPTS)
+    conf(sys.argv[1:], project='neutron')
+    mapper = build_mapper(routes.Mapper())
+    trie_mapper = build_mapper(wsgi.TrieMapper())
+    requests = get_requests()
+    requests = [random.choice(requests) for i in range(conf.requests)]
+    # Build the regexps and the trie before timing
+    route(mapper, requests[:1])
+    route(trie_mapper, requests[:1])
+
+    results, elapsed = route(mapper, requests)
+    trie_results, trie_elapsed = route(trie_mapper, requests)
+    print('%d routes, %d requests' % (len(mapper.matchlist), len(requests)))
+    print('  routes.Mapper: %.4fs, %.1fus per request' %
+          (elapsed, elapsed * 1e6 / len(requests)))
+    print('  TrieMapper:    %.4fs, %.1fus per request' %
+          (trie_elapsed, trie_elapsed * 1e6 / len(requests)))
+    if results != trie_results:
+        print('  results differ!')
+
+
+if __name__ == '__main__':
+    main()